@@ -0,0 +1,62 @@
+"""Folded and indexed last name for autocomplete prefix search.
+
+Revision ID: 3e1a2b4c5d6f
+Revises: 2fbe1bde5df8
+Create Date: 2017-04-02 12:13:48.301829
+
+"""
+
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e1a2b4c5d6f'
+down_revision = '2fbe1bde5df8'
+
+
+def fold_search_text(text):
+    """
+    Folds a text for case and accent insensitive prefix searches.
+
+    Copy of c3smembership.models.fold_search_text so that the migration does
+    not change if the model does.
+    """
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', unicode(text))
+    return u''.join(
+        [char for char in decomposed if not unicodedata.combining(char)]
+    ).lower()
+
+
+def upgrade():
+    op.add_column(
+        'members',
+        sa.Column('lastname_search', sa.Unicode(length=255), nullable=True))
+    members = sa.table(
+        'members',
+        sa.column('id', sa.Integer),
+        sa.column('lastname', sa.Unicode),
+        sa.column('lastname_search', sa.Unicode))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select([members.c.id, members.c.lastname]))
+    updates = [
+        {'member_id': row.id, 'folded': fold_search_text(row.lastname)}
+        for row in rows]
+    if updates:
+        bind.execute(
+            members.update()
+                .where(members.c.id == sa.bindparam('member_id'))
+                .values(lastname_search=sa.bindparam('folded')),
+            updates)
+    op.create_index(
+        'ix_members_lastname_search', 'members', ['lastname_search'])
+
+
+def downgrade():
+    op.drop_index('ix_members_lastname_search', 'members')
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.drop_column('lastname_search')
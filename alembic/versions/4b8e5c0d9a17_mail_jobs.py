@@ -0,0 +1,44 @@
+"""Mail job queue for batch mail runs.
+
+Revision ID: 4b8e5c0d9a17
+Revises: 3e1a2b4c5d6f
+Create Date: 2017-04-09 16:42:05.518203
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4b8e5c0d9a17'
+down_revision = '3e1a2b4c5d6f'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'mail_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run', sa.Unicode(length=255), nullable=False),
+        sa.Column('idempotency_key', sa.Unicode(length=255), nullable=False),
+        sa.Column('status', sa.Unicode(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt', sa.DateTime(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('sent', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Unicode(length=255), nullable=True),
+        sa.Column('sender', sa.Unicode(length=255), nullable=False),
+        sa.Column('recipients', sa.Unicode(length=1023), nullable=False),
+        sa.Column('subject', sa.Unicode(length=255), nullable=False),
+        sa.Column('body', sa.UnicodeText(), nullable=False),
+        sa.Column('extra_headers', sa.UnicodeText(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'))
+    op.create_index('ix_mail_jobs_run', 'mail_jobs', ['run'])
+    op.create_index(
+        'ix_mail_jobs_next_attempt', 'mail_jobs', ['next_attempt'])
+
+
+def downgrade():
+    op.drop_index('ix_mail_jobs_next_attempt', 'mail_jobs')
+    op.drop_index('ix_mail_jobs_run', 'mail_jobs')
+    op.drop_table('mail_jobs')
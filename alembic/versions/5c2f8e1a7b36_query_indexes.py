@@ -0,0 +1,62 @@
+"""Indexes for the filtered, joined and sorted columns of members and shares.
+
+Revision ID: 5c2f8e1a7b36
+Revises: 4b8e5c0d9a17
+Create Date: 2017-04-16 10:27:51.903144
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5c2f8e1a7b36'
+down_revision = '4b8e5c0d9a17'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+INDEXES = [
+    ('ix_members_membership_accepted_date', 'members',
+     ['membership_accepted', 'membership_date', 'membership_loss_date']),
+    ('ix_members_lastname', 'members', ['lastname']),
+    ('ix_members_country', 'members', ['country']),
+    ('ix_members_shares_shares_id', 'members_shares', ['shares_id']),
+    ('ix_shares_date_of_acquisition', 'shares', ['date_of_acquisition']),
+    ('ix_dues15invoices_membership_no', 'dues15invoices', ['membership_no']),
+    ('ix_dues16invoices_membership_no', 'dues16invoices', ['membership_no']),
+    ('ix_dues17invoices_membership_no', 'dues17invoices', ['membership_no']),
+]
+"""
+The indexes as tuples of name, table and columns.
+"""
+
+
+NOT_NULL_INDEXES = [
+    'membership_number',
+    'membership_loss_date',
+    'email_invite_token_bcgv17',
+    'dues15_token',
+    'dues16_token',
+    'dues17_token',
+]
+"""
+The members columns which are indexed partially containing only the rows in
+which they are set.
+"""
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for column in NOT_NULL_INDEXES:
+        op.create_index(
+            'ix_members_{0}'.format(column),
+            'members',
+            [column],
+            sqlite_where=sa.text('{0} IS NOT NULL'.format(column)))
+
+
+def downgrade():
+    for column in reversed(NOT_NULL_INDEXES):
+        op.drop_index('ix_members_{0}'.format(column), 'members')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table)
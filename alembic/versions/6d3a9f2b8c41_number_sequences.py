@@ -0,0 +1,44 @@
+"""Number sequences for allocating membership numbers.
+
+Revision ID: 6d3a9f2b8c41
+Revises: 5c2f8e1a7b36
+Create Date: 2017-04-22 14:05:12.476318
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6d3a9f2b8c41'
+down_revision = '5c2f8e1a7b36'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+RESERVED_MEMBERSHIP_NUMBER = 999999999
+"""
+Copy of MemberRepository.RESERVED_MEMBERSHIP_NUMBER so that the migration
+does not change if the repository does.
+"""
+
+
+def upgrade():
+    number_sequences = op.create_table(
+        'number_sequences',
+        sa.Column('name', sa.Unicode(length=255), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'))
+    members = sa.table(
+        'members',
+        sa.column('membership_number', sa.Integer))
+    highest_membership_number = op.get_bind().execute(
+        sa.select([sa.func.max(members.c.membership_number)]).where(
+            members.c.membership_number != RESERVED_MEMBERSHIP_NUMBER)
+    ).scalar()
+    op.bulk_insert(number_sequences, [{
+        'name': u'membership_number',
+        'value': highest_membership_number or 0,
+    }])
+
+
+def downgrade():
+    op.drop_table('number_sequences')
@@ -0,0 +1,54 @@
+"""Number sequences for allocating dues invoice numbers.
+
+Revision ID: 7e4c1a3d9b52
+Revises: 6d3a9f2b8c41
+Create Date: 2017-04-23 11:48:37.092615
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7e4c1a3d9b52'
+down_revision = '6d3a9f2b8c41'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+DUES_YEARS = [
+    (2015, 'dues15invoices'),
+    (2016, 'dues16invoices'),
+    (2017, 'dues17invoices'),
+]
+"""
+The dues years and their invoice tables.
+"""
+
+
+def _sequence_name(year):
+    return u'dues{0}_invoice_number'.format(year)
+
+
+def upgrade():
+    number_sequences = sa.table(
+        'number_sequences',
+        sa.column('name', sa.Unicode),
+        sa.column('value', sa.Integer))
+    rows = []
+    for year, table_name in DUES_YEARS:
+        invoices = sa.table(table_name, sa.column('invoice_no', sa.Integer))
+        max_invoice_no = op.get_bind().execute(
+            sa.select([sa.func.max(invoices.c.invoice_no)])).scalar()
+        rows.append({
+            'name': _sequence_name(year),
+            'value': max_invoice_no or 0,
+        })
+    op.bulk_insert(number_sequences, rows)
+
+
+def downgrade():
+    number_sequences = sa.table(
+        'number_sequences',
+        sa.column('name', sa.Unicode))
+    op.execute(number_sequences.delete().where(
+        number_sequences.c.name.in_(
+            [_sequence_name(year) for year, _ in DUES_YEARS])))
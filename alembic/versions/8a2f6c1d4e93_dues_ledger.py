@@ -0,0 +1,126 @@
+"""Year-agnostic dues ledger and dues balances.
+
+Revision ID: 8a2f6c1d4e93
+Revises: 7e4c1a3d9b52
+Create Date: 2017-04-30 10:12:44.301857
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8a2f6c1d4e93'
+down_revision = '7e4c1a3d9b52'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+DUES_YEARS = [
+    (2015, 'dues15invoices', 'dues15_'),
+    (2016, 'dues16invoices', 'dues16_'),
+    (2017, 'dues17invoices', 'dues17_'),
+]
+"""
+The dues years, their invoice tables and the prefixes of their member
+columns.
+"""
+
+INVOICE_COLUMNS = (
+    'invoice_no, invoice_no_string, is_cancelled, cancelled_date, '
+    'is_altered, membership_no, email, token, preceding_invoice_no, '
+    'succeeding_invoice_no')
+"""
+The invoice columns copied into the ledger.
+"""
+
+BALANCE_COLUMNS = [
+    'start', 'invoice', 'invoice_no', 'amount', 'reduced', 'amount_reduced',
+    'amount_paid', 'paid_date', 'balance', 'balanced']
+"""
+The dues columns of the members copied into the balances.
+"""
+
+
+def upgrade():
+    op.create_table(
+        'dues_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=False),
+        sa.Column('entry_type', sa.Unicode(length=20), nullable=False),
+        sa.Column('entry_date', sa.DateTime(), nullable=True),
+        sa.Column('amount', sa.VARCHAR(length=100), nullable=True),
+        sa.Column('invoice_no', sa.Integer(), nullable=True),
+        sa.Column('invoice_no_string', sa.Unicode(length=255), nullable=True),
+        sa.Column('is_cancelled', sa.Boolean(), nullable=True),
+        sa.Column('cancelled_date', sa.DateTime(), nullable=True),
+        sa.Column('is_altered', sa.Boolean(), nullable=True),
+        sa.Column('membership_no', sa.Integer(), nullable=True),
+        sa.Column('email', sa.Unicode(length=255), nullable=True),
+        sa.Column('token', sa.Unicode(length=255), nullable=True),
+        sa.Column('preceding_invoice_no', sa.Integer(), nullable=True),
+        sa.Column('succeeding_invoice_no', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_index(
+        'ix_dues_ledger_member_id_year', 'dues_ledger',
+        ['member_id', 'year', 'entry_date'])
+    op.create_index(
+        'ix_dues_ledger_year_entry_date', 'dues_ledger',
+        ['year', 'entry_date'])
+    op.create_index(
+        'ix_dues_ledger_year_invoice_no', 'dues_ledger',
+        ['year', 'invoice_no'])
+    op.create_table(
+        'dues_balances',
+        sa.Column('member_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('start', sa.Unicode(length=255), nullable=True),
+        sa.Column('invoice', sa.Boolean(), nullable=True),
+        sa.Column('invoice_no', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.VARCHAR(length=100), nullable=True),
+        sa.Column('reduced', sa.Boolean(), nullable=True),
+        sa.Column('amount_reduced', sa.VARCHAR(length=100), nullable=True),
+        sa.Column('amount_paid', sa.VARCHAR(length=100), nullable=True),
+        sa.Column('paid_date', sa.DateTime(), nullable=True),
+        sa.Column('balance', sa.VARCHAR(length=100), nullable=True),
+        sa.Column('balanced', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('member_id', 'year'))
+    op.create_index('ix_dues_balances_year', 'dues_balances', ['year'])
+
+    for year, invoice_table, prefix in DUES_YEARS:
+        op.execute(
+            "insert into dues_ledger "
+            "(year, member_id, entry_type, entry_date, amount, {columns}) "
+            "select {year}, member_id, "
+            "case when is_reversal then 'reversal' else 'invoice' end, "
+            "invoice_date, invoice_amount, {columns} "
+            "from {table} order by id".format(
+                year=year, table=invoice_table, columns=INVOICE_COLUMNS))
+        # Only the total amount paid and the date of the last payment are
+        # known so each member gets one payment entry per year.
+        op.execute(
+            "insert into dues_ledger "
+            "(year, member_id, entry_type, entry_date, amount, "
+            "is_cancelled, is_altered) "
+            "select {year}, id, 'payment', {prefix}paid_date, "
+            "{prefix}amount_paid, 0, 0 from members "
+            "where {prefix}paid = 1 and {prefix}paid_date is not null "
+            "order by id".format(year=year, prefix=prefix))
+        op.execute(
+            "insert into dues_balances (member_id, year, {columns}) "
+            "select id, {year}, {member_columns} from members "
+            "where {prefix}start is not null or {prefix}invoice = 1 "
+            "or {prefix}paid = 1".format(
+                year=year,
+                prefix=prefix,
+                columns=', '.join(BALANCE_COLUMNS),
+                member_columns=', '.join(
+                    prefix + column for column in BALANCE_COLUMNS)))
+
+
+def downgrade():
+    op.drop_index('ix_dues_balances_year', 'dues_balances')
+    op.drop_table('dues_balances')
+    op.drop_index('ix_dues_ledger_year_invoice_no', 'dues_ledger')
+    op.drop_index('ix_dues_ledger_year_entry_date', 'dues_ledger')
+    op.drop_index('ix_dues_ledger_member_id_year', 'dues_ledger')
+    op.drop_table('dues_ledger')
@@ -0,0 +1,68 @@
+"""Monthly dues statistics aggregated from the dues ledger.
+
+Revision ID: 9b3d7e2f5a14
+Revises: 8a2f6c1d4e93
+Create Date: 2017-05-07 16:41:09.512638
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9b3d7e2f5a14'
+down_revision = '8a2f6c1d4e93'
+
+from datetime import date
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+AMOUNT_COLUMNS = {
+    'invoice': 'amount_invoiced_normal',
+    'reversal': 'amount_invoiced_reversal',
+    'payment': 'amount_paid',
+}
+"""
+The amount columns of the statistics by ledger entry type.
+"""
+
+
+def upgrade():
+    statistics = op.create_table(
+        'dues_monthly_statistics',
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column(
+            'amount_invoiced_normal', sa.VARCHAR(length=100), nullable=True),
+        sa.Column(
+            'amount_invoiced_reversal', sa.VARCHAR(length=100),
+            nullable=True),
+        sa.Column('amount_paid', sa.VARCHAR(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('year', 'month'))
+
+    # The amounts are stored as text and therefore summed as Decimal instead
+    # of by the database.
+    connection = op.get_bind()
+    sums = {}
+    for year, entry_date, entry_type, amount in connection.execute(
+            "select year, entry_date, entry_type, amount from dues_ledger "
+            "where entry_date is not null"):
+        month = date(int(entry_date[0:4]), int(entry_date[5:7]), 1)
+        month_sums = sums.setdefault(
+            (year, month),
+            dict.fromkeys(AMOUNT_COLUMNS.values(), Decimal('0')))
+        if amount is not None and not Decimal(amount).is_nan():
+            month_sums[AMOUNT_COLUMNS[entry_type]] += Decimal(amount)
+    if sums:
+        op.bulk_insert(statistics, [
+            dict(
+                year=row_year,
+                month=row_month,
+                **dict(
+                    (column, str(amount))
+                    for column, amount in row_sums.items()))
+            for (row_year, row_month), row_sums in sorted(sums.items())])
+
+
+def downgrade():
+    op.drop_table('dues_monthly_statistics')
@@ -0,0 +1,145 @@
+"""Store the dues amounts as integer cents.
+
+The amounts are converted from their text representation to integer cents.
+Undefined amounts (NaN) become NULL. Amounts with more than two decimal
+places are rounded to cents.
+
+Revision ID: a4c8e1f6b2d7
+Revises: 9b3d7e2f5a14
+Create Date: 2017-05-14 11:27:53.804216
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e1f6b2d7'
+down_revision = '9b3d7e2f5a14'
+
+from decimal import (
+    Decimal,
+    ROUND_HALF_UP,
+)
+
+from alembic import op
+import sqlalchemy as sa
+
+
+MONEY_COLUMNS = [
+    ('members', [
+        'dues{0}_{1}'.format(year, name)
+        for year in [15, 16, 17]
+        for name in ['amount', 'amount_reduced', 'amount_paid', 'balance']]),
+    ('dues15invoices', ['invoice_amount']),
+    ('dues16invoices', ['invoice_amount']),
+    ('dues17invoices', ['invoice_amount']),
+    ('dues_ledger', ['amount']),
+    ('dues_balances', ['amount', 'amount_reduced', 'amount_paid', 'balance']),
+    ('dues_monthly_statistics', [
+        'amount_invoiced_normal', 'amount_invoiced_reversal', 'amount_paid']),
+]
+"""
+The amount columns by table.
+"""
+
+NAN_COLUMNS = [
+    'dues15_amount', 'dues15_amount_reduced',
+    'dues16_amount', 'dues16_amount_reduced',
+    'dues17_amount', 'dues17_amount_reduced',
+    'invoice_amount',
+    'amount',
+    'amount_reduced',
+]
+"""
+The amount columns which were NaN when undefined.
+"""
+
+NOT_NULL_INDEXES = [
+    'membership_number',
+    'membership_loss_date',
+    'email_invite_token_bcgv17',
+    'dues15_token',
+    'dues16_token',
+    'dues17_token',
+]
+"""
+The members columns which are indexed partially containing only the rows in
+which they are set.
+"""
+
+
+def _to_cents(value):
+    if value is None or value == '':
+        return None
+    value = Decimal(value)
+    if value.is_nan():
+        return None
+    return int(value.scaleb(2).quantize(Decimal('1'), ROUND_HALF_UP))
+
+
+def _to_decimal_text(value, column):
+    if value is None:
+        return 'NaN' if column in NAN_COLUMNS else None
+    return str(Decimal(value).scaleb(-2))
+
+
+def _convert(table, columns, convert):
+    connection = op.get_bind()
+    rows = connection.execute(
+        'select rowid, {columns} from {table}'.format(
+            table=table, columns=', '.join(columns))).fetchall()
+    if len(rows) == 0:
+        return
+    # The values are bound as text so that they are stored as given before
+    # and converted according to the affinity of the column after it is
+    # altered.
+    statement = sa.text(
+        'update {table} set {values} where rowid = :rowid'.format(
+            table=table,
+            values=', '.join(
+                '{0} = :{0}'.format(column) for column in columns)))
+    connection.execute(statement, [
+        dict(
+            [('rowid', row[0])] +
+            [(column, convert(value, column)) for column, value in zip(
+                columns, row[1:])])
+        for row in rows])
+
+
+def _recreate_not_null_indexes():
+    # The batch operations recreate the members table from reflection which
+    # loses the conditions of partial indexes.
+    for column in NOT_NULL_INDEXES:
+        name = 'ix_members_{0}'.format(column)
+        op.drop_index(name, 'members')
+        op.create_index(
+            name,
+            'members',
+            [column],
+            sqlite_where=sa.text('{0} IS NOT NULL'.format(column)))
+
+
+def upgrade():
+    for table, columns in MONEY_COLUMNS:
+        _convert(
+            table,
+            columns,
+            lambda value, column: None if _to_cents(value) is None
+            else str(_to_cents(value)))
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    type_=sa.Integer(),
+                    existing_type=sa.VARCHAR(length=100))
+    _recreate_not_null_indexes()
+
+
+def downgrade():
+    for table, columns in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    type_=sa.VARCHAR(length=100),
+                    existing_type=sa.Integer())
+        _convert(table, columns, _to_decimal_text)
+    _recreate_not_null_indexes()
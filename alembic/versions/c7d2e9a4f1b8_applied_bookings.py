@@ -0,0 +1,33 @@
+"""Applied bookings preventing bank statements from being booked twice.
+
+Revision ID: c7d2e9a4f1b8
+Revises: a4c8e1f6b2d7
+Create Date: 2017-05-20 10:13:41.627305
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e9a4f1b8'
+down_revision = 'a4c8e1f6b2d7'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'applied_bookings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('identifier', sa.Unicode(length=255), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=False),
+        # the amount is stored as integer cents like all dues amounts
+        sa.Column('amount', sa.Integer(), nullable=True),
+        sa.Column('booking_date', sa.Date(), nullable=True),
+        sa.Column('applied', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('identifier'))
+
+
+def downgrade():
+    op.drop_table('applied_bookings')
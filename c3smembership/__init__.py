@@ -12,6 +12,7 @@ from pyramid_beaker import session_factory_from_settings
 from sqlalchemy import engine_from_config
 
 from c3smembership.data.model.base import Base
+from c3smembership.presentation.pagination import CachedContentSizeProvider
 from c3smembership.security.request import RequestWithUserAttribute
 from c3smembership.security import (
     Root,
@@ -58,6 +59,18 @@ def main(global_config, **settings):
     config.include('cornice')
     config.include('c3smembership.presentation.pagination')
 
+    # request-scoped SQL instrumentation, statistics are shown on /_perf
+    from c3smembership.presentation.sql_instrumentation import (
+        SqlInstrumentation
+    )
+    config.registry.sql_instrumentation = SqlInstrumentation()
+    if 'true' in settings.get('c3smembership.sql_instrumentation', 'false'):
+        config.registry.sql_instrumentation.instrument(engine)
+        config.add_tween(
+            'c3smembership.presentation.sql_instrumentation.'
+            'sql_instrumentation_tween_factory')
+    config.add_route('sql_performance', '/_perf')
+
     config.add_translation_dirs(
         'colander:locale/',
         'deform:locale/',
@@ -107,9 +120,11 @@ def main(global_config, **settings):
 
     # applications for membership
     config.add_route('dashboard', '/dashboard')
+    dashboard_content_size = CachedContentSizeProvider(
+        dashboard_content_size_provider)
     config.make_pagination_route(
         'dashboard',
-        dashboard_content_size_provider,
+        dashboard_content_size,
         sort_property_default='id',
         page_size_default=int(
             settings.get('c3smembership.dashboard_number', 30)))
@@ -159,15 +174,19 @@ def main(global_config, **settings):
 
     config.add_route('membership_listing_backend',
                      '/memberships')
+    membership_content_size = CachedContentSizeProvider(
+        membership_content_size_provider)
     config.make_pagination_route(
         'membership_listing_backend',
-        membership_content_size_provider,
+        membership_content_size,
         sort_property_default='id',
         page_size_default=int(
             settings.get('c3smembership.membership_number', 30)))
 
     config.add_route('membership_listing_alphabetical',
                      '/aml')
+    config.add_route('membership_listing_csv',
+                     '/memberships.csv')
 
     # membership list
     from c3smembership.data.repository.member_repository import (
@@ -248,13 +267,17 @@ def main(global_config, **settings):
         os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
             '../invoices/'))
+    # the invoices are rendered within the request thread as forking worker
+    # processes is not safe within the multithreaded server, the console
+    # script c3sMembership_archive_invoices renders them in parallel
     config.registry.dues_invoice_archiving = DuesInvoiceArchiving(
         DBSession,
         C3sMember,
         Dues15Invoice,
         make_invoice_pdf_pdflatex,
         make_reversal_pdf_pdflatex,
-        invoices_archive_path)
+        invoices_archive_path,
+        worker_count=1)
     config.add_route(
         'batch_archive_pdf_invoices',
         '/batch_archive_pdf_invoices')
@@ -274,12 +297,118 @@ def main(global_config, **settings):
     config.add_route('certificate_pdf', '/cert/{id}/C3S_{name}_{token}.pdf')
     config.add_route('certificate_pdf_staff', '/cert/{id}/C3S_{name}.pdf')
 
+    # rendered documents like invoices and membership certificates
+    from c3smembership.business.document_cache import DocumentCache
+    config.registry.document_cache = DocumentCache(
+        settings.get(
+            'c3smembership.document_cache_path',
+            os.path.abspath(
+                os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)),
+                    '../document_cache/'))))
+
     # annual reports
     from c3smembership.data.repository.share_repository import ShareRepository
     from c3smembership.business.share_information import ShareInformation
     config.registry.share_information = ShareInformation(ShareRepository)
     config.add_route('annual_reporting', '/annual_reporting')
 
+    # membership numbers
+    from c3smembership.data.repository.member_repository import (
+        MemberRepository
+    )
+    from c3smembership.data.repository.number_sequence_repository import (
+        NumberSequenceRepository
+    )
+    from c3smembership.business.membership_number_allocator import (
+        MembershipNumberAllocator
+    )
+    config.registry.membership_number_allocator = MembershipNumberAllocator(
+        MemberRepository, NumberSequenceRepository)
+
+    # dues invoice numbers
+    from c3smembership.data.repository.dues_invoice_repository import (
+        DuesInvoiceRepository
+    )
+    from c3smembership.business.invoice_number_allocator import (
+        InvoiceNumberAllocator
+    )
+    config.registry.invoice_number_allocator = InvoiceNumberAllocator(
+        DuesInvoiceRepository, NumberSequenceRepository)
+
+    # statistics
+    from c3smembership.data.repository.statistics_repository import (
+        StatisticsRepository
+    )
+    from c3smembership.data.repository.change_tracking import (
+        listen_for_changes
+    )
+    from c3smembership.business.statistics_information import (
+        StatisticsInformation
+    )
+    from c3smembership.models import (
+        C3sStaff,
+        Dues16Invoice,
+        Dues17Invoice,
+        Shares,
+    )
+    statistics_information = StatisticsInformation(
+        StatisticsRepository,
+        ShareRepository,
+        config.registry.membership_number_allocator)
+    listen_for_changes(
+        DBSession,
+        [C3sMember, C3sStaff, Shares, Dues15Invoice, Dues16Invoice,
+         Dues17Invoice],
+        statistics_information.invalidate)
+    config.registry.statistics_information = statistics_information
+
+    # duplicate detection
+    from c3smembership.business.duplicate_detection import DuplicateDetection
+    duplicate_detection = DuplicateDetection(MemberRepository)
+    listen_for_changes(
+        DBSession,
+        [C3sMember],
+        duplicate_detection.invalidate)
+    config.registry.duplicate_detection = duplicate_detection
+
+    # content sizes of the dashboard and membership listing pagination
+    for content_size in [dashboard_content_size, membership_content_size]:
+        listen_for_changes(DBSession, [C3sMember], content_size.invalidate)
+
+    # changes by other processes like the console scripts, checked per
+    # request before the caches are used
+    from c3smembership.data.repository.change_tracking import (
+        ChangeGeneration
+    )
+    change_generation = ChangeGeneration(NumberSequenceRepository)
+    for callback in [
+            statistics_information.invalidate,
+            duplicate_detection.invalidate,
+            dashboard_content_size.invalidate,
+            membership_content_size.invalidate]:
+        change_generation.add_callback(callback)
+    config.add_subscriber(change_generation, 'pyramid.events.NewRequest')
+
+    # mail queue for batch mail runs
+    from c3smembership.data.repository.mail_job_repository import (
+        MailJobRepository
+    )
+    from c3smembership.business.mail_queue import MailQueue
+    config.registry.mail_queue = MailQueue(MailJobRepository)
+
+    # version information displayed on the pages, git information only in
+    # development mode
+    from c3smembership.presentation.version_information import (
+        VersionInformationProvider
+    )
+    config.registry.version_information = VersionInformationProvider(
+        os.path.abspath(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')),
+        include_git=settings.get('c3smembership.runmode') == 'dev',
+        refresh='true' in settings.get(
+            'c3smembership.version_refresh', 'false'))
+
     # invite people
     config.add_route('invite_member', '/invite_member/{m_id}')
     config.add_route('invite_batch', '/invite_batch/{number}')
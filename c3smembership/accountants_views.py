@@ -39,12 +39,12 @@ from c3smembership.mail_reminders_util import (
     make_signature_reminder_email,
     make_payment_reminder_email,
 )
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
 from c3smembership.models import (
     C3sMember,
     C3sStaff,
-    Dues15Invoice,
-    Dues16Invoice,
-    Dues17Invoice,
 )
 from c3smembership.presentation.i18n import _
 from c3smembership.presentation.schemas.accountant_login import (
@@ -268,10 +268,13 @@ def member_detail(request):
         return HTTPFound(  # back to base
             request.route_url('toolbox'))
 
-    # get the members invoices from the DB
-    invoices15 = Dues15Invoice.get_by_membership_no(member.membership_number)
-    invoices16 = Dues16Invoice.get_by_membership_no(member.membership_number)
-    invoices17 = Dues17Invoice.get_by_membership_no(member.membership_number)
+    # get the members invoices and dues balances of all years from the dues
+    # ledger
+    invoices = DuesLedgerRepository.get_member_invoices(member.id)
+    balances = DuesLedgerRepository.get_member_balances(member.id)
+    dues_balances = dict(
+        (year, balances[year].balance if year in balances else D('0'))
+        for year in [2015, 2016, 2017])
     shares = request.registry.share_information.get_member_shares(
         member.membership_number)
 
@@ -280,9 +283,11 @@ def member_detail(request):
         'D': D,
         'member': member,
         'shares': shares,
-        'invoices15': invoices15,
-        'invoices16': invoices16,
-        'invoices17': invoices17,
+        'invoices15': invoices.get(2015, []),
+        'invoices16': invoices.get(2016, []),
+        'invoices17': invoices.get(2017, []),
+        'dues_balances': dues_balances,
+        'account_balance': sum(dues_balances.values()),
         # 'form': html
     }
 
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Caches rendered PDF documents on disk.
+
+Rendering documents like dues invoices and membership certificates with
+pdflatex takes a considerable amount of time. Members download their
+documents repeatedly and after sending invoices to all members many of them
+click their invoice links at the same time. The rendered PDFs are therefore stored in a cache directory
+and served from there.
+
+The cache is content-addressed. A document is stored under a key which is a
+hash of the version of its templates and the data it is rendered from, e.g.
+the LaTeX source. Any change of templates or data results in a different key
+so that stale documents are never served. The key also serves as entity tag
+of the document.
+
+Documents can be stored under a name, e.g. the invoice number, in addition to
+the key. Storing a new version of a named document removes the versions it
+supersedes so that the cache does not grow with every change of the data.
+
+Documents are rendered lazily when they are requested but not cached. The
+rendering is done under a lock per key which is held across threads and
+processes so that concurrent requests of the same document render it only
+once while the others wait for it.
+"""
+
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+class DocumentCache(object):
+    """
+    Caches rendered PDF documents on disk keyed by a hash of their templates
+    and data.
+    """
+
+    _file_hashes = {}
+    """
+    The hashes of template files by filename, modification time and size.
+    """
+
+    def __init__(self, cache_path):
+        """
+        Initialises the DocumentCache object.
+
+        Args:
+            cache_path: The path of the directory in which the rendered
+                documents are stored. It is created if it doesn't exist.
+        """
+        self._cache_path = cache_path
+        if not os.path.isdir(self._cache_path):
+            os.makedirs(self._cache_path)
+
+    @classmethod
+    def _get_file_hash(cls, filename):
+        stat = os.stat(filename)
+        cache_key = (filename, stat.st_mtime, stat.st_size)
+        file_hash = cls._file_hashes.get(cache_key)
+        if file_hash is None:
+            digest = hashlib.sha256()
+            with open(filename, 'rb') as template_file:
+                for block in iter(lambda: template_file.read(65536), b''):
+                    digest.update(block)
+            file_hash = digest.hexdigest()
+            cls._file_hashes[cache_key] = file_hash
+        return file_hash
+
+    @classmethod
+    def get_template_version(cls, filenames):
+        """
+        Gets the version of template files.
+
+        The version is a hash of the contents of the files which are only
+        read again if they were modified.
+
+        Args:
+            filenames: The filenames of the templates, e.g. the LaTeX
+                templates and the background PDF.
+
+        Returns:
+            The template version as a hexadecimal string.
+        """
+        digest = hashlib.sha256()
+        for filename in filenames:
+            digest.update(cls._get_file_hash(filename))
+        return digest.hexdigest()
+
+    @classmethod
+    def get_key(cls, template_version, data):
+        """
+        Gets the cache key of a document.
+
+        Args:
+            template_version: The version of the templates the document is
+                rendered with as returned by get_template_version.
+            data: The data the document is rendered from, e.g. the LaTeX
+                source.
+
+        Returns:
+            The cache key as a hexadecimal string.
+        """
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(template_version)
+        digest.update(b'\n')
+        digest.update(data)
+        return digest.hexdigest()
+
+    @classmethod
+    def _get_name_prefix(cls, name):
+        return u'{0}_'.format(name)
+
+    def _get_filename(self, key, name=None):
+        if name is None:
+            return os.path.join(self._cache_path, u'{0}.pdf'.format(key))
+        return os.path.join(
+            self._cache_path,
+            u'{0}{1}.pdf'.format(self._get_name_prefix(name), key))
+
+    def _get_lock_filename(self, key):
+        return os.path.join(self._cache_path, u'{0}.lock'.format(key))
+
+    def get(self, key, name=None):
+        """
+        Gets the cached document.
+
+        Args:
+            key: The cache key of the document.
+            name: Optional. The name the document is stored under.
+
+        Returns:
+            The filename of the cached document PDF or None if the document
+            is not cached.
+        """
+        filename = self._get_filename(key, name)
+        if os.path.isfile(filename):
+            return filename
+        return None
+
+    def store(self, key, pdf_filename, name=None):
+        """
+        Stores the document in the cache and removes the versions of a named
+        document it supersedes.
+
+        The file is written atomically so that concurrent requests never read
+        incomplete documents.
+
+        Args:
+            key: The cache key of the document.
+            pdf_filename: The filename of the rendered document PDF.
+            name: Optional. The name the document is stored under.
+
+        Returns:
+            The filename of the cached document PDF.
+        """
+        filename = self._get_filename(key, name)
+        handle, temp_filename = tempfile.mkstemp(
+            dir=self._cache_path, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file, \
+                    open(pdf_filename, 'rb') as pdf_file:
+                shutil.copyfileobj(pdf_file, temp_file)
+            os.rename(temp_filename, filename)
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+        if name is not None:
+            self.invalidate(name, keep=os.path.basename(filename))
+        return filename
+
+    def invalidate(self, name, keep=None):
+        """
+        Removes the cached versions of a named document.
+
+        Args:
+            name: The name the document is stored under.
+            keep: Optional. The name of a cache file not to be removed.
+        """
+        prefix = self._get_name_prefix(name)
+        for cached_file in os.listdir(self._cache_path):
+            if cached_file.startswith(prefix) and \
+                    cached_file.endswith('.pdf') and \
+                    cached_file != keep:
+                try:
+                    os.remove(os.path.join(self._cache_path, cached_file))
+                except OSError:
+                    # already removed by a concurrent request
+                    pass
+
+    def get_or_render(self, key, render, name=None):
+        """
+        Gets the cached document and renders it if it is not cached.
+
+        Concurrent calls for the same key wait for the document being
+        rendered by the first one instead of rendering it again. Documents
+        failing to render are not cached.
+
+        Args:
+            key: The cache key of the document.
+            render: Function without arguments rendering the document and
+                returning the rendered PDF file object, e.g. a
+                NamedTemporaryFile. It raises an exception if rendering
+                fails.
+            name: Optional. The name the document is stored under.
+
+        Returns:
+            The filename of the cached document PDF.
+
+        Raises:
+            IOError: The rendered document is empty.
+        """
+        filename = self.get(key, name)
+        if filename is not None:
+            return filename
+        with self._lock(key):
+            # rendered by a concurrent call while waiting for the lock
+            filename = self.get(key, name)
+            if filename is None:
+                pdf_file = render()
+                try:
+                    if os.path.getsize(pdf_file.name) == 0:
+                        raise IOError('The rendered document is empty.')
+                    filename = self.store(key, pdf_file.name, name)
+                finally:
+                    pdf_file.close()
+                # Waiting calls find the document cached once they hold the
+                # lock and later calls do not lock at all.
+                os.remove(self._get_lock_filename(key))
+        return filename
+
+    @contextmanager
+    def _lock(self, key):
+        """
+        Locks the key across threads and processes.
+
+        The lock is an exclusive lock on a lock file of the key. Every call
+        opens the lock file itself so that threads of the same process
+        exclude each other as well.
+        """
+        with open(self._get_lock_filename(key), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Calculates the membership dues of the whole register for a dues year.
+"""
+
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+import math
+
+
+QUARTER_AMOUNTS = [
+    (4, Decimal('50')),
+    (7, Decimal('37.50')),
+    (10, Decimal('25')),
+    (13, Decimal('12.50')),
+]
+"""
+The dues amounts by start quarter as tuples of the month in which the next
+quarter starts and the amount of members who became members before.
+"""
+
+DuesCalculationResult = namedtuple(
+    'DuesCalculationResult',
+    ['member_id', 'start', 'amount', 'effective_amount', 'paid', 'balance',
+     'invoiced'])
+"""
+The dues of a member for a dues year.
+
+Start is the codified start quarter like u'q1_2017'. Amount is the dues amount
+and effective amount the possibly reduced amount to be paid. Paid is the
+amount already paid and balance the amount still to be settled. Invoiced
+tells whether an invoice was already sent in which case start and amount are
+the ones stored for the member.
+"""
+
+DuesPreview = namedtuple(
+    'DuesPreview',
+    ['year', 'members', 'invoiced', 'amount', 'reductions', 'paid',
+     'receivables', 'quarters'])
+"""
+The totals of the dues of a dues year.
+
+Members is the number of members liable to pay dues and invoiced the number
+of them already invoiced. Amount is the sum of the dues amounts, reductions
+the sum by which they were reduced, paid the sum of the payments and
+receivables the sum of the outstanding positive balances. Quarters is a
+dictionary with the codified start quarters as keys and the numbers of
+members as values.
+"""
+
+
+def _is_nan(value):
+    return value is None or math.isnan(value)
+
+
+def calculate_partial_dues(year, membership_date):
+    """
+    Calculates the codified start quarter and the dues amount of a member.
+
+    Members pay the full dues if they became members in the first quarter of
+    the year or earlier and partial dues otherwise.
+
+    Args:
+        year: The dues year.
+        membership_date: The date the member became a member.
+
+    Returns:
+        A tuple of the codified start quarter, e.g. u'q2_2017', and the dues
+        amount.
+
+    Raises:
+        ValueError: The member became a member after the dues year.
+    """
+    if membership_date >= date(year + 1, 1, 1):
+        raise ValueError(
+            'Member is not applicable for dues {0}.'.format(year))
+    for quarter, (month, amount) in enumerate(QUARTER_AMOUNTS, 1):
+        if month > 12 or membership_date < date(year, month, 1):
+            return (u'q{0}_{1}'.format(quarter, year), amount)
+
+
+class DuesCalculation(object):
+    """
+    Calculates the membership dues of the whole register for a dues year.
+
+    The relevant columns of all members are loaded at once and the dues are
+    calculated in one pass over them. The start quarters are computed by
+    comparing the membership dates with the quarter boundaries of the year
+    only once instead of per member object. Writing the results back takes
+    one bulk update.
+
+    Like sending an invoice, the calculation sets start quarter and amount
+    only for members not yet invoiced and the amount only for normal members
+    as investing members are asked for a voluntary contribution. Already
+    invoiced members keep their stored dues.
+    """
+
+    def __init__(self, dues_calculation_repository):
+        """
+        Initialises the dues calculation.
+
+        Args:
+            dues_calculation_repository: The dues calculation repository
+                loading and storing the dues columns of all members.
+        """
+        self.dues_calculation_repository = dues_calculation_repository
+
+    def calculate(self, year):
+        """
+        Calculates the dues of all members liable to pay dues for the year.
+
+        Args:
+            year: The dues year.
+
+        Returns:
+            A list of DuesCalculationResult ordered by member ID.
+        """
+        columns = self.dues_calculation_repository.get_dues_columns(year)
+        boundaries = [
+            (date(year, month, 1) if month <= 12 else None,
+             u'q{0}_{1}'.format(quarter, year),
+             amount)
+            for quarter, (month, amount) in enumerate(QUARTER_AMOUNTS, 1)]
+        zero = Decimal('0')
+
+        results = []
+        for (member_id, membership_date, membership_type, invoiced, amount,
+             reduced, amount_reduced, amount_paid, balance) in zip(
+                 columns['id'],
+                 columns['membership_date'],
+                 columns['membership_type'],
+                 columns['invoice'],
+                 columns['amount'],
+                 columns['reduced'],
+                 columns['amount_reduced'],
+                 columns['amount_paid'],
+                 columns['balance']):
+            for boundary, start, quarter_amount in boundaries:
+                if boundary is None or membership_date < boundary:
+                    break
+            paid = zero if _is_nan(amount_paid) else amount_paid
+            if invoiced:
+                amount = zero if _is_nan(amount) else amount
+                effective_amount = amount_reduced \
+                    if reduced and not _is_nan(amount_reduced) else amount
+                balance = zero if _is_nan(balance) else balance
+            else:
+                amount = quarter_amount \
+                    if membership_type == u'normal' else zero
+                effective_amount = amount
+                balance = amount - paid
+            results.append(DuesCalculationResult(
+                member_id,
+                start,
+                amount,
+                effective_amount,
+                paid,
+                balance,
+                bool(invoiced)))
+        return results
+
+    def preview(self, year):
+        """
+        Calculates the dues totals of the year without storing anything.
+
+        Args:
+            year: The dues year.
+
+        Returns:
+            A DuesPreview.
+        """
+        return self._summarize(year, self.calculate(year))
+
+    @classmethod
+    def _summarize(cls, year, results):
+        zero = Decimal('0')
+        invoiced = 0
+        amount = zero
+        reductions = zero
+        paid = zero
+        receivables = zero
+        quarters = {}
+        for result in results:
+            invoiced += result.invoiced
+            amount += result.amount
+            reductions += result.amount - result.effective_amount
+            paid += result.paid
+            if result.balance > zero:
+                receivables += result.balance
+            quarters[result.start] = quarters.get(result.start, 0) + 1
+        return DuesPreview(
+            year,
+            len(results),
+            invoiced,
+            amount,
+            reductions,
+            paid,
+            receivables,
+            quarters)
+
+    def apply(self, year):
+        """
+        Calculates and stores the dues of the members not yet invoiced.
+
+        Args:
+            year: The dues year.
+
+        Returns:
+            The DuesPreview of the stored dues.
+        """
+        results = self.calculate(year)
+        self.dues_calculation_repository.update_dues(year, [
+            {
+                'member_id': result.member_id,
+                'start': result.start,
+                # investing members keep the undefined amount as they are
+                # not invoiced
+                'amount': result.amount
+                if result.amount > Decimal('0') else Decimal('NaN'),
+                'balance': result.balance,
+                'balanced': result.balance == Decimal('0'),
+            }
+            for result in results if not result.invoiced])
+        return self._summarize(year, results)
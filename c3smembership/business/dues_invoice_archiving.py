@@ -3,8 +3,14 @@
 Offers functionality to archive invoices.
 """
 
+import logging
+import multiprocessing
 import os
 import shutil
+import tempfile
+
+
+LOG = logging.getLogger(__name__)
 
 
 class IDuesInvoiceArchiving(object):
@@ -20,18 +26,21 @@ class IDuesInvoiceArchiving(object):
             db_session: Object implementing the query(class) method
                 returning instances of the specified class.
             c3s_member: Class describing the c3s member.
-            dues15_invoices: Object implementing the get_by_membership_no(int)
-                method returning invoice instances.
+            dues15_invoices: Class describing the dues 15 invoice.
         """
         raise NotImplementedError()
 
-    def generate_missing_invoice_pdfs(self, invoice_count):
+    def generate_missing_invoice_pdfs(self, invoice_count,
+                                      progress_callback=None):
         """
         Generates and archives a number of invoices which have not yet been
         archived.
 
         Args:
             invoice_count: The number of invoices to be generated and archived.
+            progress_callback: Optional. Function taking the number of
+                archived invoices and the total number of invoices to be
+                archived which is called after each archived invoice.
 
         Returns:
             An array of invoice numbers which were generated and archived.
@@ -42,11 +51,18 @@ class IDuesInvoiceArchiving(object):
 class DuesInvoiceArchiving(IDuesInvoiceArchiving):
     """
     Offers functionality to archive invoices.
+
+    The invoices can be rendered in parallel by a pool of worker processes as
+    the rendering using pdflatex is CPU bound. As the pool forks the calling
+    process it must not be used within a multithreaded server but only by the
+    console script c3sMembership_archive_invoices. The archive files are
+    written atomically so that an interrupted archiving does not leave
+    incomplete files which would be considered as archived.
     """
 
     def __init__(self, db_session, c3s_member, dues15_invoices,
                  make_invoice_pdf_pdflatex, make_reversal_pdf_pdflatex,
-                 invoices_archive_path):
+                 invoices_archive_path, worker_count=None):
         """
         Initialises the MembershipApplication object.
 
@@ -54,14 +70,19 @@ class DuesInvoiceArchiving(IDuesInvoiceArchiving):
             db_session: Object implementing the query(class) method
                 returning instances of the specified class.
             c3s_member: Class describing the c3s member.
-            dues15_invoices: Object implementing the get_by_membership_no(int)
-                method returning invoice instances.
+            dues15_invoices: Class describing the dues 15 invoice.
             make_invoice_pdf_pdflatex: Method taking member and invoice as
-                arguments and returning the generated file.
+                arguments and returning the generated file. Must be picklable,
+                i.e. a module level function, if more than one worker is used.
             make_reversal_pdf_pdflatex: Method taking member and invoice as
-                arguments and returning the generated file.
+                arguments and returning the generated file. Must be picklable,
+                i.e. a module level function, if more than one worker is used.
             invoices_archive_path: The absolute path in which the archived
                 invoices are stored.
+            worker_count: Optional. The number of worker processes rendering
+                invoices. Defaults to the number of CPUs. If 1 the invoices
+                are rendered in the calling process which is required within
+                a multithreaded server.
         """
         self._dbsession = db_session
         self._c3s_member = c3s_member
@@ -69,48 +90,142 @@ class DuesInvoiceArchiving(IDuesInvoiceArchiving):
         self._make_invoice_pdf_pdflatex = make_invoice_pdf_pdflatex
         self._make_reversal_pdf_pdflatex = make_reversal_pdf_pdflatex
         self._invoices_archive_path = invoices_archive_path
+        if worker_count is None:
+            worker_count = multiprocessing.cpu_count()
+        self._worker_count = max(1, worker_count)
         if not os.path.isdir(self._invoices_archive_path):
             os.makedirs(self._invoices_archive_path)
 
-    def generate_missing_invoice_pdfs(self, invoice_count):
+    def generate_missing_invoice_pdfs(self, invoice_count,
+                                      progress_callback=None):
         """
         Generates and archives a number of invoices which have not yet been
         archived.
 
+        All invoices and their members are retrieved in one query and the
+        invoices not yet archived are rendered by the worker processes.
+
         Args:
             invoice_count: The number of invoices to be generated and archived.
+            progress_callback: Optional. Function taking the number of
+                archived invoices and the total number of invoices to be
+                archived which is called after each archived invoice.
 
         Returns:
             An array of invoice numbers which were generated and archived.
         """
-        members = self._dbsession.query(self._c3s_member)
+        jobs = self._get_missing_invoice_jobs(invoice_count)
         generated_files = []
-        invoices_archive_path = self._invoices_archive_path
-        counter = 0
-        for member in members.all():
-            invoices = self._dues15_invoices.get_by_membership_no(
-                member.membership_number)
-            for invoice in invoices:
-                invoice_archive_filename = os.path.join(
-                    invoices_archive_path,
-                    '{0}.pdf'.format(invoice.invoice_no_string)
-                )
-                if not os.path.isfile(invoice_archive_filename):
-                    pdf_file = self._generate_invoice_pdf(member, invoice)
-                    generated_files.append(invoice.invoice_no_string)
-                    shutil.copyfile(
-                        pdf_file.name,
-                        invoice_archive_filename
-                    )
-                    counter += 1
-                    if counter >= invoice_count:
-                        return generated_files
+        for invoice_no_string in self._run_jobs(jobs):
+            generated_files.append(invoice_no_string)
+            LOG.info(
+                'Archived invoice %s (%d of %d)',
+                invoice_no_string, len(generated_files), len(jobs))
+            if progress_callback is not None:
+                progress_callback(len(generated_files), len(jobs))
         return generated_files
 
-    def _generate_invoice_pdf(self, member, invoice):
-        pdf_file = None
-        if invoice.is_reversal:
-            pdf_file = self._make_reversal_pdf_pdflatex(member, invoice)
-        else:
-            pdf_file = self._make_invoice_pdf_pdflatex(member, invoice)
-        return pdf_file
+    def _get_missing_invoice_jobs(self, invoice_count):
+        """
+        Gets the rendering jobs of a number of invoices not yet archived.
+        """
+        member_class = self._c3s_member
+        invoice_class = self._dues15_invoices
+        rows = self._dbsession.query(member_class, invoice_class) \
+            .filter(invoice_class.membership_no ==
+                    member_class.membership_number) \
+            .order_by(invoice_class.invoice_no) \
+            .all()
+        archived_files = set(os.listdir(self._invoices_archive_path))
+        jobs = []
+        for member, invoice in rows:
+            if len(jobs) >= invoice_count:
+                break
+            archive_filename = '{0}.pdf'.format(invoice.invoice_no_string)
+            if archive_filename in archived_files:
+                continue
+            if invoice.is_reversal:
+                make_pdf = self._make_reversal_pdf_pdflatex
+            else:
+                make_pdf = self._make_invoice_pdf_pdflatex
+            jobs.append((
+                make_pdf,
+                member,
+                invoice,
+                os.path.join(self._invoices_archive_path, archive_filename),
+                invoice.invoice_no_string))
+        return jobs
+
+    def _run_jobs(self, jobs):
+        """
+        Runs the rendering jobs and yields the invoice number strings in the
+        order of the jobs.
+        """
+        worker_count = min(self._worker_count, len(jobs))
+        if worker_count <= 1:
+            for job in jobs:
+                yield _archive_invoice(job)
+            return
+        pool = multiprocessing.Pool(worker_count)
+        try:
+            for invoice_no_string in pool.imap(_archive_invoice, jobs):
+                yield invoice_no_string
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+def _archive_invoice(job):
+    """
+    Renders the invoice of the job and writes it atomically to the archive.
+
+    Module level function so that it can be executed by worker processes.
+    """
+    make_pdf, member, invoice, archive_filename, invoice_no_string = job
+    pdf_file = make_pdf(member, invoice)
+    _write_atomically(pdf_file.name, archive_filename)
+    return invoice_no_string
+
+
+def _get_umask():
+    """
+    Gets the umask of the process.
+
+    The umask can only be read by setting it so it is reset immediately. As
+    the umask is process wide it is only read once at import time and not
+    while other threads might create files.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_FILE_MODE = 0o666 & ~_get_umask()
+"""
+The mode of newly created files according to the umask of the process.
+"""
+
+
+def _write_atomically(source_filename, target_filename):
+    """
+    Copies the source file to the target file which either does not exist or
+    is written completely.
+
+    The source is copied to a temporary file in the target directory which is
+    then renamed to the target file name. The temporary file is created
+    readable by its owner only and therefore gets the mode of newly created
+    files according to the umask of the process.
+    """
+    file_descriptor, temporary_filename = tempfile.mkstemp(
+        prefix='.', suffix='.tmp', dir=os.path.dirname(target_filename))
+    os.close(file_descriptor)
+    try:
+        shutil.copyfile(source_filename, temporary_filename)
+        os.chmod(temporary_filename, _FILE_MODE)
+        os.rename(temporary_filename, target_filename)
+    except:
+        os.unlink(temporary_filename)
+        raise
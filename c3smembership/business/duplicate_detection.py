@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Detects accepted members which might be duplicates of membership applicants.
+
+Members are indexed by blocking keys, i.e. normalised full name, phonetic code
+of the last name, local part of the email address and date of birth. Only
+members sharing at least one blocking key with an applicant are compared to it
+and scored by the similarity of names, email addresses and dates of birth.
+This finds candidates despite typos while avoiding comparing each applicant
+with each member.
+
+Members having the same email address as the applicant or the same date of
+birth and a similar last name are candidates regardless of their score.
+"""
+
+from collections import namedtuple
+from difflib import SequenceMatcher
+import threading
+import unicodedata
+
+
+DuplicateCandidate = namedtuple('DuplicateCandidate', [
+    'applicant_id',
+    'member_id',
+    'score',
+    'reasons',
+])
+"""
+Accepted member which might be a duplicate of the applicant.
+
+The score is a value between 0 and 1 with 1 being a perfect match. The reasons
+is a tuple of the matching properties out of 'lastname', 'firstname', 'email'
+and 'date_of_birth'.
+"""
+
+
+def normalize_name(name):
+    """
+    Normalises a name for comparison.
+
+    Case, accents and all characters other than letters and digits are
+    removed, e.g. u'Müller-Lüdenscheidt' is normalised to
+    u'mullerludenscheidt'.
+    """
+    if not name:
+        return u''
+    decomposed = unicodedata.normalize(
+        'NFKD', unicode(name).replace(u'ß', u'ss'))
+    return u''.join(
+        [char for char in decomposed if char.isalnum()]).lower()
+
+
+def email_local_part(email):
+    """
+    Gets the lower case local part of the email address, i.e. the part before
+    the @.
+    """
+    if not email:
+        return u''
+    return unicode(email).rsplit(u'@', 1)[0].strip().lower()
+
+
+# pylint: disable=too-many-return-statements,too-many-branches
+def _cologne_phonetic_code(char, previous, following, is_first):
+    if char in u'AEIJOUY':
+        return u'0'
+    if char == u'H':
+        return u''
+    if char == u'B':
+        return u'1'
+    if char == u'P':
+        return u'3' if following == u'H' else u'1'
+    if char in u'DT':
+        return u'8' if following in (u'C', u'S', u'Z') else u'2'
+    if char in u'FVW':
+        return u'3'
+    if char in u'GKQ':
+        return u'4'
+    if char == u'C':
+        if is_first:
+            return u'4' if following in u'AHKLOQRUX' and following else u'8'
+        if previous in (u'S', u'Z'):
+            return u'8'
+        return u'4' if following in u'AHKOQUX' and following else u'8'
+    if char == u'X':
+        return u'8' if previous in (u'C', u'K', u'Q') else u'48'
+    if char == u'L':
+        return u'5'
+    if char in u'MN':
+        return u'6'
+    if char == u'R':
+        return u'7'
+    if char in u'SZ':
+        return u'8'
+    return u''
+
+
+def cologne_phonetic(name):
+    """
+    Calculates the Cologne phonetic code of the name.
+
+    The Cologne phonetics (Kölner Phonetik) assign the same code to names which
+    sound alike in German, e.g. u'Meier', u'Mayer' and u'Maier' all are
+    encoded as u'67'.
+    """
+    letters = [
+        char for char in normalize_name(name).upper()
+        if u'A' <= char <= u'Z']
+    codes = []
+    for index, char in enumerate(letters):
+        previous = letters[index - 1] if index > 0 else u''
+        following = letters[index + 1] if index + 1 < len(letters) else u''
+        codes.append(
+            _cologne_phonetic_code(char, previous, following, index == 0))
+    code = u''
+    for digit in u''.join(codes):
+        if not code or code[-1] != digit:
+            code += digit
+    if not code:
+        return code
+    return code[0] + code[1:].replace(u'0', u'')
+
+
+def _same_email(first, second):
+    if not first or not second:
+        return False
+    return first.strip().lower() == second.strip().lower()
+
+
+def _similarity(first, second):
+    if not first or not second:
+        return 0.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+class DuplicateDetection(object):
+    """
+    Detects accepted members which might be duplicates of applicants.
+
+    The index of accepted members is cached until it is invalidated. The
+    invalidation must be triggered by calling invalidate whenever members
+    change.
+    """
+
+    LASTNAME_WEIGHT = 0.3
+    FIRSTNAME_WEIGHT = 0.2
+    EMAIL_WEIGHT = 0.3
+    EMAIL_LOCAL_PART_WEIGHT = 0.2
+    DATE_OF_BIRTH_WEIGHT = 0.2
+    NAME_SIMILARITY_THRESHOLD = 0.85
+
+    def __init__(self, member_repository, minimum_score=0.5):
+        """
+        Initialises the DuplicateDetection object.
+
+        Args:
+            member_repository: The member repository providing the methods
+                get_accepted_member_identities and
+                get_application_identities.
+            minimum_score: Optional. The minimum score of candidates, defaults
+                to 0.5.
+        """
+        self._member_repository = member_repository
+        self._minimum_score = minimum_score
+        self._index = None
+        self._lock = threading.Lock()
+
+    def find_candidates(self, applicant):
+        """
+        Finds accepted members which might be duplicates of the applicant.
+
+        Args:
+            applicant: An object having the properties id, firstname,
+                lastname, email and date_of_birth like a C3sMember.
+
+        Returns:
+            A list of DuplicateCandidate sorted by score descending.
+        """
+        return self._find_candidates(self._get_index(), applicant)
+
+    def find_all_candidates(self):
+        """
+        Finds accepted members which might be duplicates of all pending
+        applications in one pass.
+
+        Returns:
+            A dictionary mapping the applicant IDs of all applicants having
+            candidates to lists of DuplicateCandidate sorted by score
+            descending.
+        """
+        index = self._get_index()
+        all_candidates = {}
+        for applicant in self._member_repository.get_application_identities():
+            candidates = self._find_candidates(index, applicant)
+            if candidates:
+                all_candidates[applicant.id] = candidates
+        return all_candidates
+
+    def invalidate(self):
+        """
+        Invalidates the cached index of accepted members.
+        """
+        self._index = None
+
+    def _get_index(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                index = self._index
+                if index is None:
+                    index = self._build_index()
+                    self._index = index
+        return index
+
+    def _build_index(self):
+        index = {}
+        for member in self._member_repository.get_accepted_member_identities():
+            for key in self._blocking_keys(member):
+                index.setdefault(key, []).append(member)
+        return index
+
+    @classmethod
+    def _blocking_keys(cls, person):
+        keys = []
+        firstname = normalize_name(person.firstname)
+        lastname = normalize_name(person.lastname)
+        if firstname or lastname:
+            keys.append(('name', firstname + u' ' + lastname))
+        phonetic_code = cologne_phonetic(person.lastname)
+        if phonetic_code:
+            keys.append(('phonetic', phonetic_code))
+        local_part = email_local_part(person.email)
+        if local_part:
+            keys.append(('email', local_part))
+        if person.date_of_birth is not None:
+            keys.append(('date_of_birth', person.date_of_birth))
+        return keys
+
+    def _find_candidates(self, index, applicant):
+        members = {}
+        for key in self._blocking_keys(applicant):
+            for member in index.get(key, []):
+                members[member.id] = member
+        candidates = []
+        for member_id, member in members.items():
+            if member_id == applicant.id:
+                continue
+            score, reasons = self._score(applicant, member)
+            if score >= self._minimum_score or \
+                    self._is_sufficient_match(applicant, member, reasons):
+                candidates.append(DuplicateCandidate(
+                    applicant_id=applicant.id,
+                    member_id=member_id,
+                    score=score,
+                    reasons=reasons))
+        candidates.sort(key=lambda candidate: (
+            -candidate.score, candidate.member_id))
+        return candidates
+
+    @classmethod
+    def _score(cls, applicant, member):
+        """
+        Scores the similarity of applicant and member.
+
+        Returns:
+            A tuple of the score and the tuple of matching properties.
+        """
+        score = 0.0
+        reasons = []
+
+        lastname_similarity = _similarity(
+            normalize_name(applicant.lastname),
+            normalize_name(member.lastname))
+        if lastname_similarity < cls.NAME_SIMILARITY_THRESHOLD and \
+                cologne_phonetic(applicant.lastname) and \
+                cologne_phonetic(applicant.lastname) == \
+                cologne_phonetic(member.lastname):
+            lastname_similarity = cls.NAME_SIMILARITY_THRESHOLD
+        score += cls.LASTNAME_WEIGHT * lastname_similarity
+        if lastname_similarity >= cls.NAME_SIMILARITY_THRESHOLD:
+            reasons.append('lastname')
+
+        firstname_similarity = _similarity(
+            normalize_name(applicant.firstname),
+            normalize_name(member.firstname))
+        score += cls.FIRSTNAME_WEIGHT * firstname_similarity
+        if firstname_similarity >= cls.NAME_SIMILARITY_THRESHOLD:
+            reasons.append('firstname')
+
+        applicant_local_part = email_local_part(applicant.email)
+        if applicant_local_part and \
+                applicant_local_part == email_local_part(member.email):
+            if _same_email(applicant.email, member.email):
+                score += cls.EMAIL_WEIGHT
+            else:
+                score += cls.EMAIL_LOCAL_PART_WEIGHT
+            reasons.append('email')
+
+        if applicant.date_of_birth is not None and \
+                applicant.date_of_birth == member.date_of_birth:
+            score += cls.DATE_OF_BIRTH_WEIGHT
+            reasons.append('date_of_birth')
+
+        return round(score, 3), tuple(reasons)
+
+    @classmethod
+    def _is_sufficient_match(cls, applicant, member, reasons):
+        """
+        Checks whether applicant and member match on properties which suffice
+        for a candidate on their own.
+
+        These are the same email address or the same date of birth and a
+        similar last name.
+        """
+        return _same_email(applicant.email, member.email) or (
+            'date_of_birth' in reasons and 'lastname' in reasons)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Allocates dues invoice numbers.
+"""
+
+
+class InvoiceNumberAllocator(object):
+    """
+    Allocates dues invoice numbers for all dues years.
+
+    Each dues year has its own number sequence. Numbers are allocated
+    atomically so that invoices can be created by concurrent requests and
+    batch workers without receiving the same number and without searching
+    the invoices for the highest number. As numbers are only allocated for
+    invoices actually created there are no gaps. The sequence of a dues year
+    is created starting after the highest invoice number of the year when
+    the first number is allocated.
+    """
+
+    def __init__(self, dues_invoice_repository, number_sequence_repository):
+        """
+        Initialises the invoice number allocator.
+
+        Args:
+            dues_invoice_repository: The dues invoice repository providing the
+                highest invoice number of a dues year.
+            number_sequence_repository: The number sequence repository
+                allocating the numbers.
+        """
+        self.dues_invoice_repository = dues_invoice_repository
+        self.number_sequence_repository = number_sequence_repository
+
+    @classmethod
+    def get_sequence_name(cls, year):
+        """
+        Gets the name of the number sequence of the dues year.
+        """
+        return u'dues{0}_invoice_number'.format(year)
+
+    def allocate(self, year):
+        """
+        Allocates an invoice number.
+
+        Args:
+            year: The dues year of the invoice.
+
+        Returns:
+            The allocated invoice number.
+        """
+        return self.allocate_block(year, 1)[0]
+
+    def allocate_block(self, year, count):
+        """
+        Allocates a block of consecutive invoice numbers, e.g. for a reversal
+        invoice and the invoice replacing the reversed one.
+
+        Args:
+            year: The dues year of the invoices.
+            count: The number of invoice numbers to allocate.
+
+        Returns:
+            The list of allocated invoice numbers in ascending order.
+        """
+        if not isinstance(count, int) or count < 1:
+            raise ValueError(
+                'The parameter "count" must be an integer of at least 1.')
+        last = self.number_sequence_repository.allocate(
+            self.get_sequence_name(year),
+            count,
+            lambda: self.dues_invoice_repository.get_max_invoice_number(year))
+        return range(last - count + 1, last + 1)
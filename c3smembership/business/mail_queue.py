@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Queues emails of batch mail runs and delivers them in the background.
+
+Batch mail runs like dues invoices and invitations queue their emails within
+the request. The emails are stored in the database and delivered by one or
+more mail worker processes, see c3smembership.scripts.mail_worker, which
+retry failed deliveries and limit the sending rate.
+
+Each email has an idempotency key, e.g. the run and the member, so that an
+email is queued only once even if the batch run is triggered again.
+"""
+
+from collections import namedtuple
+from datetime import (
+    datetime,
+    timedelta,
+)
+import logging
+import time
+
+from pyramid_mailer.message import Message
+
+
+LOG = logging.getLogger(__name__)
+
+
+RunProgress = namedtuple('RunProgress', [
+    'run',
+    'pending',
+    'sending',
+    'sent',
+    'failed',
+    'total',
+])
+"""
+The number of queued emails of a run per status.
+"""
+
+
+class MailQueue(object):
+    """
+    Queues emails for the delivery by mail workers.
+    """
+
+    datetime = datetime
+
+    def __init__(self, mail_job_repository):
+        """
+        Initialises the MailQueue object.
+
+        Args:
+            mail_job_repository: The mail job repository providing the methods
+                exists, add and get_run_status_counts.
+        """
+        self._mail_job_repository = mail_job_repository
+
+    def enqueue(self, run, idempotency_key, message):
+        """
+        Queues the message unless a message with the same idempotency key was
+        already queued.
+
+        Args:
+            run: The batch run the message belongs to, e.g. dues17_invoice.
+            idempotency_key: The key unique for the message, e.g. the run and
+                the member ID.
+            message: The pyramid_mailer message to be sent.
+
+        Returns:
+            True if the message was queued, False if a message with the
+            idempotency key had already been queued.
+        """
+        if self._mail_job_repository.exists(idempotency_key):
+            return False
+        self._mail_job_repository.add(
+            run,
+            idempotency_key,
+            message.sender,
+            message.recipients,
+            message.subject,
+            message.body,
+            message.extra_headers,
+            self.datetime.now())
+        return True
+
+    def get_progress(self):
+        """
+        Gets the progress of all runs.
+
+        Returns:
+            A list of RunProgress ordered by run.
+        """
+        runs = {}
+        for run, status, count in \
+                self._mail_job_repository.get_run_status_counts():
+            runs.setdefault(run, {})[status] = count
+        progress = []
+        for run in sorted(runs.keys()):
+            counts = runs[run]
+            progress.append(RunProgress(
+                run=run,
+                pending=counts.get('pending', 0),
+                sending=counts.get('sending', 0),
+                sent=counts.get('sent', 0),
+                failed=counts.get('failed', 0),
+                total=sum(counts.values())))
+        return progress
+
+
+class MailWorker(object):
+    """
+    Delivers queued emails.
+
+    Several workers can deliver the emails of the same queue concurrently.
+    Failed deliveries are retried with exponentially increasing delays until
+    the maximum number of attempts is reached.
+    """
+
+    datetime = datetime
+    time = time
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, mail_job_repository, mailer, transaction_manager,
+                 max_attempts=5, retry_delay=60, rate_limit=None,
+                 lease_duration=600):
+        """
+        Initialises the MailWorker object.
+
+        Args:
+            mail_job_repository: The mail job repository providing the methods
+                claim_next, mark_sent and mark_failed.
+            mailer: The mailer providing the method send_immediately.
+            transaction_manager: The transaction manager used as context
+                manager to commit the changes of the jobs.
+            max_attempts: Optional. The maximum number of delivery attempts,
+                defaults to 5.
+            retry_delay: Optional. The delay in seconds before the first
+                retry which is doubled for each further retry, defaults to 60.
+            rate_limit: Optional. The maximum number of emails sent per second
+                by this worker. Defaults to None, i.e. no limit.
+            lease_duration: Optional. The number of seconds after which a
+                claimed but not finished job can be claimed again, defaults to
+                600.
+        """
+        self._mail_job_repository = mail_job_repository
+        self._mailer = mailer
+        self._transaction_manager = transaction_manager
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._minimum_interval = 1.0 / rate_limit if rate_limit else 0.0
+        self._lease_duration = lease_duration
+
+    def work(self, max_jobs=None):
+        """
+        Delivers due emails until there is no due email left.
+
+        Args:
+            max_jobs: Optional. The maximum number of emails to deliver.
+
+        Returns:
+            The number of processed emails including failed deliveries.
+        """
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            with self._transaction_manager:
+                now = self.datetime.now()
+                job = self._mail_job_repository.claim_next(
+                    now,
+                    now + timedelta(seconds=self._lease_duration))
+            if job is None:
+                break
+            started = self.time.time()
+            self._deliver(job)
+            processed += 1
+            remaining_interval = \
+                self._minimum_interval - (self.time.time() - started)
+            if remaining_interval > 0:
+                self.time.sleep(remaining_interval)
+        return processed
+
+    def _deliver(self, job):
+        error = None
+        try:
+            self._mailer.send_immediately(Message(
+                subject=job['subject'],
+                sender=job['sender'],
+                recipients=job['recipients'],
+                body=job['body'],
+                extra_headers=job['extra_headers']))
+        # Any delivery error must be recorded for the retry.
+        # pylint: disable=broad-except
+        except Exception as exception:
+            error = u'{0}: {1}'.format(
+                exception.__class__.__name__, exception)
+        with self._transaction_manager:
+            now = self.datetime.now()
+            if error is None:
+                self._mail_job_repository.mark_sent(job['id'], now)
+            elif job['attempts'] >= self._max_attempts:
+                LOG.error(
+                    'Giving up delivering mail job %s: %s', job['id'], error)
+                self._mail_job_repository.mark_failed(job['id'], error)
+            else:
+                LOG.warning(
+                    'Delivering mail job %s failed: %s', job['id'], error)
+                self._mail_job_repository.mark_failed(
+                    job['id'],
+                    error,
+                    now + timedelta(seconds=self._retry_delay * 2 ** (
+                        job['attempts'] - 1)))
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Imports members and their shares in bulk.
+"""
+
+from collections import namedtuple
+from datetime import (
+    date,
+    datetime,
+)
+import random
+import string
+
+from c3smembership.models import (
+    fold_search_text,
+    hash_password,
+)
+
+
+ImportReport = namedtuple(
+    'ImportReport',
+    ['inserted', 'merged', 'skipped'])
+"""
+The report of a member import.
+
+Inserted and merged are the numbers of rows inserted as new members and
+merged into existing members. Skipped is a list of tuples of line number and
+reason of the rows which were not imported.
+"""
+
+SKIP = 'skip'
+"""
+Skip rows of members already existing.
+"""
+
+MERGE = 'merge'
+"""
+Merge the shares of rows of members already existing into the existing
+members.
+"""
+
+MEMBER_DEFAULTS = {
+    'password': None,
+    'address2': u'',
+    'locale': u'de',
+    'email_is_confirmed': False,
+    'email_confirm_code': None,
+    'date_of_submission': None,
+    'membership_type': u'normal',
+    'member_of_colsoc': False,
+    'name_of_colsoc': u'',
+    'signature_received': False,
+    'payment_received': False,
+    'membership_date': None,
+    'accountant_comment': None,
+}
+"""
+The default values of the optional member attributes of imported rows.
+"""
+
+
+def _is_password_hash(password):
+    # bcrypt hashes as created by hash_password, e.g. exported by an earlier
+    # installation, are imported as they are
+    return len(password) == 60 and password[:4] in ('$2a$', '$2b$', '$2y$')
+
+
+class MemberImporter(object):
+    """
+    Imports members and their shares in bulk.
+
+    The members are imported in batches. For each batch the members already
+    existing are looked up by email address and reference code with a few
+    queries, and the new members and shares are inserted with one
+    executemany statement each so that large imports, e.g. from
+    crowdfunding, take seconds and only one batch is held in memory.
+
+    Rows with a membership date are imported as accepted members with a
+    membership number and a shares package, all other rows as applications.
+
+    Rows with a reference code already in use are skipped. Rows with the
+    email address of an existing member, including members of earlier rows
+    of the import, are either skipped or merged. Merging adds the shares of
+    the row to the existing member, as a new shares package for accepted
+    members and to the number of shares of the application otherwise.
+    """
+
+    BATCH_SIZE = 1000
+    """
+    The number of rows imported together.
+    """
+
+    def __init__(self, member_import_repository,
+                 membership_number_allocator):
+        """
+        Initialises the member importer.
+
+        Args:
+            member_import_repository: The member import repository looking up
+                existing members and inserting the imported ones.
+            membership_number_allocator: The membership number allocator
+                providing the membership numbers of accepted members.
+        """
+        self.member_import_repository = member_import_repository
+        self.membership_number_allocator = membership_number_allocator
+        self._random = random.SystemRandom()
+
+    def import_members(self, rows, duplicates=SKIP, batch_size=None,
+                       progress_callback=None):
+        """
+        Imports members.
+
+        Args:
+            rows: An iterable of tuples of line number and a dictionary of
+                validated member attributes as deserialized by the
+                MemberImport schema.
+            duplicates: Optional. Either SKIP or MERGE specifying the handling
+                of rows of existing members. Defaults to SKIP.
+            batch_size: Optional. The number of rows imported together,
+                defaults to BATCH_SIZE.
+            progress_callback: Optional. A function called with the number of
+                processed rows after each batch.
+
+        Returns:
+            An ImportReport.
+
+        Raises:
+            ValueError: The duplicate handling is invalid.
+        """
+        if duplicates not in (SKIP, MERGE):
+            raise ValueError(u'Invalid duplicate handling: {0}'.format(
+                duplicates))
+        batch_size = batch_size or self.BATCH_SIZE
+        report = ImportReport(0, 0, [])
+        processed = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                report = self._import_batch(batch, duplicates, report)
+                processed += len(batch)
+                batch = []
+                if progress_callback is not None:
+                    progress_callback(processed)
+        if len(batch) > 0:
+            report = self._import_batch(batch, duplicates, report)
+            processed += len(batch)
+            if progress_callback is not None:
+                progress_callback(processed)
+        return report
+
+    def _make_reference_code(self):
+        return u''.join(
+            self._random.choice(string.ascii_uppercase + string.digits)
+            for _ in range(10))
+
+    def _assign_reference_codes(self, batch, skipped):
+        """
+        Skips rows with reference codes in use and generates the missing
+        reference codes.
+        """
+        given_codes = [
+            values['email_confirm_code'] for _, values in batch
+            if values['email_confirm_code'] is not None]
+        used = set(self.member_import_repository.find_used_reference_codes(
+            given_codes))
+        rows = []
+        for line, values in batch:
+            code = values['email_confirm_code']
+            if code is not None:
+                if code in used:
+                    skipped.append((line, u'reference code already in use'))
+                    continue
+                used.add(code)
+            rows.append((line, values))
+
+        missing = [values for _, values in rows
+                   if values['email_confirm_code'] is None]
+        while len(missing) > 0:
+            candidates = {}
+            for values in missing:
+                code = self._make_reference_code()
+                while code in used or code in candidates:
+                    code = self._make_reference_code()  # pragma: no cover
+                candidates[code] = values
+            taken = self.member_import_repository.find_used_reference_codes(
+                candidates.keys())
+            missing = []
+            for code, values in candidates.items():
+                if code in taken:
+                    missing.append(values)  # pragma: no cover
+                else:
+                    values['email_confirm_code'] = code
+                    used.add(code)
+        return rows
+
+    def _import_batch(self, batch, duplicates, report):
+        # pylint: disable=too-many-locals
+        skipped = report.skipped
+        batch = [(line, dict(MEMBER_DEFAULTS, **values))
+                 for line, values in batch]
+        rows = self._assign_reference_codes(batch, skipped)
+
+        existing = self.member_import_repository.find_members_by_emails(
+            set(values['email'].lower() for _, values in rows))
+        new_members = []
+        pending = {}
+        new_shares = []
+        added_num_shares = {}
+        merged = 0
+        for line, values in rows:
+            email = values['email'].lower()
+            if email in existing or email in pending:
+                if duplicates == SKIP:
+                    skipped.append((line, u'email address already in use'))
+                    continue
+                merged += 1
+                if email in pending:
+                    target = pending[email]
+                    if target['membership_accepted']:
+                        target['packages'].append(values)
+                    else:
+                        target['num_shares'] += values['num_shares']
+                    continue
+                member_id, accepted = existing[email]
+                if accepted:
+                    new_shares.append((member_id, self._make_shares(
+                        values, values['membership_date'] or
+                        (values['date_of_submission'] or
+                         datetime.now()).date())))
+                added_num_shares[member_id] = added_num_shares.get(
+                    member_id, 0) + values['num_shares']
+                continue
+            member = self._make_member(values)
+            new_members.append(member)
+            pending[email] = member
+
+        accepted_members = [
+            new for new in new_members if new['membership_accepted']]
+        if len(accepted_members) > 0:
+            membership_numbers = self.membership_number_allocator \
+                .allocate_block(len(accepted_members))
+            for member, number in zip(accepted_members, membership_numbers):
+                member['membership_number'] = number
+
+        packages = [new.pop('packages') for new in new_members]
+        ids = self.member_import_repository.add_members(new_members)
+        for member, member_id, member_packages in zip(
+                new_members, ids, packages):
+            for values in member_packages:
+                new_shares.append((member_id, self._make_shares(
+                    values,
+                    values['membership_date'] or member['membership_date'])))
+                if values['email_confirm_code'] != \
+                        member['email_confirm_code']:
+                    added_num_shares[member_id] = added_num_shares.get(
+                        member_id, 0) + values['num_shares']
+        self.member_import_repository.add_shares(new_shares)
+        self.member_import_repository.add_num_shares(added_num_shares)
+
+        return ImportReport(
+            report.inserted + len(new_members),
+            report.merged + merged,
+            skipped)
+
+    @classmethod
+    def _make_member(cls, values):
+        password = values['password']
+        if password is not None and not _is_password_hash(password):
+            password = hash_password(password)
+        now = datetime.now()
+        accepted = values['membership_date'] is not None
+        member = {
+            'firstname': values['firstname'],
+            'lastname': values['lastname'],
+            'lastname_search': fold_search_text(values['lastname']),
+            'email': values['email'],
+            'password': password,
+            'last_password_change': now,
+            'address1': values['address1'],
+            'address2': values['address2'],
+            'postcode': values['postcode'],
+            'city': values['city'],
+            'country': values['country'],
+            'locale': values['locale'],
+            'date_of_birth': values['date_of_birth'],
+            'email_is_confirmed': values['email_is_confirmed'],
+            'email_confirm_code': values['email_confirm_code'],
+            'num_shares': values['num_shares'],
+            'date_of_submission': values['date_of_submission'] or now,
+            'membership_type': values['membership_type'],
+            'member_of_colsoc': values['member_of_colsoc'],
+            'name_of_colsoc': values['name_of_colsoc']
+            if values['member_of_colsoc'] else u'',
+            'signature_received': values['signature_received'] or accepted,
+            'payment_received': values['payment_received'] or accepted,
+            'accountant_comment': values['accountant_comment'],
+            'membership_accepted': accepted,
+            'membership_date': values['membership_date'] or date(1970, 1, 1),
+            'membership_number': None,
+            'packages': [values] if accepted else [],
+        }
+        return member
+
+    @classmethod
+    def _make_shares(cls, values, date_of_acquisition):
+        return {
+            'number': values['num_shares'],
+            'date_of_acquisition': date_of_acquisition,
+            'reference_code': values['email_confirm_code'],
+            'signature_received': True,
+            'signature_received_date': date_of_acquisition,
+            'payment_received': True,
+            'payment_received_date': date_of_acquisition,
+        }
@@ -55,6 +55,25 @@ class MemberInformation(object):
         return self._member_repository.get_accepted_members_sorted(
             effective_date)
 
+    def get_accepted_members_export(self, effective_date=None):
+        """
+        Gets the statement selecting the contact data of the members which
+        have been accepted until and including the specified effective date
+        for exporting them.
+
+        Args:
+            effective_date: Optional. The date on which the membership has been
+                accepted. If not specified system date is used as effective
+                date.
+
+        Returns:
+            The statement selecting the contact data of the members which
+            have been accepted until and including the specified effective
+            date.
+        """
+        return self._member_repository.get_accepted_members_export(
+            effective_date)
+
     def get_member(self, membership_number):
         """
         Gets the member of the specified membership number.
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Allocates membership numbers.
+"""
+
+
+class MembershipNumberAllocator(object):
+    """
+    Allocates membership numbers.
+
+    The membership numbers are allocated from a number sequence so that
+    concurrent approvals do not receive the same membership number and the
+    highest membership number is known without searching the members. The
+    sequence is created starting after the highest membership number in use
+    when the first membership number is allocated.
+    """
+
+    SEQUENCE_NAME = u'membership_number'
+
+    def __init__(self, member_repository, number_sequence_repository):
+        """
+        Initialises the membership number allocator.
+
+        Args:
+            member_repository: The member repository providing the highest
+                membership number in use.
+            number_sequence_repository: The number sequence repository
+                allocating the numbers.
+        """
+        self.member_repository = member_repository
+        self.number_sequence_repository = number_sequence_repository
+
+    def allocate(self):
+        """
+        Allocates a membership number.
+
+        Returns:
+            The allocated membership number.
+        """
+        return self.allocate_block(1)[0]
+
+    def allocate_block(self, count):
+        """
+        Allocates a block of consecutive membership numbers, e.g. for
+        approving several members at once.
+
+        Args:
+            count: The number of membership numbers to allocate.
+
+        Returns:
+            The list of allocated membership numbers in ascending order.
+        """
+        if not isinstance(count, int) or count < 1:
+            raise ValueError(
+                'The parameter "count" must be an integer of at least 1.')
+        last = self.number_sequence_repository.allocate(
+            self.SEQUENCE_NAME,
+            count,
+            self.member_repository.get_highest_membership_number)
+        return range(last - count + 1, last + 1)
+
+    def get_highest(self):
+        """
+        Gets the highest membership number allocated.
+
+        Returns:
+            The highest membership number allocated.
+        """
+        return self.number_sequence_repository.get_current(
+            self.SEQUENCE_NAME,
+            self.member_repository.get_highest_membership_number)
+
+    def get_next(self):
+        """
+        Gets the membership number to be allocated next if no other one is
+        allocated in between.
+
+        Returns:
+            The membership number to be allocated next.
+        """
+        return self.get_highest() + 1
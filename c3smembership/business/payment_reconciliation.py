@@ -0,0 +1,591 @@
+# -*- coding: utf-8 -*-
+"""
+Reconciles dues payments from bank statements.
+
+Bank statements are read either as CSV exports or as CAMT.053 XML files.
+Both readers stream the statement and yield one Booking per booked
+transaction so that large statements do not have to be held in memory.
+
+Each booking carries an identifier which is recorded when its payment is
+applied. Bookings already applied, e.g. when a statement is reconciled again
+or statements overlap, are skipped instead of being booked twice.
+"""
+
+from collections import namedtuple
+import csv
+import datetime
+from decimal import Decimal
+import hashlib
+import re
+from xml.etree import cElementTree
+
+
+Booking = namedtuple(
+    'Booking',
+    ['line', 'date', 'amount', 'reference', 'name', 'identifier'])
+"""
+A booked transaction of a bank statement.
+
+The amount is positive for credits and negative for debits. The line is the
+line number within a CSV file or the number of the entry within a CAMT.053
+file and identifies the booking in the reconciliation report. The identifier
+identifies the booking across statements. It is the reference of the bank
+for CAMT.053 bookings and otherwise a hash of the booking data, see
+get_booking_hash.
+"""
+
+ReconciledBooking = namedtuple(
+    'ReconciledBooking',
+    ['booking', 'status', 'member_id', 'year', 'reason'])
+"""
+The result of reconciling a booking.
+
+The status is one of MATCHED, UNMATCHED, AMBIGUOUS and SKIPPED. Member ID
+and year are only set for matched bookings and the reason is only set for
+bookings which could not be matched or were skipped.
+"""
+
+ReconciliationReport = namedtuple(
+    'ReconciliationReport',
+    ['matched', 'unmatched', 'ambiguous', 'skipped', 'payments'])
+"""
+The report of a reconciliation.
+
+Matched, unmatched, ambiguous and skipped are lists of ReconciledBooking.
+Payments is a dictionary with the dues years as keys and dictionaries of
+member IDs and tuples of the total paid amount and the latest payment date
+as values.
+"""
+
+MATCHED = 'matched'
+UNMATCHED = 'unmatched'
+AMBIGUOUS = 'ambiguous'
+SKIPPED = 'skipped'
+
+CSV_COLUMNS = {
+    'date': [
+        'date', 'booking date', 'buchungstag', 'buchungsdatum', 'valuta',
+        'valutadatum', 'wertstellung'],
+    'amount': ['amount', 'betrag', 'umsatz'],
+    'reference': [
+        'reference', 'purpose', 'remittance information',
+        'verwendungszweck'],
+    'name': [
+        'name', 'payer', 'auftraggeber', 'auftraggeber/empfänger',
+        'beguenstigter/zahlungspflichtiger',
+        'begünstigter/zahlungspflichtiger', 'zahlungspflichtiger'],
+}
+"""
+The accepted CSV header names of the booking fields in lower case.
+"""
+
+DATE_FORMATS = ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y', '%d/%m/%Y']
+"""
+The accepted date formats of CSV bank statements.
+"""
+
+INVOICE_NUMBER_PATTERN = re.compile(
+    r'C3S[\s\-]*DUES[\s\-]*(20\d\d)[\s\-]*(\d{1,6})')
+"""
+Matches invoice number strings like C3S-dues2017-0042 in upper case
+references also allowing for blanks inserted or dashes removed by banks.
+"""
+
+DUES_TOKEN_PATTERN = re.compile(r'\b([A-Z]{10})\b')
+"""
+Matches dues token candidates in upper case references.
+"""
+
+MEMBERSHIP_NUMBER_PATTERN = re.compile(
+    r'\b(?:(?:MITGLIEDS?[\s\-]*(?:NUMMER|NR)'
+    r'|MEMBER(?:SHIP)?[\s\-]*(?:NUMBER|NO)'
+    r'|M[\s\-]?NR)[\s\.:#\-]*'
+    r'|(?:MITGLIEDS?|MEMBER(?:SHIP)?)[\s\-]*[:#][\s\-]*)(\d{1,6})\b')
+"""
+Matches membership numbers following a number keyword like Mitglieds-Nr. or
+a member keyword with a colon or hash like Mitglied: in upper case
+references. Numbers just following a member keyword like in Mitglied 2017
+are not matched as they are frequently years.
+"""
+
+AMOUNT_PATTERN = re.compile(
+    r'^([\-+]?)'
+    r'(\d{1,3}(?:([\.,])\d{3})+(?:(?!\3)[\.,]\d{1,2})?'
+    r'|\d+(?:[\.,]\d{1,2})?)$')
+"""
+Matches amounts with an optional sign, optional thousands separators and up
+to two decimal places. The thousands separator is either a point or a comma
+and the decimal separator the respective other one.
+"""
+
+
+def _decode(value):
+    if isinstance(value, unicode):
+        return value
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        # German bank exports are frequently Windows-1252 encoded
+        return value.decode('cp1252')
+
+
+def parse_amount(value):
+    """
+    Parses an amount of a bank statement.
+
+    The amount can use either a decimal comma or a decimal point and
+    thousands separators of the respective other kind. A single separator
+    followed by three digits is a thousands separator, e.g. 1.234 is 1234 as
+    in German bank statements. Amounts with more than two decimal places are
+    rejected.
+
+    Args:
+        value: The string representation of the amount.
+
+    Returns:
+        The amount as Decimal.
+
+    Raises:
+        ValueError: The value cannot be parsed as an amount.
+    """
+    match = AMOUNT_PATTERN.match(re.sub(r'[^\d,\.\-+]', '', value))
+    if match is None:
+        raise ValueError(u'Invalid amount: {0}'.format(value))
+    sign, number, thousands_separator = match.groups()
+    if thousands_separator is not None:
+        number = number.replace(thousands_separator, '')
+    return Decimal(sign + number.replace(',', '.'))
+
+
+def parse_date(value):
+    """
+    Parses a date of a CSV bank statement in one of the DATE_FORMATS.
+
+    Args:
+        value: The string representation of the date.
+
+    Returns:
+        The date as datetime.date.
+
+    Raises:
+        ValueError: The value cannot be parsed as a date.
+    """
+    value = value.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(u'Invalid date: {0}'.format(value))
+
+
+def get_booking_hash(occurrences, date, amount, reference, name):
+    """
+    Gets the identifier of a booking without a reference of the bank.
+
+    The identifier is a hash of the booking data and the number of identical
+    bookings preceding it in the statement. Identical bookings like two
+    payments of the same amount on the same day are therefore distinguished
+    while reading the same statement again results in the same identifiers.
+
+    Args:
+        occurrences: Dictionary counting the occurrences of the hashes
+            within the statement which is updated.
+        date: The date of the booking.
+        amount: The amount of the booking.
+        reference: The reference text of the booking.
+        name: The name of the payer.
+
+    Returns:
+        The identifier of the booking.
+    """
+    data = u'\n'.join([
+        unicode(date),
+        unicode(amount.quantize(Decimal('0.01'))),
+        reference,
+        name])
+    digest = hashlib.sha256(data.encode('utf-8')).hexdigest()
+    occurrences[digest] = occurrences.get(digest, 0) + 1
+    return u'sha256:{0}:{1}'.format(digest, occurrences[digest])
+
+
+def read_csv_bookings(csv_file):
+    """
+    Reads the bookings of a CSV bank statement.
+
+    The first row must be a header naming the columns as listed in
+    CSV_COLUMNS. Date, amount and reference columns are required, the name
+    column is optional. The delimiter is detected from the beginning of the
+    file.
+
+    Args:
+        csv_file: The file object of the CSV bank statement opened in binary
+            mode.
+
+    Yields:
+        A Booking for each row identified by a hash of its data.
+
+    Raises:
+        ValueError: The header lacks a required column or a row cannot be
+            parsed.
+    """
+    sample = csv_file.read(4096)
+    csv_file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(csv_file, dialect)
+    header = [_decode(column).strip().lower() for column in next(reader)]
+    indexes = {}
+    for field, names in CSV_COLUMNS.items():
+        for index, column in enumerate(header):
+            if column in [_decode(name) for name in names]:
+                indexes[field] = index
+                break
+    for field in ['date', 'amount', 'reference']:
+        if field not in indexes:
+            raise ValueError(u'Missing column: {0}'.format(field))
+
+    occurrences = {}
+    for row in reader:
+        if len(row) == 0 or not any(cell.strip() for cell in row):
+            continue
+        line = reader.line_num
+        try:
+            date = parse_date(_decode(row[indexes['date']]))
+            amount = parse_amount(_decode(row[indexes['amount']]))
+            reference = _decode(row[indexes['reference']]).strip()
+            name = _decode(row[indexes['name']]).strip() \
+                if 'name' in indexes else u''
+        except (IndexError, ValueError) as error:
+            raise ValueError(u'Line {0}: {1}'.format(line, error))
+        yield Booking(
+            line=line,
+            date=date,
+            amount=amount,
+            reference=reference,
+            name=name,
+            identifier=get_booking_hash(
+                occurrences, date, amount, reference, name))
+
+
+def _local_name(element):
+    return element.tag.rsplit('}', 1)[-1]
+
+
+def _children(element, *path):
+    elements = [element]
+    for name in path:
+        elements = [
+            child for parent in elements for child in parent
+            if _local_name(child) == name]
+    return elements
+
+
+def _text(element, *path):
+    for child in _children(element, *path):
+        if child.text is not None and child.text.strip() != '':
+            return child.text.strip()
+    return None
+
+
+def _camt_date(element, name):
+    value = _text(element, name, 'Dt')
+    if value is None:
+        value = _text(element, name, 'DtTm')
+    if value is None:
+        return None
+    return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def _camt_amount(element, indicator):
+    amount = Decimal(element.text.strip())
+    if indicator == 'DBIT':
+        amount = -amount
+    return amount
+
+
+def _camt_identifier(reference, occurrences, booking):
+    if reference is None:
+        return get_booking_hash(
+            occurrences,
+            booking.date,
+            booking.amount,
+            booking.reference,
+            booking.name)
+    return u'camt:{0}'.format(reference)
+
+
+def _camt_bookings(entry, number, occurrences):
+    date = _camt_date(entry, 'BookgDt') or _camt_date(entry, 'ValDt')
+    entry_indicator = _text(entry, 'CdtDbtInd')
+    entry_reference = _text(entry, 'AcctSvcrRef') or _text(entry, 'NtryRef')
+    transactions = _children(entry, 'NtryDtls', 'TxDtls')
+    if len(transactions) == 0:
+        booking = Booking(
+            line=number,
+            date=date,
+            amount=_camt_amount(_children(entry, 'Amt')[0], entry_indicator),
+            reference=_text(entry, 'AddtlNtryInf') or u'',
+            name=u'',
+            identifier=None)
+        yield booking._replace(identifier=_camt_identifier(
+            entry_reference, occurrences, booking))
+        return
+    for index, transaction in enumerate(transactions):
+        # batch bookings carry the amount of each transaction in its details
+        amounts = _children(transaction, 'AmtDtls', 'TxAmt', 'Amt') \
+            or _children(transaction, 'Amt')
+        if len(transactions) == 1 or len(amounts) == 0:
+            amounts = _children(entry, 'Amt')
+        references = [
+            child.text.strip()
+            for child in _children(transaction, 'RmtInf', 'Ustrd')
+            if child.text is not None]
+        references += [
+            child.text.strip()
+            for child in _children(
+                transaction, 'RmtInf', 'Strd', 'CdtrRefInf', 'Ref')
+            if child.text is not None]
+        name = _text(transaction, 'RltdPties', 'Dbtr', 'Nm') \
+            or _text(transaction, 'RltdPties', 'Dbtr', 'Pty', 'Nm') \
+            or u''
+        # the transactions of a batch entry are identified by their own
+        # reference or their position within the entry
+        reference = _text(transaction, 'Refs', 'AcctSvcrRef')
+        if reference is None and entry_reference is not None:
+            reference = entry_reference if len(transactions) == 1 \
+                else u'{0}/{1}'.format(entry_reference, index + 1)
+        booking = Booking(
+            line=number,
+            date=date,
+            amount=_camt_amount(
+                amounts[0],
+                _text(transaction, 'CdtDbtInd') or entry_indicator),
+            reference=u' '.join(references) or (
+                _text(entry, 'AddtlNtryInf') or u''),
+            name=name,
+            identifier=None)
+        yield booking._replace(identifier=_camt_identifier(
+            reference, occurrences, booking))
+
+
+def read_camt053_bookings(xml_file):
+    """
+    Reads the bookings of a CAMT.053 bank statement.
+
+    Only booked entries are read. Batch entries yield a booking for each of
+    their transaction details. The file is parsed incrementally and the
+    processed entries are discarded.
+
+    Args:
+        xml_file: The file object of the CAMT.053 bank statement.
+
+    Yields:
+        A Booking for each transaction, all transactions of an entry have
+        the number of the entry as line. The bookings are identified by the
+        reference of the bank, i.e. AcctSvcrRef or NtryRef, and by a hash of
+        their data if the bank does not provide one.
+    """
+    number = 0
+    occurrences = {}
+    for _, element in cElementTree.iterparse(xml_file, events=('end',)):
+        if _local_name(element) != 'Ntry':
+            continue
+        number += 1
+        status = _text(element, 'Sts')
+        if status is None:
+            status = _text(element, 'Sts', 'Cd')
+        if status in [None, 'BOOK']:
+            for booking in _camt_bookings(element, number, occurrences):
+                yield booking
+        element.clear()
+
+
+class PaymentReconciliation(object):
+    """
+    Reconciles bookings of bank statements with the dues of members.
+
+    A booking is matched to a member by invoice numbers like
+    C3S-dues2017-0042, by dues tokens of any dues year or by membership
+    numbers given in its reference. Invoice numbers and dues tokens also
+    determine the dues year while membership numbers are booked to the
+    default dues year. A booking referencing several members or several dues
+    years is ambiguous and not booked. Debits and bookings without any known
+    reference are unmatched.
+
+    The bookings are processed in batches. The references of a batch are
+    looked up with a few bulk queries instead of a query per booking. The
+    payments of all matched bookings are summed up per member and dues year
+    and recorded with one bulk update per dues year.
+
+    The identifiers of the applied bookings are recorded as well. Bookings
+    which were already applied or occur twice are skipped so that
+    reconciling a statement again does not book its payments twice.
+    """
+
+    BATCH_SIZE = 1000
+    """
+    The number of bookings of which the references are looked up together.
+    """
+
+    def __init__(self, dues_payment_repository):
+        """
+        Initialises the payment reconciliation.
+
+        Args:
+            dues_payment_repository: The dues payment repository looking up
+                the references and recording the payments.
+        """
+        self.dues_payment_repository = dues_payment_repository
+
+    def reconcile(self, bookings, default_year, apply_payments=True):
+        """
+        Reconciles the bookings with the dues of the members.
+
+        Args:
+            bookings: An iterable of Booking.
+            default_year: The dues year to book payments to which are only
+                identified by membership number.
+            apply_payments: Optional boolean whether to record the payments.
+                If False the report is only a preview. Defaults to True.
+
+        Returns:
+            A ReconciliationReport.
+        """
+        report = ReconciliationReport([], [], [], [], {})
+        identifiers = set()
+        batch = []
+        for booking in bookings:
+            batch.append(booking)
+            if len(batch) >= self.BATCH_SIZE:
+                self._reconcile_batch(batch, default_year, report, identifiers)
+                batch = []
+        self._reconcile_batch(batch, default_year, report, identifiers)
+        if apply_payments:
+            for year, payments in sorted(report.payments.items()):
+                self.dues_payment_repository.add_payments(year, payments)
+            self.dues_payment_repository.add_applied_bookings([
+                (
+                    result.booking.identifier,
+                    result.year,
+                    result.member_id,
+                    result.booking.amount,
+                    result.booking.date,
+                )
+                for result in report.matched])
+        return report
+
+    @classmethod
+    def get_references(cls, reference):
+        """
+        Extracts the references from the reference text of a booking.
+
+        Args:
+            reference: The reference text of the booking.
+
+        Returns:
+            A tuple of a set of tuples of dues year and invoice number, a set
+            of dues token candidates and a set of membership numbers.
+        """
+        reference = reference.upper()
+        invoice_numbers = set(
+            (int(year), int(number))
+            for year, number in INVOICE_NUMBER_PATTERN.findall(reference))
+        tokens = set(DUES_TOKEN_PATTERN.findall(reference))
+        membership_numbers = set(
+            int(number)
+            for number in MEMBERSHIP_NUMBER_PATTERN.findall(reference))
+        return (invoice_numbers, tokens, membership_numbers)
+
+    def _reconcile_batch(self, batch, default_year, report, identifiers):
+        if len(batch) == 0:
+            return
+        references = [
+            self.get_references(booking.reference) for booking in batch]
+        applied = self.dues_payment_repository.find_applied_bookings(
+            [booking.identifier for booking in batch])
+
+        all_invoice_numbers = {}
+        all_tokens = set()
+        all_membership_numbers = set()
+        for invoice_numbers, tokens, membership_numbers in references:
+            for year, number in invoice_numbers:
+                all_invoice_numbers.setdefault(year, set()).add(number)
+            all_tokens.update(tokens)
+            all_membership_numbers.update(membership_numbers)
+
+        invoice_members = {}
+        for year, numbers in all_invoice_numbers.items():
+            if year in self.dues_payment_repository.DUES_YEARS:
+                invoice_members[year] = self.dues_payment_repository \
+                    .find_members_by_invoice_numbers(year, numbers)
+        token_members = {}
+        if len(all_tokens) > 0:
+            token_members = self.dues_payment_repository \
+                .find_members_by_dues_tokens(all_tokens)
+        membership_number_members = {}
+        if len(all_membership_numbers) > 0:
+            membership_number_members = self.dues_payment_repository \
+                .find_members_by_membership_numbers(all_membership_numbers)
+
+        for booking, (invoice_numbers, tokens, membership_numbers) in zip(
+                batch, references):
+            # matches of invoice numbers and tokens determine the year
+            year_matches = set()
+            for year, number in invoice_numbers:
+                member_id = invoice_members.get(year, {}).get(number)
+                if member_id is not None:
+                    year_matches.add((member_id, year))
+            for token in tokens:
+                year_matches.update(token_members.get(token, []))
+            member_ids = set(member_id for member_id, _ in year_matches)
+            member_ids.update(
+                membership_number_members[number]
+                for number in membership_numbers
+                if number in membership_number_members)
+            years = set(year for _, year in year_matches)
+
+            if booking.identifier in applied:
+                result = ReconciledBooking(
+                    booking, SKIPPED, None, None, u'already applied')
+            elif booking.identifier in identifiers:
+                result = ReconciledBooking(
+                    booking, SKIPPED, None, None, u'duplicate booking')
+            elif booking.amount <= 0:
+                result = ReconciledBooking(
+                    booking, UNMATCHED, None, None, u'not a credit')
+            elif len(member_ids) == 0:
+                result = ReconciledBooking(
+                    booking, UNMATCHED, None, None, u'no known reference')
+            elif len(member_ids) > 1:
+                result = ReconciledBooking(
+                    booking, AMBIGUOUS, None, None,
+                    u'references members {0}'.format(
+                        u', '.join(str(i) for i in sorted(member_ids))))
+            elif len(years) > 1:
+                result = ReconciledBooking(
+                    booking, AMBIGUOUS, None, None,
+                    u'references dues years {0}'.format(
+                        u', '.join(str(i) for i in sorted(years))))
+            else:
+                year = years.pop() if len(years) == 1 else default_year
+                result = ReconciledBooking(
+                    booking, MATCHED, member_ids.pop(), year, None)
+
+            if result.status != SKIPPED:
+                identifiers.add(booking.identifier)
+            if result.status == MATCHED:
+                report.matched.append(result)
+                payments = report.payments.setdefault(result.year, {})
+                amount, date = payments.get(
+                    result.member_id, (Decimal('0'), booking.date))
+                payments[result.member_id] = (
+                    amount + booking.amount, max(date, booking.date))
+            elif result.status == AMBIGUOUS:
+                report.ambiguous.append(result)
+            elif result.status == SKIPPED:
+                report.skipped.append(result)
+            else:
+                report.unmatched.append(result)
@@ -89,6 +89,20 @@ class ShareInformation(object):
         """
         return self.share_repository.get_share_count(effective_date)
 
+    def get_share_counts(self, effective_dates):
+        """
+        Gets the total number of shares at each of the effective dates.
+
+        Args:
+            effective_dates: The dates for which the number of shares is
+                calculated.
+
+        Returns:
+            A dictionary with the effective dates as keys and the total number
+            of shares at the respective date as values.
+        """
+        return self.share_repository.get_share_counts(effective_dates)
+
     def get_member_share_count(self, membership_number, effective_date=None):
         """
         Gets the number of shares of the member on the effective date.
@@ -103,6 +117,20 @@ class ShareInformation(object):
             membership_number,
             effective_date)
 
+    def get_member_share_counts(self, effective_date=None):
+        """
+        Gets the number of shares of all members on the effective date.
+
+        Args:
+            effective_date: Optional. The date for which the numbers of shares
+                are calculated.
+
+        Returns:
+            A dictionary with the membership numbers as keys and the number of
+            shares of the respective member on the effective date as values.
+        """
+        return self.share_repository.get_member_share_counts(effective_date)
+
     def get_member_shares(self, membership_number):
         """
         Gets the share of a members.
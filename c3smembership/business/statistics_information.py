@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Provides statistics about applications, members, shares, staff and dues.
+"""
+
+from collections import namedtuple
+from datetime import date
+import threading
+
+
+StatisticsSnapshot = namedtuple('StatisticsSnapshot', [
+    'effective_date',
+    'number_of_datasets',
+    'afm_shares_unpaid',
+    'afm_shares_paid',
+    'share_count',
+    'members_accepted_count',
+    'non_accepted_count',
+    'nonmember_listing_count',
+    'duplicates_count',
+    'natural_persons_count',
+    'legal_entities_count',
+    'normal_memberships_count',
+    'investing_memberships_count',
+    'other_memberships_count',
+    'membership_lost_count',
+    'membership_numbers_count',
+    'highest_membership_number',
+    'next_membership_number',
+    'countries_count',
+    'countries',
+    'dues15_stats',
+    'dues16_stats',
+    'dues17_stats',
+    'staff_count',
+])
+"""
+Immutable snapshot of all statistics figures as of the effective date.
+"""
+
+
+class StatisticsInformation(object):
+    """
+    Provides statistics snapshots.
+
+    The snapshot is cached until it is invalidated or the system date changes.
+    Invalidation must be triggered by calling invalidate whenever members,
+    shares, invoices or staff change.
+    """
+
+    date = date
+
+    def __init__(self, statistics_repository, share_repository,
+                 membership_number_allocator):
+        """
+        Initialises the StatisticsInformation object.
+
+        Args:
+            statistics_repository: The statistics repository providing the
+                methods get_member_statistics, get_country_statistics,
+                get_staff_count and get_dues_statistics.
+            share_repository: The share repository providing the method
+                get_share_count.
+            membership_number_allocator: The membership number allocator
+                providing the highest and next membership number.
+        """
+        self._statistics_repository = statistics_repository
+        self._share_repository = share_repository
+        self._membership_number_allocator = membership_number_allocator
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get_snapshot(self):
+        """
+        Gets the statistics snapshot as of the system date.
+
+        The snapshot is calculated if it was not calculated yet, was
+        invalidated or was calculated for a different date.
+
+        Returns:
+            A StatisticsSnapshot.
+        """
+        effective_date = self.date.today()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.effective_date == effective_date:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.effective_date != effective_date:
+                snapshot = self._calculate(effective_date)
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """
+        Invalidates the cached statistics snapshot.
+        """
+        self._snapshot = None
+
+    def _calculate(self, effective_date):
+        """
+        Calculates the statistics snapshot for the effective date.
+        """
+        member_statistics = self._statistics_repository.get_member_statistics(
+            effective_date)
+        dues_statistics = self._statistics_repository.get_dues_statistics()
+        highest_membership_number = \
+            self._membership_number_allocator.get_highest()
+        return StatisticsSnapshot(
+            effective_date=effective_date,
+            number_of_datasets=member_statistics['number_of_datasets'],
+            afm_shares_unpaid=member_statistics['afm_shares_unpaid'],
+            afm_shares_paid=member_statistics['afm_shares_paid'],
+            share_count=self._share_repository.get_share_count(
+                effective_date),
+            members_accepted_count=member_statistics[
+                'members_accepted_count'],
+            non_accepted_count=member_statistics['non_accepted_count'],
+            nonmember_listing_count=member_statistics[
+                'nonmember_listing_count'],
+            duplicates_count=member_statistics['duplicates_count'],
+            natural_persons_count=member_statistics['natural_persons_count'],
+            legal_entities_count=member_statistics['legal_entities_count'],
+            normal_memberships_count=member_statistics[
+                'normal_memberships_count'],
+            investing_memberships_count=member_statistics[
+                'investing_memberships_count'],
+            other_memberships_count=member_statistics[
+                'other_memberships_count'],
+            membership_lost_count=member_statistics['membership_lost_count'],
+            membership_numbers_count=member_statistics[
+                'membership_numbers_count'],
+            highest_membership_number=highest_membership_number,
+            next_membership_number=highest_membership_number + 1,
+            countries_count=member_statistics['countries_count'],
+            countries=tuple(
+                self._statistics_repository.get_country_statistics()),
+            dues15_stats=tuple(dues_statistics[2015]),
+            dues16_stats=tuple(dues_statistics[2016]),
+            dues17_stats=tuple(dues_statistics[2017]),
+            staff_count=self._statistics_repository.get_staff_count(),
+        )
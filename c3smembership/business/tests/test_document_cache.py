@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from c3smembership.business.document_cache import DocumentCache
+
+
+class DocumentCacheTest(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.pdf_path = tempfile.mkdtemp()
+        self.render_count = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path)
+        shutil.rmtree(self.pdf_path)
+
+    def write(self, name, content):
+        filename = os.path.join(self.pdf_path, name)
+        with open(filename, 'wb') as written_file:
+            written_file.write(content)
+        return filename
+
+    def read(self, filename):
+        with open(filename, 'rb') as cached_file:
+            return cached_file.read()
+
+    def render(self, content, delay=0):
+        def render():
+            self.render_count += 1
+            time.sleep(delay)
+            pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+            pdf_file.write(content)
+            pdf_file.flush()
+            return pdf_file
+        return render
+
+    def test_directory_creation(self):
+        cache_path = os.path.join(self.cache_path, 'documents')
+        DocumentCache(cache_path)
+        self.assertTrue(os.path.isdir(cache_path))
+
+    def test_get_key(self):
+        template = self.write('template.tex', 'template 1')
+        version = DocumentCache.get_template_version([template])
+        key = DocumentCache.get_key(version, u'data')
+        self.assertEqual(DocumentCache.get_key(version, u'data'), key)
+        self.assertNotEqual(DocumentCache.get_key(version, u'other'), key)
+
+        # a modified template results in another version
+        template = self.write('template.tex', 'template 2 modified')
+        other_version = DocumentCache.get_template_version([template])
+        self.assertNotEqual(other_version, version)
+        self.assertNotEqual(DocumentCache.get_key(other_version, u'data'), key)
+
+    def test_get_store(self):
+        cache = DocumentCache(self.cache_path)
+        self.assertIsNone(cache.get('key'))
+
+        filename = cache.store('key', self.write('document.pdf', 'pdf 1'))
+        self.assertEqual(cache.get('key'), filename)
+        self.assertEqual(self.read(filename), 'pdf 1')
+        self.assertIsNone(cache.get('other key'))
+
+    def test_store_named(self):
+        cache = DocumentCache(self.cache_path)
+        first = cache.store(
+            'key1', self.write('document.pdf', 'pdf 1'), 'invoice_1')
+        other = cache.store(
+            'key1', self.write('document.pdf', 'pdf 1'), 'invoice_10')
+        self.assertEqual(cache.get('key1', 'invoice_1'), first)
+        self.assertIsNone(cache.get('key1'))
+
+        # a new version supersedes the old one of the same name only
+        second = cache.store(
+            'key2', self.write('document.pdf', 'pdf 2'), 'invoice_1')
+        self.assertEqual(cache.get('key2', 'invoice_1'), second)
+        self.assertIsNone(cache.get('key1', 'invoice_1'))
+        self.assertEqual(cache.get('key1', 'invoice_10'), other)
+
+        cache.invalidate('invoice_1')
+        self.assertIsNone(cache.get('key2', 'invoice_1'))
+        self.assertEqual(cache.get('key1', 'invoice_10'), other)
+
+    def test_store_failure(self):
+        cache = DocumentCache(self.cache_path)
+        with self.assertRaises(IOError):
+            cache.store('key', os.path.join(self.pdf_path, 'missing.pdf'))
+        self.assertEqual(os.listdir(self.cache_path), [])
+
+    def test_get_or_render(self):
+        cache = DocumentCache(self.cache_path)
+        filename = cache.get_or_render('key', self.render('pdf 1'))
+        self.assertEqual(self.read(filename), 'pdf 1')
+        self.assertEqual(self.render_count, 1)
+
+        # cached
+        self.assertEqual(
+            cache.get_or_render('key', self.render('pdf 2')), filename)
+        self.assertEqual(self.render_count, 1)
+        self.assertEqual(os.listdir(self.cache_path), ['key.pdf'])
+
+    def test_get_or_render_failure(self):
+        def fail():
+            raise OSError('pdflatex failed')
+
+        cache = DocumentCache(self.cache_path)
+        with self.assertRaises(OSError):
+            cache.get_or_render('key', fail)
+        self.assertIsNone(cache.get('key'))
+
+        # empty documents are not cached
+        with self.assertRaises(IOError):
+            cache.get_or_render('key', self.render(''))
+        self.assertIsNone(cache.get('key'))
+
+        filename = cache.get_or_render('key', self.render('pdf 1'))
+        self.assertEqual(self.read(filename), 'pdf 1')
+
+    def test_get_or_render_concurrently(self):
+        cache = DocumentCache(self.cache_path)
+        filenames = []
+
+        def request_document():
+            filenames.append(
+                cache.get_or_render('key', self.render('pdf 1', 0.1)))
+
+        threads = [
+            threading.Thread(target=request_document) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.render_count, 1)
+        self.assertEqual(len(filenames), 10)
+        self.assertEqual(len(set(filenames)), 1)
+        self.assertEqual(self.read(filenames[0]), 'pdf 1')
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.business.dues_calculation module.
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.dues_calculation import (
+    calculate_partial_dues,
+    DuesCalculation,
+)
+
+
+class CalculatePartialDuesTest(TestCase):
+    """
+    Tests the calculate_partial_dues function.
+    """
+
+    def test_calculate_partial_dues(self):
+        """
+        Test the start quarters and amounts at the quarter boundaries.
+        """
+        self.assertEqual(
+            calculate_partial_dues(2017, date(2013, 9, 25)),
+            (u'q1_2017', Decimal('50')))
+        self.assertEqual(
+            calculate_partial_dues(2017, date(2017, 3, 31)),
+            (u'q1_2017', Decimal('50')))
+        self.assertEqual(
+            calculate_partial_dues(2017, date(2017, 4, 1)),
+            (u'q2_2017', Decimal('37.50')))
+        self.assertEqual(
+            calculate_partial_dues(2016, date(2016, 9, 30)),
+            (u'q3_2016', Decimal('25')))
+        self.assertEqual(
+            calculate_partial_dues(2016, date(2016, 12, 31)),
+            (u'q4_2016', Decimal('12.50')))
+        with self.assertRaises(ValueError):
+            calculate_partial_dues(2016, date(2017, 1, 1))
+
+
+class DuesCalculationTest(TestCase):
+    """
+    Tests the DuesCalculation class.
+    """
+
+    def setUp(self):
+        nan = Decimal('NaN')
+        self.repository = mock.Mock()
+        self.repository.get_dues_columns.return_value = {
+            'id': (1, 2, 3, 4),
+            'membership_date': (
+                date(2014, 1, 1),
+                date(2017, 5, 1),
+                date(2017, 11, 1),
+                date(2015, 1, 1)),
+            'membership_loss_date': (None, None, None, None),
+            'membership_type': (u'normal', u'normal', u'investing', u'normal'),
+            'invoice': (False, False, False, True),
+            'amount': (nan, nan, nan, Decimal('50')),
+            'reduced': (False, False, False, True),
+            'amount_reduced': (nan, nan, nan, Decimal('20')),
+            'amount_paid': (Decimal('0'), Decimal('10'), nan, Decimal('5')),
+            'balance': (Decimal('0'), Decimal('-10'), nan, Decimal('15')),
+        }
+        self.dues_calculation = DuesCalculation(self.repository)
+
+    def test_calculate(self):
+        """
+        Test that the dues are calculated for members not yet invoiced and
+        taken from invoiced members.
+        """
+        results = self.dues_calculation.calculate(2017)
+        self.repository.get_dues_columns.assert_called_with(2017)
+        self.assertEqual(
+            [(result.member_id, result.start, result.amount,
+              result.effective_amount, result.paid, result.balance,
+              result.invoiced)
+             for result in results],
+            [
+                (1, u'q1_2017', 50, 50, 0, 50, False),
+                (2, u'q2_2017', Decimal('37.50'), Decimal('37.50'), 10,
+                 Decimal('27.50'), False),
+                (3, u'q4_2017', 0, 0, 0, 0, False),
+                (4, u'q1_2017', 50, 20, 5, 15, True),
+            ])
+
+    def test_preview(self):
+        """
+        Test that the preview sums up the dues without storing them.
+        """
+        preview = self.dues_calculation.preview(2017)
+        self.assertEqual(preview.year, 2017)
+        self.assertEqual(preview.members, 4)
+        self.assertEqual(preview.invoiced, 1)
+        self.assertEqual(preview.amount, Decimal('137.50'))
+        self.assertEqual(preview.reductions, Decimal('30'))
+        self.assertEqual(preview.paid, Decimal('15'))
+        self.assertEqual(preview.receivables, Decimal('92.50'))
+        self.assertEqual(
+            preview.quarters,
+            {u'q1_2017': 2, u'q2_2017': 1, u'q4_2017': 1})
+        self.assertFalse(self.repository.update_dues.called)
+
+    def test_apply(self):
+        """
+        Test that the dues of members not yet invoiced are stored.
+        """
+        preview = self.dues_calculation.apply(2017)
+        self.assertEqual(preview.receivables, Decimal('92.50'))
+        year, dues = self.repository.update_dues.call_args[0]
+        self.assertEqual(year, 2017)
+        self.assertEqual([due['member_id'] for due in dues], [1, 2, 3])
+        self.assertEqual(dues[0]['amount'], Decimal('50'))
+        self.assertEqual(dues[0]['balance'], Decimal('50'))
+        self.assertFalse(dues[0]['balanced'])
+        self.assertEqual(dues[1]['start'], u'q2_2017')
+        self.assertEqual(dues[1]['balance'], Decimal('27.50'))
+        self.assertTrue(dues[2]['amount'].is_nan())
+        self.assertTrue(dues[2]['balanced'])
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
+from collections import namedtuple
 import mock
 import os
+import shutil
+import tempfile
 
 from unittest import TestCase
 
@@ -11,104 +14,107 @@ from c3smembership.business.dues_invoice_archiving import (
 )
 
 
+Member = namedtuple('Member', ['membership_number'])
+Invoice = namedtuple('Invoice', ['invoice_no_string', 'is_reversal'])
+
+
+def make_pdf(member, invoice):
+    """
+    Picklable fake of the pdflatex rendering functions.
+    """
+    pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+    pdf_file.write('{0} {1}'.format(
+        member.membership_number, invoice.invoice_no_string))
+    pdf_file.flush()
+    return pdf_file
+
+
 class DuesInvoiceArchivingTest(TestCase):
 
     def setUp(self):
+        self.archive_path = tempfile.mkdtemp()
+        self.members = [
+            Member(membership_number=1),
+            Member(membership_number=2),
+        ]
         self.invoices = [
-            mock.Mock(invoice_no_string='Dues15-0001', is_reversal=False),
-            mock.Mock(invoice_no_string='Dues15-0002', is_reversal=True),
-            mock.Mock(invoice_no_string='Dues15-0003', is_reversal=False),
-            mock.Mock(invoice_no_string='Dues15-0004', is_reversal=False),
-            mock.Mock(invoice_no_string='Dues15-0005', is_reversal=False),
-            mock.Mock(invoice_no_string='Dues15-0006', is_reversal=False),
+            Invoice(invoice_no_string='Dues15-0001', is_reversal=False),
+            Invoice(invoice_no_string='Dues15-0002', is_reversal=True),
+            Invoice(invoice_no_string='Dues15-0003', is_reversal=False),
+            Invoice(invoice_no_string='Dues15-0004', is_reversal=False),
+            Invoice(invoice_no_string='Dues15-0005', is_reversal=False),
+            Invoice(invoice_no_string='Dues15-0006', is_reversal=False),
         ]
-        self.members = [
-            mock.Mock(membership_number=1),
-            mock.Mock(membership_number=2),
+        self.rows = [
+            (self.members[0], self.invoices[0]),
+            (self.members[0], self.invoices[1]),
+            (self.members[1], self.invoices[2]),
+            (self.members[1], self.invoices[3]),
+            (self.members[1], self.invoices[4]),
+            (self.members[1], self.invoices[5]),
         ]
-        file1 = mock.Mock()
-        type(file1).name = mock.PropertyMock(return_value='tmp1.pdf')
-        file2 = mock.Mock()
-        type(file2).name = mock.PropertyMock(return_value='tmp2.pdf')
-        file3 = mock.Mock()
-        type(file3).name = mock.PropertyMock(return_value='tmp3.pdf')
-        file4 = mock.Mock()
-        type(file4).name = mock.PropertyMock(return_value='tmp4.pdf')
-        file5 = mock.Mock()
-        type(file5).name = mock.PropertyMock(return_value='tmp5.pdf')
-        self.files = [file1, file2, file3, file4, file5]
-
-        self.isdir_patcher = mock.patch('os.path.isdir')
-        self.isdir_mock = self.isdir_patcher.start()
-
-        self.isfile_patcher = mock.patch('os.path.isfile')
-        self.isfile_mock = self.isfile_patcher.start()
-
-        self.copyfile_patcher = mock.patch('shutil.copyfile')
-        self.copyfile_mock = self.copyfile_patcher.start()
-
-        self.makedirs_patcher = mock.patch('os.makedirs')
-        self.makedirs_mock = self.makedirs_patcher.start()
-
-    def create_db_session(self, members=None):
-        if members is None:
-            members = []
+        # invoice 4 has already been archived
+        with open(os.path.join(self.archive_path, 'Dues15-0004.pdf'), 'w') \
+                as archived_file:
+            archived_file.write('archived')
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_path)
+
+    def create_db_session(self, rows=None):
+        if rows is None:
+            rows = []
         db_session = mock.Mock()
         query_result = mock.Mock()
-        query_result.all.return_value = members
+        query_result.filter.return_value = query_result
+        query_result.order_by.return_value = query_result
+        query_result.all.return_value = rows
         db_session.query.return_value = query_result
         return db_session
 
-    def create_make_invoice(self, files=None):
-        if files is None:
-            files = []
+    def create_make_invoice(self):
         make_invoice_mock = mock.Mock()
-        make_invoice_mock.side_effect = files
+        make_invoice_mock.side_effect = make_pdf
         return make_invoice_mock
 
-    def create_dues15_invoices(self, invoices=None):
-        if invoices is None:
-            invoices = []
-        dues15_invoices_mock = mock.Mock()
-        dues15_invoices_mock.get_by_membership_no.side_effect = invoices
-        return dues15_invoices_mock
+    def read_archive(self, invoice_no_string):
+        filename = os.path.join(
+            self.archive_path, '{0}.pdf'.format(invoice_no_string))
+        with open(filename) as archived_file:
+            return archived_file.read()
 
     def test_generate_missing_invoice_pdfs(self):
-        self.isfile_mock.side_effect = [False, False, False, True, False, False]
-        make_invoice_mock = self.create_make_invoice([
-            self.files[0],
-            self.files[2],
-            self.files[3],
-            self.files[4]])
-        make_reversal_mock = self.create_make_invoice([self.files[1]])
-        db_session = self.create_db_session(self.members)
-        dues15_invoices_mock = self.create_dues15_invoices([
-            [self.invoices[0], self.invoices[1]],
-            [self.invoices[2], self.invoices[3], self.invoices[4], self.invoices[5]],
-        ])
+        make_invoice_mock = self.create_make_invoice()
+        make_reversal_mock = self.create_make_invoice()
+        progress_mock = mock.Mock()
+        db_session = self.create_db_session(self.rows)
 
         archiving = DuesInvoiceArchiving(
             db_session,
-            'c3s_member',
-            dues15_invoices_mock,
+            mock.Mock(),
+            mock.Mock(),
             make_invoice_mock,
             make_reversal_mock,
-            '/tmp/invoices/archive'
+            self.archive_path,
+            worker_count=1
         )
-        generated_files = archiving.generate_missing_invoice_pdfs(4)
+        generated_files = archiving.generate_missing_invoice_pdfs(
+            4, progress_mock)
 
         self.assertEqual(len(generated_files), 4)
         self.assertEqual(
             generated_files,
             ['Dues15-0001', 'Dues15-0002', 'Dues15-0003', 'Dues15-0005']
         )
-        self.isdir_mock.assert_called_with('/tmp/invoices/archive')
-        self.copyfile_mock.assert_has_calls([
-            mock.call('tmp1.pdf', '/tmp/invoices/archive/Dues15-0001.pdf'),
-            mock.call('tmp2.pdf', '/tmp/invoices/archive/Dues15-0002.pdf'),
-            mock.call('tmp3.pdf', '/tmp/invoices/archive/Dues15-0003.pdf'),
-            mock.call('tmp4.pdf', '/tmp/invoices/archive/Dues15-0005.pdf'),
-        ])
+        self.assertEqual(db_session.query.call_count, 1)
+        self.assertEqual(self.read_archive('Dues15-0001'), '1 Dues15-0001')
+        self.assertEqual(self.read_archive('Dues15-0002'), '1 Dues15-0002')
+        self.assertEqual(self.read_archive('Dues15-0004'), 'archived')
+        self.assertEqual(self.read_archive('Dues15-0005'), '2 Dues15-0005')
+        self.assertEqual(
+            sorted(os.listdir(self.archive_path)),
+            ['Dues15-0001.pdf', 'Dues15-0002.pdf', 'Dues15-0003.pdf',
+             'Dues15-0004.pdf', 'Dues15-0005.pdf'])
         make_invoice_mock.assert_has_calls([
             mock.call(self.members[0], self.invoices[0]),
             mock.call(self.members[1], self.invoices[2]),
@@ -119,37 +125,108 @@ class DuesInvoiceArchivingTest(TestCase):
             mock.call(self.members[0], self.invoices[1]),
         ])
         self.assertEqual(make_reversal_mock.call_count, 1)
+        progress_mock.assert_has_calls([
+            mock.call(1, 4),
+            mock.call(2, 4),
+            mock.call(3, 4),
+            mock.call(4, 4),
+        ])
 
-    def test_archive_directory_creation(self):
-        db_session = self.create_db_session()
-        dues15_invoices_mock = self.create_dues15_invoices()
-        make_invoice_mock = self.create_make_invoice()
-        make_reversal_mock = self.create_make_invoice()
+    def test_generate_missing_invoice_pdfs_file_mode(self):
+        db_session = self.create_db_session(self.rows[:1])
+        archiving = DuesInvoiceArchiving(
+            db_session,
+            mock.Mock(),
+            mock.Mock(),
+            make_pdf,
+            make_pdf,
+            self.archive_path,
+            worker_count=1
+        )
+        with mock.patch(
+                'c3smembership.business.dues_invoice_archiving._FILE_MODE',
+                0o640):
+            archiving.generate_missing_invoice_pdfs(1)
+        mode = os.stat(
+            os.path.join(self.archive_path, 'Dues15-0001.pdf')).st_mode
+        self.assertEqual(mode & 0o777, 0o640)
+
+    def test_generate_missing_invoice_pdfs_parallel(self):
+        db_session = self.create_db_session(self.rows)
 
-        self.isdir_mock.side_effect = [True]
         archiving = DuesInvoiceArchiving(
             db_session,
-            'c3s_member',
-            dues15_invoices_mock,
-            make_invoice_mock,
-            make_reversal_mock,
-            '/tmp/invoices/archive'
+            mock.Mock(),
+            mock.Mock(),
+            make_pdf,
+            make_pdf,
+            self.archive_path,
+            worker_count=3
         )
-        self.makedirs_mock.assert_not_called()
+        generated_files = archiving.generate_missing_invoice_pdfs(
+            float('inf'))
+
+        self.assertEqual(
+            generated_files,
+            ['Dues15-0001', 'Dues15-0002', 'Dues15-0003', 'Dues15-0005',
+             'Dues15-0006']
+        )
+        self.assertEqual(self.read_archive('Dues15-0003'), '2 Dues15-0003')
+        self.assertEqual(self.read_archive('Dues15-0006'), '2 Dues15-0006')
+        self.assertEqual(len(os.listdir(self.archive_path)), 6)
+
+        generated_files = archiving.generate_missing_invoice_pdfs(
+            float('inf'))
+        self.assertEqual(generated_files, [])
+
+    def test_generate_missing_invoice_pdfs_failure(self):
+        make_invoice_mock = mock.Mock()
+        pdf_file = mock.Mock()
+        type(pdf_file).name = mock.PropertyMock(
+            return_value=os.path.join(self.archive_path, 'missing.pdf'))
+        make_invoice_mock.return_value = pdf_file
+        db_session = self.create_db_session(self.rows[:1])
 
-        self.isdir_mock.side_effect = [False]
         archiving = DuesInvoiceArchiving(
             db_session,
-            'c3s_member',
-            dues15_invoices_mock,
+            mock.Mock(),
+            mock.Mock(),
             make_invoice_mock,
-            make_reversal_mock,
-            '/tmp/invoices/archive'
+            make_invoice_mock,
+            self.archive_path,
+            worker_count=1
         )
-        self.makedirs_mock.assert_called_with('/tmp/invoices/archive')
+        with self.assertRaises(IOError):
+            archiving.generate_missing_invoice_pdfs(1)
+        # no incomplete or temporary files are left in the archive
+        self.assertEqual(os.listdir(self.archive_path), ['Dues15-0004.pdf'])
 
-    def tearDown(self):
-        self.isdir_patcher.stop()
-        self.isfile_patcher.stop()
-        self.copyfile_patcher.stop()
-        self.makedirs_patcher.stop()
+    def test_archive_directory_creation(self):
+        db_session = self.create_db_session()
+        make_invoice_mock = self.create_make_invoice()
+        make_reversal_mock = self.create_make_invoice()
+
+        with mock.patch('os.path.isdir') as isdir_mock, \
+                mock.patch('os.makedirs') as makedirs_mock:
+            isdir_mock.side_effect = [True]
+            DuesInvoiceArchiving(
+                db_session,
+                'c3s_member',
+                'dues15_invoices',
+                make_invoice_mock,
+                make_reversal_mock,
+                '/tmp/invoices/archive'
+            )
+            isdir_mock.assert_called_with('/tmp/invoices/archive')
+            makedirs_mock.assert_not_called()
+
+            isdir_mock.side_effect = [False]
+            DuesInvoiceArchiving(
+                db_session,
+                'c3s_member',
+                'dues15_invoices',
+                make_invoice_mock,
+                make_reversal_mock,
+                '/tmp/invoices/archive'
+            )
+            makedirs_mock.assert_called_with('/tmp/invoices/archive')
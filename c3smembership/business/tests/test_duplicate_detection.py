@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+from datetime import date
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.duplicate_detection import (
+    cologne_phonetic,
+    DuplicateDetection,
+    email_local_part,
+    normalize_name,
+)
+
+
+Identity = namedtuple(
+    'Identity', ['id', 'firstname', 'lastname', 'email', 'date_of_birth'])
+
+
+class DuplicateDetectionFunctionsTest(TestCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(
+            normalize_name(u'Müller-Lüdenscheidt'), u'mullerludenscheidt')
+        self.assertEqual(normalize_name(u'Strauß'), u'strauss')
+        self.assertEqual(normalize_name(None), u'')
+
+    def test_email_local_part(self):
+        self.assertEqual(email_local_part(u'Alice@Example.com'), u'alice')
+        self.assertEqual(email_local_part(u'no-at-sign'), u'no-at-sign')
+        self.assertEqual(email_local_part(None), u'')
+
+    def test_cologne_phonetic(self):
+        self.assertEqual(cologne_phonetic(u'Meier'), u'67')
+        self.assertEqual(cologne_phonetic(u'Mayer'), u'67')
+        self.assertEqual(cologne_phonetic(u'Maier'), u'67')
+        self.assertEqual(
+            cologne_phonetic(u'Müller-Lüdenscheidt'), u'65752682')
+        self.assertEqual(cologne_phonetic(u'Wikipedia'), u'3412')
+        self.assertEqual(cologne_phonetic(u'Christoph'), u'47823')
+        self.assertEqual(cologne_phonetic(u''), u'')
+
+
+class DuplicateDetectionTest(TestCase):
+
+    def setUp(self):
+        self.member_repository = mock.Mock()
+        self.member_repository.get_accepted_member_identities.return_value = [
+            Identity(1, u'Alice', u'Meier', u'alice@example.com',
+                     date(1980, 1, 1)),
+            Identity(2, u'Bob', u'Schmidt', u'bob@example.com',
+                     date(1970, 5, 17)),
+            Identity(3, u'Carol', u'Smith', u'carol@example.org',
+                     date(1990, 12, 24)),
+        ]
+        self.member_repository.get_application_identities.return_value = [
+            Identity(10, u'Alice', u'Mayer', u'alice@example.net',
+                     date(1980, 1, 1)),
+            Identity(11, u'Bob', u'Schmitt', u'bob@example.com',
+                     date(1971, 5, 17)),
+            Identity(12, u'Dave', u'Jones', u'dave@example.com',
+                     date(1960, 2, 2)),
+        ]
+        self.duplicate_detection = DuplicateDetection(self.member_repository)
+
+    def test_find_candidates(self):
+        applicant = Identity(
+            10, u'Alice', u'Mayer', u'alice@example.net', date(1980, 1, 1))
+        candidates = self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].applicant_id, 10)
+        self.assertEqual(candidates[0].member_id, 1)
+        self.assertTrue(0.8 < candidates[0].score < 1.0)
+        self.assertEqual(
+            candidates[0].reasons,
+            ('lastname', 'firstname', 'email', 'date_of_birth'))
+
+        # exact duplicate scores 1
+        applicant = Identity(
+            10, u'Alice', u'Meier', u'Alice@example.com', date(1980, 1, 1))
+        candidates = self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(candidates[0].score, 1.0)
+
+        # the member itself is no candidate
+        applicant = Identity(
+            1, u'Alice', u'Meier', u'alice@example.com', date(1980, 1, 1))
+        self.assertEqual(
+            self.duplicate_detection.find_candidates(applicant), [])
+
+        # a matching date of birth only is not sufficient
+        applicant = Identity(
+            12, u'Dave', u'Jones', u'dave@example.com', date(1990, 12, 24))
+        self.assertEqual(
+            self.duplicate_detection.find_candidates(applicant), [])
+
+        # the same email address is sufficient despite a different name
+        applicant = Identity(
+            13, u'Zoe', u'Other', u'Carol@Example.org ', date(2000, 1, 1))
+        candidates = self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].member_id, 3)
+        self.assertEqual(candidates[0].reasons, ('email',))
+
+        # the same date of birth and a similar last name are sufficient
+        applicant = Identity(
+            14, u'Zoe', u'Smith', u'zoe@example.net', date(1990, 12, 24))
+        candidates = self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].member_id, 3)
+        self.assertEqual(
+            candidates[0].reasons, ('lastname', 'date_of_birth'))
+
+    def test_find_all_candidates(self):
+        all_candidates = self.duplicate_detection.find_all_candidates()
+        self.assertEqual(sorted(all_candidates.keys()), [10, 11])
+        self.assertEqual(all_candidates[10][0].member_id, 1)
+        self.assertEqual(all_candidates[11][0].member_id, 2)
+        self.assertEqual(
+            all_candidates[11][0].reasons, ('lastname', 'firstname', 'email'))
+        self.assertEqual(
+            self.member_repository.get_accepted_member_identities.call_count,
+            1)
+        self.assertEqual(
+            self.member_repository.get_application_identities.call_count, 1)
+
+    def test_invalidate(self):
+        applicant = Identity(
+            10, u'Alice', u'Meier', u'alice@example.com', date(1980, 1, 1))
+        self.duplicate_detection.find_candidates(applicant)
+        self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(
+            self.member_repository.get_accepted_member_identities.call_count,
+            1)
+
+        self.duplicate_detection.invalidate()
+        self.duplicate_detection.find_candidates(applicant)
+        self.assertEqual(
+            self.member_repository.get_accepted_member_identities.call_count,
+            2)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.business.invoice_number_allocator module.
+"""
+
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.invoice_number_allocator import (
+    InvoiceNumberAllocator,
+)
+
+
+class InvoiceNumberAllocatorTest(TestCase):
+    """
+    Tests the InvoiceNumberAllocator class.
+    """
+
+    def setUp(self):
+        self.dues_invoice_repository = mock.Mock()
+        self.dues_invoice_repository.get_max_invoice_number.side_effect = \
+            lambda year: {2016: 12, 2017: 7}[year]
+        self.number_sequence_repository = mock.Mock()
+        self.allocator = InvoiceNumberAllocator(
+            self.dues_invoice_repository, self.number_sequence_repository)
+
+    def test_allocate(self):
+        """
+        Test the allocate method.
+        """
+        self.number_sequence_repository.allocate.side_effect = [8]
+        self.assertEqual(self.allocator.allocate(2017), 8)
+        name, count, initial_value = \
+            self.number_sequence_repository.allocate.call_args[0]
+        self.assertEqual(name, u'dues2017_invoice_number')
+        self.assertEqual(count, 1)
+        # the sequence starts after the highest invoice number of the year
+        self.assertEqual(initial_value(), 7)
+
+    def test_allocate_block(self):
+        """
+        Test the allocate_block method.
+        """
+        self.number_sequence_repository.allocate.side_effect = [14]
+        self.assertEqual(self.allocator.allocate_block(2016, 2), [13, 14])
+        name, count, initial_value = \
+            self.number_sequence_repository.allocate.call_args[0]
+        self.assertEqual(name, u'dues2016_invoice_number')
+        self.assertEqual(count, 2)
+        self.assertEqual(initial_value(), 12)
+
+        with self.assertRaises(ValueError):
+            self.allocator.allocate_block(2016, 0)
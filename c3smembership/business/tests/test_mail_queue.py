@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from unittest import TestCase
+
+import mock
+from pyramid_mailer.message import Message
+
+from c3smembership.business.mail_queue import (
+    MailQueue,
+    MailWorker,
+)
+
+
+class MailQueueTest(TestCase):
+
+    def test_enqueue(self):
+        repository_mock = mock.Mock()
+        repository_mock.exists.side_effect = [False, True]
+        mail_queue = MailQueue(repository_mock)
+        mail_queue.datetime = mock.Mock()
+        mail_queue.datetime.now.return_value = datetime(2017, 4, 1, 12, 0)
+        message = Message(
+            subject=u'Subject',
+            sender=u'yes@c3s.cc',
+            recipients=[u'alice@example.com'],
+            body=u'Body',
+            extra_headers={'Reply-To': 'office@c3s.cc'})
+
+        self.assertTrue(
+            mail_queue.enqueue(u'run', u'run/1', message))
+        repository_mock.exists.assert_called_with(u'run/1')
+        repository_mock.add.assert_called_with(
+            u'run', u'run/1', u'yes@c3s.cc', [u'alice@example.com'],
+            u'Subject', u'Body', {'Reply-To': 'office@c3s.cc'},
+            datetime(2017, 4, 1, 12, 0))
+
+        self.assertFalse(
+            mail_queue.enqueue(u'run', u'run/1', message))
+        self.assertEqual(repository_mock.add.call_count, 1)
+
+    def test_get_progress(self):
+        repository_mock = mock.Mock()
+        repository_mock.get_run_status_counts.return_value = [
+            (u'dues17_invoice', u'failed', 1),
+            (u'dues17_invoice', u'pending', 3),
+            (u'dues17_invoice', u'sent', 6),
+            (u'invitation_bcgv17', u'sending', 2),
+        ]
+        mail_queue = MailQueue(repository_mock)
+
+        progress = mail_queue.get_progress()
+
+        self.assertEqual(len(progress), 2)
+        self.assertEqual(progress[0].run, u'dues17_invoice')
+        self.assertEqual(progress[0].pending, 3)
+        self.assertEqual(progress[0].sending, 0)
+        self.assertEqual(progress[0].sent, 6)
+        self.assertEqual(progress[0].failed, 1)
+        self.assertEqual(progress[0].total, 10)
+        self.assertEqual(progress[1].run, u'invitation_bcgv17')
+        self.assertEqual(progress[1].sending, 2)
+        self.assertEqual(progress[1].total, 2)
+
+
+class MailWorkerTest(TestCase):
+
+    def _create_job(self, job_id, attempts=1):
+        return {
+            'id': job_id,
+            'attempts': attempts,
+            'sender': u'yes@c3s.cc',
+            'recipients': [u'alice@example.com'],
+            'subject': u'Subject {0}'.format(job_id),
+            'body': u'Body',
+            'extra_headers': {},
+        }
+
+    def _create_worker(self, jobs, mailer, **kwargs):
+        repository_mock = mock.Mock()
+        repository_mock.claim_next.side_effect = jobs
+        worker = MailWorker(
+            repository_mock, mailer, mock.MagicMock(), **kwargs)
+        worker.datetime = mock.Mock()
+        worker.datetime.now.return_value = datetime(2017, 4, 1, 12, 0)
+        worker.time = mock.Mock()
+        worker.time.time.return_value = 100.0
+        return worker, repository_mock
+
+    def test_work(self):
+        mailer = mock.Mock()
+        worker, repository_mock = self._create_worker(
+            [self._create_job(1), self._create_job(2), None], mailer)
+
+        self.assertEqual(worker.work(), 2)
+
+        self.assertEqual(mailer.send_immediately.call_count, 2)
+        message = mailer.send_immediately.call_args[0][0]
+        self.assertEqual(message.subject, u'Subject 2')
+        self.assertEqual(message.recipients, [u'alice@example.com'])
+        repository_mock.claim_next.assert_called_with(
+            datetime(2017, 4, 1, 12, 0), datetime(2017, 4, 1, 12, 10))
+        repository_mock.mark_sent.assert_has_calls([
+            mock.call(1, datetime(2017, 4, 1, 12, 0)),
+            mock.call(2, datetime(2017, 4, 1, 12, 0)),
+        ])
+        worker.time.sleep.assert_not_called()
+
+    def test_work_max_jobs(self):
+        worker, repository_mock = self._create_worker(
+            [self._create_job(1), self._create_job(2)], mock.Mock())
+        self.assertEqual(worker.work(max_jobs=1), 1)
+        self.assertEqual(repository_mock.claim_next.call_count, 1)
+
+    def test_work_retry(self):
+        mailer = mock.Mock()
+        mailer.send_immediately.side_effect = IOError('connection refused')
+        worker, repository_mock = self._create_worker(
+            [self._create_job(1, attempts=1),
+             self._create_job(2, attempts=3),
+             self._create_job(3, attempts=5),
+             None],
+            mailer,
+            max_attempts=5,
+            retry_delay=60)
+
+        self.assertEqual(worker.work(), 3)
+
+        repository_mock.mark_sent.assert_not_called()
+        repository_mock.mark_failed.assert_has_calls([
+            mock.call(
+                1, u'IOError: connection refused',
+                datetime(2017, 4, 1, 12, 1)),
+            mock.call(
+                2, u'IOError: connection refused',
+                datetime(2017, 4, 1, 12, 4)),
+            mock.call(3, u'IOError: connection refused'),
+        ])
+
+    def test_work_rate_limit(self):
+        worker, _ = self._create_worker(
+            [self._create_job(1), self._create_job(2), None],
+            mock.Mock(),
+            rate_limit=4)
+        worker.time.time.side_effect = [100.0, 100.125, 101.0, 101.5]
+
+        self.assertEqual(worker.work(), 2)
+
+        worker.time.sleep.assert_called_once_with(0.125)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.business.member_import module.
+"""
+
+from datetime import date
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.member_import import (
+    MemberImporter,
+    MERGE,
+    SKIP,
+)
+
+
+def _values(number, **kwargs):
+    values = {
+        'firstname': u'Firstname',
+        'lastname': u'Lastname',
+        'email': u'member{0}@example.com'.format(number),
+        'address1': u'Street',
+        'postcode': u'12345',
+        'city': u'Town',
+        'country': u'DE',
+        'date_of_birth': date(1970, 1, 1),
+        'num_shares': 2,
+        'email_confirm_code': u'CODE{0}'.format(number),
+    }
+    values.update(kwargs)
+    return values
+
+
+class MemberImporterTest(TestCase):
+    """
+    Tests the MemberImporter class.
+    """
+
+    def setUp(self):
+        self.repository = mock.Mock()
+        self.repository.find_used_reference_codes.return_value = set()
+        self.repository.find_members_by_emails.return_value = {}
+        self.repository.add_members.side_effect = \
+            lambda members: range(1, len(members) + 1)
+        self.allocator = mock.Mock()
+        self.allocator.allocate_block.side_effect = \
+            lambda count: range(100, 100 + count)
+        self.importer = MemberImporter(self.repository, self.allocator)
+
+    def test_import_members_batches(self):
+        """
+        Test that the rows are looked up and inserted in batches.
+        """
+        progress = []
+        report = self.importer.import_members(
+            [(line, _values(line)) for line in range(5)],
+            batch_size=2,
+            progress_callback=progress.append)
+
+        self.assertEqual(report.inserted, 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(self.repository.add_members.call_count, 3)
+        self.assertEqual(
+            self.repository.find_members_by_emails.call_count, 3)
+        self.assertFalse(self.allocator.allocate_block.called)
+
+    def test_import_members_accepted(self):
+        """
+        Test that rows with membership date become accepted members.
+        """
+        self.importer.import_members([
+            (1, _values(1, membership_date=date(2014, 3, 29))),
+            (2, _values(2)),
+            (3, _values(3, membership_date=date(2014, 4, 1))),
+        ])
+        self.allocator.allocate_block.assert_called_with(2)
+        members = self.repository.add_members.call_args[0][0]
+        self.assertEqual(
+            [(member['membership_accepted'], member['membership_number'])
+             for member in members],
+            [(True, 100), (False, None), (True, 101)])
+        shares = self.repository.add_shares.call_args[0][0]
+        self.assertEqual(
+            [(member_id, values['reference_code'], values['number'])
+             for member_id, values in shares],
+            [(1, u'CODE1', 2), (3, u'CODE3', 2)])
+        self.repository.add_num_shares.assert_called_with({})
+
+    def test_import_members_duplicates(self):
+        """
+        Test the skipping and merging of existing members.
+        """
+        self.repository.find_members_by_emails.return_value = {
+            u'member1@example.com': (11, True),
+            u'member2@example.com': (12, False),
+        }
+        rows = [
+            (1, _values(1, email=u'Member1@example.com')),
+            (2, _values(2)),
+            (3, _values(3)),
+        ]
+        report = self.importer.import_members(rows, SKIP)
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(report.skipped, [
+            (1, u'email address already in use'),
+            (2, u'email address already in use'),
+        ])
+
+        report = self.importer.import_members(rows, MERGE)
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(report.merged, 2)
+        shares = self.repository.add_shares.call_args[0][0]
+        self.assertEqual(
+            [(member_id, values['reference_code']) for member_id, values in
+             shares],
+            [(11, u'CODE1')])
+        self.repository.add_num_shares.assert_called_with({11: 2, 12: 2})
+
+        with self.assertRaises(ValueError):
+            self.importer.import_members(rows, 'overwrite')
+
+    def test_import_members_passwords(self):
+        """
+        Test that passwords are hashed unless already hashed.
+        """
+        password_hash = u'$2a$10$' + u'x' * 53
+        self.importer.import_members([
+            (1, _values(1, password=password_hash)),
+            (2, _values(2, password=u'secret')),
+            (3, _values(3)),
+        ])
+        members = self.repository.add_members.call_args[0][0]
+        self.assertEqual(members[0]['password'], password_hash)
+        self.assertTrue(members[1]['password'].startswith(u'$2a$'))
+        self.assertEqual(members[2]['password'], None)
+
+    def test_import_members_reference_codes(self):
+        """
+        Test that missing reference codes are generated.
+        """
+        self.repository.find_used_reference_codes.side_effect = [
+            set([u'CODE1']), set()]
+        report = self.importer.import_members([
+            (1, _values(1)),
+            (2, _values(2, email_confirm_code=None)),
+        ])
+        self.assertEqual(report.skipped, [
+            (1, u'reference code already in use')])
+        members = self.repository.add_members.call_args[0][0]
+        self.assertEqual(len(members[0]['email_confirm_code']), 10)
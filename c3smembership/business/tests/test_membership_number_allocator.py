@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.business.membership_number_allocator module.
+"""
+
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.membership_number_allocator import (
+    MembershipNumberAllocator,
+)
+
+
+class MembershipNumberAllocatorTest(TestCase):
+    """
+    Tests the MembershipNumberAllocator class.
+    """
+
+    def setUp(self):
+        self.member_repository = mock.Mock()
+        self.number_sequence_repository = mock.Mock()
+        self.allocator = MembershipNumberAllocator(
+            self.member_repository, self.number_sequence_repository)
+
+    def test_allocate(self):
+        """
+        Test the allocate method.
+        """
+        self.number_sequence_repository.allocate.side_effect = [17]
+        self.assertEqual(self.allocator.allocate(), 17)
+        self.number_sequence_repository.allocate.assert_called_with(
+            u'membership_number',
+            1,
+            self.member_repository.get_highest_membership_number)
+
+    def test_allocate_block(self):
+        """
+        Test the allocate_block method.
+        """
+        self.number_sequence_repository.allocate.side_effect = [21]
+        self.assertEqual(
+            self.allocator.allocate_block(4), [18, 19, 20, 21])
+        self.number_sequence_repository.allocate.assert_called_with(
+            u'membership_number',
+            4,
+            self.member_repository.get_highest_membership_number)
+
+        with self.assertRaises(ValueError):
+            self.allocator.allocate_block(0)
+        with self.assertRaises(ValueError):
+            self.allocator.allocate_block(1.5)
+
+    def test_get_highest_and_next(self):
+        """
+        Test the get_highest and get_next methods.
+        """
+        self.number_sequence_repository.get_current.side_effect = [33, 33]
+        self.assertEqual(self.allocator.get_highest(), 33)
+        self.assertEqual(self.allocator.get_next(), 34)
+        self.number_sequence_repository.get_current.assert_called_with(
+            u'membership_number',
+            self.member_repository.get_highest_membership_number)
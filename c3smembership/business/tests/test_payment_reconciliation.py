@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.business.payment_reconciliation module.
+"""
+
+from datetime import date
+from decimal import Decimal
+from StringIO import StringIO
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.payment_reconciliation import (
+    AMBIGUOUS,
+    Booking,
+    MATCHED,
+    PaymentReconciliation,
+    SKIPPED,
+    UNMATCHED,
+    get_booking_hash,
+    parse_amount,
+    parse_date,
+    read_camt053_bookings,
+    read_csv_bookings,
+)
+
+
+CAMT053 = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt>
+    <Stmt>
+      <Ntry>
+        <Amt Ccy="EUR">50.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2017-05-02</Dt></BookgDt>
+        <AcctSvcrRef>REF1</AcctSvcrRef>
+        <NtryDtls>
+          <TxDtls>
+            <RltdPties><Dbtr><Nm>Jane Doe</Nm></Dbtr></RltdPties>
+            <RmtInf><Ustrd>C3S-dues2017-0042</Ustrd></RmtInf>
+          </TxDtls>
+        </NtryDtls>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">80.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2017-05-03</Dt></BookgDt>
+        <NtryRef>REF2</NtryRef>
+        <NtryDtls>
+          <TxDtls>
+            <Refs><AcctSvcrRef>TX21</AcctSvcrRef></Refs>
+            <AmtDtls><TxAmt><Amt Ccy="EUR">30.00</Amt></TxAmt></AmtDtls>
+            <RmtInf><Ustrd>Mitgliedsnummer 11</Ustrd></RmtInf>
+          </TxDtls>
+          <TxDtls>
+            <AmtDtls><TxAmt><Amt Ccy="EUR">50.00</Amt></TxAmt></AmtDtls>
+            <RmtInf><Ustrd>KLMNOPQRST</Ustrd></RmtInf>
+          </TxDtls>
+        </NtryDtls>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">12.00</Amt>
+        <CdtDbtInd>DBIT</CdtDbtInd>
+        <Sts>BOOK</Sts>
+        <BookgDt><Dt>2017-05-04</Dt></BookgDt>
+        <AddtlNtryInf>Bank fees</AddtlNtryInf>
+      </Ntry>
+      <Ntry>
+        <Amt Ccy="EUR">99.00</Amt>
+        <CdtDbtInd>CRDT</CdtDbtInd>
+        <Sts>PDNG</Sts>
+        <BookgDt><Dt>2017-05-05</Dt></BookgDt>
+      </Ntry>
+    </Stmt>
+  </BkToCstmrStmt>
+</Document>
+"""
+
+
+class ParserTest(TestCase):
+    """
+    Tests the bank statement parsing.
+    """
+
+    def test_parse_amount(self):
+        """
+        Test the parse_amount function.
+        """
+        self.assertEqual(parse_amount(u'1.234,56'), Decimal('1234.56'))
+        self.assertEqual(parse_amount(u'1,234.56'), Decimal('1234.56'))
+        self.assertEqual(parse_amount(u'-50,00 EUR'), Decimal('-50.00'))
+        self.assertEqual(parse_amount(u'50'), Decimal('50'))
+        self.assertEqual(parse_amount(u'50.5'), Decimal('50.5'))
+        self.assertEqual(parse_amount(u'+1234,50'), Decimal('1234.50'))
+        # a single separator followed by three digits separates thousands
+        self.assertEqual(parse_amount(u'1.234'), Decimal('1234'))
+        self.assertEqual(parse_amount(u'1,234'), Decimal('1234'))
+        self.assertEqual(parse_amount(u'1.234.567'), Decimal('1234567'))
+        for invalid in [u'1234,567', u'1.234.56', u'1,234,56', u'']:
+            with self.assertRaises(ValueError):
+                parse_amount(invalid)
+        with self.assertRaises(ValueError):
+            parse_amount(u'fifty')
+
+    def test_parse_date(self):
+        """
+        Test the parse_date function.
+        """
+        self.assertEqual(parse_date(u'2017-05-02'), date(2017, 5, 2))
+        self.assertEqual(parse_date(u'02.05.2017'), date(2017, 5, 2))
+        self.assertEqual(parse_date(u'02.05.17'), date(2017, 5, 2))
+        with self.assertRaises(ValueError):
+            parse_date(u'May 2nd')
+
+    def test_read_csv_bookings(self):
+        """
+        Test the read_csv_bookings function.
+        """
+        statement = StringIO(
+            'Buchungstag;Auftraggeber/Empf\xc3\xa4nger;Verwendungszweck;'
+            'Betrag\n'
+            '02.05.2017;J\xc3\xbcrgen;C3S-dues2017-0042;50,00\n'
+            '\n'
+            '03.05.2017;Jane;KLMNOPQRST;1.050,00\n')
+        occurrences = {}
+        self.assertEqual(
+            list(read_csv_bookings(statement)),
+            [
+                Booking(
+                    2, date(2017, 5, 2), Decimal('50.00'),
+                    u'C3S-dues2017-0042', u'J\xfcrgen',
+                    get_booking_hash(
+                        occurrences, date(2017, 5, 2), Decimal('50'),
+                        u'C3S-dues2017-0042', u'J\xfcrgen')),
+                Booking(
+                    4, date(2017, 5, 3), Decimal('1050.00'),
+                    u'KLMNOPQRST', u'Jane',
+                    get_booking_hash(
+                        occurrences, date(2017, 5, 3), Decimal('1050'),
+                        u'KLMNOPQRST', u'Jane')),
+            ])
+
+        # identical bookings are distinguished and get the same identifiers
+        # when read again
+        statement = 'date;amount;reference\n' + \
+            '2017-05-02;50;Mitglied: 11\n' * 2
+        identifiers = [
+            booking.identifier
+            for booking in read_csv_bookings(StringIO(statement))]
+        self.assertEqual(len(set(identifiers)), 2)
+        self.assertEqual(
+            [
+                booking.identifier
+                for booking in read_csv_bookings(StringIO(statement))],
+            identifiers)
+
+        statement = StringIO('date,reference\n2017-05-02,something\n')
+        with self.assertRaises(ValueError):
+            list(read_csv_bookings(statement))
+
+        statement = StringIO('date,amount,reference\n2017-05-02,a lot,x\n')
+        with self.assertRaises(ValueError):
+            list(read_csv_bookings(statement))
+
+    def test_read_camt053_bookings(self):
+        """
+        Test the read_camt053_bookings function.
+        """
+        self.assertEqual(
+            list(read_camt053_bookings(StringIO(CAMT053))),
+            [
+                Booking(
+                    1, date(2017, 5, 2), Decimal('50.00'),
+                    'C3S-dues2017-0042', 'Jane Doe', u'camt:REF1'),
+                Booking(
+                    2, date(2017, 5, 3), Decimal('30.00'),
+                    'Mitgliedsnummer 11', u'', u'camt:TX21'),
+                Booking(
+                    2, date(2017, 5, 3), Decimal('50.00'), 'KLMNOPQRST', u'',
+                    u'camt:REF2/2'),
+                Booking(
+                    3, date(2017, 5, 4), Decimal('-12.00'), 'Bank fees', u'',
+                    get_booking_hash(
+                        {}, date(2017, 5, 4), Decimal('-12'), u'Bank fees',
+                        u'')),
+            ])
+
+
+class PaymentReconciliationTest(TestCase):
+    """
+    Tests the PaymentReconciliation class.
+    """
+
+    def setUp(self):
+        self.repository = mock.Mock()
+        self.repository.DUES_YEARS = [2015, 2016, 2017]
+        self.repository.find_members_by_invoice_numbers.side_effect = \
+            lambda year, numbers: {2017: {42: 1, 43: 2}}.get(year, {})
+        self.repository.find_members_by_dues_tokens.return_value = {
+            u'KLMNOPQRST': [(1, 2017)],
+            u'ABCDEFGHIJ': [(1, 2016)],
+        }
+        self.repository.find_members_by_membership_numbers.return_value = {
+            11: 1,
+            22: 2,
+        }
+        self.repository.find_applied_bookings.return_value = set()
+        self.reconciliation = PaymentReconciliation(self.repository)
+
+    def test_get_references(self):
+        """
+        Test the get_references method.
+        """
+        self.assertEqual(
+            PaymentReconciliation.get_references(
+                u'Beitrag C3S dues 2017 - 0042, Mitglieds-Nr. 11 klmnopqrst'),
+            (set([(2017, 42)]), set([u'KLMNOPQRST']), set([11])))
+        self.assertEqual(
+            PaymentReconciliation.get_references(u'C3S-dues2016-0007-S'),
+            (set([(2016, 7)]), set(), set()))
+        self.assertEqual(
+            PaymentReconciliation.get_references(u'member no: 5'),
+            (set(), set(), set([5])))
+        self.assertEqual(
+            PaymentReconciliation.get_references(u'Mitglied #5, M-Nr 6'),
+            (set(), set(), set([5, 6])))
+        # numbers just following the member keyword are no membership
+        # numbers
+        self.assertEqual(
+            PaymentReconciliation.get_references(u'Mitglied 2017 Beitrag'),
+            (set(), set(), set()))
+
+    def test_reconcile(self):
+        """
+        Test the reconcile method.
+        """
+        bookings = [
+            Booking(1, date(2017, 5, 2), Decimal('30'), u'C3S-dues2017-0042',
+                    u'', u'b1'),
+            Booking(2, date(2017, 5, 4), Decimal('20'), u'KLMNOPQRST', u'',
+                    u'b2'),
+            Booking(3, date(2017, 5, 3), Decimal('50'), u'Mitglied Nr. 22',
+                    u'', u'b3'),
+            Booking(4, date(2017, 5, 3), Decimal('50'), u'ABCDEFGHIJ', u'',
+                    u'b4'),
+            Booking(5, date(2017, 5, 3), Decimal('-5'), u'KLMNOPQRST', u'',
+                    u'b5'),
+            Booking(6, date(2017, 5, 3), Decimal('5'), u'Donation', u'',
+                    u'b6'),
+            Booking(7, date(2017, 5, 3), Decimal('5'),
+                    u'C3S-dues2017-0042 C3S-dues2017-0043', u'', u'b7'),
+            Booking(8, date(2017, 5, 3), Decimal('5'),
+                    u'KLMNOPQRST ABCDEFGHIJ', u'', u'b8'),
+        ]
+        report = self.reconciliation.reconcile(bookings, 2017)
+
+        self.assertEqual(
+            [(r.booking.line, r.member_id, r.year) for r in report.matched],
+            [(1, 1, 2017), (2, 1, 2017), (3, 2, 2017), (4, 1, 2016)])
+        self.assertEqual(
+            [(r.booking.line, r.status) for r in report.unmatched],
+            [(5, UNMATCHED), (6, UNMATCHED)])
+        self.assertEqual(
+            [(r.booking.line, r.status, r.reason) for r in report.ambiguous],
+            [
+                (7, AMBIGUOUS, u'references members 1, 2'),
+                (8, AMBIGUOUS, u'references dues years 2016, 2017'),
+            ])
+        self.assertTrue(all(r.status == MATCHED for r in report.matched))
+        self.assertEqual(report.payments, {
+            2016: {1: (Decimal('50'), date(2017, 5, 3))},
+            2017: {
+                1: (Decimal('50'), date(2017, 5, 4)),
+                2: (Decimal('50'), date(2017, 5, 3)),
+            },
+        })
+        self.repository.add_payments.assert_has_calls([
+            mock.call(2016, report.payments[2016]),
+            mock.call(2017, report.payments[2017]),
+        ])
+        self.repository.add_applied_bookings.assert_called_once_with([
+            (u'b1', 2017, 1, Decimal('30'), date(2017, 5, 2)),
+            (u'b2', 2017, 1, Decimal('20'), date(2017, 5, 4)),
+            (u'b3', 2017, 2, Decimal('50'), date(2017, 5, 3)),
+            (u'b4', 2016, 1, Decimal('50'), date(2017, 5, 3)),
+        ])
+        # the references are looked up in bulk
+        self.assertEqual(
+            self.repository.find_members_by_dues_tokens.call_count, 1)
+        self.assertEqual(
+            self.repository.find_members_by_membership_numbers.call_count, 1)
+
+    def test_reconcile_dry_run(self):
+        """
+        Test that the reconcile method does not record payments in a dry run.
+        """
+        report = self.reconciliation.reconcile(
+            [Booking(
+                1, date(2017, 5, 2), Decimal('30'), u'Mitglied: 11', u'',
+                u'b1')],
+            2016,
+            apply_payments=False)
+        self.assertEqual(
+            report.payments, {2016: {1: (Decimal('30'), date(2017, 5, 2))}})
+        self.assertFalse(self.repository.add_payments.called)
+
+    def test_reconcile_applied(self):
+        """
+        Test that the reconcile method skips bookings already applied.
+        """
+        self.repository.find_applied_bookings.return_value = set([u'b1'])
+        report = self.reconciliation.reconcile(
+            [
+                Booking(
+                    1, date(2017, 5, 2), Decimal('30'), u'Mitglied: 11', u'',
+                    u'b1'),
+                Booking(
+                    2, date(2017, 5, 3), Decimal('20'), u'Mitglied: 11', u'',
+                    u'b2'),
+                Booking(
+                    3, date(2017, 5, 3), Decimal('20'), u'Mitglied: 11', u'',
+                    u'b2'),
+            ],
+            2017)
+        self.assertEqual(
+            [(r.booking.line, r.status, r.reason) for r in report.skipped],
+            [
+                (1, SKIPPED, u'already applied'),
+                (3, SKIPPED, u'duplicate booking'),
+            ])
+        self.assertEqual(
+            report.payments, {2017: {1: (Decimal('20'), date(2017, 5, 3))}})
+        self.repository.add_applied_bookings.assert_called_once_with([
+            (u'b2', 2017, 1, Decimal('20'), date(2017, 5, 3))])
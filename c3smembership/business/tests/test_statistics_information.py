@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from unittest import TestCase
+
+import mock
+
+from c3smembership.business.statistics_information import (
+    StatisticsInformation,
+)
+
+
+class StatisticsInformationTest(TestCase):
+
+    def _create_statistics_information(self):
+        statistics_repository_mock = mock.Mock()
+        statistics_repository_mock.get_member_statistics.return_value = {
+            'number_of_datasets': 10,
+            'afm_shares_unpaid': 11,
+            'afm_shares_paid': 12,
+            'members_accepted_count': 13,
+            'non_accepted_count': 14,
+            'nonmember_listing_count': 15,
+            'duplicates_count': 16,
+            'natural_persons_count': 17,
+            'legal_entities_count': 18,
+            'normal_memberships_count': 19,
+            'investing_memberships_count': 20,
+            'other_memberships_count': 21,
+            'membership_lost_count': 22,
+            'membership_numbers_count': 23,
+            'countries_count': 25,
+        }
+        statistics_repository_mock.get_country_statistics.return_value = [
+            (u'DE', 2), (u'FR', 1)]
+        statistics_repository_mock.get_staff_count.return_value = 26
+        statistics_repository_mock.get_dues_statistics.return_value = {
+            2015: ['dues15'],
+            2016: ['dues16'],
+            2017: ['dues17'],
+        }
+        share_repository_mock = mock.Mock()
+        share_repository_mock.get_share_count.return_value = 27
+        membership_number_allocator_mock = mock.Mock()
+        membership_number_allocator_mock.get_highest.return_value = 24
+        statistics_information = StatisticsInformation(
+            statistics_repository_mock,
+            share_repository_mock,
+            membership_number_allocator_mock)
+        statistics_information.date = mock.Mock()
+        statistics_information.date.today.return_value = date(2017, 12, 24)
+        return (
+            statistics_information,
+            statistics_repository_mock,
+            share_repository_mock)
+
+    def test_get_snapshot(self):
+        statistics_information, statistics_repository_mock, \
+            share_repository_mock = self._create_statistics_information()
+
+        snapshot = statistics_information.get_snapshot()
+
+        statistics_repository_mock.get_member_statistics.assert_called_with(
+            date(2017, 12, 24))
+        share_repository_mock.get_share_count.assert_called_with(
+            date(2017, 12, 24))
+        self.assertEqual(snapshot.effective_date, date(2017, 12, 24))
+        self.assertEqual(snapshot.number_of_datasets, 10)
+        self.assertEqual(snapshot.afm_shares_unpaid, 11)
+        self.assertEqual(snapshot.afm_shares_paid, 12)
+        self.assertEqual(snapshot.members_accepted_count, 13)
+        self.assertEqual(snapshot.membership_lost_count, 22)
+        self.assertEqual(snapshot.highest_membership_number, 24)
+        self.assertEqual(snapshot.next_membership_number, 25)
+        self.assertEqual(snapshot.countries_count, 25)
+        self.assertEqual(snapshot.countries, ((u'DE', 2), (u'FR', 1)))
+        self.assertEqual(snapshot.staff_count, 26)
+        self.assertEqual(snapshot.share_count, 27)
+        self.assertEqual(snapshot.dues15_stats, ('dues15',))
+        self.assertEqual(snapshot.dues16_stats, ('dues16',))
+        self.assertEqual(snapshot.dues17_stats, ('dues17',))
+
+        with self.assertRaises(AttributeError):
+            snapshot.share_count = 1
+
+    def test_get_snapshot_cached(self):
+        statistics_information, statistics_repository_mock, \
+            share_repository_mock = self._create_statistics_information()
+
+        snapshot = statistics_information.get_snapshot()
+        self.assertTrue(statistics_information.get_snapshot() is snapshot)
+        self.assertEqual(
+            statistics_repository_mock.get_member_statistics.call_count, 1)
+        self.assertEqual(share_repository_mock.get_share_count.call_count, 1)
+
+        statistics_information.invalidate()
+        invalidated_snapshot = statistics_information.get_snapshot()
+        self.assertFalse(invalidated_snapshot is snapshot)
+        self.assertEqual(
+            statistics_repository_mock.get_member_statistics.call_count, 2)
+
+        statistics_information.date.today.return_value = date(2017, 12, 25)
+        next_day_snapshot = statistics_information.get_snapshot()
+        self.assertEqual(next_day_snapshot.effective_date, date(2017, 12, 25))
+        self.assertEqual(
+            statistics_repository_mock.get_member_statistics.call_count, 3)
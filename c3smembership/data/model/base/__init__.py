@@ -18,9 +18,36 @@ Base = declarative_base()
 
 
 from zope.sqlalchemy import ZopeTransactionExtension
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import (
     scoped_session,
     sessionmaker,
 )
 
 DBSession = scoped_session(sessionmaker(extension=ZopeTransactionExtension()))
+
+
+@event.listens_for(Engine, 'connect')
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    """
+    Disables the transaction handling of pysqlite.
+
+    pysqlite begins transactions only before data modifications and commits
+    them before any other statement like SAVEPOINT. Therefore, SAVEPOINTs
+    created with DBSession.begin_nested() would not work on SQLite. The
+    transactions are begun by _begin_sqlite_transaction instead.
+    """
+    # pylint: disable=unused-argument
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(Engine, 'begin')
+def _begin_sqlite_transaction(connection):
+    """
+    Begins the transactions on SQLite as pysqlite doesn't, see
+    _disable_pysqlite_transactions.
+    """
+    if connection.dialect.name == 'sqlite':
+        connection.execute('BEGIN')
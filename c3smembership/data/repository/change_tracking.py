@@ -0,0 +1,144 @@
+# -*- coding: utf-8  -*-
+"""
+Notifies about changes of model objects persisted through a session.
+
+This is used to invalidate caches of data derived from the database whenever
+the underlying data changes.
+
+Example::
+
+    listen_for_changes(
+        DBSession,
+        [C3sMember, Shares],
+        statistics_information.invalidate)
+
+Session events are only seen by the process making the changes. Other
+processes like the console scripts signal their changes with the
+ChangeGeneration which the web application checks per request.
+"""
+
+from sqlalchemy import event
+
+
+def listen_for_changes(session, model_classes, callback):
+    """
+    Registers a callback which is called whenever objects of the specified
+    model classes are inserted, updated or deleted through the session.
+
+    The callback is called after a flush containing changes of relevant
+    objects as well as after bulk updates and deletes of relevant classes.
+    It is called again after the commit of a transaction which contained such
+    changes so that data read from the database in between by other sessions
+    is invalidated as well.
+
+    Args:
+        session: The session, session maker or scoped session for which
+            changes are tracked.
+        model_classes: The model classes for which changes are tracked.
+        callback: The function without arguments to be called on changes.
+    """
+    model_classes = tuple(model_classes)
+    info_key = ('listen_for_changes', id(callback))
+
+    def _is_relevant(instances):
+        for instance in instances:
+            if isinstance(instance, model_classes):
+                return True
+        return False
+
+    def _changed(changed_session):
+        changed_session.info[info_key] = True
+        callback()
+
+    # pylint: disable=unused-argument
+    def _after_flush(flushed_session, flush_context):
+        if _is_relevant(flushed_session.new) or \
+                _is_relevant(flushed_session.dirty) or \
+                _is_relevant(flushed_session.deleted):
+            _changed(flushed_session)
+
+    def _after_bulk_operation(context):
+        if issubclass(context.mapper.class_, model_classes):
+            _changed(context.session)
+
+    def _after_commit(committed_session):
+        if committed_session.info.pop(info_key, False):
+            callback()
+
+    def _after_rollback(rolled_back_session):
+        if rolled_back_session.info.pop(info_key, False):
+            callback()
+
+    event.listen(session, 'after_flush', _after_flush)
+    event.listen(session, 'after_bulk_update', _after_bulk_operation)
+    event.listen(session, 'after_bulk_delete', _after_bulk_operation)
+    event.listen(session, 'after_commit', _after_commit)
+    event.listen(session, 'after_rollback', _after_rollback)
+
+
+class ChangeGeneration(object):
+    """
+    Signals changes of the database made by other processes.
+
+    The generation is a counter in the database which is incremented by
+    processes changing data in bulk, e.g. the console scripts importing
+    members or recording payments. The web application checks the
+    generation per request and calls the callbacks if it changed so that
+    caches of other processes' changes do not stay stale.
+
+    Example::
+
+        change_generation = ChangeGeneration(NumberSequenceRepository)
+        change_generation.add_callback(statistics_information.invalidate)
+        config.add_subscriber(change_generation, NewRequest)
+    """
+
+    SEQUENCE_NAME = u'change_generation'
+
+    def __init__(self, number_sequence_repository):
+        """
+        Initialises the ChangeGeneration object.
+
+        Args:
+            number_sequence_repository: The number sequence repository
+                storing the generation counter.
+        """
+        self._number_sequence_repository = number_sequence_repository
+        self._callbacks = []
+        self._generation = None
+
+    def add_callback(self, callback):
+        """
+        Adds a callback to be called when the generation changed.
+
+        Args:
+            callback: The function without arguments to be called on
+                changes.
+        """
+        self._callbacks.append(callback)
+
+    def increment(self):
+        """
+        Increments the generation signalling changes to other processes.
+
+        The increment becomes visible with the commit of the transaction.
+        """
+        self._number_sequence_repository.allocate(self.SEQUENCE_NAME)
+
+    def check(self):
+        """
+        Calls the callbacks if the generation changed since the last check.
+        """
+        generation = self._number_sequence_repository.get_current(
+            self.SEQUENCE_NAME)
+        if generation != self._generation:
+            self._generation = generation
+            for callback in self._callbacks:
+                callback()
+
+    def __call__(self, event):
+        """
+        Checks the generation as subscriber of the
+        ``pyramid.events.NewRequest`` event.
+        """
+        self.check()
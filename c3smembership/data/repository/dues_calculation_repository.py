@@ -0,0 +1,118 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for loading and storing the dues of the whole register at once.
+"""
+
+from datetime import date
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    or_,
+    select,
+)
+from zope.sqlalchemy import mark_changed
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.models import C3sMember
+
+
+class DuesCalculationRepository(object):
+    """
+    Repository for the dues calculation of a dues year.
+
+    The dues columns of all members are read with one query and returned
+    column by column. The calculated dues are written with one executemany
+    statement. Both bypass the ORM so that no member objects are created.
+    """
+
+    DUES_YEARS = [2015, 2016, 2017]
+    """
+    The dues years for which dues can be calculated.
+    """
+
+    COLUMNS = [
+        'id',
+        'membership_date',
+        'membership_loss_date',
+        'membership_type',
+        'invoice',
+        'amount',
+        'reduced',
+        'amount_reduced',
+        'amount_paid',
+        'balance',
+    ]
+    """
+    The names of the columns returned by get_dues_columns.
+    """
+
+    @classmethod
+    def _dues_column_name(cls, year, name):
+        return 'dues{0}_{1}'.format(str(year)[2:], name)
+
+    @classmethod
+    def get_dues_columns(cls, year):
+        """
+        Gets the dues columns of all members liable to pay dues for the year.
+
+        These are the accepted members which became members before the end
+        of the year and did not lose their membership before the year.
+
+        Args:
+            year: The dues year.
+
+        Returns:
+            A dictionary with the names of COLUMNS as keys and tuples of the
+            column values ordered by member ID as values. The dues columns
+            are named without the year prefix, e.g. 'amount' for
+            dues17_amount.
+        """
+        members = C3sMember.__table__
+        columns = [
+            members.c[name] if index < 4
+            else members.c[cls._dues_column_name(year, name)]
+            for index, name in enumerate(cls.COLUMNS)]
+        statement = select(columns) \
+            .where(and_(
+                members.c.membership_accepted,
+                members.c.membership_date < date(year + 1, 1, 1),
+                or_(
+                    members.c.membership_loss_date == None,
+                    members.c.membership_loss_date >= date(year, 1, 1)))) \
+            .order_by(members.c.id)
+        # pylint: disable=no-member
+        rows = DBSession.execute(statement).fetchall()
+        values = zip(*rows) if len(rows) > 0 else [()] * len(cls.COLUMNS)
+        return dict(zip(cls.COLUMNS, values))
+
+    @classmethod
+    def update_dues(cls, year, dues):
+        """
+        Updates the calculated dues of members with a bulk update.
+
+        Args:
+            year: The dues year.
+            dues: A list of dictionaries with the keys 'member_id', 'start',
+                'amount', 'balance' and 'balanced'.
+        """
+        if len(dues) == 0:
+            return
+        members = C3sMember.__table__
+        statement = members.update() \
+            .where(members.c.id == bindparam('member_id')) \
+            .values({
+                cls._dues_column_name(year, name): bindparam(name)
+                for name in ['start', 'amount', 'balance', 'balanced']})
+        # pylint: disable=no-member
+        DBSession.execute(statement, dues)
+        DuesLedgerRepository.refresh_balances(
+            year, [due['member_id'] for due in dues])
+        # the bulk update bypasses the unit of work so the transaction must be
+        # told to commit and loaded members are outdated
+        mark_changed(DBSession())
+        # pylint: disable=no-member
+        DBSession.expire_all()
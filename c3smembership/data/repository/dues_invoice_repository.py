@@ -0,0 +1,49 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for accessing dues invoice data.
+"""
+
+from sqlalchemy.sql import func
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import (
+    Dues15Invoice,
+    Dues16Invoice,
+    Dues17Invoice,
+)
+
+
+class DuesInvoiceRepository(object):
+    """
+    Repository for dues invoices of all dues years.
+    """
+
+    INVOICE_CLASSES = {
+        2015: Dues15Invoice,
+        2016: Dues16Invoice,
+        2017: Dues17Invoice,
+    }
+    """
+    The invoice classes by dues year.
+    """
+
+    @classmethod
+    def get_max_invoice_number(cls, year):
+        """
+        Gets the highest invoice number of the dues year.
+
+        Args:
+            year: The dues year.
+
+        Returns:
+            The highest invoice number of the dues year or 0 if no invoice
+            exists.
+
+        Raises:
+            KeyError: There are no dues invoices for the year.
+        """
+        invoice_class = cls.INVOICE_CLASSES[year]
+        # pylint: disable=no-member
+        max_invoice_number = DBSession.query(
+            func.max(invoice_class.invoice_no)).scalar()
+        return max_invoice_number if max_invoice_number is not None else 0
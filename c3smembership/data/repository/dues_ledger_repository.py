@@ -0,0 +1,187 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for the dues ledger and the dues balances of all dues years.
+"""
+
+from datetime import datetime
+
+from zope.sqlalchemy import mark_changed
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import (
+    DuesBalance,
+    DuesLedgerEntry,
+    DuesMonthlyStatistics,
+    rebuild_dues_ledger,
+)
+
+
+class DuesLedgerRepository(object):
+    """
+    Repository for the dues ledger and the dues balances of all dues years.
+
+    The ledger is keyed by dues year and member so that the history of a
+    member and the figures of all years are retrieved with one indexed query
+    each instead of one query per dues year.
+    """
+
+    @classmethod
+    def get_member_ledger(cls, member_id):
+        """
+        Gets the dues ledger entries of a member of all dues years.
+
+        Args:
+            member_id: The ID of the member.
+
+        Returns:
+            A list of DuesLedgerEntry ordered by dues year and date and
+            entries of the same date in the order they were recorded.
+        """
+        # pylint: disable=no-member
+        return DBSession.query(DuesLedgerEntry) \
+            .filter(DuesLedgerEntry.member_id == member_id) \
+            .order_by(
+                DuesLedgerEntry.year,
+                DuesLedgerEntry.entry_date,
+                DuesLedgerEntry.id) \
+            .all()
+
+    @classmethod
+    def get_member_invoices(cls, member_id):
+        """
+        Gets the invoices and reversal invoices of a member of all dues years.
+
+        Args:
+            member_id: The ID of the member.
+
+        Returns:
+            A dictionary with the dues years as keys and lists of the
+            DuesLedgerEntry invoices and reversals of the year as values.
+        """
+        invoices = {}
+        for entry in cls.get_member_ledger(member_id):
+            if entry.entry_type != DuesLedgerEntry.PAYMENT:
+                invoices.setdefault(entry.year, []).append(entry)
+        return invoices
+
+    @classmethod
+    def get_member_balances(cls, member_id):
+        """
+        Gets the dues balances of a member of all dues years.
+
+        Args:
+            member_id: The ID of the member.
+
+        Returns:
+            A dictionary with the dues years as keys and the DuesBalance of
+            the year as values.
+        """
+        # pylint: disable=no-member
+        return dict(
+            (balance.year, balance)
+            for balance in DBSession.query(DuesBalance)
+            .filter(DuesBalance.member_id == member_id))
+
+    @classmethod
+    def get_monthly_stats(cls, years):
+        """
+        Gets the monthly statistics of dues years.
+
+        Provides sums of the normal as well as reversal invoices per calendar
+        month based on the invoice date and the sums of the payments per
+        calendar month based on the payment date. The sums are read from the
+        monthly dues statistics maintained along with the ledger.
+
+        Args:
+            years: The dues years to get the statistics for.
+
+        Returns:
+            A dictionary with the dues years as keys and lists of
+            dictionaries with the keys 'month', 'amount_invoiced_normal',
+            'amount_invoiced_reversal' and 'amount_paid' ordered by month as
+            values.
+        """
+        statistics = dict((year, []) for year in years)
+        # pylint: disable=no-member
+        rows = DBSession.query(DuesMonthlyStatistics) \
+            .filter(DuesMonthlyStatistics.year.in_(list(years))) \
+            .order_by(DuesMonthlyStatistics.year, DuesMonthlyStatistics.month)
+        for row in rows:
+            statistics[row.year].append({
+                'month': datetime(row.month.year, row.month.month, 1),
+                'amount_invoiced_normal': row.amount_invoiced_normal,
+                'amount_invoiced_reversal': row.amount_invoiced_reversal,
+                'amount_paid': row.amount_paid,
+            })
+        return statistics
+
+    @classmethod
+    def add_payments(cls, year, payments):
+        """
+        Records payments in the dues ledger with a bulk insert.
+
+        This is needed when the amount paid of members is updated bypassing
+        the session.
+
+        Args:
+            year: The dues year of the payments.
+            payments: A list of tuples of member ID, payment date and paid
+                amount.
+        """
+        if len(payments) == 0:
+            return
+        # pylint: disable=no-member
+        DBSession.execute(DuesLedgerEntry.__table__.insert(), [
+            {
+                'year': year,
+                'member_id': member_id,
+                'entry_type': DuesLedgerEntry.PAYMENT,
+                'entry_date': payment_date,
+                'amount': amount,
+            }
+            for member_id, payment_date, amount in payments])
+        # pylint: disable=no-member
+        DuesMonthlyStatistics.refresh(DBSession.connection(), [
+            (year, DuesMonthlyStatistics.get_month(payment_date))
+            for _, payment_date, _ in payments])
+        mark_changed(DBSession())
+
+    @classmethod
+    def refresh_balances(cls, year, member_ids):
+        """
+        Copies the dues balances of members from their dues columns.
+
+        This is needed when the dues columns are updated bypassing the
+        session.
+
+        Args:
+            year: The dues year.
+            member_ids: The IDs of the members.
+        """
+        # pylint: disable=no-member
+        DuesBalance.refresh(DBSession.connection(), year, member_ids)
+        mark_changed(DBSession())
+
+    @classmethod
+    def rebuild_monthly_stats(cls):
+        """
+        Rebuilds the monthly dues statistics from the dues ledger.
+        """
+        # pylint: disable=no-member
+        DuesMonthlyStatistics.refresh(DBSession.connection())
+        mark_changed(DBSession())
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Rebuilds the dues ledger, balances and monthly statistics from the
+        per-year invoices and the dues columns of the members.
+
+        The dated payment entries are kept, see
+        c3smembership.models.rebuild_dues_ledger.
+        """
+        # pylint: disable=no-member
+        rebuild_dues_ledger(DBSession.connection())
+        mark_changed(DBSession())
+        # pylint: disable=no-member
+        DBSession.expire_all()
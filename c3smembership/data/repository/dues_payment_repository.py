@@ -0,0 +1,230 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for looking up members by payment references and recording dues
+payments in bulk.
+"""
+
+import datetime
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    func,
+)
+from zope.sqlalchemy import mark_changed
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.dues_invoice_repository import (
+    DuesInvoiceRepository
+)
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.models import (
+    AppliedBooking,
+    C3sMember,
+)
+
+
+class DuesPaymentRepository(object):
+    """
+    Repository for dues payments of all dues years.
+
+    The lookups take collections of references and retrieve them with a query
+    per chunk of CHUNK_SIZE references so that large bank statements do not
+    cause a query per booking.
+    """
+
+    DUES_YEARS = [2015, 2016, 2017]
+    """
+    The dues years for which payments can be recorded.
+    """
+
+    CHUNK_SIZE = 500
+    """
+    The maximum number of references per query staying below the SQLite
+    limit of bound parameters.
+    """
+
+    @classmethod
+    def _column(cls, year, name):
+        return C3sMember.__table__.c['dues{0}_{1}'.format(str(year)[2:], name)]
+
+    @classmethod
+    def _chunks(cls, values):
+        values = list(values)
+        for start in range(0, len(values), cls.CHUNK_SIZE):
+            yield values[start:start + cls.CHUNK_SIZE]
+
+    @classmethod
+    def find_members_by_dues_tokens(cls, tokens):
+        """
+        Finds the members by the dues tokens of all dues years.
+
+        Args:
+            tokens: The dues tokens to look up.
+
+        Returns:
+            A dictionary with the found tokens as keys and lists of tuples of
+            member ID and dues year as values.
+        """
+        found = {}
+        for year in cls.DUES_YEARS:
+            token_column = cls._column(year, 'token')
+            for chunk in cls._chunks(tokens):
+                # pylint: disable=no-member
+                rows = DBSession.query(C3sMember.id, token_column) \
+                    .filter(token_column.in_(chunk)) \
+                    .all()
+                for member_id, token in rows:
+                    found.setdefault(token, []).append((member_id, year))
+        return found
+
+    @classmethod
+    def find_members_by_invoice_numbers(cls, year, invoice_numbers):
+        """
+        Finds the members by the invoice numbers of a dues year.
+
+        Args:
+            year: The dues year of the invoices.
+            invoice_numbers: The invoice numbers to look up.
+
+        Returns:
+            A dictionary with the found invoice numbers as keys and the IDs
+            of the invoiced members as values.
+        """
+        invoice_class = DuesInvoiceRepository.INVOICE_CLASSES[year]
+        found = {}
+        for chunk in cls._chunks(invoice_numbers):
+            # pylint: disable=no-member
+            rows = DBSession.query(
+                invoice_class.invoice_no, invoice_class.member_id) \
+                .filter(invoice_class.invoice_no.in_(chunk)) \
+                .all()
+            found.update(rows)
+        return found
+
+    @classmethod
+    def find_members_by_membership_numbers(cls, membership_numbers):
+        """
+        Finds the accepted members by membership numbers.
+
+        Args:
+            membership_numbers: The membership numbers to look up.
+
+        Returns:
+            A dictionary with the found membership numbers as keys and the
+            member IDs as values.
+        """
+        found = {}
+        for chunk in cls._chunks(membership_numbers):
+            # pylint: disable=no-member
+            rows = DBSession.query(C3sMember.membership_number, C3sMember.id) \
+                .filter(and_(
+                    C3sMember.membership_accepted,
+                    C3sMember.membership_number.in_(chunk))) \
+                .all()
+            found.update(rows)
+        return found
+
+    @classmethod
+    def find_applied_bookings(cls, identifiers):
+        """
+        Finds the bookings of which the payments were already applied.
+
+        Args:
+            identifiers: The booking identifiers to look up.
+
+        Returns:
+            A set of the identifiers of the applied bookings.
+        """
+        found = set()
+        for chunk in cls._chunks(identifiers):
+            # pylint: disable=no-member
+            rows = DBSession.query(AppliedBooking.identifier) \
+                .filter(AppliedBooking.identifier.in_(chunk)) \
+                .all()
+            found.update(identifier for (identifier,) in rows)
+        return found
+
+    @classmethod
+    def add_applied_bookings(cls, bookings):
+        """
+        Records the bookings of which the payments were applied with a bulk
+        insert.
+
+        Args:
+            bookings: A list of tuples of booking identifier, dues year,
+                member ID, amount and booking date.
+        """
+        if len(bookings) == 0:
+            return
+        applied = datetime.datetime.now()
+        # pylint: disable=no-member
+        DBSession.execute(
+            AppliedBooking.__table__.insert(),
+            [
+                {
+                    'identifier': identifier,
+                    'year': year,
+                    'member_id': member_id,
+                    'amount': amount,
+                    'booking_date': booking_date,
+                    'applied': applied,
+                }
+                for identifier, year, member_id, amount, booking_date
+                in bookings])
+        mark_changed(DBSession())
+
+    @classmethod
+    def add_payments(cls, year, payments):
+        """
+        Adds payments to the dues of the members with a bulk update.
+
+        The paid amount is added to the amount already paid and subtracted
+        from the balance like C3sMember.set_dues17_payment does for a single
+        payment. The payments are recorded in the dues ledger.
+
+        Args:
+            year: The dues year of the payments.
+            payments: A dictionary with member IDs as keys and tuples of the
+                paid amount and the payment date as values.
+        """
+        if len(payments) == 0:
+            return
+        members = C3sMember.__table__
+        amount_paid = cls._column(year, 'amount_paid')
+        balance = cls._column(year, 'balance')
+        payment = bindparam('paid_amount', type_=balance.type)
+        # The amounts are stored as integer cents and calculated by the
+        # database. Undefined amounts are stored as NULL and count as zero.
+        new_balance = func.coalesce(balance, 0) - payment
+        statement = members.update() \
+            .where(members.c.id == bindparam('member_id')) \
+            .values({
+                cls._column(year, 'paid'): True,
+                amount_paid: func.coalesce(amount_paid, 0) + payment,
+                cls._column(year, 'paid_date'): bindparam('paid_date'),
+                balance: new_balance,
+                cls._column(year, 'balanced'): new_balance == 0,
+            })
+        parameters = [
+            {
+                'member_id': member_id,
+                'paid_amount': paid_amount,
+                'paid_date': datetime.datetime.combine(
+                    paid_date, datetime.time()),
+            }
+            for member_id, (paid_amount, paid_date) in payments.items()]
+        # pylint: disable=no-member
+        DBSession.execute(statement, parameters)
+        DuesLedgerRepository.add_payments(year, [
+            (parameter['member_id'], parameter['paid_date'],
+             payments[parameter['member_id']][0])
+            for parameter in parameters])
+        DuesLedgerRepository.refresh_balances(year, payments.keys())
+        # the bulk update bypasses the unit of work so the transaction must be
+        # told to commit and loaded members are outdated
+        mark_changed(DBSession())
+        # pylint: disable=no-member
+        DBSession.expire_all()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for accessing and operating with queued emails.
+"""
+
+import json
+
+from sqlalchemy import and_
+from sqlalchemy.sql import func
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import MailJob
+
+
+class MailJobRepository(object):
+    """
+    Repository for queued emails.
+
+    Jobs are claimed by workers using a conditional update so that several
+    worker processes can deliver jobs of the same queue. A claim is a lease
+    until the specified time. If the worker does not mark the job as sent or
+    failed until then, e.g. because it crashed, the job can be claimed again.
+    """
+
+    PENDING = u'pending'
+    SENDING = u'sending'
+    SENT = u'sent'
+    FAILED = u'failed'
+
+    @classmethod
+    def exists(cls, idempotency_key):
+        """
+        Checks whether a job with the idempotency key exists.
+
+        Args:
+            idempotency_key: The idempotency key of the job.
+
+        Returns:
+            True if the job exists, otherwise False.
+        """
+        # pylint: disable=no-member
+        return DBSession.query(MailJob.id) \
+            .filter(MailJob.idempotency_key == idempotency_key) \
+            .first() is not None
+
+    @classmethod
+    def add(cls, run, idempotency_key, sender, recipients, subject, body,
+            extra_headers, created):
+        """
+        Adds a pending job.
+
+        Args:
+            run: The batch run the email belongs to.
+            idempotency_key: The unique key of the job.
+            sender: The sender of the email.
+            recipients: The list of recipients of the email.
+            subject: The subject of the email.
+            body: The body of the email.
+            extra_headers: The dictionary of additional email headers.
+            created: The datetime the job is queued.
+        """
+        # pylint: disable=too-many-arguments
+        # pylint: disable=no-member
+        DBSession.add(MailJob(
+            run=run,
+            idempotency_key=idempotency_key,
+            status=cls.PENDING,
+            attempts=0,
+            next_attempt=created,
+            created=created,
+            sender=sender,
+            recipients=u','.join(recipients),
+            subject=subject,
+            body=body,
+            extra_headers=unicode(json.dumps(extra_headers or {})),
+        ))
+        DBSession.flush()
+
+    @classmethod
+    def claim_next(cls, now, lease_until):
+        """
+        Claims the next job due for delivery.
+
+        Args:
+            now: The current datetime.
+            lease_until: The datetime until which the job is claimed.
+
+        Returns:
+            A dictionary with the keys id, attempts, sender, recipients,
+            subject, body and extra_headers of the claimed job or None if no
+            job is due.
+        """
+        due_condition = and_(
+            MailJob.status.in_([cls.PENDING, cls.SENDING]),
+            MailJob.next_attempt <= now)
+        while True:
+            # pylint: disable=no-member
+            job = DBSession.query(MailJob) \
+                .filter(due_condition) \
+                .order_by(MailJob.next_attempt, MailJob.id) \
+                .first()
+            if job is None:
+                return None
+            claimed_count = DBSession.query(MailJob) \
+                .filter(MailJob.id == job.id) \
+                .filter(due_condition) \
+                .update(
+                    {
+                        'status': cls.SENDING,
+                        'attempts': MailJob.attempts + 1,
+                        'next_attempt': lease_until,
+                    },
+                    synchronize_session=False)
+            if claimed_count == 1:
+                return {
+                    'id': job.id,
+                    'attempts': job.attempts + 1,
+                    'sender': job.sender,
+                    'recipients': job.recipients.split(u','),
+                    'subject': job.subject,
+                    'body': job.body,
+                    'extra_headers': json.loads(job.extra_headers or '{}'),
+                }
+            # another worker claimed the job in between
+            DBSession.expire(job)
+
+    @classmethod
+    def mark_sent(cls, job_id, sent):
+        """
+        Marks the job as sent.
+
+        Args:
+            job_id: The ID of the job.
+            sent: The datetime the email was delivered.
+        """
+        # pylint: disable=no-member
+        DBSession.query(MailJob).filter(MailJob.id == job_id).update(
+            {
+                'status': cls.SENT,
+                'sent': sent,
+                'last_error': None,
+            },
+            synchronize_session=False)
+
+    @classmethod
+    def mark_failed(cls, job_id, error, next_attempt=None):
+        """
+        Marks the delivery attempt of the job as failed.
+
+        Args:
+            job_id: The ID of the job.
+            error: The error message of the failed attempt.
+            next_attempt: Optional. The datetime of the next attempt. If None
+                the job is not retried.
+        """
+        values = {'last_error': error[:255]}
+        if next_attempt is None:
+            values['status'] = cls.FAILED
+        else:
+            values['status'] = cls.PENDING
+            values['next_attempt'] = next_attempt
+        # pylint: disable=no-member
+        DBSession.query(MailJob).filter(MailJob.id == job_id).update(
+            values, synchronize_session=False)
+
+    @classmethod
+    def get_run_status_counts(cls):
+        """
+        Gets the number of jobs per run and status.
+
+        Returns:
+            A list of tuples of run, status and number of jobs ordered by run.
+        """
+        # pylint: disable=no-member
+        return DBSession.query(
+            MailJob.run, MailJob.status, func.count(MailJob.id)) \
+            .group_by(MailJob.run, MailJob.status) \
+            .order_by(MailJob.run, MailJob.status) \
+            .all()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for importing members and their shares in bulk.
+"""
+
+from sqlalchemy import (
+    bindparam,
+    func,
+)
+from zope.sqlalchemy import mark_changed
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import (
+    C3sMember,
+    Shares,
+    members_shares,
+)
+
+
+class MemberImportRepository(object):
+    """
+    Repository for importing members and their shares in bulk.
+
+    Members and shares are inserted with one executemany statement per batch
+    bypassing the ORM. The lookups take collections of values and retrieve
+    them with a query per chunk of CHUNK_SIZE values.
+    """
+
+    CHUNK_SIZE = 500
+    """
+    The maximum number of values per query staying below the SQLite limit of
+    bound parameters.
+    """
+
+    @classmethod
+    def _chunks(cls, values):
+        values = list(values)
+        for start in range(0, len(values), cls.CHUNK_SIZE):
+            yield values[start:start + cls.CHUNK_SIZE]
+
+    @classmethod
+    def find_members_by_emails(cls, emails):
+        """
+        Finds members by email address ignoring case.
+
+        Args:
+            emails: The lower case email addresses to look up.
+
+        Returns:
+            A dictionary with the found lower case email addresses as keys and
+            tuples of the member ID and the membership acceptance flag of the
+            first member with the address as values.
+        """
+        found = {}
+        email = func.lower(C3sMember.email)
+        for chunk in cls._chunks(emails):
+            # pylint: disable=no-member
+            rows = DBSession.query(
+                email, C3sMember.id, C3sMember.membership_accepted) \
+                .filter(email.in_(chunk)) \
+                .order_by(C3sMember.id) \
+                .all()
+            for row_email, member_id, accepted in rows:
+                if row_email not in found:
+                    found[row_email] = (member_id, bool(accepted))
+        return found
+
+    @classmethod
+    def find_used_reference_codes(cls, reference_codes):
+        """
+        Finds the reference codes already used by members or shares.
+
+        Args:
+            reference_codes: The reference codes to look up.
+
+        Returns:
+            The set of the reference codes in use.
+        """
+        used = set()
+        for chunk in cls._chunks(reference_codes):
+            # pylint: disable=no-member
+            used.update(
+                code for code, in DBSession.query(
+                    C3sMember.email_confirm_code)
+                .filter(C3sMember.email_confirm_code.in_(chunk)))
+            used.update(
+                code for code, in DBSession.query(Shares.reference_code)
+                .filter(Shares.reference_code.in_(chunk)))
+        return used
+
+    @classmethod
+    def _get_next_id(cls, column):
+        # pylint: disable=no-member
+        return (DBSession.query(func.max(column)).scalar() or 0) + 1
+
+    @classmethod
+    def add_members(cls, members):
+        """
+        Inserts members.
+
+        The IDs are assigned in advance like SQLite does, continuing after
+        the highest ID, so that they need not be retrieved after inserting.
+        Should another transaction insert members in between the insert fails
+        on the primary key and the import is rolled back.
+
+        Args:
+            members: A list of dictionaries of member attributes all having
+                the same keys. The ID is added to each dictionary.
+
+        Returns:
+            The list of the IDs of the inserted members.
+        """
+        if len(members) == 0:
+            return []
+        next_id = cls._get_next_id(C3sMember.id)
+        for member_id, member in enumerate(members, next_id):
+            member['id'] = member_id
+        # pylint: disable=no-member
+        DBSession.execute(C3sMember.__table__.insert(), members)
+        mark_changed(DBSession())
+        return [member['id'] for member in members]
+
+    @classmethod
+    def add_shares(cls, shares):
+        """
+        Inserts shares packages and assigns them to members.
+
+        The IDs are assigned in advance like for members.
+
+        Args:
+            shares: A list of tuples of the member ID and a dictionary of
+                shares attributes. The dictionaries must all have the same
+                keys.
+        """
+        if len(shares) == 0:
+            return
+        next_id = cls._get_next_id(Shares.id)
+        links = []
+        for shares_id, (member_id, values) in enumerate(shares, next_id):
+            values['id'] = shares_id
+            links.append({'members_id': member_id, 'shares_id': shares_id})
+        # pylint: disable=no-member
+        DBSession.execute(
+            Shares.__table__.insert(), [values for _, values in shares])
+        # pylint: disable=no-member
+        DBSession.execute(members_shares.insert(), links)
+        mark_changed(DBSession())
+
+    @classmethod
+    def add_num_shares(cls, num_shares):
+        """
+        Adds to the number of shares of members.
+
+        Args:
+            num_shares: A dictionary with member IDs as keys and the number of
+                shares to add as values.
+        """
+        if len(num_shares) == 0:
+            return
+        members = C3sMember.__table__
+        statement = members.update() \
+            .where(members.c.id == bindparam('member_id')) \
+            .values(num_shares=members.c.num_shares + bindparam('added'))
+        # pylint: disable=no-member
+        DBSession.execute(statement, [
+            {'member_id': member_id, 'added': added}
+            for member_id, added in num_shares.items()])
+        mark_changed(DBSession())
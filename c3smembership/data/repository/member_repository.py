@@ -3,6 +3,7 @@
 Repository for accessing and operating with member data.
 """
 
+from sqlalchemy import or_
 from sqlalchemy.sql import func
 from datetime import date
 
@@ -15,6 +16,12 @@ class MemberRepository(object):
     Repository for members.
     """
 
+    RESERVED_MEMBERSHIP_NUMBER = 999999999
+    """
+    A membership number used as placeholder which is not considered when
+    determining the highest membership number.
+    """
+
     @classmethod
     def get_member(cls, membership_number):
         """
@@ -110,6 +117,43 @@ class MemberRepository(object):
             effective_date)
         return accepted_members_query
 
+    @classmethod
+    def get_accepted_members_export(cls, effective_date=None):
+        """
+        Gets the statement selecting the contact data of the members which
+        have been accepted until and including the specified effective date
+        ordered by membership number.
+
+        The statement is not executed so that it can be streamed by the
+        caller, e.g. the csv renderer.
+
+        Args:
+            effective_date: Optional. The date on which the membership has been
+                accepted. If not specified system date is used as effective
+                date.
+
+        Returns:
+            The SQLAlchemy statement selecting membership number, first name,
+            last name, email address, postal address, locale and membership
+            date.
+        """
+        # pylint: disable=no-member
+        query = DBSession.query(
+            C3sMember.membership_number,
+            C3sMember.firstname,
+            C3sMember.lastname,
+            C3sMember.email,
+            C3sMember.address1,
+            C3sMember.address2,
+            C3sMember.postcode,
+            C3sMember.city,
+            C3sMember.country,
+            C3sMember.locale,
+            C3sMember.membership_date)
+        return cls._filter_accepted_member(query, effective_date) \
+            .order_by(C3sMember.membership_number) \
+            .statement
+
     @classmethod
     def get_accepted_members_count(cls, effective_date=None):
         """
@@ -132,6 +176,69 @@ class MemberRepository(object):
             effective_date)
         return accepted_members_count_query.scalar()
 
+    @classmethod
+    def get_highest_membership_number(cls):
+        """
+        Gets the highest membership number in use.
+
+        The membership number RESERVED_MEMBERSHIP_NUMBER is not considered.
+
+        Returns:
+            The highest membership number or 0 if no membership number is in
+            use.
+        """
+        # pylint: disable=no-member
+        highest = DBSession.query(func.max(C3sMember.membership_number)) \
+            .filter(
+                C3sMember.membership_number !=
+                cls.RESERVED_MEMBERSHIP_NUMBER) \
+            .scalar()
+        return highest if highest is not None else 0
+
+    @classmethod
+    def get_accepted_member_identities(cls):
+        """
+        Gets the identifying data of all accepted members.
+
+        Returns:
+            A list of rows having the properties id, firstname, lastname,
+            email and date_of_birth.
+        """
+        # pylint: disable=no-member
+        return cls._identities_query() \
+            .filter(C3sMember.membership_accepted) \
+            .all()
+
+    @classmethod
+    def get_application_identities(cls):
+        """
+        Gets the identifying data of all pending applications for membership,
+        i.e. not yet accepted and not marked as duplicate.
+
+        Returns:
+            A list of rows having the properties id, firstname, lastname,
+            email and date_of_birth.
+        """
+        # pylint: disable=no-member
+        return cls._identities_query() \
+            .filter(or_(
+                C3sMember.membership_accepted == None,
+                C3sMember.membership_accepted == False)) \
+            .filter(or_(
+                C3sMember.is_duplicate == None,
+                C3sMember.is_duplicate == False)) \
+            .all()
+
+    @classmethod
+    def _identities_query(cls):
+        # pylint: disable=no-member
+        return DBSession.query(
+            C3sMember.id,
+            C3sMember.firstname,
+            C3sMember.lastname,
+            C3sMember.email,
+            C3sMember.date_of_birth)
+
     @classmethod
     def _filter_accepted_member(cls, query, effective_date=None):
         """
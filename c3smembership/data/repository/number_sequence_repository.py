@@ -0,0 +1,99 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for allocating numbers from number sequences.
+"""
+
+from sqlalchemy.exc import IntegrityError
+from zope.sqlalchemy import mark_changed
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import NumberSequence
+
+
+class NumberSequenceRepository(object):
+    """
+    Repository for number sequences.
+
+    A number sequence is a counter row holding the last allocated number.
+    Numbers are allocated by incrementing the counter with a single update
+    statement. The update locks the counter until the end of the transaction
+    so that concurrent transactions allocate one after another and never
+    receive the same numbers. Reading the current value is a primary key
+    lookup.
+
+    A sequence which does not exist yet is created by the first allocation.
+    If a concurrent transaction creates it first the creation fails and the
+    counter is incremented instead. The creation is executed within a
+    SAVEPOINT so that the failure only rolls back the creation and not the
+    whole transaction.
+    """
+
+    @classmethod
+    def allocate(cls, name, count=1, initial_value=None):
+        """
+        Allocates a block of consecutive numbers.
+
+        Args:
+            name: The name of the sequence.
+            count: Optional. The number of numbers to allocate, defaults to 1.
+            initial_value: Optional. A function returning the last number
+                already in use. It is called to create the sequence if it
+                does not exist yet. If not specified the sequence starts with
+                1.
+
+        Returns:
+            The last number of the allocated block. The block consists of the
+            numbers from the returned number minus count plus one up to and
+            including the returned number.
+        """
+        if count < 1:
+            raise ValueError('At least one number must be allocated.')
+        if cls._increment(name, count) == 0:
+            value = 0 if initial_value is None else initial_value()
+            try:
+                # pylint: disable=no-member
+                with DBSession.begin_nested():
+                    DBSession.execute(
+                        NumberSequence.__table__.insert().values(
+                            name=name, value=value + count))
+            except IntegrityError:
+                # created by a concurrent transaction in the meantime
+                cls._increment(name, count)
+            mark_changed(DBSession())
+        return cls._get_value(name)
+
+    @classmethod
+    def get_current(cls, name, initial_value=None):
+        """
+        Gets the last number allocated from the sequence.
+
+        Args:
+            name: The name of the sequence.
+            initial_value: Optional. A function returning the last number
+                already in use. It is called if the sequence does not exist
+                yet. If not specified 0 is returned for non-existing
+                sequences.
+
+        Returns:
+            The last number allocated from the sequence.
+        """
+        value = cls._get_value(name)
+        if value is None:
+            value = 0 if initial_value is None else initial_value()
+        return value
+
+    @classmethod
+    def _increment(cls, name, count):
+        # pylint: disable=no-member
+        return DBSession.query(NumberSequence) \
+            .filter(NumberSequence.name == name) \
+            .update(
+                {'value': NumberSequence.value + count},
+                synchronize_session=False)
+
+    @classmethod
+    def _get_value(cls, name):
+        # pylint: disable=no-member
+        return DBSession.query(NumberSequence.value) \
+            .filter(NumberSequence.name == name) \
+            .scalar()
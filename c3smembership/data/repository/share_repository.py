@@ -13,7 +13,6 @@ from sqlalchemy.sql import (
 )
 
 from c3smembership.data.model.base import DBSession
-from c3smembership.data.repository.member_repository import MemberRepository
 from c3smembership.models import (
     C3sMember,
     Shares,
@@ -364,24 +363,87 @@ class ShareRepository(object):
         """
         Gets the number of shares valid on effective date.
 
+        The number is calculated by a single aggregate query over the shares
+        of all members accepted until and including the effective date.
+
         Args:
             effective_date: Optional. The date for which the number of shares
                 is counted. If not specified the date is set to the system
                 date.
+
+        Returns:
+            The number of shares valid on effective date.
         """
-        # TODO: use single optimized query
-        share_count = 0
         if effective_date is None:
             effective_date = date.today()
+        # pylint: disable=no-member
+        share_count = DBSession \
+            .query(func.sum(Shares.number)) \
+            .join(members_shares) \
+            .join(C3sMember) \
+            .filter(
+                expression.and_(
+                    # SqlAlchemy not equal condition must be "!= None"
+                    # instead of Python "is not None".
+                    # pylint: disable=singleton-comparison
+                    C3sMember.membership_number != None,
+                    C3sMember.membership_accepted,
+                    C3sMember.membership_date <= effective_date,
+                    Shares.date_of_acquisition <= effective_date,
+                )
+            ).scalar()
+        if share_count is None:
+            share_count = 0
+        return share_count
 
-        member_repository = MemberRepository()
-        members = member_repository.get_accepted_members(effective_date)
+    @classmethod
+    def get_share_counts(cls, effective_dates):
+        """
+        Gets the number of shares valid on each of the effective dates.
 
-        for member in members:
-            for share in member.shares:
-                if share.date_of_acquisition <= effective_date:
-                    share_count += share.number
-        return share_count
+        All dates are calculated by a single aggregate query over the shares
+        of accepted members using one conditional sum per date.
+
+        Args:
+            effective_dates: The dates for which the number of shares is
+                counted.
+
+        Returns:
+            A dictionary with the effective dates as keys and the number of
+            shares valid on the respective date as values.
+        """
+        effective_dates = list(effective_dates)
+        if len(effective_dates) == 0:
+            return {}
+        sums = []
+        for effective_date in effective_dates:
+            sums.append(func.sum(expression.case(
+                [(
+                    expression.and_(
+                        C3sMember.membership_date <= effective_date,
+                        Shares.date_of_acquisition <= effective_date),
+                    Shares.number
+                )],
+                else_=0)))
+        # pylint: disable=no-member
+        row = DBSession \
+            .query(*sums) \
+            .select_from(Shares) \
+            .join(members_shares) \
+            .join(C3sMember) \
+            .filter(
+                expression.and_(
+                    # pylint: disable=singleton-comparison
+                    C3sMember.membership_number != None,
+                    C3sMember.membership_accepted,
+                )
+            ).one()
+        share_counts = {}
+        for effective_date, share_count in zip(effective_dates, row):
+            if share_count is None:
+                share_count = 0
+            share_counts[effective_date] = share_count
+        return share_counts
 
     @classmethod
     def get_member_share_count(cls, membership_number, effective_date=None):
@@ -414,6 +476,47 @@ class ShareRepository(object):
             share_count = 0
         return share_count
 
+    @classmethod
+    def get_member_share_counts(cls, effective_date=None):
+        """
+        Gets the number of shares of all members as of the effective date.
+
+        The numbers are calculated by a single query grouped by membership
+        number.
+
+        Args:
+            effective_date: Optional. The effective date for which the numbers
+                of shares are calculated. If not specified the system date is
+                used.
+
+        Returns:
+            A dictionary with the membership numbers as keys and the number of
+            shares of the respective member as of the effective date as
+            values. Members without shares as of the effective date are not
+            contained.
+        """
+        if effective_date is None:
+            effective_date = date.today()
+        # pylint: disable=no-member
+        rows = DBSession \
+            .query(C3sMember.membership_number, func.sum(Shares.number)) \
+            .select_from(Shares) \
+            .join(members_shares) \
+            .join(C3sMember) \
+            .filter(
+                expression.and_(
+                    # pylint: disable=singleton-comparison
+                    C3sMember.membership_number != None,
+                    Shares.date_of_acquisition <= effective_date
+                )
+            ) \
+            .group_by(C3sMember.membership_number) \
+            .all()
+        share_counts = {}
+        for membership_number, share_count in rows:
+            share_counts[membership_number] = share_count
+        return share_counts
+
     @classmethod
     def get(cls, shares_id):
         """
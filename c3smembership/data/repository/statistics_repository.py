@@ -0,0 +1,175 @@
+# -*- coding: utf-8  -*-
+"""
+Repository for retrieving aggregated statistics about applications, members,
+staff and dues.
+"""
+
+from datetime import date
+
+from sqlalchemy.sql import (
+    distinct,
+    expression,
+    func,
+)
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.models import (
+    C3sMember,
+    C3sStaff,
+)
+
+
+def _count_if(condition):
+    """
+    Gets an aggregate expression counting the rows matching the condition.
+    """
+    return func.sum(expression.case([(condition, 1)], else_=0))
+
+
+def _sum_if(condition, value):
+    """
+    Gets an aggregate expression summing the value of the rows matching the
+    condition.
+    """
+    return func.sum(expression.case([(condition, value)], else_=0))
+
+
+class StatisticsRepository(object):
+    """
+    Repository for statistics.
+    """
+
+    @classmethod
+    def get_member_statistics(cls, effective_date=None):
+        """
+        Gets the statistics about applications and members as of the effective
+        date.
+
+        All figures are calculated with a single aggregate query over the
+        members table.
+
+        Args:
+            effective_date: Optional. The date for which the membership status
+                is evaluated. If not specified the system date is used.
+
+        Returns:
+            A dictionary containing the number of datasets, the number of
+            unpaid and paid shares of applications, the numbers of accepted
+            and not accepted members, duplicates, natural persons and legal
+            entities, normal, investing and other memberships, lost
+            memberships, membership numbers and countries.
+        """
+        if effective_date is None:
+            effective_date = date.today()
+        is_member = C3sMember.is_member_filter(effective_date)
+        # pylint: disable=no-member
+        row = DBSession.query(
+            func.count(C3sMember.id).label('number_of_datasets'),
+            _sum_if(
+                expression.or_(
+                    # "== None" for SqlAlchemy instead of Python "is None"
+                    # pylint: disable=singleton-comparison
+                    C3sMember.payment_received == None,
+                    # pylint: disable=singleton-comparison
+                    C3sMember.payment_received == False),
+                C3sMember.num_shares).label('afm_shares_unpaid'),
+            _sum_if(
+                # pylint: disable=singleton-comparison
+                C3sMember.payment_received == True,
+                C3sMember.num_shares).label('afm_shares_paid'),
+            _count_if(is_member).label('members_accepted_count'),
+            _count_if(
+                expression.not_(
+                    C3sMember.membership_accepted_filter(effective_date))
+            ).label('non_accepted_count'),
+            _count_if(
+                expression.or_(
+                    C3sMember.membership_accepted == 0,
+                    C3sMember.membership_accepted == '',
+                    # pylint: disable=singleton-comparison
+                    C3sMember.membership_accepted == None,
+                )
+            ).label('nonmember_listing_count'),
+            _count_if(C3sMember.is_duplicate == 1).label('duplicates_count'),
+            _count_if(
+                expression.and_(C3sMember.is_legalentity == 0, is_member)
+            ).label('natural_persons_count'),
+            _count_if(
+                expression.and_(C3sMember.is_legalentity == 1, is_member)
+            ).label('legal_entities_count'),
+            _count_if(
+                expression.and_(
+                    C3sMember.membership_type == u'normal', is_member)
+            ).label('normal_memberships_count'),
+            _count_if(
+                expression.and_(
+                    C3sMember.membership_type == u'investing', is_member)
+            ).label('investing_memberships_count'),
+            _count_if(
+                expression.and_(
+                    C3sMember.membership_type != u'normal',
+                    C3sMember.membership_type != u'investing',
+                    is_member)
+            ).label('other_memberships_count'),
+            _count_if(
+                C3sMember.membership_lost_filter(effective_date)
+            ).label('membership_lost_count'),
+            _count_if(
+                expression.and_(
+                    # pylint: disable=singleton-comparison
+                    C3sMember.membership_number != None,
+                    C3sMember.membership_number != 0)
+            ).label('membership_numbers_count'),
+            func.count(distinct(C3sMember.country)).label('countries_count'),
+        ).one()
+
+        statistics = {}
+        for key in row.keys():
+            value = getattr(row, key)
+            statistics[key] = value if value is not None else 0
+        return statistics
+
+    @classmethod
+    def get_country_statistics(cls):
+        """
+        Gets the number of datasets per country.
+
+        Returns:
+            A list of tuples of country and number of datasets sorted by the
+            number of datasets descending.
+        """
+        count = func.count(C3sMember.id)
+        # pylint: disable=no-member
+        return [
+            (country, country_count)
+            for country, country_count in DBSession.query(
+                C3sMember.country, count)
+            .group_by(C3sMember.country)
+            .order_by(count.desc(), C3sMember.country.asc())
+            .all()
+        ]
+
+    @classmethod
+    def get_staff_count(cls):
+        """
+        Gets the number of staff accounts.
+        """
+        # pylint: disable=no-member
+        return DBSession.query(func.count(C3sStaff.id)).scalar()
+
+    @classmethod
+    def get_dues_statistics(cls):
+        """
+        Gets the monthly dues statistics of all dues years.
+
+        The statistics of all years are retrieved from the dues ledger with
+        one query.
+
+        Returns:
+            A dictionary with the dues years 2015, 2016 and 2017 as keys and
+            the monthly statistics of the respective year as values.
+        """
+        return DuesLedgerRepository.get_monthly_stats([2015, 2016, 2017])
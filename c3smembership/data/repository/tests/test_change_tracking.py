@@ -0,0 +1,152 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.change_tracking package.
+"""
+
+from datetime import date
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import (
+    scoped_session,
+    sessionmaker,
+)
+
+from c3smembership.data.model.base import Base
+from c3smembership.data.repository.change_tracking import (
+    ChangeGeneration,
+    listen_for_changes,
+)
+from c3smembership.models import (
+    C3sStaff,
+    Shares,
+)
+
+
+class CallbackCounter(object):
+    """
+    Counts the calls of the callback.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+
+
+class TestChangeTracking(unittest.TestCase):
+    """
+    Tests the listen_for_changes function.
+    """
+
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        self.session = scoped_session(sessionmaker(bind=engine))
+        self.callback = CallbackCounter()
+        listen_for_changes(self.session, [Shares], self.callback)
+
+    def tearDown(self):
+        self.session.remove()
+
+    def test_flush_and_commit(self):
+        """
+        Tests that the callback is called on flush and commit of relevant
+        changes.
+        """
+        shares = Shares(number=1, date_of_acquisition=date(2017, 1, 1))
+        self.session.add(shares)
+        self.session.flush()
+        self.assertEqual(self.callback.count, 1)
+        self.session.commit()
+        self.assertEqual(self.callback.count, 2)
+
+        shares.number = 2
+        self.session.commit()
+        self.assertEqual(self.callback.count, 4)
+
+        self.session.delete(shares)
+        self.session.commit()
+        self.assertEqual(self.callback.count, 6)
+
+    def test_irrelevant_changes(self):
+        """
+        Tests that the callback is not called for changes of other classes.
+        """
+        self.session.add(C3sStaff(
+            login=u'staff', password=u'password', email=u'staff@example.com'))
+        self.session.commit()
+        self.assertEqual(self.callback.count, 0)
+
+    def test_rollback(self):
+        """
+        Tests that the callback is called on rollback of relevant flushed
+        changes.
+        """
+        self.session.add(
+            Shares(number=1, date_of_acquisition=date(2017, 1, 1)))
+        self.session.flush()
+        self.assertEqual(self.callback.count, 1)
+        self.session.rollback()
+        self.assertEqual(self.callback.count, 2)
+
+    def test_bulk_operations(self):
+        """
+        Tests that the callback is called on bulk updates and deletes.
+        """
+        self.session.add(
+            Shares(number=1, date_of_acquisition=date(2017, 1, 1)))
+        self.session.commit()
+        self.callback.count = 0
+
+        self.session.query(Shares).update({'number': 3})
+        self.assertEqual(self.callback.count, 1)
+        self.session.query(Shares).delete()
+        self.assertEqual(self.callback.count, 2)
+        self.session.commit()
+        self.assertEqual(self.callback.count, 3)
+
+
+class NumberSequenceRepositoryDummy(object):
+    """
+    Keeps number sequences in memory.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def allocate(self, name, count=1, initial_value=None):
+        self.values[name] = self.values.get(name, 0) + count
+        return self.values[name]
+
+    def get_current(self, name, initial_value=None):
+        return self.values.get(name, 0)
+
+
+class TestChangeGeneration(unittest.TestCase):
+    """
+    Tests the ChangeGeneration class.
+    """
+
+    def test_check(self):
+        """
+        Tests that the callbacks are called when the generation was
+        incremented by another process.
+        """
+        repository = NumberSequenceRepositoryDummy()
+        callback = CallbackCounter()
+        change_generation = ChangeGeneration(repository)
+        change_generation.add_callback(callback)
+
+        change_generation(None)
+        self.assertEqual(callback.count, 1)
+        change_generation(None)
+        self.assertEqual(callback.count, 1)
+
+        # another process signals changes
+        ChangeGeneration(repository).increment()
+        change_generation(None)
+        self.assertEqual(callback.count, 2)
+        change_generation.check()
+        self.assertEqual(callback.count, 2)
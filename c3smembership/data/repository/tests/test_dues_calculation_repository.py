@@ -0,0 +1,131 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.dues_calculation_repository package.
+"""
+
+from datetime import date
+from decimal import Decimal
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.dues_calculation import DuesCalculation
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.dues_calculation_repository import (
+    DuesCalculationRepository
+)
+from c3smembership.models import C3sMember
+
+
+def _create_member(number, membership_date, membership_type=u'normal'):
+    member = C3sMember(
+        firstname=u'Firstname{0}'.format(number),
+        lastname=u'Lastname{0}'.format(number),
+        email=u'member{0}@example.com'.format(number),
+        address1=u'Some Street 123',
+        address2=u'',
+        postcode=u'12345',
+        city=u'Some City',
+        country=u'DE',
+        locale=u'DE',
+        date_of_birth=date(1980, 1, 1),
+        email_is_confirmed=True,
+        email_confirm_code=u'CONFIRM{0}'.format(number),
+        password=u'arandompassword',
+        date_of_submission=date(2013, 1, 1),
+        membership_type=membership_type,
+        member_of_colsoc=False,
+        name_of_colsoc=u'',
+        num_shares=1,
+    )
+    member.membership_accepted = True
+    member.membership_date = membership_date
+    return member
+
+
+class TestDuesCalculationRepository(unittest.TestCase):
+    """
+    Tests the DuesCalculationRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            members = [
+                _create_member(1, date(2014, 1, 1)),
+                _create_member(2, date(2017, 8, 1)),
+                _create_member(3, date(2017, 2, 1), u'investing'),
+                _create_member(4, date(2015, 1, 1)),
+                # not yet a member in 2017
+                _create_member(5, date(2018, 1, 1)),
+                # left before 2017
+                _create_member(6, date(2014, 1, 1)),
+                # not accepted
+                _create_member(7, date(2014, 1, 1)),
+            ]
+            members[3].dues17_invoice = True
+            members[3].dues17_start = u'q1_2017'
+            members[3].dues17_amount = Decimal('50')
+            members[3].dues17_amount_paid = Decimal('20')
+            members[3].dues17_balance = Decimal('30')
+            members[5].membership_loss_date = date(2016, 12, 31)
+            members[6].membership_accepted = False
+            # pylint: disable=no-member
+            DBSession.add_all(members)
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_get_dues_columns(self):
+        """
+        Tests that the dues columns of the members liable to pay dues are
+        loaded.
+        """
+        columns = DuesCalculationRepository.get_dues_columns(2017)
+        self.assertEqual(
+            sorted(columns.keys()), sorted(DuesCalculationRepository.COLUMNS))
+        self.assertEqual(columns['id'], (1, 2, 3, 4))
+        self.assertEqual(columns['membership_date'][1], date(2017, 8, 1))
+        self.assertEqual(columns['amount'][3], Decimal('50'))
+        self.assertEqual(columns['balance'][3], Decimal('30'))
+        self.assertEqual(
+            DuesCalculationRepository.get_dues_columns(2016)['id'], (1, 4, 6))
+
+    def test_update_dues(self):
+        """
+        Tests storing the calculated dues with a bulk update.
+        """
+        dues_calculation = DuesCalculation(DuesCalculationRepository)
+        with transaction.manager:
+            preview = dues_calculation.apply(2017)
+        self.assertEqual(preview.members, 4)
+        self.assertEqual(preview.receivables, Decimal('105'))
+
+        # pylint: disable=no-member
+        member = DBSession.query(C3sMember).get(1)
+        self.assertEqual(member.dues17_start, u'q1_2017')
+        self.assertEqual(member.dues17_amount, Decimal('50'))
+        self.assertEqual(member.dues17_balance, Decimal('50'))
+        self.assertFalse(member.dues17_balanced)
+        member = DBSession.query(C3sMember).get(2)
+        self.assertEqual(member.dues17_start, u'q3_2017')
+        self.assertEqual(member.dues17_amount, Decimal('25'))
+        member = DBSession.query(C3sMember).get(3)
+        self.assertEqual(member.dues17_start, u'q1_2017')
+        self.assertTrue(member.dues17_amount.is_nan())
+        self.assertTrue(member.dues17_balanced)
+        member = DBSession.query(C3sMember).get(4)
+        self.assertEqual(member.dues17_balance, Decimal('30'))
+        member = DBSession.query(C3sMember).get(5)
+        self.assertEqual(member.dues17_start, None)
+        self.assertEqual(dues_calculation.preview(2017), preview)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.dues_invoice_repository package.
+"""
+
+from datetime import datetime
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.dues_invoice_repository import (
+    DuesInvoiceRepository
+)
+from c3smembership.models import Dues16Invoice
+
+
+class TestDuesInvoiceRepository(unittest.TestCase):
+    """
+    Tests the DuesInvoiceRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            for invoice_no in [3, 11, 5]:
+                # pylint: disable=no-member
+                DBSession.add(Dues16Invoice(
+                    invoice_no=invoice_no,
+                    invoice_no_string=u'C3S-dues2016-{0:04d}'.format(
+                        invoice_no),
+                    invoice_date=datetime(2016, 4, 1),
+                    invoice_amount=u'50',
+                    member_id=1,
+                    membership_no=1,
+                    email=u'some@example.com',
+                    token=u'TOKEN{0}'.format(invoice_no)))
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_get_max_invoice_number(self):
+        """
+        Tests the DuesInvoiceRepository.get_max_invoice_number method.
+        """
+        self.assertEqual(
+            DuesInvoiceRepository.get_max_invoice_number(2016), 11)
+        self.assertEqual(DuesInvoiceRepository.get_max_invoice_number(2017), 0)
+        with self.assertRaises(KeyError):
+            DuesInvoiceRepository.get_max_invoice_number(2014)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.dues_ledger_repository package.
+"""
+
+from datetime import (
+    date,
+    datetime,
+)
+from decimal import Decimal
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.models import (
+    C3sMember,
+    Dues16Invoice,
+    Dues17Invoice,
+    DuesLedgerEntry,
+)
+
+
+def _create_member(number):
+    member = C3sMember(
+        firstname=u'Firstname{0}'.format(number),
+        lastname=u'Lastname{0}'.format(number),
+        email=u'member{0}@example.com'.format(number),
+        address1=u'Some Street 123',
+        address2=u'',
+        postcode=u'12345',
+        city=u'Some City',
+        country=u'DE',
+        locale=u'DE',
+        date_of_birth=date(1980, 1, 1),
+        email_is_confirmed=True,
+        email_confirm_code=u'CONFIRM{0}'.format(number),
+        password=u'arandompassword',
+        date_of_submission=date(2014, 1, 1),
+        membership_type=u'normal',
+        member_of_colsoc=False,
+        name_of_colsoc=u'',
+        num_shares=1,
+    )
+    member.membership_accepted = True
+    member.membership_number = number
+    member.membership_date = date(2014, 1, 1)
+    return member
+
+
+def _create_invoice(invoice_class, invoice_no, invoice_date, amount,
+                    member):
+    return invoice_class(
+        invoice_no=invoice_no,
+        invoice_no_string=u'C3S-dues-{0}'.format(invoice_no),
+        invoice_date=invoice_date,
+        invoice_amount=amount,
+        member_id=member.id,
+        membership_no=member.membership_number,
+        email=member.email,
+        token=u'TOKEN{0}'.format(invoice_no))
+
+
+class TestDuesLedgerRepository(unittest.TestCase):
+    """
+    Tests the DuesLedgerRepository class and the recording of the dues
+    ledger on flush.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            member1 = _create_member(1)
+            member2 = _create_member(2)
+            # pylint: disable=no-member
+            DBSession.add_all([member1, member2])
+            DBSession.flush()
+            member1.dues17_invoice = True
+            member1.dues17_start = u'q1_2017'
+            member1.set_dues17_amount(Decimal('50'))
+            DBSession.add(_create_invoice(
+                Dues17Invoice, 1, datetime(2017, 4, 1), Decimal('50'),
+                member1))
+            DBSession.add(_create_invoice(
+                Dues16Invoice, 1, datetime(2016, 4, 1), Decimal('50'),
+                member1))
+            DBSession.add(_create_invoice(
+                Dues17Invoice, 2, datetime(2017, 4, 2), Decimal('50'),
+                member2))
+            DBSession.flush()
+            member1.set_dues17_payment(Decimal('20'), datetime(2017, 5, 2))
+            DBSession.flush()
+            member1.set_dues17_payment(Decimal('30'), datetime(2017, 6, 3))
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def _get_ledger(self, member_id):
+        return [
+            (entry.year, entry.entry_type, entry.entry_date, entry.amount,
+             entry.invoice_no)
+            for entry in DuesLedgerRepository.get_member_ledger(member_id)]
+
+    def test_record_dues_ledger(self):
+        """
+        Tests that flushed invoices and payments are recorded in the ledger
+        and the balances are updated.
+        """
+        self.assertEqual(self._get_ledger(1), [
+            (2016, u'invoice', datetime(2016, 4, 1), Decimal('50'), 1),
+            (2017, u'invoice', datetime(2017, 4, 1), Decimal('50'), 1),
+            (2017, u'payment', datetime(2017, 5, 2), Decimal('20'), None),
+            (2017, u'payment', datetime(2017, 6, 3), Decimal('30'), None),
+        ])
+        balances = DuesLedgerRepository.get_member_balances(1)
+        self.assertEqual(balances.keys(), [2017])
+        self.assertEqual(balances[2017].start, u'q1_2017')
+        self.assertEqual(balances[2017].amount, Decimal('50'))
+        self.assertEqual(balances[2017].amount_paid, Decimal('50'))
+        self.assertEqual(balances[2017].balance, Decimal('0'))
+        self.assertTrue(balances[2017].balanced)
+
+        with transaction.manager:
+            invoice = Dues17Invoice.get_by_invoice_no(1)
+            invoice.is_cancelled = True
+            invoice.succeeding_invoice_no = 3
+            reversal = _create_invoice(
+                Dues17Invoice, 3, datetime(2017, 7, 1), Decimal('-50'),
+                C3sMember.get_by_id(1))
+            reversal.is_reversal = True
+            reversal.preceding_invoice_no = 1
+            # pylint: disable=no-member
+            DBSession.add(reversal)
+        invoices = DuesLedgerRepository.get_member_invoices(1)
+        self.assertEqual(sorted(invoices.keys()), [2016, 2017])
+        self.assertEqual(
+            [(entry.invoice_no, entry.is_reversal, entry.is_cancelled,
+              entry.invoice_amount)
+             for entry in invoices[2017]],
+            [(1, False, True, Decimal('50')),
+             (3, True, False, Decimal('-50'))])
+        self.assertEqual(invoices[2017][0].succeeding_invoice_no, 3)
+        self.assertFalse(invoices[2016][0].is_cancelled)
+
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.delete(C3sMember.get_by_id(1))
+        self.assertEqual(self._get_ledger(1), [])
+        self.assertEqual(DuesLedgerRepository.get_member_balances(1), {})
+
+    def test_delete(self):
+        """
+        Tests that the ledger entries of deleted invoices and the ledger
+        entries and balances of members deleted in bulk are deleted and the
+        monthly statistics refreshed.
+        """
+        def get_months():
+            return [
+                (stat['month'], stat['amount_invoiced_normal'])
+                for stat in DuesLedgerRepository.get_monthly_stats(
+                    [2017])[2017]]
+
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.delete(Dues17Invoice.get_by_invoice_no(2))
+        self.assertEqual(self._get_ledger(2), [])
+        self.assertEqual(get_months()[0], (datetime(2017, 4, 1), 50))
+
+        with transaction.manager:
+            self.assertEqual(C3sMember.delete_by_id(1), 1)
+        self.assertEqual(self._get_ledger(1), [])
+        self.assertEqual(DuesLedgerRepository.get_member_balances(1), {})
+        self.assertEqual(get_months(), [])
+
+        # a member reusing the ID doesn't inherit the dues history
+        with transaction.manager:
+            member = _create_member(3)
+            member.id = 1
+            # pylint: disable=no-member
+            DBSession.add(member)
+        self.assertEqual(DuesLedgerRepository.get_member_invoices(1), {})
+
+        with transaction.manager:
+            self.assertEqual(C3sMember.delete_by_id(4), 0)
+
+    def test_get_monthly_stats(self):
+        """
+        Tests that the monthly statistics of all years are aggregated from
+        the ledger.
+        """
+        statistics = DuesLedgerRepository.get_monthly_stats(
+            [2015, 2016, 2017])
+        self.assertEqual(statistics[2015], [])
+        self.assertEqual(
+            [(stat['month'], stat['amount_invoiced_normal'],
+              stat['amount_invoiced_reversal'], stat['amount_paid'])
+             for stat in statistics[2017]],
+            [
+                (datetime(2017, 4, 1), 100, 0, 0),
+                (datetime(2017, 5, 1), 0, 0, 20),
+                (datetime(2017, 6, 1), 0, 0, 30),
+            ])
+        self.assertEqual(len(statistics[2016]), 1)
+
+    def test_monthly_stats_maintenance(self):
+        """
+        Tests that the monthly statistics are refreshed for the months of
+        changed invoices and payments and equal the rebuilt ones.
+        """
+        def get_stats():
+            statistics = DuesLedgerRepository.get_monthly_stats([2017])
+            return [
+                (stat['month'], stat['amount_invoiced_normal'],
+                 stat['amount_invoiced_reversal'], stat['amount_paid'])
+                for stat in statistics[2017]]
+
+        with transaction.manager:
+            invoice = Dues17Invoice.get_by_invoice_no(2)
+            invoice.invoice_date = datetime(2017, 7, 1)
+            invoice.invoice_amount = Decimal('0.10')
+            reversal = _create_invoice(
+                Dues17Invoice, 3, datetime(2017, 7, 2), Decimal('-0.20'),
+                C3sMember.get_by_id(2))
+            reversal.is_reversal = True
+            # pylint: disable=no-member
+            DBSession.add(reversal)
+            DuesLedgerRepository.add_payments(2017, [
+                (2, datetime(2017, 7, 3), Decimal('0.10')),
+                (2, datetime(2017, 7, 4), Decimal('0.20')),
+            ])
+        # the amounts are summed exactly and not as floating point numbers
+        self.assertEqual(get_stats(), [
+            (datetime(2017, 4, 1), Decimal('50'), 0, 0),
+            (datetime(2017, 5, 1), 0, 0, Decimal('20')),
+            (datetime(2017, 6, 1), 0, 0, Decimal('30')),
+            (datetime(2017, 7, 1), Decimal('0.10'), Decimal('-0.20'),
+             Decimal('0.30')),
+        ])
+
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.delete(C3sMember.get_by_id(1))
+        self.assertEqual(get_stats(), [
+            (datetime(2017, 7, 1), Decimal('0.10'), Decimal('-0.20'),
+             Decimal('0.30')),
+        ])
+
+        with transaction.manager:
+            DuesLedgerRepository.rebuild_monthly_stats()
+        self.assertEqual(get_stats(), [
+            (datetime(2017, 7, 1), Decimal('0.10'), Decimal('-0.20'),
+             Decimal('0.30')),
+        ])
+
+    def test_rebuild(self):
+        """
+        Tests rebuilding the ledger from the invoices and members.
+        """
+        with transaction.manager:
+            DuesLedgerRepository.rebuild()
+        # the dated payments are kept
+        self.assertEqual(self._get_ledger(1), [
+            (2016, u'invoice', datetime(2016, 4, 1), Decimal('50'), 1),
+            (2017, u'invoice', datetime(2017, 4, 1), Decimal('50'), 1),
+            (2017, u'payment', datetime(2017, 5, 2), Decimal('20'), None),
+            (2017, u'payment', datetime(2017, 6, 3), Decimal('30'), None),
+        ])
+        self.assertEqual(
+            DuesLedgerRepository.get_member_balances(1)[2017].amount_paid,
+            Decimal('50'))
+        self.assertEqual(
+            # pylint: disable=no-member
+            DBSession.query(DuesLedgerEntry).count(), 5)
+
+        # payments written bypassing the session are added as the difference
+        members = C3sMember.__table__
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.execute(
+                members.update()
+                .where(members.c.id == 1)
+                .values(
+                    dues17_amount_paid=Decimal('45'),
+                    dues17_paid_date=datetime(2017, 7, 4)))
+            DuesLedgerRepository.rebuild()
+        self.assertEqual(self._get_ledger(1)[2:], [
+            (2017, u'payment', datetime(2017, 5, 2), Decimal('20'), None),
+            (2017, u'payment', datetime(2017, 6, 3), Decimal('30'), None),
+            (2017, u'payment', datetime(2017, 7, 4), Decimal('-5'), None),
+        ])
+        self.assertEqual(
+            DuesLedgerRepository.get_member_balances(1)[2017].amount_paid,
+            Decimal('45'))
+
+        # the payments of deleted members are deleted
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.execute(members.delete().where(members.c.id == 1))
+            DuesLedgerRepository.rebuild()
+        self.assertEqual(
+            [entry[1] for entry in self._get_ledger(1)],
+            [u'invoice', u'invoice'])
@@ -0,0 +1,182 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.dues_payment_repository package.
+"""
+
+from datetime import (
+    date,
+    datetime,
+)
+from decimal import Decimal
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.data.repository.dues_payment_repository import (
+    DuesPaymentRepository
+)
+from c3smembership.models import (
+    C3sMember,
+    Dues17Invoice,
+)
+
+
+def _create_member(number):
+    return C3sMember(
+        firstname=u'Firstname{0}'.format(number),
+        lastname=u'Lastname{0}'.format(number),
+        email=u'member{0}@example.com'.format(number),
+        address1=u'Some Street 123',
+        address2=u'',
+        postcode=u'12345',
+        city=u'Some City',
+        country=u'DE',
+        locale=u'DE',
+        date_of_birth=date(1980, 1, 1),
+        email_is_confirmed=True,
+        email_confirm_code=u'CONFIRM{0}'.format(number),
+        password=u'arandompassword',
+        date_of_submission=date(2017, 1, 1),
+        membership_type=u'normal',
+        member_of_colsoc=False,
+        name_of_colsoc=u'',
+        num_shares=1,
+    )
+
+
+class TestDuesPaymentRepository(unittest.TestCase):
+    """
+    Tests the DuesPaymentRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            member1 = _create_member(1)
+            member1.membership_accepted = True
+            member1.membership_number = 11
+            member1.dues16_token = u'ABCDEFGHIJ'
+            member1.dues17_token = u'KLMNOPQRST'
+            member1.dues17_balance = Decimal('50')
+            member1.dues17_amount_paid = Decimal('NaN')
+            member2 = _create_member(2)
+            member2.membership_number = 22
+            member2.dues17_token = u'UVWXYZABCD'
+            member2.dues17_balance = Decimal('50')
+            member2.dues17_amount_paid = Decimal('0')
+            member2.set_dues17_payment(Decimal('20'), datetime(2017, 3, 1))
+            # pylint: disable=no-member
+            DBSession.add(member1)
+            DBSession.add(member2)
+            DBSession.flush()
+            DBSession.add(Dues17Invoice(
+                invoice_no=42,
+                invoice_no_string=u'C3S-dues2017-0042',
+                invoice_date=datetime(2017, 4, 1),
+                invoice_amount=u'50',
+                member_id=member2.id,
+                membership_no=22,
+                email=u'member2@example.com',
+                token=u'UVWXYZABCD'))
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_find_members(self):
+        """
+        Tests the lookups by dues tokens, invoice numbers and membership
+        numbers.
+        """
+        self.assertEqual(
+            DuesPaymentRepository.find_members_by_dues_tokens(
+                [u'ABCDEFGHIJ', u'KLMNOPQRST', u'UVWXYZABCD', u'UNKNOWNABC']),
+            {
+                u'ABCDEFGHIJ': [(1, 2016)],
+                u'KLMNOPQRST': [(1, 2017)],
+                u'UVWXYZABCD': [(2, 2017)],
+            })
+        self.assertEqual(
+            DuesPaymentRepository.find_members_by_invoice_numbers(
+                2017, [42, 43]),
+            {42: 2})
+        self.assertEqual(
+            DuesPaymentRepository.find_members_by_invoice_numbers(2016, [42]),
+            {})
+        # member 2 is not accepted
+        self.assertEqual(
+            DuesPaymentRepository.find_members_by_membership_numbers(
+                [11, 22]),
+            {11: 1})
+
+    def test_add_payments(self):
+        """
+        Tests the DuesPaymentRepository.add_payments method.
+        """
+        with transaction.manager:
+            DuesPaymentRepository.add_payments(2017, {
+                1: (Decimal('50'), date(2017, 5, 2)),
+                2: (Decimal('10'), date(2017, 5, 3)),
+            })
+            DuesPaymentRepository.add_payments(2017, {})
+
+        # pylint: disable=no-member
+        member1 = DBSession.query(C3sMember).get(1)
+        self.assertTrue(member1.dues17_paid)
+        self.assertEqual(member1.dues17_amount_paid, Decimal('50'))
+        self.assertEqual(member1.dues17_paid_date, datetime(2017, 5, 2))
+        self.assertEqual(member1.dues17_balance, Decimal('0'))
+        self.assertTrue(member1.dues17_balanced)
+
+        member2 = DBSession.query(C3sMember).get(2)
+        self.assertTrue(member2.dues17_paid)
+        self.assertEqual(member2.dues17_amount_paid, Decimal('30'))
+        self.assertEqual(member2.dues17_paid_date, datetime(2017, 5, 3))
+        self.assertEqual(member2.dues17_balance, Decimal('20'))
+        self.assertFalse(member2.dues17_balanced)
+        self.assertFalse(member2.dues16_paid)
+
+        # the payments are recorded in the dues ledger
+        self.assertEqual(
+            [(entry.entry_type, entry.entry_date, entry.amount)
+             for entry in DuesLedgerRepository.get_member_ledger(2)],
+            [
+                (u'payment', datetime(2017, 3, 1), Decimal('20')),
+                (u'invoice', datetime(2017, 4, 1), Decimal('50')),
+                (u'payment', datetime(2017, 5, 3), Decimal('10')),
+            ])
+        self.assertEqual(
+            DuesLedgerRepository.get_member_balances(2)[2017].balance,
+            Decimal('20'))
+
+    def test_applied_bookings(self):
+        """
+        Tests the DuesPaymentRepository.add_applied_bookings and
+        find_applied_bookings methods.
+        """
+        with transaction.manager:
+            DuesPaymentRepository.add_applied_bookings([
+                (u'camt:REF1', 2017, 1, Decimal('50'), date(2017, 5, 2)),
+                (u'camt:REF2', 2017, 2, Decimal('10'), date(2017, 5, 3)),
+            ])
+            DuesPaymentRepository.add_applied_bookings([])
+
+        self.assertEqual(
+            DuesPaymentRepository.find_applied_bookings(
+                [u'camt:REF1', u'camt:REF2', u'camt:REF3']),
+            set([u'camt:REF1', u'camt:REF2']))
+        self.assertEqual(
+            DuesPaymentRepository.find_applied_bookings([]), set())
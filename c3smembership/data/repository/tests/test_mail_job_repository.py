@@ -0,0 +1,115 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.mail_job_repository package.
+"""
+
+from datetime import datetime
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.mail_job_repository import (
+    MailJobRepository
+)
+from c3smembership.models import MailJob
+
+
+class TestMailJobRepository(unittest.TestCase):
+    """
+    Tests the MailJobRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            MailJobRepository.add(
+                u'dues17_invoice', u'dues17_invoice/1', u'yes@c3s.cc',
+                [u'alice@example.com'], u'Subject 1', u'Body 1',
+                {'Reply-To': 'office@c3s.cc'}, datetime(2017, 4, 1, 12, 0))
+            MailJobRepository.add(
+                u'dues17_invoice', u'dues17_invoice/2', u'yes@c3s.cc',
+                [u'bob@example.com', u'carol@example.com'], u'Subject 2',
+                u'Body 2', None, datetime(2017, 4, 1, 12, 1))
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_exists(self):
+        """
+        Tests the MailJobRepository.exists method.
+        """
+        self.assertTrue(MailJobRepository.exists(u'dues17_invoice/1'))
+        self.assertFalse(MailJobRepository.exists(u'dues17_invoice/3'))
+
+    def test_claim_next(self):
+        """
+        Tests the MailJobRepository.claim_next method.
+        """
+        now = datetime(2017, 4, 1, 12, 0, 30)
+        lease_until = datetime(2017, 4, 1, 12, 10)
+
+        job = MailJobRepository.claim_next(now, lease_until)
+        self.assertEqual(job['attempts'], 1)
+        self.assertEqual(job['recipients'], [u'alice@example.com'])
+        self.assertEqual(job['subject'], u'Subject 1')
+        self.assertEqual(job['body'], u'Body 1')
+        self.assertEqual(job['extra_headers'], {'Reply-To': 'office@c3s.cc'})
+        # the second job is not due yet and the first one is claimed
+        self.assertTrue(MailJobRepository.claim_next(now, lease_until) is None)
+
+        now = datetime(2017, 4, 1, 12, 5)
+        job = MailJobRepository.claim_next(now, lease_until)
+        self.assertEqual(
+            job['recipients'], [u'bob@example.com', u'carol@example.com'])
+        self.assertEqual(job['extra_headers'], {})
+
+        # the lease of the first job expired and it can be claimed again
+        now = datetime(2017, 4, 1, 12, 10)
+        job = MailJobRepository.claim_next(now, datetime(2017, 4, 1, 12, 20))
+        self.assertEqual(job['subject'], u'Subject 1')
+        self.assertEqual(job['attempts'], 2)
+
+    def test_mark_sent_and_failed(self):
+        """
+        Tests the MailJobRepository.mark_sent and mark_failed methods.
+        """
+        now = datetime(2017, 4, 1, 12, 5)
+        lease_until = datetime(2017, 4, 1, 12, 15)
+        job1 = MailJobRepository.claim_next(now, lease_until)
+        job2 = MailJobRepository.claim_next(now, lease_until)
+
+        MailJobRepository.mark_sent(job1['id'], now)
+        MailJobRepository.mark_failed(
+            job2['id'], u'SMTPError: failure', datetime(2017, 4, 1, 12, 6))
+        self.assertEqual(
+            MailJobRepository.get_run_status_counts(),
+            [(u'dues17_invoice', u'pending', 1),
+             (u'dues17_invoice', u'sent', 1)])
+
+        # retried after the delay
+        self.assertTrue(MailJobRepository.claim_next(now, lease_until) is None)
+        job2 = MailJobRepository.claim_next(
+            datetime(2017, 4, 1, 12, 6), lease_until)
+        self.assertEqual(job2['attempts'], 2)
+        MailJobRepository.mark_failed(job2['id'], u'SMTPError: failure')
+        self.assertEqual(
+            MailJobRepository.get_run_status_counts(),
+            [(u'dues17_invoice', u'failed', 1),
+             (u'dues17_invoice', u'sent', 1)])
+        # pylint: disable=no-member
+        mail_job = DBSession.query(MailJob).get(job2['id'])
+        self.assertEqual(mail_job.last_error, u'SMTPError: failure')
+        self.assertTrue(
+            MailJobRepository.claim_next(
+                datetime(2017, 5, 1), lease_until) is None)
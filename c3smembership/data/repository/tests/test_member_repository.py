@@ -166,6 +166,27 @@ class TestMemberRepository(unittest.TestCase):
         self.assertTrue('member1' in membership_numbers)
         self.assertTrue('member2' in membership_numbers)
 
+    # pylint: disable=invalid-name
+    def test_get_accepted_members_export(self):
+        """
+        Tests the MemberRepository.get_accepted_members_export method.
+        """
+        # pylint: disable=no-member
+        result = DBSession.execute(
+            MemberRepository.get_accepted_members_export())
+        self.assertEqual(result.keys()[:3], [
+            'membership_number', 'firstname', 'lastname'])
+        rows = result.fetchall()
+        self.assertEqual(
+            [(row.membership_number, row.email) for row in rows],
+            [('member1', u'some@shri.de'), ('member2', u'some2@shri.de')])
+
+        # pylint: disable=no-member
+        rows = DBSession.execute(
+            MemberRepository.get_accepted_members_export(
+                date(2013, 1, 4))).fetchall()
+        self.assertEqual(len(rows), 1)
+
     # pylint: disable=invalid-name
     def test_get_accepted_members_sorted(self):
         """
@@ -235,3 +256,48 @@ class TestMemberRepository(unittest.TestCase):
         members_count = MemberRepository.get_accepted_members_count(
             date(2016, 4, 23))
         self.assertEqual(members_count, 2)
+
+    def test_get_highest_membership_number(self):
+        """
+        Tests the MemberRepository.get_highest_membership_number method.
+        """
+        member1 = MemberRepository.get_member_by_id(1)
+        member2 = MemberRepository.get_member_by_id(2)
+        member1.membership_number = None
+        member2.membership_number = None
+        self.assertEqual(MemberRepository.get_highest_membership_number(), 0)
+
+        member1.membership_number = 12
+        member2.membership_number = 7
+        self.assertEqual(MemberRepository.get_highest_membership_number(), 12)
+
+        # the reserved membership number is not considered
+        member2.membership_number = \
+            MemberRepository.RESERVED_MEMBERSHIP_NUMBER
+        self.assertEqual(MemberRepository.get_highest_membership_number(), 12)
+
+    def test_get_accepted_member_identities(self):
+        """
+        Tests the MemberRepository.get_accepted_member_identities method.
+        """
+        identities = MemberRepository.get_accepted_member_identities()
+        self.assertEqual(
+            sorted([identity.id for identity in identities]), [1, 2])
+        identity = [
+            identity for identity in identities if identity.id == 1][0]
+        self.assertEqual(identity.firstname, u'SomeFirstnäme')
+        self.assertEqual(identity.lastname, u'SomeLastnäme')
+        self.assertEqual(identity.email, u'some@shri.de')
+        self.assertEqual(identity.date_of_birth, date.today())
+
+    def test_get_application_identities(self):
+        """
+        Tests the MemberRepository.get_application_identities method.
+        """
+        identities = MemberRepository.get_application_identities()
+        self.assertEqual([identity.id for identity in identities], [3])
+        self.assertEqual(identities[0].email, u'not.approved@example.com')
+
+        member3 = MemberRepository.get_member_by_id(3)
+        member3.is_duplicate = True
+        self.assertEqual(MemberRepository.get_application_identities(), [])
@@ -0,0 +1,175 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.number_sequence_repository package.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import (
+    create_engine,
+    engine_from_config,
+)
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+from c3smembership.models import NumberSequence
+
+
+class TestNumberSequenceRepository(unittest.TestCase):
+    """
+    Tests the NumberSequenceRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_allocate(self):
+        """
+        Tests the NumberSequenceRepository.allocate method.
+        """
+        self.assertEqual(NumberSequenceRepository.allocate(u'first'), 1)
+        self.assertEqual(NumberSequenceRepository.allocate(u'first'), 2)
+        self.assertEqual(NumberSequenceRepository.allocate(u'first', 10), 12)
+        self.assertEqual(NumberSequenceRepository.allocate(u'first'), 13)
+
+        # the initial value is only used to create the sequence
+        initial_values = []
+
+        def initial_value():
+            initial_values.append(100)
+            return 100
+
+        self.assertEqual(
+            NumberSequenceRepository.allocate(u'second', 5, initial_value),
+            105)
+        self.assertEqual(
+            NumberSequenceRepository.allocate(u'second', 1, initial_value),
+            106)
+        self.assertEqual(initial_values, [100])
+
+        with self.assertRaises(ValueError):
+            NumberSequenceRepository.allocate(u'first', 0)
+
+    def test_allocate_created_concurrently(self):
+        """
+        Tests that NumberSequenceRepository.allocate increments a sequence
+        created by a concurrent transaction after it was found missing.
+
+        The failed creation only rolls back its SAVEPOINT and keeps the
+        previous changes of the transaction.
+        """
+        def initial_value():
+            # the concurrent transaction creates the sequence
+            DBSession.execute(NumberSequence.__table__.insert().values(
+                name=u'sequence', value=7))
+            return 5
+
+        with transaction.manager:
+            self.assertEqual(NumberSequenceRepository.allocate(u'other'), 1)
+            self.assertEqual(
+                NumberSequenceRepository.allocate(
+                    u'sequence', 2, initial_value),
+                9)
+            self.assertEqual(
+                NumberSequenceRepository.allocate(u'sequence'), 10)
+        self.assertEqual(NumberSequenceRepository.get_current(u'other'), 1)
+        self.assertEqual(
+            NumberSequenceRepository.get_current(u'sequence'), 10)
+
+    def test_get_current(self):
+        """
+        Tests the NumberSequenceRepository.get_current method.
+        """
+        self.assertEqual(NumberSequenceRepository.get_current(u'first'), 0)
+        self.assertEqual(
+            NumberSequenceRepository.get_current(u'first', lambda: 42), 42)
+        # getting the current value does not create the sequence
+        self.assertEqual(NumberSequenceRepository.get_current(u'first'), 0)
+
+        NumberSequenceRepository.allocate(u'first', 3)
+        self.assertEqual(
+            NumberSequenceRepository.get_current(u'first', lambda: 42), 3)
+
+
+class TestNumberSequenceRepositoryConcurrency(unittest.TestCase):
+    """
+    Tests the concurrent allocation of numbers.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine(
+            'sqlite:///' + os.path.join(self.directory, 'sequence.db'),
+            connect_args={'timeout': 10})
+        Base.metadata.create_all(self.engine)
+        DBSession.remove()
+        DBSession.configure(bind=self.engine)
+
+    def tearDown(self):
+        DBSession.remove()
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_concurrent_allocation(self):
+        """
+        Test that concurrent transactions allocate different numbers.
+
+        The first transaction allocates a number and keeps its transaction
+        open until the second transaction tried to allocate a block. The
+        second transaction must wait for the first one and then receive the
+        following numbers.
+        """
+        first_allocated = threading.Event()
+        second_started = threading.Event()
+        results = {}
+
+        def allocate(name, count, wait_for=None, notify=None):
+            with transaction.manager:
+                if wait_for is not None:
+                    wait_for.wait()
+                if name == 'second':
+                    second_started.set()
+                results[name] = NumberSequenceRepository.allocate(
+                    u'sequence', count)
+                if notify is not None:
+                    notify.set()
+                    # keep the transaction open while the second one starts
+                    second_started.wait()
+            DBSession.remove()
+
+        threads = [
+            threading.Thread(
+                target=allocate,
+                args=('first', 1),
+                kwargs={'notify': first_allocated}),
+            threading.Thread(
+                target=allocate,
+                args=('second', 5),
+                kwargs={'wait_for': first_allocated}),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'first': 1, 'second': 6})
+        self.assertEqual(NumberSequenceRepository.get_current(u'sequence'), 6)
@@ -508,6 +508,41 @@ class TestShareRepository(unittest.TestCase):
         share_count = ShareRepository.get_share_count()
         self.assertEqual(share_count, 114)
 
+        share_count = ShareRepository.get_share_count(date(2012, 12, 31))
+        self.assertEqual(share_count, 0)
+
+        share_count = ShareRepository.get_share_count(date(2013, 1, 1))
+        self.assertEqual(share_count, 0)
+
+        share_count = ShareRepository.get_share_count(date(2013, 1, 2))
+        self.assertEqual(share_count, 12)
+
+        share_count = ShareRepository.get_share_count(date(2014, 3, 4))
+        self.assertEqual(share_count, 12 + 23 + 34)
+
+        share_count = ShareRepository.get_share_count(date(2015, 4, 5))
+        self.assertEqual(share_count, 12 + 23 + 34 + 45)
+
+    def test_get_share_counts(self):
+        """
+        Tests the ShareRepository.get_share_counts method.
+        """
+        share_counts = ShareRepository.get_share_counts([])
+        self.assertEqual(share_counts, {})
+
+        share_counts = ShareRepository.get_share_counts([
+            date(2012, 12, 31),
+            date(2013, 1, 2),
+            date(2014, 2, 3),
+            date(2014, 3, 4),
+            date(2015, 4, 5),
+        ])
+        self.assertEqual(share_counts[date(2012, 12, 31)], 0)
+        self.assertEqual(share_counts[date(2013, 1, 2)], 12)
+        self.assertEqual(share_counts[date(2014, 2, 3)], 12 + 23)
+        self.assertEqual(share_counts[date(2014, 3, 4)], 12 + 23 + 34)
+        self.assertEqual(share_counts[date(2015, 4, 5)], 12 + 23 + 34 + 45)
+
     def test_get_member_share_count(self):
         """
         Tests the ShareRepository.get_member_share_count method.
@@ -535,6 +570,31 @@ class TestShareRepository(unittest.TestCase):
             date(2014, 2, 3))
         self.assertEqual(share_count, 12 + 23)
 
+    def test_get_member_share_counts(self):
+        """
+        Tests the ShareRepository.get_member_share_counts method.
+        """
+        share_counts = ShareRepository.get_member_share_counts()
+        self.assertEqual(share_counts, {
+            u'member1': 12 + 23,
+            u'member2': 34 + 45,
+        })
+
+        share_counts = ShareRepository.get_member_share_counts(
+            date(2013, 1, 1))
+        self.assertEqual(share_counts, {})
+
+        share_counts = ShareRepository.get_member_share_counts(
+            date(2014, 2, 3))
+        self.assertEqual(share_counts, {u'member1': 12 + 23})
+
+        share_counts = ShareRepository.get_member_share_counts(
+            date(2014, 3, 4))
+        self.assertEqual(share_counts, {
+            u'member1': 12 + 23,
+            u'member2': 34,
+        })
+
     def test_get(self):
         """
         Tests the ShareRepository.get method.
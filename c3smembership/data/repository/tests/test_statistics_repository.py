@@ -0,0 +1,149 @@
+# -*- coding: utf-8  -*-
+"""
+Tests the c3smembership.data.repository.statistics_repository package.
+"""
+
+from datetime import (
+    date,
+    datetime,
+)
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import (
+    DBSession,
+    Base,
+)
+from c3smembership.models import (
+    C3sMember,
+    C3sStaff,
+)
+from c3smembership.data.repository.statistics_repository import (
+    StatisticsRepository
+)
+
+
+class TestStatisticsRepository(unittest.TestCase):
+    """
+    Tests the StatisticsRepository class.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.add(self._create_member(
+                u'normal', u'DE', u'CODE1', 5, True, 1,
+                date(2014, 1, 1), None))
+            DBSession.add(self._create_member(
+                u'investing', u'DE', u'CODE2', 7, True, 2,
+                date(2014, 1, 1), None, is_legalentity=True))
+            DBSession.add(self._create_member(
+                u'normal', u'FR', u'CODE3', 11, True, 3,
+                date(2014, 1, 1), date(2015, 12, 31)))
+            DBSession.add(self._create_member(
+                u'normal', u'DE', u'CODE4', 13, False, None, None, None))
+            duplicate = self._create_member(
+                u'normal', u'AT', u'CODE5', 17, True, None, None, None)
+            duplicate.is_duplicate = True
+            DBSession.add(duplicate)
+            DBSession.add(C3sStaff(
+                login=u'staff', password=u'password',
+                email=u'staff@example.com'))
+
+    @classmethod
+    def _create_member(cls, membership_type, country, code, num_shares,
+                       payment_received, membership_number, membership_date,
+                       membership_loss_date, is_legalentity=False):
+        # pylint: disable=too-many-arguments
+        member = C3sMember(
+            firstname=u'Firstname',
+            lastname=u'Lastname',
+            email=u'{0}@example.com'.format(code),
+            address1=u'Some Street 123',
+            address2=u'',
+            postcode=u'12345',
+            city=u'Some City',
+            country=country,
+            locale=u'de',
+            date_of_birth=date(1980, 1, 1),
+            email_is_confirmed=False,
+            email_confirm_code=code,
+            password=u'password',
+            date_of_submission=datetime(2013, 12, 1),
+            membership_type=membership_type,
+            member_of_colsoc=False,
+            name_of_colsoc=u'',
+            num_shares=num_shares,
+        )
+        member.payment_received = payment_received
+        member.is_legalentity = is_legalentity
+        if membership_number is not None:
+            member.membership_accepted = True
+            member.membership_number = membership_number
+            member.membership_date = membership_date
+            member.membership_loss_date = membership_loss_date
+        return member
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def test_get_member_statistics(self):
+        """
+        Tests the StatisticsRepository.get_member_statistics method.
+        """
+        statistics = StatisticsRepository.get_member_statistics(
+            date(2016, 1, 1))
+        self.assertEqual(statistics['number_of_datasets'], 5)
+        self.assertEqual(statistics['afm_shares_unpaid'], 13)
+        self.assertEqual(statistics['afm_shares_paid'], 5 + 7 + 11 + 17)
+        self.assertEqual(statistics['members_accepted_count'], 2)
+        self.assertEqual(statistics['non_accepted_count'], 2)
+        self.assertEqual(statistics['nonmember_listing_count'], 2)
+        self.assertEqual(statistics['duplicates_count'], 1)
+        self.assertEqual(statistics['natural_persons_count'], 1)
+        self.assertEqual(statistics['legal_entities_count'], 1)
+        self.assertEqual(statistics['normal_memberships_count'], 1)
+        self.assertEqual(statistics['investing_memberships_count'], 1)
+        self.assertEqual(statistics['other_memberships_count'], 0)
+        self.assertEqual(statistics['membership_lost_count'], 1)
+        self.assertEqual(statistics['membership_numbers_count'], 3)
+        self.assertEqual(statistics['countries_count'], 3)
+
+        statistics = StatisticsRepository.get_member_statistics(
+            date(2015, 12, 31))
+        self.assertEqual(statistics['members_accepted_count'], 3)
+        self.assertEqual(statistics['membership_lost_count'], 0)
+
+        statistics = StatisticsRepository.get_member_statistics(
+            date(2013, 12, 31))
+        self.assertEqual(statistics['members_accepted_count'], 0)
+        self.assertEqual(statistics['non_accepted_count'], 5)
+
+    def test_get_country_statistics(self):
+        """
+        Tests the StatisticsRepository.get_country_statistics method.
+        """
+        countries = StatisticsRepository.get_country_statistics()
+        self.assertEqual(countries, [(u'DE', 3), (u'AT', 1), (u'FR', 1)])
+
+    def test_get_staff_count(self):
+        """
+        Tests the StatisticsRepository.get_staff_count method.
+        """
+        self.assertEqual(StatisticsRepository.get_staff_count(), 1)
+
+    def test_get_dues_statistics(self):
+        """
+        Tests the StatisticsRepository.get_dues_statistics method.
+        """
+        dues_statistics = StatisticsRepository.get_dues_statistics()
+        self.assertEqual(dues_statistics, {2015: [], 2016: [], 2017: []})
@@ -629,7 +629,7 @@ def edit_member(request):
             if isinstance(member.membership_number, NoneType) \
                     and member.membership_accepted:
                 member.membership_number = \
-                    C3sMember.get_next_free_membership_number()
+                    request.registry.membership_number_allocator.allocate()
 
         if appstruct['membership_info']['entity_type'] == 'legalentity':
             member.is_legalentity = True
@@ -12,62 +12,19 @@ GnuPG is used to encrypt email to staff
 # you need python-gnupg, so
 # bin/pip install python-gnupg
 
+import atexit
 import gnupg
+import os
+import subprocess
 import tempfile
 import shutil
+import threading
 
 DEBUG = False
 # DEBUG = True
 
-
-def encrypt_with_gnupg(data):
-    """
-    this function encrypts "data" with gnupg.
-
-    returns strings:
-    -----BEGIN PGP MESSAGE-----\n
-    Version: GnuPG v1.4.11 (GNU/Linux)\n
-    ...
-    -----END PGP MESSAGE-----\n
-    """
-    # we use a folder named 'keys' to store stuff
-
-    # if os.path.exists("keys"):
-    #     if DEBUG:  # pragma: no cover
-    #         print("===================================== GNUPG START")
-    #         print "folder 'keys' exists"
-    #     shutil.rmtree("keys")     # delete to renew
-    #     print "deleted keys"
-
-    # tempfile approach
-    keyfolder = tempfile.mkdtemp()
-    # print(keyfolder)
-
-    # TODO: check for a better way to do this:
-    # do we really need to create a new tempdir for every run? no!
-    # but hey as long as we need to run both as 'normal' user (while testing
-    # on port 6544) and as www-data (apache) we do need separate folders,
-    # because only the creator may access it.
-    # however: as long as this is reasonably fast,
-    # we can live with it. for now...
-
-    #    if DEBUG:  # pragma: no cover
-    #        # a gpg object to work with
-    #        gpg = gnupg.GPG(gnupghome="keys", verbose=True)
-    #    else:
-    # gpg = gnupg.GPG(gnupghome="keys")
-    gpg = gnupg.GPG(gnupghome=keyfolder)
-    gpg.encoding = 'utf-8'
-
-    # check if we have the membership key
-    list_of_keys = gpg.list_keys()
-    if DEBUG:  # pragma: no cover
-        print("=== the list of keys: " + repr(list_of_keys))
-
-    if 'C3S-Yes!' not in str(list_of_keys):
-        # open and read key file
-        # reading public key
-        pubkey_content = """
+C3S_KEY_FINGERPRINT = '89FC70ECCAD4487972D8924D71F6BA91CDD28110'
+C3S_PUBLIC_KEY = """
 -----BEGIN PGP PUBLIC KEY BLOCK-----
 Version: GnuPG v2
 
@@ -100,61 +57,182 @@ iRxv2JwkwRYtQFg5bFO3NqulcEBAgSmz/TViRvGS3xBZtu08jUW55k9EIuAKzJ3K
 =vq3Z
 -----END PGP PUBLIC KEY BLOCK-----
 """
-        # import public key
-        gpg.import_keys(pubkey_content)
-    else:
-        if DEBUG:  # pragma: no cover
-            print("=== not imported: key already known")
-        pass
 
-    if DEBUG:  # pragma: no cover
-        print "list_keys(): " + str(gpg.list_keys())
+STREAM_CHUNK_SIZE = 65536
+
+
+class GnuPGKeyring(object):
+    """
+    Keyring containing the C3S public key.
+
+    The keyring is created in a temporary directory and the key is imported
+    only once per process. Previously, a new keyring was created and the key
+    imported for each encryption which spawned three gpg processes per
+    message.
+
+    As the app runs both as a 'normal' user (e.g. while testing on port 6544)
+    and as www-data (apache) and only the creator may access a keyring, each
+    process uses its own keyring directory which is created with permissions
+    for its user only and removed when the process exits. Forked processes
+    create their own keyring.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gpg = None
+        self._pid = None
+
+    def get_gpg(self):
+        """
+        Gets the gnupg.GPG object of the keyring and creates the keyring if
+        necessary.
+        """
+        with self._lock:
+            if self._gpg is None or self._pid != os.getpid():
+                keyfolder = tempfile.mkdtemp(prefix='c3smembership_gnupg_')
+                gpg = gnupg.GPG(gnupghome=keyfolder)
+                gpg.encoding = 'utf-8'
+                gpg.import_keys(C3S_PUBLIC_KEY)
+                if DEBUG:  # pragma: no cover
+                    print "list_keys(): " + str(gpg.list_keys())
+                atexit.register(self._remove, keyfolder, os.getpid())
+                self._gpg = gpg
+                self._pid = os.getpid()
+            return self._gpg
+
+    @classmethod
+    def _remove(cls, keyfolder, pid):
+        if os.getpid() == pid:
+            shutil.rmtree(keyfolder, ignore_errors=True, onerror=rmtreeDebug)
+
+
+KEYRING = GnuPGKeyring()
 
-    # prepare
-    to_encode = data
 
-    # if DEBUG:  # pragma: no cover
-    #    print("encrypt_with_gnupg: data: %s") % data
-    #    print("encrypt_with_gnupg: type(data): %s") % type(data)
-    #    print("type of to_encode: %s") % type(to_encode)
+def encrypt_with_gnupg(data):
+    """
+    this function encrypts "data" with gnupg.
+
+    The keyring of the process is used so that only a single gpg process is
+    spawned per call.
 
-    if isinstance(to_encode, unicode):
-        # print("type is unicode")
-        to_encrypt = to_encode.encode(gpg.encoding)
+    returns strings:
+    -----BEGIN PGP MESSAGE-----\n
+    Version: GnuPG v1.4.11 (GNU/Linux)\n
+    ...
+    -----END PGP MESSAGE-----\n
+    """
+    gpg = KEYRING.get_gpg()
+
+    if isinstance(data, unicode):
+        to_encrypt = data.encode(gpg.encoding)
     else:
-        to_encrypt = to_encode
-    # elif isinstance(to_encode, str):
-    #    print("type was string")
-    #    to_encrypt = to_encode.encode(gpg.encoding)
-    #    print("type is now %s") % type(to_encrypt)
-    # else:
-    #    print("type is neither str nor unicode: %s") % type(to_encode)
+        to_encrypt = data
 
     if DEBUG:  # pragma: no cover
         print "len(to_encrypt): " + str(len(str(to_encrypt)))
-        # print("encrypt_with_gnupg: to_encrypt: %s") % to_encrypt
         print("encrypt_with_gnupg: type(to_encrypt): %s") % type(to_encrypt)
 
     # encrypt
     encrypted = gpg.encrypt(
         to_encrypt,
-        '89FC70ECCAD4487972D8924D71F6BA91CDD28110',  # key fingerprint
-        # 'ED6CAAC657A45BCF55EAE6EFE83C7CFC7CB6F90F',  # key fingerprint
+        C3S_KEY_FINGERPRINT,
         always_trust=True)
 
     if DEBUG:  # pragma: no cover
-        # print("encrypt_with_gnupg: encrypted: %s") % encrypted
-        print("encrypt_with_gnupg: type(encrypted): %s") % type(encrypted)
         print(
             "encrypt_with_gnupg: type(encrypted.data): %s"
         ) % type(
             encrypted.data)
-        # print "encrypted: " + str(encrypted)
-        # print "len(encrypted): " + str(len(str(encrypted)))
         print ("========================================== GNUPG END")
-    shutil.rmtree(keyfolder, ignore_errors=True, onerror=rmtreeDebug)
     return encrypted.data
 
+
+def encrypt_stream_with_gnupg(chunks):
+    """
+    this function encrypts the iterable of string "chunks" with gnupg.
+
+    The chunks are piped through a single gpg process while it is running so
+    that neither the data nor the encrypted result is ever held in memory
+    completely. The encrypted result is yielded in chunks as soon as gpg
+    produces them, e.g. for a response app_iter.
+
+    yields strings of the ASCII armored PGP message:
+    -----BEGIN PGP MESSAGE-----\n
+    ...
+    -----END PGP MESSAGE-----\n
+    """
+    gpg = KEYRING.get_gpg()
+    process = None
+    try:
+        process = subprocess.Popen(
+            [
+                gpg.gpgbinary,
+                '--batch',
+                '--no-tty',
+                '--homedir', gpg.gnupghome,
+                '--trust-model', 'always',
+                '--armor',
+                '--encrypt',
+                '--recipient', C3S_KEY_FINGERPRINT,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=open(os.devnull, 'w'))
+
+        # feed gpg in a separate thread while reading its output so that
+        # neither of the pipes blocks
+        feed_errors = []
+        feeder = threading.Thread(
+            target=_feed_stream,
+            args=(process.stdin, chunks, gpg.encoding, feed_errors))
+        feeder.daemon = True
+        feeder.start()
+        while True:
+            encrypted = process.stdout.read(STREAM_CHUNK_SIZE)
+            if not encrypted:
+                break
+            yield encrypted
+        feeder.join()
+        return_code = process.wait()
+        if return_code != 0:
+            raise IOError(
+                'gpg encryption failed with exit code {0}'.format(
+                    return_code))
+        if feed_errors:
+            raise feed_errors[0]
+    finally:
+        if process is not None and process.poll() is None:
+            # the stream was closed before it was finished
+            process.kill()
+            process.wait()
+
+
+def _feed_stream(stream, chunks, encoding, errors):
+    """
+    writes the chunks to the stream and closes it.
+
+    Exceptions are appended to the errors list in order to be raised by the
+    consumer of the stream. The chunks are closed if they are a generator so
+    that resources like database connections are released even if gpg was
+    terminated early.
+    """
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode(encoding)
+            stream.write(chunk)
+    except Exception as exception:  # pylint: disable=broad-except
+        errors.append(exception)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        try:
+            stream.close()
+        except IOError:
+            # gpg was terminated
+            pass
+
 #
 
 def rmtreeDebug(function, path, excinfo):
@@ -24,7 +24,8 @@ We send an email to the members from our membership database -- this app. The
 templates for those emails (english/german depending on members locale) can be
 prepared here.
 
-For convenience, staff can invite n members at the same time.
+For convenience, staff can invite n members at the same time. These batch
+invitations are queued and delivered by the mail worker.
 
 Combination with c3sPartyTicketing
 ----------------------------------
@@ -44,7 +45,10 @@ from pyramid.view import view_config
 from pyramid_mailer.message import Message
 
 from c3smembership.invite_members_texts import make_bcga17_invitation_email
-from c3smembership.mail_utils import send_message
+from c3smembership.mail_utils import (
+    queue_message,
+    send_message,
+)
 from c3smembership.membership_certificate import make_random_token
 from c3smembership.models import C3sMember
 from c3smembership.presentation.views.membership_listing import (
@@ -119,6 +123,7 @@ def batch_invite(request):
     The number (n) is configurable, defaults to 5.
     The number can either be supplied in the URL
     or by posting a form with 'number' and 'submit to this view.
+    The emails are queued and delivered in the background by the mail worker.
 
     === =====================================
     URL http://app:port/invite_batch/{number}
@@ -153,7 +158,7 @@ def batch_invite(request):
             token=member.email_invite_token_bcgv17,
             email=member.email)
 
-        LOG.info("mailing event invitation to to member id %s", member.id)
+        LOG.info("queueing event invitation to member id %s", member.id)
 
         email_subject, email_body = make_bcga17_invitation_email(member, url)
         message = Message(
@@ -165,7 +170,11 @@ def batch_invite(request):
                 'Reply-To': 'office@c3s.cc',
             }
         )
-        send_message(request, message)
+        queue_message(
+            request,
+            u'invitation_bcgv17',
+            u'invitation_bcgv17/{0}'.format(member.id),
+            message)
 
         member.email_invite_flag_bcgv17 = True
         member.email_invite_date_bcgv17 = datetime.now()
@@ -173,7 +182,7 @@ def batch_invite(request):
         ids_sent.append(member.id)
 
     request.session.flash(
-        "sent out {} mails (to members with ids {})".format(
+        "queued {} mails (to members with ids {})".format(
             num_sent, ids_sent),
         'message_to_staff')
 
@@ -128,3 +128,15 @@ def send_message(request, message):
         mailer = get_mailer(request)
         mailer.send(message)
 
+
+def queue_message(request, run, idempotency_key, message):
+    """
+    Queues a message of a batch mail run for the delivery by the mail worker.
+
+    The message is not queued if a message with the same idempotency key was
+    already queued.
+
+    Returns:
+        True if the message was queued, otherwise False.
+    """
+    return request.registry.mail_queue.enqueue(run, idempotency_key, message)
@@ -6,7 +6,9 @@ This module holds functionality to handle Membership Certificates.
 - Generate certificate PDFs for users.
 - Generate certificate PDFs for staff.
 
-The actual PDFs are generated using *pdflatex*.
+The actual PDFs are generated using *pdflatex* and cached until the member
+data, the certificate token or the templates change, see
+c3smembership.business.document_cache.
 
 The LaTeX templates for this have been factured out into a private repository,
 because we do not want others to be able to re-create our membership
@@ -32,6 +34,9 @@ from c3smembership.mail_utils import (
 )
 
 from c3smembership.models import C3sMember
+from c3smembership.presentation.document_response import (
+    make_document_response
+)
 from c3smembership.tex_tools import TexTools
 from c3smembership.presentation.views.membership_listing import (
     get_memberhip_listing_redirect
@@ -69,6 +74,8 @@ def send_certificate_email(request):
             status='404 Not Found',)
     # create a token for the certificate
     member.certificate_token = make_random_token()
+    request.registry.document_cache.invalidate(
+        get_certificate_document_name(member))
 
     email_subject, email_body = make_membership_certificate_email(
         request,
@@ -148,7 +155,7 @@ def generate_certificate(request):
             'that id does not exist or is not an accepted member. go back',
             status='404 Not Found',)
 
-    return gen_cert(member)
+    return gen_cert(request, member)
 
 
 @view_config(permission='manage',
@@ -170,52 +177,126 @@ def generate_certificate_staff(request):
             'Member with this id ({}) is not an accepted member!'.format(mid),
             status='404 Not Found',)
 
-    return gen_cert(member)
+    return gen_cert(request, member)
+
+
+def get_certificate_document_name(member):
+    '''
+    Utility function: get the name the certificate of a member is stored
+    under in the document cache
+    '''
+    return u'certificate_{0}'.format(member.id)
 
 
-def gen_cert(member):
+def gen_cert(request, member):
     '''
     Utility function: create a membership certificate PDF file using pdflatex
+
+    The certificate is only rendered if it is not contained in the document
+    cache yet. The cache key covers the LaTeX source, i.e. all member data
+    printed on the certificate and the signing date, the certificate token and
+    the version of the templates which the LaTeX source only references by
+    filename. A new certificate of the member replaces the cached one.
+    '''
+    latex_data = make_certificate_latex(member)
+    return make_document_response(
+        request,
+        get_certificate_templates(member),
+        u'{0}\n%{1}'.format(latex_data, member.certificate_token),
+        lambda: render_certificate(latex_data),
+        get_certificate_document_name(member))
+
+
+def render_certificate(latex_data):
+    '''
+    Utility function: render the certificate LaTeX source using pdflatex
+
+    Returns the rendered PDF as temporary file. Raises an IOError if pdflatex
+    fails so that no broken certificate is cached.
+    '''
+    # a temporary directory for the latex run
+    tempdir = tempfile.mkdtemp()
+    try:
+        latex_file = tempfile.NamedTemporaryFile(
+            suffix='.tex',
+            dir=tempdir,
+            delete=False,  # directory will be deleted anyways
+        )
+        latex_file.write(latex_data.encode('utf-8'))
+        latex_file.close()
+
+        # pdflatex latex_file to pdf_file
+        return_code = subprocess.call(
+            [
+                'pdflatex',
+                '-output-directory=%s' % tempdir,
+                latex_file.name
+            ],
+            stdout=open(os.devnull, 'w'),
+            stderr=subprocess.STDOUT  # hide output
+        )
+        if return_code != 0:
+            raise IOError(
+                'pdflatex failed with exit code {0}'.format(return_code))
+        pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+        with open(latex_file.name.replace('.tex', '.pdf'), 'rb') as rendered:
+            shutil.copyfileobj(rendered, pdf_file)
+        pdf_file.flush()
+        return pdf_file
+    finally:
+        # delete temporary directory
+        shutil.rmtree(tempdir, ignore_errors=True)
+
+
+def get_certificate_templates(member):
+    '''
+    Utility function: get the filenames of the templates a membership
+    certificate is rendered with
+
+    Returns the LaTeX header and footer, the background image and the
+    signatures.
     '''
     here = os.path.dirname(__file__)
 
     if 'de' in member.locale:
-        latex_background_image = os.path.abspath(
-            os.path.join(here, '../certificate/Urkunde_Hintergrund_blank.pdf'))
         # latex header and footer
         latex_header_tex = os.path.abspath(
             os.path.join(here, '../certificate/urkunde_header_de.tex'))
         latex_footer_tex = os.path.abspath(
             os.path.join(here, '../certificate/urkunde_footer_de.tex'))
     else:
-        latex_background_image = os.path.abspath(
-            os.path.join(here, '../certificate/Urkunde_Hintergrund_blank.pdf'))
         # latex header and footer
         latex_header_tex = os.path.abspath(
             os.path.join(here, '../certificate/urkunde_header_en.tex'))
         latex_footer_tex = os.path.abspath(
             os.path.join(here, '../certificate/urkunde_footer_en.tex'))
+    latex_background_image = os.path.abspath(
+        os.path.join(here, '../certificate/Urkunde_Hintergrund_blank.pdf'))
 
     sign_meik = os.path.abspath(
         os.path.join(here, '../certificate/sign_meik.png'))
     sign_julian = os.path.abspath(
         os.path.join(here, '../certificate/sign_julian.png'))
+    return [
+        latex_header_tex,
+        latex_footer_tex,
+        latex_background_image,
+        sign_meik,
+        sign_julian,
+    ]
 
-    # a temporary directory for the latex run
-    tempdir = tempfile.mkdtemp()
-
-    latex_file = tempfile.NamedTemporaryFile(
-        suffix='.tex',
-        dir=tempdir,
-        delete=False,  # directory will be deleted anyways
-    )
 
-    # using tempfile
-    pdf_file = tempfile.NamedTemporaryFile(
-        dir=tempdir,
-        delete=False,  # directory will be deleted anyways
-    )
-    pdf_file.name = latex_file.name.replace('.tex', '.pdf')
+def make_certificate_latex(member):
+    '''
+    Utility function: create the LaTeX source of a membership certificate
+    '''
+    (
+        latex_header_tex,
+        latex_footer_tex,
+        latex_background_image,
+        sign_meik,
+        sign_julian,
+    ) = get_certificate_templates(member)
 
     is_founder = True if 'dungHH_' in member.email_confirm_code else False
     # prepare the certificate text
@@ -336,23 +417,4 @@ def gen_cert(member):
         print '*' * 70
         print latex_data
         print '*' * 70
-    latex_file.write(latex_data.encode('utf-8'))
-    latex_file.seek(0)  # rewind
-
-    # pdflatex latex_file to pdf_file
-    # pdflatex_output =
-    subprocess.call(
-        [
-            'pdflatex',
-            '-output-directory=%s' % tempdir,
-            latex_file.name
-        ],
-        stdout=open(os.devnull, 'w'),
-        stderr=subprocess.STDOUT  # hide output
-    )
-
-    # return a pdf file
-    response = Response(content_type='application/pdf')
-    response.app_iter = open(pdf_file.name, "r")
-    shutil.rmtree(tempdir, ignore_errors=True)  # delete temporary directory
-    return response
+    return latex_data
@@ -85,6 +85,9 @@ def member_list_date_pdf_view(request):
         effective_date)
     members = member_information.get_accepted_members_sorted(
         effective_date)
+    member_share_counts = \
+        request.registry.share_information.get_member_share_counts(
+            effective_date)
 
     """
     Then a LaTeX file is constructed...
@@ -152,10 +155,8 @@ def member_list_date_pdf_view(request):
         address += ''' ({})'''.format(
             unicode(TexTools.escape(member.country)).encode('utf-8'))
 
-        member_share_count = \
-            request.registry.share_information.get_member_share_count(
-                member.membership_number,
-                effective_date)
+        member_share_count = member_share_counts.get(
+            member.membership_number, 0)
         shares_count_printed += member_share_count
 
         membership_loss = u''
@@ -257,8 +258,12 @@ def member_list_print_view(request):
     member_list.sort(key=lambda x: x.firstname, cmp=locale.strcoll)
     member_list.sort(key=lambda x: x.lastname, cmp=locale.strcoll)
 
+    share_counts = \
+        request.registry.share_information.get_member_share_counts()
+
     return {
         'members': member_list,
+        'share_counts': share_counts,
         'count': count,
         '_today': date.today(),
     }
@@ -358,12 +363,9 @@ def make_member_view(request):
 
     This view lets staff enter a date of approval through a form.
 
-    It also provides staff with listings of
-
-    * members with same first name
-    * members with same last name
-    * members with same email address
-    * members with same date of birth
+    It also provides staff with a listing of up to ten accepted members
+    which might be duplicates, scored by the similarity of names, email
+    addresses and dates of birth,
 
     so staff can decide if this may become a proper membership
     or whether this application is a duplicate of some accepted membership
@@ -405,7 +407,8 @@ def make_member_view(request):
             member.membership_type = u'investing'
         else:
             member.is_legalentity = False
-        member.membership_number = C3sMember.get_next_free_membership_number()
+        member.membership_number = \
+            request.registry.membership_number_allocator.allocate()
 
         share_id = request.registry.share_acquisition.create(
             member.membership_number,
@@ -437,6 +440,12 @@ def make_member_view(request):
                     request.route_url('detail', memberid=member.id))
         return HTTPFound(request.route_url('detail', memberid=member.id))
 
+    duplicate_candidates = [
+        (candidate, C3sMember.get_by_id(candidate.member_id))
+        for candidate
+        in request.registry.duplicate_detection.find_candidates(member)[:10]
+    ]
+
     referrer = ''
     if 'dashboard' in request.referrer:
         referrer = 'dashboard'
@@ -444,12 +453,9 @@ def make_member_view(request):
         referrer = 'detail'
     return {
         'member': member,
-        'next_mship_number': C3sMember.get_next_free_membership_number(),
-        'same_mships_firstn': C3sMember.get_same_firstnames(member.firstname),
-        'same_mships_lastn': C3sMember.get_same_lastnames(member.lastname),
-        'same_mships_email': C3sMember.get_same_email(member.email),
-        'same_mships_dob': C3sMember.get_same_date_of_birth(
-            member.date_of_birth),
+        'next_mship_number':
+            request.registry.membership_number_allocator.get_next(),
+        'duplicate_candidates': duplicate_candidates,
         # keep information about the page the user came from in order to
         # return her to this page
         'referrer': referrer,
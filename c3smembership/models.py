@@ -16,15 +16,20 @@ Classes / Data Objects:
 * **Shares** (packages -- members can hold packages of shares)
 * **C3sMember** (members .. or applications to become members)
 * **Dues15Invoice** (membership dues, 2015 edition)
+* **DuesLedgerEntry** (invoices, reversals and payments of all dues years)
+* **DuesBalance** (dues state per member and dues year)
+* **DuesMonthlyStatistics** (dues sums per dues year and month)
 """
 
 from datetime import (
     date,
     datetime,
+    time,
 )
 from decimal import Decimal
 import math
 import re
+import unicodedata
 
 from sqlalchemy import (
     and_,
@@ -34,18 +39,25 @@ from sqlalchemy import (
     DateTime,
     distinct,
     ForeignKey,
+    Index,
     Integer,
     or_,
     not_,
+    select,
     Table,
     Unicode,
+    UnicodeText,
 )
+from sqlalchemy import event
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from sqlalchemy.sql import expression
 from sqlalchemy.orm import (
+    attributes,
+    column_property,
     relationship,
-    synonym
+    synonym,
+    validates,
 )
 import sqlalchemy.types as types
 import cryptacular.bcrypt
@@ -65,33 +77,71 @@ def hash_password(password):
     return unicode(CRYPT.encode(password))
 
 
-# TODO: Use standard SQLAlchemy Decimal when a database is used which supports
-# it.
-class SqliteDecimal(types.TypeDecorator):
+def fold_search_text(text):
     """
-    Type decorator for persisting Decimal (currency values)
+    Folds a text for case and accent insensitive prefix searches.
 
-    TODO: Use standard SQLAlchemy Decimal
-    when a database is used which supports it.
+    The text is decomposed, combining characters like accents are removed and
+    the result is lower-cased, e.g. u'Göbel' is folded to u'gobel'.
     """
-    impl = types.String
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', unicode(text))
+    return u''.join(
+        [char for char in decomposed if not unicodedata.combining(char)]
+    ).lower()
 
-    def load_dialect_impl(self, dialect):
-        return dialect.type_descriptor(types.VARCHAR(100))
+
+def _fold_lastname_default(context):
+    """
+    Provides the folded last name for inserts not going through the ORM.
+    """
+    return fold_search_text(context.current_parameters.get('lastname'))
+
+
+AUTOCOMPLETE_LIMIT = 20
+"""The maximum number of autocomplete results."""
+
+
+class Money(types.TypeDecorator):
+    """
+    Type decorator for persisting Decimal (currency values) as integer cents
+
+    The amounts are multiplied by 10 to the power of the scale and stored as
+    integers so that the database sums them exactly with native integer
+    aggregates. Decimal('NaN') denoting an undefined amount is stored as
+    NULL which aggregates ignore and NULL is loaded as Decimal('NaN').
+
+    Amounts with more decimal places than the scale cannot be stored
+    losslessly and raise a ValueError.
+    """
+    impl = types.Integer
+
+    def __init__(self, precision=12, scale=2):
+        super(Money, self).__init__()
+        self.precision = precision
+        self.scale = scale
 
     def process_bind_param(self, value, dialect):
-        if value is not None:
-            return str(value)
-        else:
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        if value.is_nan():
             return None
+        cents = value.scaleb(self.scale)
+        if cents != cents.to_integral_value():
+            raise ValueError(
+                'The amount {0} has more than {1} decimal places.'.format(
+                    value, self.scale))
+        return int(cents)
 
     def process_result_value(self, value, dialect):
-        if value is not None and value != '':
-            return Decimal(value)
-        else:
-            return None
+        if value is None:
+            return Decimal('NaN')
+        return Decimal(value).scaleb(-self.scale)
 
-DatabaseDecimal = SqliteDecimal
+DatabaseDecimal = Money
 
 
 class InvalidPropertyException(Exception):
@@ -108,6 +158,41 @@ class InvalidSortDirection(Exception):
     pass
 
 
+def _keyset_condition(sort_attribute, sort_value, key_attribute, key,
+                      ascending):
+    # pylint: disable=singleton-comparison
+    """
+    Gets the condition for rows following the row with the sort value and key
+    when sorting on the sort attribute and the key attribute.
+
+    SQLite sorts NULL values first in ascending and last in descending order
+    which is reflected by the condition.
+
+    Args:
+        sort_attribute: The attribute on which the rows are sorted.
+        sort_value: The value of the sort attribute of the row.
+        key_attribute: The unique attribute on which rows with equal sort
+            values are sorted.
+        key: The value of the key attribute of the row.
+        ascending: Whether the rows are sorted ascending or descending.
+    """
+    if ascending:
+        if sort_value is None:
+            return or_(
+                and_(sort_attribute == None, key_attribute > key),
+                sort_attribute != None)
+        return and_(
+            sort_attribute >= sort_value,
+            or_(sort_attribute > sort_value, key_attribute > key))
+    if sort_value is None:
+        return and_(sort_attribute == None, key_attribute < key)
+    return or_(
+        and_(
+            sort_attribute <= sort_value,
+            or_(sort_attribute < sort_value, key_attribute < key)),
+        sort_attribute == None)
+
+
 class Group(Base):
     """
     The table of Groups.
@@ -297,7 +382,7 @@ class Shares(Base):
     """Technical primary key of the shares package."""
     number = Column(Integer())
     """Number of shares of the shares package."""
-    date_of_acquisition = Column(Date(), nullable=False)
+    date_of_acquisition = Column(Date(), index=True, nullable=False)
     """Date of acquisition of the shares package, i.e. the date of approval of
     the administrative board."""
     reference_code = Column(Unicode(255), unique=True)
@@ -342,7 +427,9 @@ members_shares = Table(
         primary_key=True, nullable=False),
     Column(
         'shares_id', Integer, ForeignKey('shares.id'),
-        primary_key=True, nullable=False)
+        primary_key=True, nullable=False),
+    # the primary key only serves lookups by member
+    Index('ix_members_shares_shares_id', 'shares_id'),
 )
 
 
@@ -374,8 +461,12 @@ class C3sMember(Base):
     """
     firstname = Column(Unicode(255))
     """given name(s) of person"""
-    lastname = Column(Unicode(255))
+    lastname = Column(Unicode(255), index=True)
     """last name of person"""
+    lastname_search = Column(
+        Unicode(255), index=True, default=_fold_lastname_default)
+    """last name folded for case and accent insensitive prefix search, see
+    fold_search_text"""
     email = Column(Unicode(255))
     """email address of person
     """
@@ -396,7 +487,7 @@ class C3sMember(Base):
     """Postal Code"""
     city = Column(Unicode(255))
     """City or Place"""
-    country = Column(Unicode(255))
+    country = Column(Unicode(255), index=True)
     """Country"""
     locale = Column(Unicode(255))
     """The Language chosen by a member when filling out the form.
@@ -619,8 +710,11 @@ class C3sMember(Base):
     dues15_balanced = Column(Boolean, default=True)  # was balanced?
     # payment
     dues15_paid = Column(Boolean, default=False)  # payment flag
-    dues15_amount_paid = Column(  # how much paid?
-        DatabaseDecimal(12, 2), default=Decimal('0'))
+    dues15_amount_paid = column_property(  # how much paid?
+        Column(DatabaseDecimal(12, 2), default=Decimal('0')),
+        # the amount paid before is needed for recording the payment in the
+        # dues ledger
+        active_history=True)
     dues15_paid_date = Column(DateTime())  # paid when?
 
     # membership dues for 2016
@@ -642,8 +736,9 @@ class C3sMember(Base):
     dues16_balanced = Column(Boolean, default=True)  # was balanced?
     # payment
     dues16_paid = Column(Boolean, default=False)  # payment flag
-    dues16_amount_paid = Column(  # how much paid?
-        DatabaseDecimal(12, 2), default=Decimal('0'))
+    dues16_amount_paid = column_property(  # how much paid?
+        Column(DatabaseDecimal(12, 2), default=Decimal('0')),
+        active_history=True)
     dues16_paid_date = Column(DateTime())  # paid when?
 
     # membership dues for 2017
@@ -665,8 +760,9 @@ class C3sMember(Base):
     dues17_balanced = Column(Boolean, default=True)  # was balanced?
     # payment
     dues17_paid = Column(Boolean, default=False)  # payment flag
-    dues17_amount_paid = Column(  # how much paid?
-        DatabaseDecimal(12, 2), default=Decimal('0'))
+    dues17_amount_paid = column_property(  # how much paid?
+        Column(DatabaseDecimal(12, 2), default=Decimal('0')),
+        active_history=True)
     dues17_paid_date = Column(DateTime())  # paid when?
 
     def __init__(self, firstname, lastname, email, password,
@@ -709,6 +805,12 @@ class C3sMember(Base):
     password = property(_get_password, _set_password)
     password = synonym('_password', descriptor=password)
 
+    @validates('lastname')
+    def _validate_lastname(self, key, lastname):
+        # pylint: disable=unused-argument
+        self.lastname_search = fold_search_text(lastname)
+        return lastname
+
     @hybrid_property
     def dues15_balance(self):
         """
@@ -1003,6 +1105,9 @@ class C3sMember(Base):
         """
         Delete one C3sMember entry by id.
 
+        The dues ledger entries and balances of the member are deleted as
+        well as the bulk delete bypasses record_dues_ledger.
+
         Args:
             _id: the id to delete
 
@@ -1010,7 +1115,11 @@ class C3sMember(Base):
             * **1** on success
             * **0** else
         """
-        return DBSession.query(cls).filter(cls.id == member_id).delete()
+        deleted_count = DBSession.query(cls).filter(
+            cls.id == member_id).delete()
+        if deleted_count:
+            delete_members_dues(DBSession.connection(), [member_id])
+        return deleted_count
 
     # listings
     @classmethod
@@ -1028,34 +1137,93 @@ class C3sMember(Base):
             cls.is_duplicate == 1).all()
 
     @classmethod
-    def get_members(cls, order_by, how_many=10, offset=0, order="asc"):
+    def _get_page(cls, query, sort_attribute, sort_direction, offset,
+                  page_size, cursor=None):
+        # pylint: disable=too-many-arguments
         """
-        Compute a list of C3sMember items with membership accepted (Query!).
+        Gets a page of the query sorted on the sort attribute and the ID.
+
+        Without cursor the page is retrieved by skipping the offset rows. With
+        cursor the page is retrieved by seeking the rows following or
+        preceding the row referenced by the cursor so that the costs do not
+        depend on the position of the page. If the referenced row does not
+        exist anymore the offset is used.
+
+        Args:
+            query: The query of which the page is retrieved.
+            sort_attribute: The attribute on which the rows are sorted.
+            sort_direction: Either "asc" or "desc".
+            offset: The number of rows on the previous pages.
+            page_size: The number of rows on the page.
+            cursor: Optional. A keyset cursor having the attributes direction,
+                either "after" or "before", and key, the ID of the row after
+                or before which the page starts or None for the start
+                respectively end of the rows.
+
+        Returns:
+            List of rows.
+        """
+        ascending = sort_direction == 'asc'
+        sort_value = None
+        if cursor is not None and cursor.key is not None:
+            row = DBSession.query(sort_attribute).filter(
+                cls.id == cursor.key).first()
+            if row is None:
+                cursor = None
+            else:
+                sort_value = row[0]
+
+        forward = cursor is None or cursor.direction == 'after'
+        if forward == ascending:
+            order = [sort_attribute.asc(), cls.id.asc()]
+        else:
+            order = [sort_attribute.desc(), cls.id.desc()]
+
+        if cursor is None:
+            return query.order_by(*order).slice(
+                offset, offset + page_size).all()
+        if cursor.key is not None:
+            query = query.filter(_keyset_condition(
+                sort_attribute,
+                sort_value,
+                cls.id,
+                cursor.key,
+                forward == ascending))
+        rows = query.order_by(*order).limit(page_size).all()
+        if not forward:
+            rows.reverse()
+        return rows
+
+    @classmethod
+    def get_members(cls, order_by, how_many=10, offset=0, order="asc",
+                    cursor=None):
+        # pylint: disable=too-many-arguments
+        """
+        Compute a list of C3sMember items with membership accepted.
 
         Args:
             order_by: which column to sort on, e.g. "id"
             how_many: number of entries (Integer)
             offset: how many to omit (leave out first n; default is 0)
             order: either "asc" (ascending, **default**) or "desc" (descending)
+            cursor: Optional. A keyset pagination cursor from which the page
+                is retrieved instead of the offset, see _get_page.
 
         Raises:
             Exception: invalid value for "order_by" or "order".
 
         Returns:
-            query: C3sMember database query
+            list: C3sMember objects
         """
-        try:
-            attr = getattr(cls, order_by)
-            order_function = getattr(attr, order)
-        except:
+        attr = getattr(cls, order_by, None)
+        if attr is None or order not in ['asc', 'desc']:
             raise Exception("Invalid order_by ({0}) or order value "
                             "({1})".format(order_by, order))
-        count = int(offset) + int(how_many)
-        offset = int(offset)
         query = DBSession.query(cls).filter(
             cls.membership_accepted == 1
-        ).order_by(order_function()).slice(offset, count)
-        return query
+        )
+        return cls._get_page(
+            query, attr, order, int(offset), int(how_many), cursor)
 
     # statistical stuff
     @classmethod
@@ -1285,7 +1453,8 @@ class C3sMember(Base):
 
     @classmethod
     def nonmember_listing(cls, offset, page_size, sort_property,
-                          sort_direction='asc'):
+                          sort_direction='asc', cursor=None):
+        # pylint: disable=too-many-arguments
         """
         Retrieve a list of members which are **not** accepted.
         Note:
@@ -1300,6 +1469,8 @@ class C3sMember(Base):
             sort_property: Which column to sort on, e.g. "id"
             sort_direction: Either "asc" (ascending, **default**) or "desc"
                 (descending)
+            cursor: Optional. A keyset pagination cursor from which the page
+                is retrieved instead of the offset, see _get_page.
 
         Raises:
             InvalidPropertyException: The sort property does not exist.
@@ -1314,9 +1485,7 @@ class C3sMember(Base):
             raise InvalidPropertyException(
                 'C3sMember does not have a property named "{0}".'.format(
                     sort_property))
-        try:
-            order_function = getattr(sort_attribute, sort_direction)
-        except AttributeError:
+        if sort_direction not in ['asc', 'desc']:
             raise InvalidSortDirection(
                 'Invalid sort direction: {0}'.format(sort_direction))
         query = DBSession.query(cls).filter(
@@ -1327,10 +1496,9 @@ class C3sMember(Base):
                 # noqa
                 cls.membership_accepted == None,
             )
-        ).order_by(
-            order_function()
-        ).slice(offset, offset + page_size)
-        return query.all()
+        )
+        return cls._get_page(
+            query, sort_attribute, sort_direction, offset, page_size, cursor)
 
     @classmethod
     def nonmember_listing_count(cls):
@@ -1376,21 +1544,30 @@ class C3sMember(Base):
 
     # autocomplete
     @classmethod
-    def get_matching_codes(cls, prefix):
+    def get_matching_codes(cls, prefix, limit=AUTOCOMPLETE_LIMIT):
         """
         Return only codes matching the prefix.
 
         This is used in the autocomplete form to search for C3sMember entries.
+        Reference codes consist of upper case letters and digits so the prefix
+        is matched case insensitively. The prefix is matched by a range on the
+        indexed code column so that only matching rows are read.
+
+        Args:
+            prefix: The prefix the codes start with.
+            limit: Optional. The maximum number of codes returned, defaults to
+                AUTOCOMPLETE_LIMIT. None returns all matching codes.
 
         Returns:
-            list of strings
+            list of strings ordered by code
         """
-        rows = DBSession.query(cls).all()
-        codes = []
-        for row in rows:
-            if row.email_confirm_code.startswith(prefix):
-                codes.append(row.email_confirm_code)
-        return codes
+        prefix = unicode(prefix).upper()
+        query = DBSession.query(cls.email_confirm_code) \
+            .filter(cls.email_confirm_code >= prefix) \
+            .filter(cls.email_confirm_code < prefix + u'\uffff') \
+            .order_by(cls.email_confirm_code) \
+            .limit(limit)
+        return [row.email_confirm_code for row in query.all()]
 
     @classmethod
     def check_password(cls, member_id, password):
@@ -1426,43 +1603,6 @@ class C3sMember(Base):
         login = cls.get_by_id(member_id)  # is None if user not exists
         return login
 
-    # for merge comparisons
-    @classmethod
-    def get_same_lastnames(cls, lastname):
-        """return list of accepted members with same lastnames"""
-        return DBSession.query(cls).filter(
-            and_(
-                cls.membership_accepted == 1,
-                cls.lastname == lastname
-            )).all()
-
-    @classmethod
-    def get_same_firstnames(cls, firstname):
-        """return list of accepted members with same fistnames"""
-        return DBSession.query(cls).filter(
-            and_(
-                cls.membership_accepted == 1,
-                cls.firstname == firstname
-            )).all()
-
-    @classmethod
-    def get_same_email(cls, email):
-        """return list of accepted members with same email"""
-        return DBSession.query(cls).filter(
-            and_(
-                cls.membership_accepted == 1,
-                cls.email == email,
-            )).all()
-
-    @classmethod
-    def get_same_date_of_birth(cls, date_of_birth):
-        """return list of accepted members with same date of birth"""
-        return DBSession.query(cls).filter(
-            and_(
-                cls.membership_accepted == 1,
-                cls.date_of_birth == date_of_birth,
-            )).all()
-
     # membership numbers etc.
     @classmethod
     def get_num_membership_numbers(cls):
@@ -1471,35 +1611,6 @@ class C3sMember(Base):
         """
         return DBSession.query(cls).filter(cls.membership_number).count()
 
-    @classmethod
-    def get_next_free_membership_number(cls):
-        """
-        returns the next free membership number
-        """
-        return C3sMember.get_highest_membership_number() + 1
-
-    @classmethod
-    def get_highest_membership_number(cls):
-        """
-        get the highest membership number
-        """
-        rows = DBSession.query(cls.membership_number).filter(
-            cls.membership_number != None).all()  # noqa
-        membership_numbers = []
-        for row in rows:
-            membership_numbers.append(int(row[0]))
-        try:
-            max_number = max(membership_numbers)
-        except ValueError:
-            membership_numbers = [0, 999999999]
-            max_number = 999999999
-        try:
-            assert(max_number == 999999999)
-            membership_numbers.remove(max(membership_numbers))  # remove known maximum
-        except AssertionError:
-            pass
-        return max(membership_numbers)
-
     # countries
     @classmethod
     def get_num_countries(cls):
@@ -1520,18 +1631,35 @@ class C3sMember(Base):
 
     # autocomplete
     @classmethod
-    def get_matching_people(cls, prefix):
+    def get_matching_people(cls, prefix, limit=AUTOCOMPLETE_LIMIT):
         """
-        return only entries matchint the prefix
-        """
-        rows = DBSession.query(cls).all()
+        Return only entries with last names matching the prefix.
+
+        The prefix is matched case and accent insensitively by a range on the
+        indexed folded last name so that only matching rows are read.
+
+        Args:
+            prefix: The prefix the last names start with.
+            limit: Optional. The maximum number of entries returned, defaults
+                to AUTOCOMPLETE_LIMIT. None returns all matching entries.
+
+        Returns:
+            dictionary mapping the strings of reference code, last name and
+            first name to themselves
+        """
+        prefix = fold_search_text(prefix)
+        query = DBSession.query(
+            cls.email_confirm_code, cls.lastname, cls.firstname) \
+            .filter(cls.lastname_search >= prefix) \
+            .filter(cls.lastname_search < prefix + u'\uffff') \
+            .order_by(cls.lastname_search, cls.firstname) \
+            .limit(limit)
         names = {}
-        for row in rows:
-            if row.lastname.startswith(prefix):
-                key = (
-                    row.email_confirm_code + ' ' +
-                    row.lastname + ', ' + row.firstname)
-                names[key] = key
+        for row in query.all():
+            key = (
+                row.email_confirm_code + ' ' +
+                row.lastname + ', ' + row.firstname)
+            names[key] = key
         return names
 
     def set_dues15_payment(self, paid_amount, paid_date):
@@ -1726,6 +1854,36 @@ class C3sMember(Base):
             not_(cls.membership_lost_filter(effective_date)))
 
 
+def _not_null_index(column):
+    """
+    Creates a partial index of the column only containing the rows in which
+    the column is set.
+
+    Equality and range conditions on the column imply "IS NOT NULL" so that
+    SQLite uses the partial index for them.
+    """
+    # pylint: disable=singleton-comparison
+    return Index(
+        'ix_{0}_{1}'.format(column.table.name, column.key),
+        column,
+        sqlite_where=column != None)  # noqa
+
+
+# The membership filters compare acceptance, membership date and loss date
+# together. Membership numbers, tokens and loss dates are only set for some
+# entries and therefore indexed partially.
+Index(
+    'ix_members_membership_accepted_date',
+    C3sMember.membership_accepted,
+    C3sMember.membership_date,
+    C3sMember.membership_loss_date)
+_not_null_index(C3sMember.membership_number)
+_not_null_index(C3sMember.membership_loss_date)
+_not_null_index(C3sMember.email_invite_token_bcgv17)
+_not_null_index(C3sMember.dues15_token)
+_not_null_index(C3sMember.dues16_token)
+_not_null_index(C3sMember.dues17_token)
+
 
 class Dues15Invoice(Base):
     """
@@ -1766,7 +1924,7 @@ class Dues15Invoice(Base):
     # person reference
     member_id = Column(Integer())
     """reference to C3sMember id"""
-    membership_no = Column(Integer())
+    membership_no = Column(Integer(), index=True)
     """reference to C3sMember membership_number"""
     email = Column(Unicode(255))
     """C3sMembers email we sent this invoice to"""
@@ -1880,23 +2038,22 @@ class Dues15Invoice(Base):
                 [(
                     expression.not_(Dues15Invoice.is_reversal),
                     Dues15Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_normal'),
+                else_=0)).label('amount_invoiced_normal'),
             func.sum(expression.case(
                 [(
                     Dues15Invoice.is_reversal,
                     Dues15Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_reversal'),
+                else_=0)).label('amount_invoiced_reversal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_paid')
+                '0', Money).label('amount_paid')
         ).group_by(invoice_date_month)
         # collect the payments per month
         member_payments_query = DBSession.query(
             payment_date_month.label('month'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_invoiced_normal'),
+                '0', Money).label('amount_invoiced_normal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal
-            ).label('amount_invoiced_reversal'),
+                '0', Money).label('amount_invoiced_reversal'),
             func.sum(C3sMember.dues15_amount_paid).label('amount_paid')
         ).filter(C3sMember.dues15_paid_date.isnot(None)) \
             .group_by(payment_date_month)
@@ -1966,7 +2123,7 @@ class Dues16Invoice(Base):
     # person reference
     member_id = Column(Integer())
     """reference to C3sMember id"""
-    membership_no = Column(Integer())
+    membership_no = Column(Integer(), index=True)
     """reference to C3sMember membership_number"""
     email = Column(Unicode(255))
     """C3sMembers email we sent this invoice to"""
@@ -2080,23 +2237,22 @@ class Dues16Invoice(Base):
                 [(
                     expression.not_(Dues16Invoice.is_reversal),
                     Dues16Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_normal'),
+                else_=0)).label('amount_invoiced_normal'),
             func.sum(expression.case(
                 [(
                     Dues16Invoice.is_reversal,
                     Dues16Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_reversal'),
+                else_=0)).label('amount_invoiced_reversal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_paid')
+                '0', Money).label('amount_paid')
         ).group_by(invoice_date_month)
         # collect the payments per month
         member_payments_query = DBSession.query(
             payment_date_month.label('month'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_invoiced_normal'),
+                '0', Money).label('amount_invoiced_normal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal
-            ).label('amount_invoiced_reversal'),
+                '0', Money).label('amount_invoiced_reversal'),
             func.sum(C3sMember.dues16_amount_paid).label('amount_paid')
         ).filter(C3sMember.dues16_paid_date.isnot(None)) \
             .group_by(payment_date_month)
@@ -2166,7 +2322,7 @@ class Dues17Invoice(Base):
     # person reference
     member_id = Column(Integer())
     """reference to C3sMember id"""
-    membership_no = Column(Integer())
+    membership_no = Column(Integer(), index=True)
     """reference to C3sMember membership_number"""
     email = Column(Unicode(255))
     """C3sMembers email we sent this invoice to"""
@@ -2280,23 +2436,22 @@ class Dues17Invoice(Base):
                 [(
                     expression.not_(Dues17Invoice.is_reversal),
                     Dues17Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_normal'),
+                else_=0)).label('amount_invoiced_normal'),
             func.sum(expression.case(
                 [(
                     Dues17Invoice.is_reversal,
                     Dues17Invoice.invoice_amount)],
-                else_=Decimal('0.0'))).label('amount_invoiced_reversal'),
+                else_=0)).label('amount_invoiced_reversal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_paid')
+                '0', Money).label('amount_paid')
         ).group_by(invoice_date_month)
         # collect the payments per month
         member_payments_query = DBSession.query(
             payment_date_month.label('month'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal).label('amount_invoiced_normal'),
+                '0', Money).label('amount_invoiced_normal'),
             expression.literal_column(
-                '\'0.0\'', SqliteDecimal
-            ).label('amount_invoiced_reversal'),
+                '0', Money).label('amount_invoiced_reversal'),
             func.sum(C3sMember.dues17_amount_paid).label('amount_paid')
         ).filter(C3sMember.dues17_paid_date.isnot(None)) \
             .group_by(payment_date_month)
@@ -2326,3 +2481,677 @@ class Dues17Invoice(Base):
                     'amount_paid': month_stat[3]
                 })
         return result
+
+
+class DuesLedgerEntry(Base):
+    """
+    An entry of the dues ledger of all dues years.
+
+    The ledger records the invoices, reversal invoices and payments of the
+    membership dues of all years in one table keyed by dues year and member.
+    The dues history of a member as well as the figures of all years are
+    retrieved with one indexed query and new dues years need no schema
+    change. DuesBalance holds the resulting dues state per member and year.
+
+    The entries are recorded from the per-year invoice tables and the dues
+    columns of C3sMember whenever they are flushed, see
+    record_dues_ledger.
+    """
+    __tablename__ = 'dues_ledger'
+
+    INVOICE = u'invoice'
+    """entry type of an invoice"""
+    REVERSAL = u'reversal'
+    """entry type of a reversal invoice cancelling an invoice"""
+    PAYMENT = u'payment'
+    """entry type of a payment"""
+
+    # pylint: disable=invalid-name
+    id = Column(Integer, primary_key=True)
+    """tech. id. / no. in table (integer, primary key)"""
+    year = Column(Integer(), nullable=False)
+    """the dues year"""
+    member_id = Column(Integer(), nullable=False)
+    """reference to C3sMember id"""
+    entry_type = Column(Unicode(20), nullable=False)
+    """invoice, reversal or payment"""
+    entry_date = Column(DateTime())
+    """timestamp of invoice creation or payment date"""
+    amount = Column(DatabaseDecimal(12, 2))
+    """amount, negative for reversals (DatabaseDecimal(12,2))"""
+    # invoices and reversals
+    invoice_no = Column(Integer())
+    """invoice number, unique per year"""
+    invoice_no_string = Column(Unicode(255))
+    """invoice number string"""
+    is_cancelled = Column(Boolean, default=False)
+    """flag: invoice has been superseeded by reversal or cancellation"""
+    cancelled_date = Column(DateTime())
+    """timestamp of cancellation/reversal"""
+    is_altered = Column(Boolean, default=False)
+    """flag: has the amount been reduced or increased?"""
+    membership_no = Column(Integer())
+    """reference to C3sMember membership_number"""
+    email = Column(Unicode(255))
+    """C3sMembers email we sent this invoice to"""
+    token = Column(Unicode(255))
+    """used to limit access to this invoice"""
+    preceding_invoice_no = Column(Integer(), default=None)
+    """the invoice number preceeding this one, if applicable"""
+    succeeding_invoice_no = Column(Integer(), default=None)
+    """the invoice number succeeding this one, if applicable"""
+
+    INVOICE_COLUMNS = [
+        'invoice_no',
+        'invoice_no_string',
+        'is_cancelled',
+        'cancelled_date',
+        'is_altered',
+        'membership_no',
+        'email',
+        'token',
+        'preceding_invoice_no',
+        'succeeding_invoice_no',
+    ]
+    """the columns copied from the per-year invoices"""
+
+    @property
+    def is_reversal(self):
+        """flag: is this a reversal invoice?"""
+        return self.entry_type == self.REVERSAL
+
+    @property
+    def invoice_date(self):
+        """timestamp of invoice creation like for per-year invoices"""
+        return self.entry_date
+
+    @property
+    def invoice_amount(self):
+        """amount like for per-year invoices"""
+        return self.amount
+
+    @classmethod
+    def get_invoice_values(cls, year, invoice):
+        """
+        Gets the column values of the ledger entry of a per-year invoice.
+
+        Args:
+            year: The dues year of the invoice.
+            invoice: The Dues15Invoice, Dues16Invoice or Dues17Invoice.
+
+        Returns:
+            A dictionary of column values of the ledger entry.
+        """
+        values = {
+            'year': year,
+            'member_id': invoice.member_id,
+            'entry_type': cls.REVERSAL if invoice.is_reversal else cls.INVOICE,
+            'entry_date': invoice.invoice_date,
+            'amount': invoice.invoice_amount,
+        }
+        for name in cls.INVOICE_COLUMNS:
+            values[name] = getattr(invoice, name)
+        return values
+
+
+class DuesBalance(Base):
+    """
+    The dues state of a member for a dues year.
+
+    There is a row per member and year for which the member has dues, i.e.
+    a start quarter, an invoice or a payment. The rows are copied from the
+    dues columns of C3sMember whenever they are flushed, see
+    record_dues_ledger.
+    """
+    __tablename__ = 'dues_balances'
+    member_id = Column(Integer(), primary_key=True, autoincrement=False)
+    """reference to C3sMember id"""
+    year = Column(Integer(), primary_key=True, autoincrement=False)
+    """the dues year"""
+    start = Column(Unicode(255))
+    """codified start quarter of membership, e.g. q1_2017"""
+    invoice = Column(Boolean, default=False)
+    """flag: invoice sent?"""
+    invoice_no = Column(Integer())
+    """number of the current invoice"""
+    amount = Column(DatabaseDecimal(12, 2), default=Decimal('NaN'))
+    """calculated amount the member has to pay by default"""
+    reduced = Column(Boolean, default=False)
+    """flag: was the amount reduced?"""
+    amount_reduced = Column(DatabaseDecimal(12, 2), default=Decimal('NaN'))
+    """the amount reduced to"""
+    amount_paid = Column(DatabaseDecimal(12, 2), default=Decimal('0'))
+    """the amount paid"""
+    paid_date = Column(DateTime())
+    """timestamp of the last payment"""
+    balance = Column(DatabaseDecimal(12, 2), default=Decimal('0'))
+    """the amount to be settled"""
+    balanced = Column(Boolean, default=True)
+    """flag: is the balance settled?"""
+
+    COLUMNS = [
+        'start',
+        'invoice',
+        'invoice_no',
+        'amount',
+        'reduced',
+        'amount_reduced',
+        'amount_paid',
+        'paid_date',
+        'balance',
+        'balanced',
+    ]
+    """the columns copied from the dues columns of C3sMember"""
+
+    CHUNK_SIZE = 500
+    """
+    The maximum number of members refreshed per statement staying below the
+    SQLite limit of bound parameters.
+    """
+
+    @classmethod
+    def refresh(cls, connection, year, member_ids=None):
+        """
+        Copies the dues state from the dues columns of C3sMember.
+
+        Args:
+            connection: The connection to execute the statements with.
+            year: The dues year.
+            member_ids: Optional. The IDs of the members to refresh. All
+                members are refreshed if not specified.
+        """
+        members = C3sMember.__table__
+        balances = cls.__table__
+        prefix = 'dues{0}_'.format(str(year)[2:])
+        has_dues = or_(
+            members.c[prefix + 'start'] != None,  # noqa
+            members.c[prefix + 'invoice'] == True,  # noqa
+            members.c[prefix + 'paid'] == True)  # noqa
+        select_balances = select(
+            [members.c.id, expression.literal(year, Integer)] +
+            [members.c[prefix + name] for name in cls.COLUMNS])
+        insert = balances.insert().from_select(
+            ['member_id', 'year'] + cls.COLUMNS,
+            select_balances.where(has_dues))
+        if member_ids is None:
+            connection.execute(
+                balances.delete().where(balances.c.year == year))
+            connection.execute(insert)
+            return
+        member_ids = list(member_ids)
+        for start in range(0, len(member_ids), cls.CHUNK_SIZE):
+            chunk = member_ids[start:start + cls.CHUNK_SIZE]
+            connection.execute(balances.delete().where(and_(
+                balances.c.year == year,
+                balances.c.member_id.in_(chunk))))
+            connection.execute(balances.insert().from_select(
+                ['member_id', 'year'] + cls.COLUMNS,
+                select_balances.where(and_(
+                    has_dues, members.c.id.in_(chunk)))))
+
+
+class DuesMonthlyStatistics(Base):
+    """
+    The sums of the dues invoices, reversals and payments per dues year and
+    calendar month.
+
+    The sums are aggregated from the dues ledger and refreshed for the
+    months of the ledger entries recorded or changed by a flush, see
+    record_dues_ledger, so that the statistics page reads one row per month
+    instead of aggregating all invoices and payments.
+    """
+    __tablename__ = 'dues_monthly_statistics'
+    year = Column(Integer(), primary_key=True, autoincrement=False)
+    """the dues year"""
+    month = Column(Date(), primary_key=True)
+    """the first day of the calendar month"""
+    amount_invoiced_normal = Column(
+        DatabaseDecimal(12, 2), default=Decimal('0'))
+    """the sum of the invoices"""
+    amount_invoiced_reversal = Column(
+        DatabaseDecimal(12, 2), default=Decimal('0'))
+    """the sum of the reversal invoices"""
+    amount_paid = Column(DatabaseDecimal(12, 2), default=Decimal('0'))
+    """the sum of the payments"""
+
+    AMOUNT_COLUMNS = {
+        DuesLedgerEntry.INVOICE: 'amount_invoiced_normal',
+        DuesLedgerEntry.REVERSAL: 'amount_invoiced_reversal',
+        DuesLedgerEntry.PAYMENT: 'amount_paid',
+    }
+    """the amount columns by ledger entry type"""
+
+    @classmethod
+    def get_month(cls, timestamp):
+        """
+        Gets the first day of the calendar month of a date or timestamp.
+        """
+        return date(timestamp.year, timestamp.month, 1)
+
+    @classmethod
+    def refresh(cls, connection, months=None):
+        """
+        Aggregates the sums of calendar months from the dues ledger.
+
+        The amounts are summed by the database as integer cents and thus
+        exactly.
+
+        Args:
+            connection: The connection to execute the statements with.
+            months: Optional. An iterable of tuples of dues year and first
+                day of the calendar month to refresh. All months are
+                refreshed if not specified.
+        """
+        ledger = DuesLedgerEntry.__table__
+        statistics = cls.__table__
+        if months is None:
+            connection.execute(statistics.delete())
+            conditions = [ledger.c.entry_date != None]  # noqa
+        else:
+            conditions = []
+            for year, month in set(months):
+                next_month = date(
+                    month.year + month.month // 12, month.month % 12 + 1, 1)
+                connection.execute(statistics.delete().where(and_(
+                    statistics.c.year == year,
+                    statistics.c.month == month)))
+                # the condition on year and entry date uses the ledger index
+                conditions.append(and_(
+                    ledger.c.year == year,
+                    ledger.c.entry_date >= datetime.combine(month, time()),
+                    ledger.c.entry_date < datetime.combine(
+                        next_month, time())))
+        # SQLite specific: substring as SQLite does not support date_trunc.
+        entry_month = func.substr(ledger.c.entry_date, 1, 7)
+        sums = {}
+        for condition in conditions:
+            rows = connection.execute(
+                select([
+                    ledger.c.year,
+                    entry_month,
+                    ledger.c.entry_type,
+                    func.sum(ledger.c.amount),
+                ])
+                .where(condition)
+                .group_by(ledger.c.year, entry_month, ledger.c.entry_type))
+            for year, month, entry_type, amount in rows:
+                month_sums = sums.setdefault(
+                    (year, date(int(month[0:4]), int(month[5:7]), 1)),
+                    dict.fromkeys(cls.AMOUNT_COLUMNS.values(), Decimal('0')))
+                if not amount.is_nan():
+                    month_sums[cls.AMOUNT_COLUMNS[entry_type]] = amount
+        if sums:
+            connection.execute(statistics.insert(), [
+                dict(row_sums, year=row_year, month=row_month)
+                for (row_year, row_month), row_sums in sums.items()])
+
+
+# The dues history of a member is retrieved per member, the figures per year
+# and the invoices by number.
+Index(
+    'ix_dues_ledger_member_id_year',
+    DuesLedgerEntry.member_id,
+    DuesLedgerEntry.year,
+    DuesLedgerEntry.entry_date)
+Index(
+    'ix_dues_ledger_year_entry_date',
+    DuesLedgerEntry.year,
+    DuesLedgerEntry.entry_date)
+Index(
+    'ix_dues_ledger_year_invoice_no',
+    DuesLedgerEntry.year,
+    DuesLedgerEntry.invoice_no)
+Index('ix_dues_balances_year', DuesBalance.year)
+
+
+DUES_INVOICE_CLASSES = {
+    2015: Dues15Invoice,
+    2016: Dues16Invoice,
+    2017: Dues17Invoice,
+}
+"""
+The per-year invoice classes by dues year.
+"""
+
+
+def rebuild_dues_ledger(connection):
+    """
+    Rebuilds the invoice and reversal entries of the dues ledger and the dues
+    balances from the per-year invoice tables and the dues columns of
+    C3sMember.
+
+    This is needed after writing dues data bypassing the session, e.g. when
+    generating a register.
+
+    The payment entries are kept as the dated payments are not stored
+    anywhere else. Payments are only stored as amount paid per member and
+    year. If the amount paid differs from the sum of the payment entries, a
+    payment entry of the difference with the date of the last payment is
+    added like when the amount paid is flushed.
+
+    Args:
+        connection: The connection to execute the statements with.
+    """
+    ledger = DuesLedgerEntry.__table__
+    members = C3sMember.__table__
+    # the payments of members deleted bypassing the session are deleted too
+    connection.execute(ledger.delete().where(or_(
+        ledger.c.entry_type != DuesLedgerEntry.PAYMENT,
+        ~ledger.c.member_id.in_(select([members.c.id])))))
+    for year, invoice_class in sorted(DUES_INVOICE_CLASSES.items()):
+        invoices = invoice_class.__table__
+        connection.execute(ledger.insert().from_select(
+            ['year', 'member_id', 'entry_type', 'entry_date', 'amount'] +
+            DuesLedgerEntry.INVOICE_COLUMNS,
+            select(
+                [
+                    expression.literal(year, Integer),
+                    invoices.c.member_id,
+                    expression.case(
+                        [(invoices.c.is_reversal == True,  # noqa
+                          DuesLedgerEntry.REVERSAL)],
+                        else_=DuesLedgerEntry.INVOICE),
+                    invoices.c.invoice_date,
+                    invoices.c.invoice_amount,
+                ] + [invoices.c[name]
+                     for name in DuesLedgerEntry.INVOICE_COLUMNS])
+            .order_by(invoices.c.id)))
+        recorded = {}
+        for member_id, amount in connection.execute(
+                select([ledger.c.member_id, ledger.c.amount])
+                .where(and_(
+                    ledger.c.year == year,
+                    ledger.c.entry_type == DuesLedgerEntry.PAYMENT))):
+            recorded[member_id] = recorded.get(
+                member_id, Decimal('0')) + _to_decimal(amount)
+        prefix = 'dues{0}_'.format(str(year)[2:])
+        payments = []
+        for member_id, amount_paid, paid_date in connection.execute(
+                select([
+                    members.c.id,
+                    members.c[prefix + 'amount_paid'],
+                    members.c[prefix + 'paid_date'],
+                ])
+                .order_by(members.c.id)):
+            amount = _to_decimal(amount_paid) - recorded.get(
+                member_id, Decimal('0'))
+            if amount != Decimal('0'):
+                payments.append({
+                    'year': year,
+                    'member_id': member_id,
+                    'entry_type': DuesLedgerEntry.PAYMENT,
+                    'entry_date': paid_date,
+                    'amount': amount,
+                })
+        if payments:
+            connection.execute(ledger.insert(), payments)
+        DuesBalance.refresh(connection, year)
+    DuesMonthlyStatistics.refresh(connection)
+
+
+class MailJob(Base):
+    """
+    An email queued for delivery by the mail worker.
+
+    Batch mail runs like dues invoices and invitations queue their emails
+    instead of sending them within the request, see
+    c3smembership.business.mail_queue.
+    """
+    __tablename__ = 'mail_jobs'
+    # pylint: disable=invalid-name
+    id = Column(Integer, primary_key=True)
+    """technical id. / number in table (integer, primary key)"""
+    run = Column(Unicode(255), index=True, nullable=False)
+    """the batch run the email belongs to, e.g. dues17_invoice"""
+    idempotency_key = Column(Unicode(255), unique=True, nullable=False)
+    """key unique per email to be sent, e.g. per member and run, preventing
+    the same email from being queued twice"""
+    status = Column(Unicode(20), nullable=False, default=u'pending')
+    """pending, sending, sent or failed"""
+    attempts = Column(Integer, nullable=False, default=0)
+    """the number of delivery attempts"""
+    next_attempt = Column(DateTime(), index=True, nullable=False)
+    """the time from which on the job can be claimed by a worker"""
+    created = Column(DateTime(), nullable=False)
+    """the time the job was queued"""
+    sent = Column(DateTime())
+    """the time the email was delivered"""
+    last_error = Column(Unicode(255))
+    """the error of the last failed delivery attempt"""
+    sender = Column(Unicode(255), nullable=False)
+    recipients = Column(Unicode(1023), nullable=False)
+    """comma separated list of recipients"""
+    subject = Column(Unicode(255), nullable=False)
+    body = Column(UnicodeText, nullable=False)
+    extra_headers = Column(UnicodeText)
+    """JSON object of additional email headers"""
+
+
+class NumberSequence(Base):
+    """
+    A counter handing out consecutive numbers like membership numbers.
+
+    Numbers are allocated by incrementing the counter with a single update
+    statement so that concurrent transactions cannot hand out the same
+    number, see
+    c3smembership.data.repository.number_sequence_repository.
+    """
+    __tablename__ = 'number_sequences'
+    name = Column(Unicode(255), primary_key=True)
+    """the name of the sequence, e.g. membership_number"""
+    value = Column(Integer, nullable=False)
+    """the last number allocated"""
+
+
+class AppliedBooking(Base):
+    """
+    A booking of a bank statement whose payment was applied to the dues.
+
+    The identifiers of the applied bookings prevent a bank statement from
+    being booked twice when it is reconciled again, see
+    c3smembership.business.payment_reconciliation.
+    """
+    __tablename__ = 'applied_bookings'
+    # pylint: disable=invalid-name
+    id = Column(Integer, primary_key=True)
+    """technical id. / number in table (integer, primary key)"""
+    identifier = Column(Unicode(255), unique=True, nullable=False)
+    """the reference of the bank or a hash of the booking data"""
+    year = Column(Integer(), nullable=False)
+    """the dues year the payment was booked to"""
+    member_id = Column(Integer(), nullable=False)
+    """reference to C3sMember id"""
+    amount = Column(DatabaseDecimal(12, 2))
+    """the paid amount (DatabaseDecimal(12,2))"""
+    booking_date = Column(Date())
+    """the date of the booking"""
+    applied = Column(DateTime(), nullable=False)
+    """the time the payment was applied"""
+
+
+def _dues_attribute_names(year):
+    prefix = 'dues{0}_'.format(str(year)[2:])
+    return [
+        prefix + 'start',
+        prefix + 'invoice',
+        prefix + 'invoice_no',
+        prefix + 'amount',
+        prefix + 'reduced',
+        '_' + prefix + 'amount_reduced',
+        prefix + 'amount_paid',
+        prefix + 'paid_date',
+        '_' + prefix + 'balance',
+        prefix + 'balanced',
+    ]
+
+
+def _to_decimal(value):
+    if value is None:
+        return Decimal('0')
+    value = Decimal(value)
+    return Decimal('0') if value.is_nan() else value
+
+
+def _delete_dues_ledger_entries(connection, condition):
+    """
+    Deletes the dues ledger entries matching the condition.
+
+    Returns:
+        The set of tuples of dues year and first day of the calendar month of
+        the deleted entries.
+    """
+    ledger = DuesLedgerEntry.__table__
+    months = set(
+        (year, DuesMonthlyStatistics.get_month(entry_date))
+        for year, entry_date in connection.execute(
+            select([ledger.c.year, ledger.c.entry_date])
+            .where(and_(condition, ledger.c.entry_date != None))))  # noqa
+    connection.execute(ledger.delete().where(condition))
+    return months
+
+
+def delete_members_dues(connection, member_ids):
+    """
+    Deletes the dues ledger entries and balances of deleted members and
+    refreshes the monthly dues statistics of the affected months.
+
+    This is needed when members are deleted bypassing the session.
+
+    Args:
+        connection: The connection to execute the statements with.
+        member_ids: The IDs of the deleted members.
+    """
+    months = _delete_dues_ledger_entries(
+        connection, DuesLedgerEntry.__table__.c.member_id.in_(member_ids))
+    connection.execute(DuesBalance.__table__.delete().where(
+        DuesBalance.__table__.c.member_id.in_(member_ids)))
+    if months:
+        DuesMonthlyStatistics.refresh(connection, months)
+
+
+def record_dues_ledger(session, flush_context):
+    """
+    Records the flushed dues invoices and payments in the dues ledger and
+    refreshes the dues balances of the flushed members and the monthly dues
+    statistics of the affected months.
+
+    New per-year invoices are added to the ledger and changes of them are
+    copied. Changes of the amount paid of members are recorded as payments
+    of the difference. The entries of deleted invoices and the entries and
+    balances of deleted members are deleted. The ledger is written with a few
+    bulk statements on the connection of the flush so that it is part of the
+    same transaction.
+
+    Args:
+        session: The flushed session.
+        flush_context: The flush context, not used.
+    """
+    # pylint: disable=unused-argument,too-many-locals,too-many-branches
+    invoice_years = dict(
+        (invoice_class, year)
+        for year, invoice_class in DUES_INVOICE_CLASSES.items())
+    new_entries = []
+    changed_invoices = []
+    changed_balances = dict((year, set()) for year in DUES_INVOICE_CLASSES)
+    deleted_member_ids = []
+    deleted_invoices = []
+    months = set()
+    for instance in session.new:
+        year = invoice_years.get(type(instance))
+        if year is not None:
+            new_entries.append(
+                DuesLedgerEntry.get_invoice_values(year, instance))
+    for instance in session.dirty:
+        year = invoice_years.get(type(instance))
+        if year is not None and session.is_modified(instance):
+            changed_invoices.append(
+                DuesLedgerEntry.get_invoice_values(year, instance))
+            # the sums of the month of a changed invoice date change as well
+            for invoice_date in attributes.get_history(
+                    instance, 'invoice_date').deleted:
+                if invoice_date is not None:
+                    months.add((
+                        year, DuesMonthlyStatistics.get_month(invoice_date)))
+    for instance in session.deleted:
+        if isinstance(instance, C3sMember):
+            deleted_member_ids.append(instance.id)
+        year = invoice_years.get(type(instance))
+        if year is not None:
+            deleted_invoices.append((year, instance.invoice_no))
+    for instance in list(session.new) + list(session.dirty):
+        if not isinstance(instance, C3sMember):
+            continue
+        for year in DUES_INVOICE_CLASSES:
+            names = _dues_attribute_names(year)
+            if not any(attributes.get_history(instance, name).added
+                       for name in names):
+                continue
+            changed_balances[year].add(instance.id)
+            paid = attributes.get_history(instance, names[6])
+            if not paid.added:
+                continue
+            amount = _to_decimal(paid.added[0]) - _to_decimal(
+                paid.deleted[0] if paid.deleted else None)
+            if amount != Decimal('0'):
+                new_entries.append({
+                    'year': year,
+                    'member_id': instance.id,
+                    'entry_type': DuesLedgerEntry.PAYMENT,
+                    'entry_date': getattr(instance, names[7]),
+                    'amount': amount,
+                })
+
+    if not (new_entries or changed_invoices or deleted_member_ids or
+            deleted_invoices or any(changed_balances.values())):
+        return
+    connection = session.connection()
+    ledger = DuesLedgerEntry.__table__
+    for entry in new_entries + changed_invoices:
+        if entry['entry_date'] is not None:
+            months.add((
+                entry['year'],
+                DuesMonthlyStatistics.get_month(entry['entry_date'])))
+    if new_entries:
+        keys = set()
+        for entry in new_entries:
+            keys.update(entry.keys())
+        connection.execute(ledger.insert(), [
+            dict(dict.fromkeys(keys), **entry) for entry in new_entries])
+    if changed_invoices:
+        updated_columns = ['entry_type', 'entry_date', 'amount'] + [
+            name for name in DuesLedgerEntry.INVOICE_COLUMNS
+            if name != 'invoice_no']
+        connection.execute(
+            ledger.update()
+            .where(and_(
+                ledger.c.year == expression.bindparam('b_year'),
+                ledger.c.invoice_no == expression.bindparam('b_invoice_no'),
+                ledger.c.entry_type != DuesLedgerEntry.PAYMENT))
+            .values(dict(
+                (name, expression.bindparam('v_' + name))
+                for name in updated_columns)),
+            [dict(
+                [('v_' + name, entry[name]) for name in updated_columns],
+                b_year=entry['year'],
+                b_invoice_no=entry['invoice_no'])
+             for entry in changed_invoices])
+    if deleted_invoices:
+        months.update(_delete_dues_ledger_entries(connection, or_(*[
+            and_(
+                ledger.c.year == year,
+                ledger.c.invoice_no == invoice_no,
+                ledger.c.entry_type != DuesLedgerEntry.PAYMENT)
+            for year, invoice_no in deleted_invoices])))
+    if deleted_member_ids:
+        months.update(_delete_dues_ledger_entries(
+            connection, ledger.c.member_id.in_(deleted_member_ids)))
+        connection.execute(DuesBalance.__table__.delete().where(
+            DuesBalance.__table__.c.member_id.in_(deleted_member_ids)))
+    for year, member_ids in changed_balances.items():
+        if member_ids:
+            DuesBalance.refresh(connection, year, member_ids)
+    if months:
+        DuesMonthlyStatistics.refresh(connection, months)
+
+
+event.listen(DBSession, 'after_flush', record_dues_ledger)
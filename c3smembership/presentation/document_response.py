@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Serves rendered PDF documents from the document cache.
+"""
+
+from pyramid.response import FileResponse
+
+
+def make_document_response(request, templates, data, render, name=None):
+    """
+    Makes a response serving a PDF document from the document cache.
+
+    The document is keyed by the version of its templates and the data it is
+    rendered from and rendered if it is not cached yet. The response carries
+    the cache key as entity tag and the modification date of the cached file
+    as last modification date. Clients sending matching conditional request
+    headers get a 304 Not Modified response and range requests are answered
+    with the requested part of the document only.
+
+    Args:
+        request: The request for the document. Its registry provides the
+            document cache.
+        templates: The filenames of the templates the document is rendered
+            with.
+        data: The data the document is rendered from, e.g. the LaTeX source.
+        render: Function without arguments rendering the document and
+            returning the rendered PDF file object.
+        name: Optional. The name the document is stored under in the cache,
+            e.g. the invoice number. Storing a new version of the document
+            removes the superseded ones.
+
+    Returns:
+        The response serving the document.
+    """
+    document_cache = request.registry.document_cache
+    key = document_cache.get_key(
+        document_cache.get_template_version(templates), data)
+    filename = document_cache.get_or_render(key, render, name)
+    response = FileResponse(
+        filename, request=request, content_type='application/pdf')
+    response.etag = key
+    # the documents contain personal data and must not be stored by shared
+    # caches
+    response.cache_control.private = True
+    return response
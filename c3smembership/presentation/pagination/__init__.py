@@ -121,6 +121,9 @@ Example::
 #   template (configuring what to show: sorting, no sorting, etc.).
 # - Offer easy ways to indicate which column is sorted on in which direction.
 
+from datetime import date
+import threading
+
 from .exceptions import PageNotFoundException
 from .property_naming import PropertyNaming
 from .reading import (
@@ -192,6 +195,71 @@ class IContentSizeProvider(object):
         raise NotImplementedError()
 
 
+class CachedContentSizeProvider(IContentSizeProvider):
+    """
+    Caches the content size of a content size provider.
+
+    Content size providers usually count database rows which is done for every
+    request of a pagination route before the page itself is retrieved. The
+    cached content size is used until it is invalidated, e.g. by a listener on
+    changes of the content, or the date changes as the content size may depend
+    on it.
+
+    Example::
+
+        content_size_provider = CachedContentSizeProvider(
+            dashboard_content_size_provider)
+        listen_for_changes(
+            DBSession,
+            [C3sMember],
+            content_size_provider.invalidate)
+        config.make_pagination_route('dashboard', content_size_provider)
+    """
+
+    date = date
+
+    def __init__(self, content_size_provider):
+        """
+        Initialises the CachedContentSizeProvider object.
+
+        Args:
+            content_size_provider (IContentSizeProvider): The content size
+                provider of which the content size is cached.
+        """
+        self._content_size_provider = content_size_provider
+        self._lock = threading.Lock()
+        self._cached = None
+        self._generation = 0
+
+    def __call__(self):
+        """
+        Returns the cached content size or determines it if it was not
+        determined yet, was invalidated or determined on a different date.
+        """
+        today = self.date.today()
+        cached = self._cached
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        with self._lock:
+            cached = self._cached
+            if cached is not None and cached[0] == today:
+                return cached[1]
+            generation = self._generation
+            content_size = self._content_size_provider()
+            # do not cache content sizes which were invalidated while being
+            # determined
+            if generation == self._generation:
+                self._cached = (today, content_size)
+            return content_size
+
+    def invalidate(self):
+        """
+        Invalidates the cached content size.
+        """
+        self._generation += 1
+        self._cached = None
+
+
 def is_pagination_route(request):
     """
     Returns whether the ``request.matched_route`` is configured as a
@@ -289,7 +357,10 @@ def make_pagination_route(
             belongs.
         route_name (str): The name of the route.
         content_size_provider (IContentSizeProvider): A python callable
-            accepting a filtering parameter.
+            accepting a filtering parameter. In order to avoid determining
+            the content size for every request, it can be wrapped in a
+            ``CachedContentSizeProvider`` which is invalidated when the content
+            changes.
         sort_property_default (str): The name of the default sort property which is
             used in case nothing else is specified.
         page_size_default (int): The default page size in case nothing else is
@@ -307,7 +378,8 @@ def make_pagination_route(
         'page-number',
         'page-size',
         'sort-property',
-        'sort-direction'
+        'sort-direction',
+        page_cursor_name='page-cursor'
     )
     cookie_property_naming = PropertyNaming(
         'page_number',
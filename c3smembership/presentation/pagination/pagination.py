@@ -7,6 +7,110 @@ information. They are independent of Pyramid.
 from .exceptions import PageNotFoundException
 
 
+class Cursor(object):
+    """
+    A keyset pagination cursor.
+
+    Offset pagination lets the database skip all content items of the previous
+    pages which becomes slow for pages far from the start. Keyset pagination
+    instead starts the page directly after or before a content item which is
+    referenced by its key, e.g. its ID. The content must be sorted on the sort
+    property and the key so that the order is stable.
+
+    A cursor without key references the start of the content if its direction
+    is after and the end of the content if its direction is before.
+
+    Cursors are represented as strings like "after-123", "before-123" and
+    "before" in URLs.
+    """
+
+    AFTER = 'after'
+    BEFORE = 'before'
+
+    def __init__(self, direction, key=None):
+        """
+        Initializes the Cursor object.
+
+        Args:
+            direction: Cursor.AFTER if the page starts after the content item
+                with the key and Cursor.BEFORE if the page ends before it.
+            key: Optional. The key of the content item, a positive integer of
+                type int. Defaults to None referencing the start or end of the
+                content.
+
+        Raises:
+            TypeError: In case key is neither None nor of type int.
+            ValueError: In case direction is invalid or key is not larger than
+                zero.
+        """
+        if direction not in [self.AFTER, self.BEFORE]:
+            raise ValueError('Parameter direction must be after or before.')
+        if key is not None:
+            if not isinstance(key, int):
+                raise TypeError('Parameter key must be of type int.')
+            if not key > 0:
+                raise ValueError('Parameter key must be larger than zero.')
+        self.__direction = direction
+        self.__key = key
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Parses the string representation of a cursor.
+
+        Args:
+            value: The string representation of the cursor, e.g. "after-123".
+
+        Returns:
+            The Cursor.
+
+        Raises:
+            ValueError: In case value is not a valid cursor representation.
+        """
+        if value is None:
+            raise ValueError('Invalid cursor.')
+        parts = value.split('-')
+        if len(parts) > 2:
+            raise ValueError('Invalid cursor.')
+        key = None
+        if len(parts) == 2:
+            if not parts[1].isdigit():
+                raise ValueError('Invalid cursor.')
+            key = int(parts[1])
+        return cls(parts[0], key)
+
+    @property
+    def direction(self):
+        """
+        The direction of the page relative to the content item, either
+        Cursor.AFTER or Cursor.BEFORE.
+        """
+        return self.__direction
+
+    @property
+    def key(self):
+        """
+        The key of the content item or None for the start or end of the
+        content.
+        """
+        return self.__key
+
+    def __str__(self):
+        """
+        Returns the string representation of the cursor.
+        """
+        if self.__key is None:
+            return self.__direction
+        return '{0}-{1}'.format(self.__direction, self.__key)
+
+    def __eq__(self, other):
+        return isinstance(other, Cursor) and \
+            self.direction == other.direction and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+
 class PagingRequest(object):
     """
     Provides information about paging request, i.e. the request of a particular
@@ -20,7 +124,7 @@ class PagingRequest(object):
     valid values for a certain content size.
     """
 
-    def __init__(self, page_number, page_size):
+    def __init__(self, page_number, page_size, cursor=None):
         """
         Initializes the PagingRequest object.
 
@@ -29,6 +133,9 @@ class PagingRequest(object):
                 integer of type int.
             page_size: The size of the requested page. Must be a positive
                 integer of type int.
+            cursor: Optional. The ``Cursor`` from which the page can be
+                retrieved using keyset pagination instead of the content
+                offset.
 
         Raises:
             TypeError: In case page_number or page_size are not of type int.
@@ -45,6 +152,7 @@ class PagingRequest(object):
             raise ValueError('Parameter page_size must be larger than zero.')
         self.__page_number = page_number
         self.__page_size = page_size
+        self.__cursor = cursor
 
     @property
     def page_number(self):
@@ -60,15 +168,24 @@ class PagingRequest(object):
         """
         return self.__page_size
 
+    @property
+    def cursor(self):
+        """
+        The ``Cursor`` of the page or None if the page is only identified by
+        its page number.
+        """
+        return self.__cursor
+
     @property
     def content_offset(self):
         """
-        The content offset, i.e. the number of content items which reside on all
-        previous pages.
+        The content offset, i.e. the number of content items which reside on
+        all previous pages.
 
         For instance, the content offset of page 3 with page size 10 is 20. The
         pages 1 and 2 with each contain 10 content items, page 1 items 1 to 10
-        and page 2 items 11 to 20. Page 3 therefore starts with content item 21.
+        and page 2 items 11 to 20. Page 3 therefore starts with content item
+        21.
         """
         return (self.page_number - 1) * self.page_size
 
@@ -86,9 +203,15 @@ class Paging(PagingRequest):
 
     Paging information consist of a paging request (page number and page size)
     as well as the actual content size.
+
+    If the keys of the first and last content items of the page are known, see
+    ``with_page_keys``, the next and previous pages are provided with cursors
+    so that they can be retrieved using keyset pagination. The last page is
+    always provided with a cursor referencing the end of the content.
     """
 
-    def __init__(self, content_size, paging_request):
+    def __init__(self, content_size, paging_request, first_key=None,
+                 last_key=None):
         """
         Initializes the Paging object.
 
@@ -98,8 +221,10 @@ class Paging(PagingRequest):
         Args:
             content_size: The size of the content which is paged. Must be of
                 type int.
-            paging_request: A ``PagingRequest`` object providing the page number
-                and page size.
+            paging_request: A ``PagingRequest`` object providing the page
+                number and page size.
+            first_key: Optional. The key of the first content item of the page.
+            last_key: Optional. The key of the last content item of the page.
 
         Raises:
             TypeError: In case content_size is not of type int.
@@ -112,13 +237,16 @@ class Paging(PagingRequest):
         PagingRequest.__init__(
             self,
             paging_request.page_number,
-            paging_request.page_size)
+            paging_request.page_size,
+            paging_request.cursor)
         if not isinstance(content_size, int):
             raise TypeError('Parameter content_size must be of type int.')
         if not content_size >= 0:
             raise ValueError(
                 'Paramter content_size must be equal to or larger than zero.')
         self.__content_size = content_size
+        self.__first_key = first_key
+        self.__last_key = last_key
         if not paging_request.page_number <= self._last_page_number:
             raise PageNotFoundException('Page does not exist.')
 
@@ -135,11 +263,35 @@ class Paging(PagingRequest):
         """
         return self.__content_size
 
+    @property
+    def page_content_size(self):
+        """
+        Returns the number of content items on the page which is the page size
+        for all but the last page.
+        """
+        return max(
+            min(self.page_size, self.content_size - self.content_offset), 0)
+
+    def with_page_keys(self, first_key, last_key):
+        """
+        Gets a ``Paging`` object of the same page knowing the keys of its first
+        and last content items.
+
+        Args:
+            first_key: The key of the first content item of the page.
+            last_key: The key of the last content item of the page.
+        """
+        return Paging(
+            self.content_size,
+            PagingRequest(self.page_number, self.page_size, self.cursor),
+            first_key,
+            last_key)
+
     @property
     def page_count(self):
         """
-        Returns number of pages the content size is split into considering the page
-        size.
+        Returns number of pages the content size is split into considering the
+        page size.
         """
         return self._last_page_number - \
             self._first_page_number + 1
@@ -157,6 +309,12 @@ class Paging(PagingRequest):
         """
         if not self.has_next_page:
             raise PageNotFoundException('A next page does not exist.')
+        if self.page_number + 1 == self._last_page_number:
+            return self.last_page
+        if self.__last_key is not None:
+            return self._cursor_page(
+                self.page_number + 1,
+                Cursor(Cursor.AFTER, self.__last_key))
         return self.page(self.page_number + 1)
 
     @property
@@ -172,6 +330,10 @@ class Paging(PagingRequest):
         """
         if not self.has_previous_page:
             raise PageNotFoundException('A previous page does not exist.')
+        if self.__first_key is not None:
+            return self._cursor_page(
+                self.page_number - 1,
+                Cursor(Cursor.BEFORE, self.__first_key))
         return self.page(self.page_number - 1)
 
     def page(self, page_number):
@@ -183,9 +345,9 @@ class Paging(PagingRequest):
 
         Raises:
             PageNotFoundException: In case the content does not have a
-                page with the specified page number. Use the method ``has_page``
-                in order to determine whether a page with this page number is
-                exists.
+                page with the specified page number. Use the method
+                ``has_page`` in order to determine whether a page with this
+                page number is exists.
         """
         if not self.has_page(page_number):
             raise PageNotFoundException(
@@ -195,6 +357,14 @@ class Paging(PagingRequest):
             self.content_size,
             PagingRequest(page_number, self.page_size))
 
+    def _cursor_page(self, page_number, cursor):
+        """
+        Gets the ``Paging`` object of a page number retrieved from a cursor.
+        """
+        return Paging(
+            self.content_size,
+            PagingRequest(page_number, self.page_size, cursor))
+
     @property
     def first_page(self):
         """
@@ -206,8 +376,12 @@ class Paging(PagingRequest):
     def last_page(self):
         """
         Returns a ``Paging`` object representing the last page of the content.
+
+        The last page is retrieved backwards from the end of the content.
         """
-        return self.page(self._last_page_number)
+        return self._cursor_page(
+            self._last_page_number,
+            Cursor(Cursor.BEFORE))
 
     @property
     def is_first_page(self):
@@ -242,7 +416,8 @@ class Paging(PagingRequest):
 
     def has_page(self, page_number):
         """
-        Determines whether the content contains a page with a given page number.
+        Determines whether the content contains a page with a given page
+        number.
 
         Args:
             page_number: The number of the page.
@@ -383,3 +558,16 @@ class Pagination(PaginationRequest):
         Returns the ``Paging`` object of this pagination.
         """
         return self.__paging
+
+    def with_page_keys(self, first_key, last_key):
+        """
+        Gets a ``Pagination`` object of the same page knowing the keys of its
+        first and last content items.
+
+        Args:
+            first_key: The key of the first content item of the page.
+            last_key: The key of the last content item of the page.
+        """
+        return Pagination(
+            self.__paging.with_page_keys(first_key, last_key),
+            self.sorting)
@@ -24,6 +24,13 @@ class IPagingPropertyNaming(object):
         """
         raise NotImplementedError()
 
+    @property
+    def page_cursor_name(self):
+        """
+        The page cursor property name.
+        """
+        raise NotImplementedError()
+
 
 class ISortingPropertyNaming(object):
     """
@@ -64,7 +71,8 @@ class PropertyNaming(IPropertyNaming):
             page_size_name,
             sort_property_name,
             sort_direction_name,
-            name_format='{property_name}'):
+            name_format='{property_name}',
+            page_cursor_name='page_cursor'):
         # pylint: disable=too-many-arguments
         """
         Initializes the property naming.
@@ -80,10 +88,13 @@ class PropertyNaming(IPropertyNaming):
                 using the string.format formatting pattern. The the format
                 string must contain '{property_name}'. E.g. all property names
                 can be prefixed using 'prefix.{property_name}'.
+            page_cursor_name: Optional. The page cursor property name,
+                defaults to 'page_cursor'.
         """
         self._name_format = name_format
         self._page_number_name = self._format(page_number_name)
         self._page_size_name = self._format(page_size_name)
+        self._page_cursor_name = self._format(page_cursor_name)
         self._sort_property_name = self._format(sort_property_name)
         self._sort_direction_name = self._format(sort_direction_name)
 
@@ -113,6 +124,13 @@ class PropertyNaming(IPropertyNaming):
         """
         return self._page_size_name
 
+    @property
+    def page_cursor_name(self):
+        """
+        The page cursor property name.
+        """
+        return self._page_cursor_name
+
     @property
     def sort_property_name(self):
         """
@@ -7,12 +7,14 @@ from .exceptions import (
     PageNotFoundException
 )
 from .pagination import (
+    Cursor,
     Pagination,
     Paging,
     PagingRequest,
     Sorting,
 )
 from .validation import (
+    CursorValidator,
     IntegerValidator,
     MinLengthValidator,
     RegexValidator,
@@ -248,6 +250,10 @@ class RequestPaginationReader(IPaginationReader):
     # Default values: If no information is available then default values are
       used.
 
+    The page cursor for keyset pagination is only read from the URL parameters
+    as it is only valid for the page of the URL which links to it. It is only
+    used for the page number it was created for.
+
     Naming property settings can be passed to the constructor using the
     ``IPropertyNaming`` interface.
     """
@@ -389,6 +395,19 @@ class RequestPaginationReader(IPaginationReader):
             ],
             IntegerValidator())
 
+    def _create_page_cursor_reader(self, request):
+        """
+        Creates the reader for the page cursor.
+        """
+        return StrategyReader(
+            [
+                RequestParamReader(
+                    request,
+                    self._param_property_naming.page_cursor_name
+                ),
+            ],
+            CursorValidator())
+
     def _create_sorting(self, request):
         """
         Create the sorting from the sort property and sort direction readers.
@@ -405,6 +424,9 @@ class RequestPaginationReader(IPaginationReader):
         """
         page_size_reader = self._create_page_size_reader(request)
         page_number_reader = self._create_page_number_reader(request)
+        page_cursor_reader = self._create_page_cursor_reader(request)
+        page_cursor = page_cursor_reader()
         return PagingRequest(
             int(page_number_reader()),
-            int(page_size_reader()))
+            int(page_size_reader()),
+            None if page_cursor is None else Cursor.parse(page_cursor))
@@ -137,7 +137,7 @@ class CallCallCounter(CallCounter):
 
     def __call__(self, *args, **kwargs):
         self._count_call()
-        self._call(*args, **kwargs)
+        return self._call(*args, **kwargs)
 
     def _call(self, *args, **kwargs):
         raise NotImplementedError()
@@ -285,11 +285,14 @@ class PropertyNamingMock(IPropertyNaming):
             page_number_name,
             page_size_name,
             sort_property_name,
-            sort_direction_name):
+            sort_direction_name,
+            page_cursor_name='page_cursor'):
+        # pylint: disable=too-many-arguments
         self._page_number_name = page_number_name
         self._page_size_name = page_size_name
         self._sort_property_name = sort_property_name
         self._sort_direction_name = sort_direction_name
+        self._page_cursor_name = page_cursor_name
 
     @property
     def page_number_name(self):
@@ -299,6 +302,10 @@ class PropertyNamingMock(IPropertyNaming):
     def page_size_name(self):
         return self._page_size_name
 
+    @property
+    def page_cursor_name(self):
+        return self._page_cursor_name
+
     @property
     def sort_property_name(self):
         return self._sort_property_name
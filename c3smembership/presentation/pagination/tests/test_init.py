@@ -2,8 +2,10 @@
 """
 """
 
+from datetime import date
 from unittest import TestCase
 from c3smembership.presentation.pagination import (
+    CachedContentSizeProvider,
     IContentSizeProvider,
     includeme,
     is_pagination_route,
@@ -56,6 +58,50 @@ class IContentSizeProviderTest(TestCase):
             content_size_provider()
 
 
+class CachedContentSizeProviderTest(TestCase):
+
+    def test_call(self):
+        content_size_provider = ContentSizeProviderMock(12)
+        cached_provider = CachedContentSizeProvider(content_size_provider)
+        cached_provider.date = DateMock(date(2018, 1, 1))
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(content_size_provider.call_count, 1)
+
+        # invalidation
+        cached_provider.invalidate()
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(content_size_provider.call_count, 2)
+
+        # date change
+        cached_provider.date = DateMock(date(2018, 1, 2))
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(content_size_provider.call_count, 3)
+
+    def test_invalidate_while_determining(self):
+        content_size_provider = ContentSizeProviderMock(12)
+
+        def invalidating_provider():
+            # the content changes while its size is determined
+            cached_provider.invalidate()
+            return content_size_provider()
+
+        cached_provider = CachedContentSizeProvider(invalidating_provider)
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(cached_provider(), 12)
+        self.assertEqual(content_size_provider.call_count, 2)
+
+
+class DateMock(object):
+
+    def __init__(self, today):
+        self._today = today
+
+    def today(self):
+        return self._today
+
+
 class FunctionsTest(TestCase):
 
     def test_is_pagination_route(self):
@@ -7,6 +7,7 @@ from c3smembership.presentation.pagination.exceptions import (
     PageNotFoundException,
 )
 from c3smembership.presentation.pagination.pagination import (
+    Cursor,
     Pagination,
     PaginationRequest,
     Paging,
@@ -16,6 +17,35 @@ from c3smembership.presentation.pagination.pagination import (
 )
 
 
+class CursorTest(TestCase):
+
+    def test_constructor(self):
+        with self.assertRaises(ValueError):
+            Cursor('sideways', 1)
+        with self.assertRaises(ValueError):
+            Cursor(Cursor.AFTER, 0)
+        with self.assertRaises(TypeError):
+            Cursor(Cursor.AFTER, '1')
+        cursor = Cursor(Cursor.BEFORE, 12)
+        self.assertEqual(cursor.direction, 'before')
+        self.assertEqual(cursor.key, 12)
+        cursor = Cursor(Cursor.BEFORE)
+        self.assertTrue(cursor.key is None)
+
+    def test_parse(self):
+        self.assertEqual(Cursor.parse('after-123'), Cursor(Cursor.AFTER, 123))
+        self.assertEqual(Cursor.parse('before'), Cursor(Cursor.BEFORE))
+        for value in [None, '', 'after-', 'after-a', 'after-1-2', 'up-1',
+                      'after--1']:
+            with self.assertRaises(ValueError):
+                Cursor.parse(value)
+
+    def test_str(self):
+        self.assertEqual(str(Cursor(Cursor.AFTER, 123)), 'after-123')
+        self.assertEqual(str(Cursor(Cursor.BEFORE)), 'before')
+        self.assertNotEqual(Cursor(Cursor.AFTER, 1), Cursor(Cursor.BEFORE, 1))
+
+
 class PagingRequestTest(TestCase):
 
     def test_constructor(self):
@@ -36,6 +66,11 @@ class PagingRequestTest(TestCase):
         pagination = PagingRequest(10, 10)
         self.assertTrue(pagination is not None)
 
+    def test_cursor(self):
+        self.assertTrue(PagingRequest(2, 5).cursor is None)
+        cursor = Cursor(Cursor.AFTER, 3)
+        self.assertEqual(PagingRequest(2, 5, cursor).cursor, cursor)
+
     def test_page_number(self):
         pagination = PagingRequest(2, 5)
         self.assertEqual(pagination.page_number, 2)
@@ -91,6 +126,37 @@ class PagingTest(TestCase):
         paging = Paging(10, PagingRequest(2, 5))
         self.assertEqual(paging.content_size, 10)
 
+    def test_page_content_size(self):
+        self.assertEqual(Paging(13, PagingRequest(2, 5)).page_content_size, 5)
+        self.assertEqual(Paging(13, PagingRequest(3, 5)).page_content_size, 3)
+        self.assertEqual(Paging(0, PagingRequest(1, 5)).page_content_size, 0)
+
+    def test_page_keys(self):
+        cursor = Cursor(Cursor.AFTER, 7)
+        paging = Paging(30, PagingRequest(3, 5, cursor)).with_page_keys(8, 12)
+        self.assertEqual(paging.page_number, 3)
+        self.assertEqual(paging.cursor, cursor)
+
+        next_page = paging.next_page
+        self.assertEqual(next_page.page_number, 4)
+        self.assertEqual(next_page.cursor, Cursor(Cursor.AFTER, 12))
+        previous_page = paging.previous_page
+        self.assertEqual(previous_page.page_number, 2)
+        self.assertEqual(previous_page.cursor, Cursor(Cursor.BEFORE, 8))
+        self.assertTrue(paging.first_page.cursor is None)
+        self.assertEqual(paging.last_page.cursor, Cursor(Cursor.BEFORE))
+        # the cursor is dropped when jumping to a page
+        self.assertTrue(paging.page(4).cursor is None)
+
+        # the page before the last one links to the end of the content
+        paging = Paging(30, PagingRequest(5, 5)).with_page_keys(21, 25)
+        self.assertEqual(paging.next_page.cursor, Cursor(Cursor.BEFORE))
+
+        # without keys the pages are only identified by number
+        paging = Paging(30, PagingRequest(3, 5))
+        self.assertTrue(paging.next_page.cursor is None)
+        self.assertTrue(paging.previous_page.cursor is None)
+
     def test_page_count(self):
         paging = Paging(15, PagingRequest(1, 5))
         self.assertTrue(paging.page_count, 5)
@@ -282,6 +348,16 @@ class PaginationTest(TestCase):
             sorting)
         self.assertEqual(view_pagination.sorting, sorting)
 
+    def test_with_page_keys(self):
+        sorting = Sorting('id', 'asc')
+        pagination = Pagination(Paging(30, PagingRequest(3, 5)), sorting)
+        pagination = pagination.with_page_keys(11, 15)
+        self.assertEqual(pagination.sorting, sorting)
+        self.assertEqual(pagination.paging.page_number, 3)
+        self.assertEqual(
+            pagination.paging.next_page.cursor,
+            Cursor(Cursor.AFTER, 15))
+
 
 class TestPagingIterator(TestCase):
 
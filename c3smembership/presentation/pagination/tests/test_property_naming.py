@@ -40,6 +40,11 @@ class TestIPagingPropertyNaming(TestCase):
             page_size_name = self._property_naming.page_size_name
             del(page_size_name)
 
+    def test_page_cursor_name(self):
+        with self.assertRaises(NotImplementedError):
+            page_cursor_name = self._property_naming.page_cursor_name
+            del(page_cursor_name)
+
 
 class TestIPropertyNaming(TestCase):
 
@@ -102,6 +107,21 @@ class TestPropertyNaming(TestCase):
             'prefix.page_size'
         )
 
+    def test_page_cursor_name(self):
+        self.assertEquals(
+            self._default_format_property_naming.page_cursor_name,
+            'page_cursor'
+        )
+        self.assertEquals(
+            self._prefix_property_naming.page_cursor_name,
+            'prefix.page_cursor'
+        )
+        self.assertEquals(
+            PropertyNaming('a', 'b', 'c', 'd', page_cursor_name='e')
+            .page_cursor_name,
+            'e'
+        )
+
     def test_sort_property_name(self):
         self.assertEquals(
             self._default_format_property_naming.sort_property_name,
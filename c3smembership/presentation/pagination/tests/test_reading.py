@@ -212,6 +212,23 @@ class RequestPaginationReaderTest(TestCase):
             'some_other_property')
         self.assertEqual(pagination.sorting.sort_direction, 'desc')
 
+    def test_call_cursor(self):
+        content_size = 50
+        request = self.make_request()
+        self.set_dict(request.params, 'param_', 2, 21, 'some_property', 'asc')
+        pagination = self.reader(request, content_size)
+        self.assertTrue(pagination.paging.cursor is None)
+
+        request.params['page_cursor'] = 'after-12'
+        pagination = self.reader(request, content_size)
+        self.assertEqual(pagination.paging.cursor.direction, 'after')
+        self.assertEqual(pagination.paging.cursor.key, 12)
+
+        # invalid cursors are ignored
+        request.params['page_cursor'] = 'after-x'
+        pagination = self.reader(request, content_size)
+        self.assertTrue(pagination.paging.cursor is None)
+
     def test_call_cookies(self):
         content_size = 50
         request = self.make_request()
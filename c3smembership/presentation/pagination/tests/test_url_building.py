@@ -4,6 +4,7 @@
 
 from unittest import TestCase
 from c3smembership.presentation.pagination.pagination import (
+    Cursor,
     Pagination,
     Paging,
     PagingRequest,
@@ -76,6 +77,35 @@ class RequestUrlCreatorTest(TestCase):
         self.assertTrue(url.find('match_route/some_page') > 0)
         self.assertTrue(url.find('test=some_value') > 0)
 
+    def test_create_url_cursor(self):
+        config = testing.setUp()
+        config.add_route('route_name', 'route_name')
+        property_naming = PropertyNamingMock(
+            'page-number',
+            'page-size',
+            'sort-property',
+            'sort-direction',
+            'page-cursor')
+        request = DummyRequest()
+        request.params['page-cursor'] = 'after-5'
+        pagination_url_creator = RequestUrlCreator(
+            request,
+            'route_name',
+            property_naming,
+        )
+        url = pagination_url_creator(
+            PaginationRequest(
+                PagingRequest(3, 10, Cursor(Cursor.BEFORE, 7)),
+                Sorting('id', 'desc')))
+        self.assertTrue(url.find('page-cursor=before-7') > 0)
+
+        # the cursor of the current request is not passed on
+        url = pagination_url_creator(
+            PaginationRequest(
+                PagingRequest(3, 10),
+                Sorting('id', 'desc')))
+        self.assertTrue(url.find('page-cursor') < 0)
+
 
 class IUrlCreatorFactoryTest(TestCase):
 
@@ -201,6 +231,16 @@ class UrlBuilderTest(TestCase):
             next_page_provider.url,
             'http://example.com/test/url')
 
+    def test_sort_drops_cursor(self):
+        provider = UrlBuilder(
+            UrlCreatorMock('http://example.com/test/url'),
+            Pagination(
+                Paging(123, PagingRequest(3, 21, Cursor(Cursor.AFTER, 5))),
+                Sorting('id', 'desc')))
+        sorted_provider = provider.sort_property('name')
+        self.assertEqual(sorted_provider.pagination.paging.page_number, 3)
+        self.assertTrue(sorted_provider.pagination.paging.cursor is None)
+
     def test_invert_sort_direction(self):
         provider = self.get_response_provider(123, 3, 21)
         inverted = provider.invert_sort_direction
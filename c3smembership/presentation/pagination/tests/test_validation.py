@@ -4,6 +4,7 @@
 
 import unittest
 from c3smembership.presentation.pagination.validation import (
+    CursorValidator,
     DummyValidator,
     IntegerValidator,
     IValidator,
@@ -70,3 +71,14 @@ class MinLengthValidatorTest(unittest.TestCase):
         validator = MinLengthValidator(-1)
         self.assertTrue(validator(''), 3)
         self.assertTrue(validator([]), 3)
+
+
+class CursorValidatorTest(unittest.TestCase):
+
+    def test_call(self):
+        validator = CursorValidator()
+        self.assertFalse(validator(None))
+        self.assertFalse(validator('after-a'))
+        self.assertFalse(validator('after-0'))
+        self.assertTrue(validator('after-1'))
+        self.assertTrue(validator('before'))
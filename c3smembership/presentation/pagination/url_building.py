@@ -58,11 +58,17 @@ class RequestUrlCreator(IUrlCreator):
 
         page_number_name = self._param_property_naming.page_number_name
         page_size_name = self._param_property_naming.page_size_name
+        page_cursor_name = self._param_property_naming.page_cursor_name
         sort_property_name = self._param_property_naming.sort_property_name
         sort_direction_name = self._param_property_naming.sort_direction_name
         route_url_kwargs['_query'][page_number_name] = \
             paging_request.page_number
         route_url_kwargs['_query'][page_size_name] = paging_request.page_size
+        if paging_request.cursor is None:
+            route_url_kwargs['_query'].pop(page_cursor_name, None)
+        else:
+            route_url_kwargs['_query'][page_cursor_name] = \
+                str(paging_request.cursor)
         route_url_kwargs['_query'][sort_property_name] = sorting.sort_property
         route_url_kwargs['_query'][sort_direction_name] = sorting.sort_direction
 
@@ -158,11 +164,17 @@ class UrlBuilder(object):
     def _change_sorting(self, sorting):
         """
         Returns a ``UrlBuilder`` object with given sorting information.
+
+        The page cursor is dropped as it is only valid for the current
+        sorting.
         """
+        paging = self.__pagination.paging
+        if paging is not None and paging.cursor is not None:
+            paging = paging.page(paging.page_number)
         return UrlBuilder(
             self.__url_creator,
             Pagination(
-                self.__pagination.paging,
+                paging,
                 sorting
             )
         )
@@ -5,6 +5,8 @@ Validation utilities for reading pagination settings from sources.
 
 import re
 
+from .pagination import Cursor
+
 
 class IValidator(object):
     # pylint: disable=too-few-public-methods
@@ -127,3 +129,28 @@ class RegexValidator(object):
             return False
         result = re.match(self.__pattern, value, self.__flags)
         return result is not None
+
+
+class CursorValidator(IValidator):
+    # pylint: disable=too-few-public-methods
+    """
+    Validates that values are keyset pagination cursors.
+    """
+
+    def __call__(self, value):
+        """
+        Determines whether the value is a cursor representation.
+
+        Args:
+            value: The value to be validated.
+
+        Returns:
+            True, if value is a cursor representation, otherwise False.
+        """
+        if value is None:
+            return False
+        try:
+            Cursor.parse(value)
+        except (TypeError, ValueError):
+            return False
+        return True
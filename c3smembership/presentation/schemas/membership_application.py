@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Validation rules of membership applications shared by the application for
+membership form and the member import.
+"""
+
+from datetime import date
+
+import colander
+
+from c3smembership.presentation.i18n import _
+
+
+MEMBERSHIP_TYPES = [u'normal', u'investing']
+"""
+The membership types, see C3S SCE statute sec. 4.
+"""
+
+NUM_SHARES_RANGE = colander.Range(
+    min=1,
+    max=60,
+    min_err=_(u'You need at least one share of 50 €.'),
+    max_err=_(u'You may choose 60 shares at most (3000 €).'),
+)
+"""
+Validates the number of shares of an application.
+"""
+
+PASSWORD_LENGTH = colander.Length(min=5, max=100)
+"""
+Validates the length of a password.
+"""
+
+
+def validate_date_of_birth(node, value):
+    """
+    Validates that the applicant was born after 1913 and is of age.
+
+    The maximum date of birth is calculated on each validation so that
+    long-running processes do not validate against an outdated date.
+    """
+    today = date.today()
+    colander.Range(
+        min=date(1913, 1, 1),
+        # max 18th birthday, no minors through web formular
+        max=date(today.year - 18, today.month, today.day),
+        min_err=_(u'Sorry, we do not believe that you are that old'),
+        max_err=_(
+            u'Unfortunately, the membership application of an '
+            u'underaged person is currently not possible via our web '
+            u'form. Please send an email to office@c3s.cc.')
+    )(node, value)
+
+
+def _boolean():
+    return colander.Boolean(
+        false_choices=(u'false', u'no', u'0'),
+        true_choices=(u'true', u'yes', u'1'))
+
+
+class MemberImport(colander.MappingSchema):
+    """
+    Validates a row of a member import.
+
+    The column names are the attribute names of C3sMember. Applicants are
+    imported as accepted members if a membership date is given.
+    """
+    firstname = colander.SchemaNode(colander.String())
+    lastname = colander.SchemaNode(colander.String())
+    email = colander.SchemaNode(
+        colander.String(),
+        validator=colander.Email())
+    password = colander.SchemaNode(
+        colander.String(),
+        validator=PASSWORD_LENGTH,
+        missing=None)
+    address1 = colander.SchemaNode(colander.String())
+    address2 = colander.SchemaNode(colander.String(), missing=u'')
+    postcode = colander.SchemaNode(colander.String())
+    city = colander.SchemaNode(colander.String())
+    country = colander.SchemaNode(colander.String())
+    locale = colander.SchemaNode(colander.String(), missing=u'de')
+    date_of_birth = colander.SchemaNode(
+        colander.Date(),
+        validator=validate_date_of_birth)
+    email_is_confirmed = colander.SchemaNode(_boolean(), missing=False)
+    email_confirm_code = colander.SchemaNode(
+        colander.String(),
+        validator=colander.Length(min=1, max=255),
+        missing=None)
+    num_shares = colander.SchemaNode(
+        colander.Integer(),
+        validator=NUM_SHARES_RANGE)
+    date_of_submission = colander.SchemaNode(
+        colander.DateTime(default_tzinfo=None),
+        missing=None)
+    membership_type = colander.SchemaNode(
+        colander.String(),
+        validator=colander.OneOf(MEMBERSHIP_TYPES),
+        missing=u'normal')
+    member_of_colsoc = colander.SchemaNode(_boolean(), missing=False)
+    name_of_colsoc = colander.SchemaNode(colander.String(), missing=u'')
+    signature_received = colander.SchemaNode(_boolean(), missing=False)
+    payment_received = colander.SchemaNode(_boolean(), missing=False)
+    membership_date = colander.SchemaNode(colander.Date(), missing=None)
+    accountant_comment = colander.SchemaNode(
+        colander.String(),
+        validator=colander.Length(max=255),
+        missing=None)
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Request-scoped SQL instrumentation.
+
+Records the SQL statements executed while handling a request and reports the
+number of queries, the total database time, the slowest statements and
+statements which are executed repeatedly with only different parameters. The
+latter usually indicate N+1 query problems, e.g. a query per row of a
+listing, which should be replaced by a single query.
+
+The instrumentation consists of SQLAlchemy engine event hooks and a Pyramid
+tween. It is enabled with the setting c3smembership.sql_instrumentation. The
+statistics are
+
+- logged for each request, N+1 candidates as warnings,
+- added to the response header X-SQL-Instrumentation in development mode and
+- shown for the most recent requests on the staff-only page /_perf.
+"""
+
+from collections import (
+    deque,
+    namedtuple,
+)
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+
+
+LOG = logging.getLogger(__name__)
+
+
+SlowStatement = namedtuple('SlowStatement', [
+    'duration',
+    'statement',
+    'parameters',
+])
+"""
+A statement with its duration in seconds and its parameters.
+"""
+
+
+RepeatedStatement = namedtuple('RepeatedStatement', [
+    'count',
+    'statement',
+])
+"""
+A statement shape, i.e. the SQL without parameters, executed repeatedly.
+"""
+
+
+RequestStatistics = namedtuple('RequestStatistics', [
+    'method',
+    'path',
+    'route_name',
+    'query_count',
+    'database_time',
+    'request_time',
+    'slowest_statements',
+    'repeated_statements',
+])
+"""
+The SQL statistics of a request.
+
+Attributes:
+    method: The HTTP method of the request.
+    path: The path of the request.
+    route_name: The name of the matched route or None.
+    query_count: The number of executed statements.
+    database_time: The total time in seconds spent executing statements.
+    request_time: The time in seconds for handling the request.
+    slowest_statements: A list of the slowest SlowStatements, slowest first.
+    repeated_statements: A list of RepeatedStatements executed at least as
+        often as the repetition threshold, most frequent first.
+"""
+
+
+class _Recording(object):
+    """
+    The statements recorded for a request.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.query_count = 0
+        self.database_time = 0.0
+        self.statement_counts = {}
+        self.slowest_statements = []
+        self.statement_start = None
+
+
+class SqlInstrumentation(object):
+    """
+    Records the SQL statements executed by an engine per request.
+
+    The recording is bound to the current thread so that the statements of
+    concurrent requests are recorded separately. Statements executed while no
+    recording is active, e.g. by scripts, are ignored.
+    """
+
+    time = time
+
+    def __init__(self, slowest_count=5, repetition_threshold=10,
+                 history_size=50):
+        """
+        Initialises the SqlInstrumentation object.
+
+        Args:
+            slowest_count: Optional. The number of slowest statements kept per
+                request, defaults to 5.
+            repetition_threshold: Optional. The number of executions of the
+                same statement shape within a request from which on it is
+                reported as N+1 candidate, defaults to 10.
+            history_size: Optional. The number of most recent request
+                statistics kept, defaults to 50.
+        """
+        self._slowest_count = slowest_count
+        self._repetition_threshold = repetition_threshold
+        self._local = threading.local()
+        self._history = deque(maxlen=history_size)
+        self._history_lock = threading.Lock()
+
+    def instrument(self, engine):
+        """
+        Registers the event hooks recording the statements of the engine.
+        """
+        event.listen(
+            engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(
+            engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _get_recording(self):
+        return getattr(self._local, 'recording', None)
+
+    # pylint: disable=too-many-arguments,unused-argument
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        recording = self._get_recording()
+        if recording is not None:
+            recording.statement_start = self.time.time()
+
+    # pylint: disable=too-many-arguments,unused-argument
+    def _after_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        recording = self._get_recording()
+        if recording is None or recording.statement_start is None:
+            return
+        duration = self.time.time() - recording.statement_start
+        recording.statement_start = None
+        recording.query_count += 1
+        recording.database_time += duration
+        recording.statement_counts[statement] = \
+            recording.statement_counts.get(statement, 0) + 1
+        slowest = recording.slowest_statements
+        if len(slowest) < self._slowest_count or \
+                duration > slowest[-1].duration:
+            slowest.append(SlowStatement(
+                duration=duration,
+                statement=statement,
+                parameters=repr(parameters)[:500]))
+            slowest.sort(key=lambda slow: slow.duration, reverse=True)
+            del slowest[self._slowest_count:]
+
+    def start(self):
+        """
+        Starts recording the statements of the current thread.
+        """
+        self._local.recording = _Recording(self.time.time())
+
+    def stop(self, request):
+        """
+        Stops recording the statements of the current thread and adds the
+        statistics to the history if any statements were executed.
+
+        Args:
+            request: The request which was handled.
+
+        Returns:
+            The RequestStatistics of the request.
+        """
+        recording = self._get_recording()
+        self._local.recording = None
+        if recording is None:
+            return None
+        repeated_statements = [
+            RepeatedStatement(count=count, statement=statement)
+            for statement, count in recording.statement_counts.items()
+            if count >= self._repetition_threshold]
+        repeated_statements.sort(key=lambda repeated: repeated.count,
+                                 reverse=True)
+        matched_route = getattr(request, 'matched_route', None)
+        statistics = RequestStatistics(
+            method=request.method,
+            path=request.path,
+            route_name=matched_route.name if matched_route else None,
+            query_count=recording.query_count,
+            database_time=recording.database_time,
+            request_time=self.time.time() - recording.start,
+            slowest_statements=recording.slowest_statements,
+            repeated_statements=repeated_statements)
+        if statistics.query_count > 0:
+            with self._history_lock:
+                self._history.append(statistics)
+        return statistics
+
+    def get_history(self):
+        """
+        Gets the statistics of the most recent requests.
+
+        Returns:
+            A list of RequestStatistics, the most recent first.
+        """
+        with self._history_lock:
+            return list(reversed(self._history))
+
+
+def format_statistics(statistics):
+    """
+    Formats the statistics in a single line for logs and headers.
+    """
+    return 'queries={0}; db_time={1:.1f}ms; time={2:.1f}ms; ' \
+        'repeated={3}'.format(
+            statistics.query_count,
+            statistics.database_time * 1000,
+            statistics.request_time * 1000,
+            sum(repeated.count for repeated in
+                statistics.repeated_statements))
+
+
+def sql_instrumentation_tween_factory(handler, registry):
+    """
+    Creates the tween recording the SQL statements of each request.
+
+    Note:
+        Expects the object registry.sql_instrumentation to be a
+        SqlInstrumentation instrumenting the engine of the app.
+    """
+    instrumentation = registry.sql_instrumentation
+    add_header = registry.settings.get('c3smembership.runmode') == 'dev'
+
+    def sql_instrumentation_tween(request):
+        """
+        Records the SQL statements of the request and reports them.
+        """
+        instrumentation.start()
+        try:
+            response = handler(request)
+        finally:
+            statistics = instrumentation.stop(request)
+        summary = format_statistics(statistics)
+        if statistics.query_count > 0:
+            LOG.info('%s %s %s', request.method, request.path, summary)
+        for repeated in statistics.repeated_statements:
+            LOG.warning(
+                'Possible N+1 query in %s %s: %s executions of %s',
+                request.method,
+                request.path,
+                repeated.count,
+                ' '.join(repeated.statement.split()))
+        if add_header:
+            response.headers['X-SQL-Instrumentation'] = summary
+        return response
+
+    return sql_instrumentation_tween
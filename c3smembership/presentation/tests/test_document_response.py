@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyramid.registry import Registry
+from pyramid.request import Request
+
+from c3smembership.business.document_cache import DocumentCache
+from c3smembership.presentation.document_response import (
+    make_document_response
+)
+
+
+class DocumentResponseTest(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.template = os.path.join(self.cache_path, 'template.tex')
+        with open(self.template, 'wb') as template_file:
+            template_file.write('template')
+        self.registry = Registry()
+        self.registry.document_cache = DocumentCache(
+            os.path.join(self.cache_path, 'documents'))
+        self.render_count = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path)
+
+    def render(self):
+        self.render_count += 1
+        pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+        pdf_file.write('0123456789')
+        pdf_file.flush()
+        return pdf_file
+
+    def get(self, data=u'data', name=None, **headers):
+        request = Request.blank('/invoice.pdf', headers=headers)
+        request.registry = self.registry
+        response = make_document_response(
+            request, [self.template], data, self.render, name)
+        return request.get_response(response)
+
+    def test_response(self):
+        response = self.get()
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.content_type, 'application/pdf')
+        self.assertEqual(response.body, '0123456789')
+        self.assertIsNotNone(response.etag)
+        self.assertIsNotNone(response.last_modified)
+        self.assertTrue(response.cache_control.private)
+        self.assertEqual(self.render_count, 1)
+
+        # not modified
+        not_modified = self.get(**{'If-None-Match': '"{0}"'.format(
+            response.etag)})
+        self.assertEqual(not_modified.status_int, 304)
+        self.assertEqual(not_modified.body, '')
+
+        # range
+        partial = self.get(Range='bytes=2-5')
+        self.assertEqual(partial.status_int, 206)
+        self.assertEqual(partial.body, '2345')
+        self.assertEqual(self.render_count, 1)
+
+    def test_response_named(self):
+        documents_path = os.path.join(self.cache_path, 'documents')
+        first = self.get(name=u'invoice_1')
+        self.assertEqual(len(os.listdir(documents_path)), 1)
+
+        # the new version supersedes the cached one
+        second = self.get(data=u'changed', name=u'invoice_1')
+        self.assertNotEqual(second.etag, first.etag)
+        self.assertEqual(self.render_count, 2)
+        self.assertEqual(len(os.listdir(documents_path)), 1)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the c3smembership.presentation.sql_instrumentation module.
+"""
+
+from unittest import TestCase
+
+import mock
+from pyramid import testing
+from pyramid.response import Response
+from sqlalchemy import create_engine
+
+from c3smembership.presentation.sql_instrumentation import (
+    SqlInstrumentation,
+    sql_instrumentation_tween_factory,
+)
+
+
+class SqlInstrumentationTest(TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.engine.execute('CREATE TABLE members (id INTEGER, name TEXT)')
+        self.engine.execute(
+            'INSERT INTO members VALUES (1, "Alice"), (2, "Bob")')
+
+    def query_members(self, count):
+        self.engine.execute('SELECT id, name FROM members').fetchall()
+        for member_id in range(count):
+            self.engine.execute(
+                'SELECT name FROM members WHERE id = ?', member_id).fetchall()
+
+    def create_request(self, path='/dashboard', route_name='dashboard'):
+        request = testing.DummyRequest(path=path)
+        request.matched_route = mock.Mock()
+        request.matched_route.name = route_name
+        return request
+
+    def test_recording(self):
+        instrumentation = SqlInstrumentation(
+            slowest_count=3, repetition_threshold=5)
+        instrumentation.instrument(self.engine)
+
+        # not recorded outside of requests
+        self.query_members(10)
+        self.assertEqual(instrumentation.get_history(), [])
+
+        instrumentation.start()
+        self.query_members(6)
+        statistics = instrumentation.stop(self.create_request())
+
+        self.assertEqual(statistics.method, 'GET')
+        self.assertEqual(statistics.path, '/dashboard')
+        self.assertEqual(statistics.route_name, 'dashboard')
+        self.assertEqual(statistics.query_count, 7)
+        self.assertTrue(statistics.database_time > 0)
+        self.assertTrue(statistics.request_time >= statistics.database_time)
+        self.assertEqual(len(statistics.slowest_statements), 3)
+        durations = [slow.duration for slow in statistics.slowest_statements]
+        self.assertEqual(durations, sorted(durations, reverse=True))
+        self.assertEqual(len(statistics.repeated_statements), 1)
+        self.assertEqual(statistics.repeated_statements[0].count, 6)
+        self.assertEqual(
+            statistics.repeated_statements[0].statement,
+            'SELECT name FROM members WHERE id = ?')
+        self.assertEqual(instrumentation.get_history(), [statistics])
+
+        instrumentation.start()
+        self.query_members(4)
+        statistics = instrumentation.stop(
+            self.create_request('/stats', 'stats'))
+        self.assertEqual(statistics.query_count, 5)
+        self.assertEqual(statistics.repeated_statements, [])
+
+        # requests without queries are not kept
+        instrumentation.start()
+        instrumentation.stop(self.create_request('/static/logo.png', None))
+
+        history = instrumentation.get_history()
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[0].path, '/stats')
+        self.assertEqual(history[1].path, '/dashboard')
+
+    def test_history_size(self):
+        instrumentation = SqlInstrumentation(history_size=2)
+        instrumentation.instrument(self.engine)
+        for path in ['/1', '/2', '/3']:
+            instrumentation.start()
+            self.query_members(0)
+            instrumentation.stop(self.create_request(path))
+        self.assertEqual(
+            [statistics.path for statistics in instrumentation.get_history()],
+            ['/3', '/2'])
+
+    def test_tween(self):
+        registry = mock.Mock()
+        registry.settings = {'c3smembership.runmode': 'dev'}
+        registry.sql_instrumentation = SqlInstrumentation(
+            repetition_threshold=3)
+        registry.sql_instrumentation.instrument(self.engine)
+
+        def handler(request):
+            self.query_members(3)
+            return Response('ok')
+
+        tween = sql_instrumentation_tween_factory(handler, registry)
+        with mock.patch(
+                'c3smembership.presentation.sql_instrumentation.LOG') as log:
+            response = tween(self.create_request())
+        self.assertTrue(
+            response.headers['X-SQL-Instrumentation'].startswith(
+                'queries=4; db_time='))
+        self.assertTrue(
+            response.headers['X-SQL-Instrumentation'].endswith(
+                'repeated=3'))
+        self.assertEqual(log.info.call_count, 1)
+        self.assertEqual(log.warning.call_count, 1)
+        self.assertEqual(log.warning.call_args[0][3], 3)
+
+        # no header in production
+        registry.settings = {'c3smembership.runmode': 'prod'}
+        tween = sql_instrumentation_tween_factory(handler, registry)
+        response = tween(self.create_request())
+        self.assertFalse('X-SQL-Instrumentation' in response.headers)
+        self.assertEqual(len(registry.sql_instrumentation.get_history()), 2)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from c3smembership.presentation.version_information import (
+    VersionInformationProvider,
+)
+
+
+class VersionInformationProviderTest(TestCase):
+
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.base_path, '.git', 'logs'))
+        self.write('VERSION', '1.20.4', 100)
+        self.write(os.path.join('.git', 'HEAD'), 'ref: refs/heads/master', 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_path)
+
+    def write(self, filename, content, modification_time):
+        filename = os.path.join(self.base_path, filename)
+        with open(filename, 'w') as written_file:
+            written_file.write(content)
+        os.utime(filename, (modification_time, modification_time))
+
+    def create_provider(self, **kwargs):
+        provider = VersionInformationProvider(self.base_path, **kwargs)
+        provider.git_tools = mock.Mock()
+        provider.git_tools.get_tag.return_value = u'1.20.4'
+        provider.git_tools.get_branch.return_value = u'master'
+        provider.git_tools.get_commit_hash.return_value = u'abc123'
+        provider.git_tools.get_github_base_url.return_value = \
+            u'https://github.com/C3S/c3sMembership'
+        return provider
+
+    def test_get(self):
+        provider = self.create_provider()
+
+        version = provider.get()
+        self.assertEqual(version.version_information, u'Version 1.20.4')
+        self.assertIsNone(version.version_location_name)
+        self.assertIsNone(version.version_location_url)
+        provider.git_tools.get_tag.assert_not_called()
+
+        # served from memory
+        self.write('VERSION', '1.21.0', 200)
+        self.assertEqual(
+            provider.get().version_information, u'Version 1.20.4')
+
+    def test_get_git(self):
+        provider = self.create_provider(include_git=True)
+
+        version = provider.get()
+        self.assertEqual(
+            version.version_information,
+            u'Version 1.20.4, Tag 1.20.4, Branch master')
+        self.assertEqual(version.version_location_name, u'abc123')
+        self.assertEqual(
+            version.version_location_url,
+            u'https://github.com/C3S/c3sMembership/commit/abc123')
+
+        provider.get()
+        self.assertEqual(provider.git_tools.get_tag.call_count, 1)
+        self.assertEqual(provider.git_tools.get_commit_hash.call_count, 1)
+
+        provider.git_tools.get_tag.return_value = None
+        provider.git_tools.get_github_base_url.return_value = None
+        provider._version_information = None
+        version = provider.get()
+        self.assertEqual(
+            version.version_information, u'Version 1.20.4, Branch master')
+        self.assertIsNone(version.version_location_url)
+
+    def test_get_refresh(self):
+        provider = self.create_provider(include_git=True, refresh=True)
+        provider.get()
+        provider.get()
+        self.assertEqual(provider.git_tools.get_branch.call_count, 1)
+
+        # new version
+        self.write('VERSION', '1.21.0', 200)
+        self.assertEqual(
+            provider.get().version_information,
+            u'Version 1.21.0, Tag 1.20.4, Branch master')
+        self.assertEqual(provider.git_tools.get_branch.call_count, 2)
+
+        # checkout of another branch
+        provider.git_tools.get_branch.return_value = u'develop'
+        self.write(
+            os.path.join('.git', 'HEAD'), 'ref: refs/heads/develop', 300)
+        self.assertEqual(
+            provider.get().version_information,
+            u'Version 1.21.0, Tag 1.20.4, Branch develop')
+        provider.get()
+        self.assertEqual(provider.git_tools.get_branch.call_count, 3)
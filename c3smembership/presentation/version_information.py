@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Provides the version information displayed on the pages.
+
+Reading the VERSION file and, in development mode, running git for the tag,
+branch, commit hash and remote URL is expensive compared to rendering a page.
+The version information is therefore resolved once per process and served
+from memory. Optionally, it is resolved again when the VERSION file or the
+git HEAD changes, e.g. on a staging instance which is updated by pulling
+from git without restarting.
+"""
+
+from collections import namedtuple
+import os
+import threading
+
+from c3smembership.git_tools import GitTools
+
+
+VersionInformation = namedtuple('VersionInformation', [
+    'version_information',
+    'version_location_name',
+    'version_location_url',
+])
+"""
+The version information displayed on the pages.
+
+Attributes:
+    version_information: The version text, e.g. "Version 1.20.4" or in
+        development mode "Version 1.20.4, Tag 1.20.4, Branch master".
+    version_location_name: The commit hash in development mode, otherwise
+        None.
+    version_location_url: The Github URL of the commit in development mode,
+        otherwise None.
+"""
+
+
+class VersionInformationProvider(object):
+    """
+    Provides the version information resolved once per process.
+    """
+
+    git_tools = GitTools
+
+    def __init__(self, base_path, include_git=False, refresh=False):
+        """
+        Initialises the VersionInformationProvider object.
+
+        Args:
+            base_path: The path of the directory containing the VERSION file
+                and the git repository.
+            include_git: Optional. Whether the git tag, branch and commit are
+                included. Defaults to False.
+            refresh: Optional. Whether the version information is resolved
+                again when the modification time of the VERSION file or the
+                git HEAD changes. Defaults to False.
+        """
+        self._version_file = os.path.join(base_path, 'VERSION')
+        self._watched_files = [self._version_file]
+        if include_git:
+            self._watched_files.extend([
+                os.path.join(base_path, '.git', 'HEAD'),
+                os.path.join(base_path, '.git', 'logs', 'HEAD'),
+            ])
+        self._include_git = include_git
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._version_information = None
+        self._modification_times = None
+
+    def _get_modification_times(self):
+        modification_times = []
+        for filename in self._watched_files:
+            try:
+                modification_times.append(os.path.getmtime(filename))
+            except OSError:
+                modification_times.append(None)
+        return modification_times
+
+    def _resolve(self):
+        with open(self._version_file) as version_file:
+            version_number = version_file.read()
+        if not self._include_git:
+            return VersionInformation(
+                version_information=u'Version {0}'.format(version_number),
+                version_location_name=None,
+                version_location_url=None)
+
+        git_tag = self.git_tools.get_tag()
+        branch_name = self.git_tools.get_branch()
+        version_metadata = [u'Version {0}'.format(version_number)]
+        if git_tag is not None:
+            version_metadata.append(u'Tag {0}'.format(git_tag))
+        if branch_name is not None:
+            version_metadata.append(u'Branch {0}'.format(branch_name))
+        commit_hash = self.git_tools.get_commit_hash()
+        github_base_url = self.git_tools.get_github_base_url()
+        commit_url = None
+        if commit_hash is not None and github_base_url is not None:
+            commit_url = '{0}/commit/{1}'.format(github_base_url, commit_hash)
+        return VersionInformation(
+            version_information=', '.join(version_metadata),
+            version_location_name=commit_hash,
+            version_location_url=commit_url)
+
+    def get(self):
+        """
+        Gets the version information.
+
+        Returns:
+            The VersionInformation.
+        """
+        with self._lock:
+            if self._version_information is None:
+                self._modification_times = self._get_modification_times()
+                self._version_information = self._resolve()
+            elif self._refresh:
+                modification_times = self._get_modification_times()
+                if modification_times != self._modification_times:
+                    self._modification_times = modification_times
+                    self._version_information = self._resolve()
+            return self._version_information
@@ -44,13 +44,18 @@ def dashboard(request):
     try:
         members = C3sMember.nonmember_listing(
             pagination.paging.content_offset,
-            pagination.paging.page_size,
+            pagination.paging.page_content_size,
             pagination.sorting.sort_property,
-            pagination.sorting.sort_direction)
+            pagination.sorting.sort_direction,
+            pagination.paging.cursor)
     except (InvalidPropertyException, InvalidSortDirection):
         raise ParameterValidationException(
             'Page does not exist.',
             request.route_url(request.matched_route.name))
+    if members:
+        # link the next and previous pages by keyset cursors
+        request.pagination = pagination.with_page_keys(
+            members[0].id, members[-1].id)
     return {
         'members': members,
     }
@@ -15,16 +15,37 @@ def membership_listing_backend(request):
     the list is HTML with clickable links,
     not good for printout.
     """
+    pagination = request.pagination
     memberships = C3sMember.get_members(
-        request.pagination.sorting.sort_property,
-        how_many=request.pagination.paging.page_size,
-        offset=request.pagination.paging.content_offset,
-        order=request.pagination.sorting.sort_direction)
+        pagination.sorting.sort_property,
+        how_many=pagination.paging.page_content_size,
+        offset=pagination.paging.content_offset,
+        order=pagination.sorting.sort_direction,
+        cursor=pagination.paging.cursor)
+    if memberships:
+        # link the next and previous pages by keyset cursors
+        request.pagination = pagination.with_page_keys(
+            memberships[0].id, memberships[-1].id)
     return {
         'members': memberships,
     }
 
 
+@view_config(renderer='csv',
+             permission='manage',
+             route_name='membership_listing_csv')
+def membership_listing_csv(request):
+    """
+    This view lets accountants export all accepted members as CSV.
+
+    The members are streamed from the database while the CSV is sent.
+    """
+    member_information = request.registry.member_information
+    return {
+        'query': member_information.get_accepted_members_export(),
+    }
+
+
 def membership_content_size_provider():
     return C3sMember.get_num_members_accepted()
 
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Shows the SQL statistics of the most recent requests.
+"""
+
+from pyramid.view import view_config
+
+
+@view_config(
+    renderer='c3smembership:presentation/templates/sql_performance.pt',
+    permission='manage',
+    route_name='sql_performance')
+def sql_performance(request):
+    """
+    Shows the number of queries, database time, slowest statements and
+    repeated statements of the most recent requests.
+
+    Note:
+        Expects the object request.registry.sql_instrumentation to be a
+        c3smembership.presentation.sql_instrumentation.SqlInstrumentation.
+    """
+    history = request.registry.sql_instrumentation.get_history()
+    return {
+        'history': history,
+        'n_plus_one_count': len(
+            [statistics for statistics in history
+             if statistics.repeated_statements]),
+    }
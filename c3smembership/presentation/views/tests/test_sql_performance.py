@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+import mock
+from pyramid import testing
+
+from c3smembership.presentation.sql_instrumentation import (
+    RepeatedStatement,
+    RequestStatistics,
+)
+from c3smembership.presentation.views.sql_performance import (
+    sql_performance,
+)
+
+
+class SqlPerformanceTest(TestCase):
+
+    def test_sql_performance(self):
+        history = [
+            RequestStatistics(
+                'GET', '/dashboard', 'dashboard', 42, 0.2, 0.3, [],
+                [RepeatedStatement(40, 'SELECT ...')]),
+            RequestStatistics(
+                'GET', '/stats', 'stats', 4, 0.01, 0.1, [], []),
+        ]
+        request = testing.DummyRequest()
+        request.registry.sql_instrumentation = mock.Mock()
+        request.registry.sql_instrumentation.get_history.return_value = \
+            history
+
+        result = sql_performance(request)
+
+        self.assertEqual(result['history'], history)
+        self.assertEqual(result['n_plus_one_count'], 1)
@@ -81,12 +81,14 @@ def toolbox(request):
        - Alphabetical Aufstockers List
     - Members List (PDF)
     - Import & Export
+    - Progress of queued batch mails
     - ...
     """
 
     form_renderer = build_form_renderer()
     result = {
-        'date': date.today().strftime('%Y-%m-%d')
+        'date': date.today().strftime('%Y-%m-%d'),
+        'mail_queue_progress': request.registry.mail_queue.get_progress(),
     }
     result = form_renderer.render(request, result)
     return result
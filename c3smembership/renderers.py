@@ -1,6 +1,82 @@
+"""
+Renderers for exporting data.
+
+The CSV renderer is registered as 'csv' and renders a dictionary with either
+the key 'query', a SQLAlchemy statement, or the key 'rows', an iterable of
+rows, and optionally the key 'header', the list of column names.
+
+The CSV is written and sent in chunks while the rows are iterated so that
+large exports use constant memory and the response starts immediately. The
+rows are iterated after the view returned, i.e. after the transaction was
+committed and the database session was closed. A query is therefore executed
+within the response on a dedicated database connection streaming the results
+from a server-side cursor, e.g.::
+
+    return {
+        'query': DBSession.query(
+            C3sMember.id,
+            C3sMember.firstname,
+            C3sMember.lastname).statement,
+    }
+
+The header defaults to the column names of the query. Rows given as iterable
+must not need the database session.
+
+In prod mode the CSV is streamed through GnuPG.
+"""
+
 import StringIO
 import unicodecsv
-from gnupg_encrypt import encrypt_with_gnupg
+from gnupg_encrypt import encrypt_stream_with_gnupg
+
+from c3smembership.data.model.base import DBSession
+
+
+def iterate_csv_chunks(header, rows, chunk_size=65536):
+    """
+    Writes the header and rows as CSV and yields the CSV in chunks of
+    approximately chunk_size bytes.
+    """
+    fout = StringIO.StringIO()
+    writer = unicodecsv.writer(
+        fout, delimiter=';', quoting=unicodecsv.QUOTE_ALL)
+
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if fout.tell() >= chunk_size:
+            yield fout.getvalue()
+            fout.seek(0)
+            fout.truncate()
+    if fout.tell() > 0:
+        yield fout.getvalue()
+
+
+def iterate_query_csv_chunks(bind, query, header=None):
+    """
+    Executes the query on a dedicated connection and yields the results as
+    CSV in chunks.
+
+    The results are streamed from a server-side cursor where the database
+    supports it. The connection is independent of the transaction of the
+    request and closed when the iteration finishes or is closed early.
+
+    Args:
+        bind: The engine to connect to.
+        query: The SQLAlchemy statement to execute.
+        header: Optional. The list of column names. Defaults to the column
+            names of the query.
+    """
+    connection = bind.connect()
+    try:
+        result = connection.execution_options(
+            stream_results=True).execute(query)
+        if header is None:
+            header = result.keys()
+        for chunk in iterate_csv_chunks(header, result):
+            yield chunk
+    finally:
+        connection.close()
 
 
 class CSVRenderer(object):
@@ -8,19 +84,18 @@ class CSVRenderer(object):
         pass
 
     def __call__(self, value, system):
-        fout = StringIO.StringIO()
-        writer = unicodecsv.writer(
-            fout, delimiter=';', quoting=unicodecsv.QUOTE_ALL)
-
-        writer.writerow(value['header'])
-        writer.writerows(value['rows'])
+        if 'query' in value:
+            chunks = iterate_query_csv_chunks(
+                DBSession.get_bind(), value['query'], value.get('header'))
+        else:
+            chunks = iterate_csv_chunks(value['header'], value['rows'])
 
         resp = system['request'].response
         resp.content_type = 'text/csv'
         resp.content_disposition = 'attachment;filename="yes.csv"'
         if system['request'].registry.settings[
                 'c3smembership.runmode'] == 'dev':
-            return fout.getvalue()
+            resp.app_iter = chunks
         if system['request'].registry.settings[
                 'c3smembership.runmode'] == 'prod':
-            return encrypt_with_gnupg(fout.getvalue())
+            resp.app_iter = encrypt_stream_with_gnupg(chunks)
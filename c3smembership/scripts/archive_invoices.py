@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Archives the dues invoices not yet archived.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_archive_invoices
+
+Usage:
+
+  env/bin/c3sMembership_archive_invoices <config_uri> [--count=<count>]
+      [--workers=<workers>]
+
+The invoices are rendered in parallel by a pool of worker processes. Their
+number is given with --workers and defaults to the setting
+c3smembership.invoice_archiving_workers or the number of CPUs. With --count
+only the given number of invoices is archived.
+
+Unlike the toolbox the console script runs in a single threaded process which
+can safely be forked by the worker pool.
+"""
+
+import os
+import sys
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.dues_invoice_archiving import (
+    DuesInvoiceArchiving
+)
+from c3smembership.data.model.base import DBSession
+from c3smembership.models import (
+    C3sMember,
+    Dues15Invoice,
+)
+from c3smembership.views.membership_dues import (
+    make_invoice_pdf_pdflatex,
+    make_reversal_pdf_pdflatex,
+)
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> [--count=<count>] [--workers=<workers>]\n'
+          '(example: "%s development.ini --workers=4")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def print_progress(archived, total):
+    """
+    Prints the number of archived invoices.
+    """
+    print(u'archived {0} of {1} invoices'.format(archived, total))
+
+
+def main(argv=sys.argv):
+    """
+    Archives the dues invoices not yet archived.
+    """
+    arguments = argv[1:]
+    options = {}
+    for argument in list(arguments):
+        for option in ['--count=', '--workers=']:
+            if argument.startswith(option):
+                try:
+                    options[option] = int(argument[len(option):])
+                except ValueError:
+                    usage(argv)
+                arguments.remove(argument)
+    if len(arguments) != 1:
+        usage(argv)
+    config_uri = arguments[0]
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+
+    # number of processes rendering invoices, defaults to the number of CPUs
+    worker_count = options.get('--workers') or int(
+        settings.get('c3smembership.invoice_archiving_workers', 0)) or None
+    invoices_archive_path = os.path.abspath(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '../../invoices/'))
+    archiving = DuesInvoiceArchiving(
+        DBSession,
+        C3sMember,
+        Dues15Invoice,
+        make_invoice_pdf_pdflatex,
+        make_reversal_pdf_pdflatex,
+        invoices_archive_path,
+        worker_count)
+    with transaction.manager:
+        archiving.generate_missing_invoice_pdfs(
+            options.get('--count', float('inf')), print_progress)
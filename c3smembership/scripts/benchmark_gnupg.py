@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the GnuPG encryption of application mails and exports.
+
+Measures the throughput of gnupg_encrypt.encrypt_with_gnupg using the
+persistent keyring of the process compared to creating a new keyring for each
+message as it was done before. The messages are encrypted by the specified
+numbers of concurrent threads as it happens during signup spikes.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/benchmark_c3sMembership_gnupg
+
+Usage:
+
+  env/bin/benchmark_c3sMembership_gnupg [<messages> [<threads> ...]]
+
+If no arguments are given the benchmark encrypts 100 messages with 1 and 4
+threads.
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import gnupg
+
+from c3smembership.gnupg_encrypt import (
+    C3S_KEY_FINGERPRINT,
+    C3S_PUBLIC_KEY,
+    KEYRING,
+    encrypt_with_gnupg,
+)
+
+DEFAULT_MESSAGES = 100
+DEFAULT_THREADS = [1, 4]
+MESSAGE = u';'.join([
+    u'"Firstname"', u'"Lastname"', u'"firstname.lastname@example.com"',
+    u'"Streetname 1"', u'"12345"', u'"Footown Mäh"', u'"DE"', u'"normal"',
+    u'"3"']) * 5
+
+
+def encrypt_with_new_keyring(data):
+    """
+    Encrypts the data with a new keyring like it was done for each message
+    before the keyring was kept per process.
+    """
+    keyfolder = tempfile.mkdtemp()
+    try:
+        gpg = gnupg.GPG(gnupghome=keyfolder)
+        gpg.encoding = 'utf-8'
+        gpg.list_keys()
+        gpg.import_keys(C3S_PUBLIC_KEY)
+        return gpg.encrypt(
+            data.encode(gpg.encoding),
+            C3S_KEY_FINGERPRINT,
+            always_trust=True).data
+    finally:
+        shutil.rmtree(keyfolder, ignore_errors=True)
+
+
+def measure(encrypt, messages, threads):
+    """
+    Encrypts the number of messages with the number of threads.
+
+    Returns:
+        The wall time in seconds.
+    """
+    # ensure the persistent keyring is initialised before measuring
+    KEYRING.get_gpg()
+    messages_per_thread = [messages // threads] * threads
+    messages_per_thread[0] += messages % threads
+
+    def _work(count):
+        for _ in range(count):
+            encrypted = encrypt(MESSAGE)
+            if '-----BEGIN PGP MESSAGE-----' not in encrypted:
+                raise IOError('Encryption failed')
+
+    workers = [
+        threading.Thread(target=_work, args=(count,))
+        for count in messages_per_thread]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time() - start
+
+
+def benchmark(messages, threads):
+    """
+    Runs the encryption benchmark for the number of messages and threads.
+    """
+    for name, encrypt, thread_count in [
+            ('new keyring', encrypt_with_new_keyring, 1),
+            ('persistent keyring', encrypt_with_gnupg, threads)]:
+        duration = measure(encrypt, messages, thread_count)
+        print('{0:>6} messages  {1:<20} {2:>3} threads  {3:8.3f} s  '
+              '{4:8.1f} messages/s'.format(
+                  messages, name, thread_count, duration,
+                  messages / duration))
+
+
+def main(argv=sys.argv):
+    """
+    Runs the encryption benchmark for the message count and thread counts
+    given as arguments.
+    """
+    messages = int(argv[1]) if len(argv) > 1 else DEFAULT_MESSAGES
+    thread_counts = [int(threads) for threads in argv[2:]] or DEFAULT_THREADS
+    for threads in thread_counts:
+        benchmark(messages, threads)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the share count of the membership register.
+
+Measures number of SQL queries and wall time of
+ShareRepository.get_share_count and ShareRepository.get_share_counts for
+registers of different sizes.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/benchmark_c3sMembership_share_count
+
+Usage:
+
+  env/bin/benchmark_c3sMembership_share_count [<size> ...]
+
+If no sizes are given the benchmark runs for 10000, 50000 and 200000 members.
+The data is generated into an in-memory SQLite database.
+"""
+
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+)
+import sys
+import time
+
+from sqlalchemy import (
+    create_engine,
+    event,
+)
+
+from c3smembership.data.model.base import (
+    Base,
+    DBSession,
+)
+from c3smembership.data.repository.share_repository import ShareRepository
+from c3smembership.models import (
+    C3sMember,
+    Shares,
+    members_shares,
+)
+
+DEFAULT_SIZES = [10000, 50000, 200000]
+BATCH_SIZE = 10000
+
+
+class QueryCounter(object):
+    """
+    Counts the SQL statements executed on an engine.
+    """
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    # pylint: disable=too-many-arguments,unused-argument
+    def _count(self, conn, cursor, statement, parameters, context,
+               executemany):
+        self.count += 1
+
+
+def populate(engine, size):
+    """
+    Populates the database with the specified number of accepted members each
+    holding one shares package.
+
+    Args:
+        engine: The SqlAlchemy engine to populate.
+        size: The number of members to create.
+    """
+    first_date = date(2013, 9, 25)
+    with engine.begin() as connection:
+        for batch_start in range(0, size, BATCH_SIZE):
+            batch_end = min(batch_start + BATCH_SIZE, size)
+            members = []
+            shares = []
+            links = []
+            for number in range(batch_start + 1, batch_end + 1):
+                acquisition_date = first_date + timedelta(days=number % 1500)
+                members.append({
+                    'id': number,
+                    'firstname': u'Firstname{0}'.format(number),
+                    'lastname': u'Lastname{0}'.format(number),
+                    'email': u'member{0}@example.com'.format(number),
+                    'date_of_birth': date(1980, 1, 1),
+                    'date_of_submission': datetime(2013, 9, 1),
+                    'email_confirm_code': u'CODE{0}'.format(number),
+                    'num_shares': number % 60 + 1,
+                    'membership_accepted': True,
+                    'membership_date': acquisition_date,
+                    'membership_number': number,
+                })
+                shares.append({
+                    'id': number,
+                    'number': number % 60 + 1,
+                    'date_of_acquisition': acquisition_date,
+                    'reference_code': u'CODE{0}'.format(number),
+                })
+                links.append({'members_id': number, 'shares_id': number})
+            connection.execute(C3sMember.__table__.insert(), members)
+            connection.execute(Shares.__table__.insert(), shares)
+            connection.execute(members_shares.insert(), links)
+
+
+def measure(counter, function, *args):
+    """
+    Measures the number of queries and wall time of a function call.
+
+    Returns:
+        A tuple of the function result, the number of queries and the wall
+        time in seconds.
+    """
+    counter.count = 0
+    start = time.time()
+    result = function(*args)
+    return result, counter.count, time.time() - start
+
+
+def benchmark(size):
+    """
+    Runs the share count benchmark for a register of the specified size.
+    """
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    populate(engine, size)
+    DBSession.remove()
+    DBSession.configure(bind=engine)
+    counter = QueryCounter(engine)
+
+    share_count, queries, duration = measure(
+        counter, ShareRepository.get_share_count)
+    print('{0:>8} members  get_share_count   {1:>10} shares  '
+          '{2:>3} queries  {3:8.3f} s'.format(
+              size, share_count, queries, duration))
+
+    effective_dates = [date(year, 12, 31) for year in range(2013, 2018)]
+    share_counts, queries, duration = measure(
+        counter, ShareRepository.get_share_counts, effective_dates)
+    print('{0:>8} members  get_share_counts  {1:>10} dates   '
+          '{2:>3} queries  {3:8.3f} s'.format(
+              size, len(share_counts), queries, duration))
+    DBSession.remove()
+
+
+def main(argv=sys.argv):
+    """
+    Runs the share count benchmark for the sizes given as arguments.
+    """
+    sizes = [int(size) for size in argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        benchmark(size)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the hot paths of the membership register.
+
+Generates synthetic registers of the specified sizes using
+generate_register.populate and measures the number of SQL queries and the
+wall time of
+
+- the share counts,
+- the membership listing and the member list PDF data,
+- the dashboard paging of applications by offset and keyset cursor,
+- the statistics snapshot,
+- the autocompletion of reference codes and names and
+- the monthly dues statistics.
+
+The results are printed and written as JSON to the output file so that runs
+can be compared before and after a change.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/benchmark_c3sMembership
+
+Usage:
+
+  env/bin/benchmark_c3sMembership [--output=<file>] [--seed=<n>]
+      [--repeat=<n>] [<size> ...]
+
+If no sizes are given the benchmark runs for 1000, 10000 and 100000 members.
+The output file defaults to benchmark.json, the seed to 0 and the number of
+repetitions of each measurement to 3. The data is generated into an
+in-memory SQLite database.
+"""
+
+from datetime import (
+    date,
+    datetime,
+)
+import json
+import os
+import platform
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+from c3smembership.business.member_information import MemberInformation
+from c3smembership.business.membership_number_allocator import (
+    MembershipNumberAllocator,
+)
+from c3smembership.business.statistics_information import (
+    StatisticsInformation,
+)
+from c3smembership.data.model.base import (
+    Base,
+    DBSession,
+)
+from c3smembership.data.repository.member_repository import MemberRepository
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository,
+)
+from c3smembership.data.repository.share_repository import ShareRepository
+from c3smembership.data.repository.statistics_repository import (
+    StatisticsRepository,
+)
+from c3smembership.models import C3sMember
+from c3smembership.presentation.pagination.pagination import Cursor
+from c3smembership.scripts.benchmark_share_count import QueryCounter
+from c3smembership.scripts.generate_register import populate
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT = 'benchmark.json'
+DEFAULT_REPEAT = 3
+PAGE_SIZE = 30
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s [--output=<file>] [--seed=<n>] [--repeat=<n>] '
+          '[<size> ...]\n'
+          '(example: "%s --output=before.json 1000 10000")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def _share_count():
+    return ShareRepository.get_share_count()
+
+
+def _share_counts():
+    return ShareRepository.get_share_counts(
+        [date(year, 12, 31) for year in range(2013, 2018)])
+
+
+def _membership_listing():
+    return C3sMember.get_members('lastname', PAGE_SIZE, 0)
+
+
+def _membership_listing_last_page():
+    return C3sMember.get_members(
+        'lastname',
+        PAGE_SIZE,
+        max(C3sMember.get_num_members_accepted() - PAGE_SIZE, 0))
+
+
+def _membership_listing_keyset_page():
+    # the page following member 1 which is anywhere in the lastname order
+    return C3sMember.get_members(
+        'lastname', PAGE_SIZE, cursor=Cursor(Cursor.AFTER, 1))
+
+
+def _membership_listing_keyset_last_page():
+    count = C3sMember.get_num_members_accepted()
+    return C3sMember.get_members(
+        'lastname',
+        count - (max(count - 1, 0) // PAGE_SIZE) * PAGE_SIZE,
+        cursor=Cursor(Cursor.BEFORE))
+
+
+def _member_list_data():
+    members = MemberInformation(
+        MemberRepository).get_accepted_members_sorted()
+    share_counts = ShareRepository.get_member_share_counts()
+    return len(members), len(share_counts)
+
+
+def _dashboard_first_page():
+    return C3sMember.nonmember_listing(0, PAGE_SIZE, 'id', 'asc'), \
+        C3sMember.nonmember_listing_count()
+
+
+def _dashboard_last_page():
+    count = C3sMember.nonmember_listing_count()
+    return C3sMember.nonmember_listing(
+        max(count - PAGE_SIZE, 0), PAGE_SIZE, 'lastname', 'desc')
+
+
+def _dashboard_keyset_page():
+    return C3sMember.nonmember_listing(
+        0, PAGE_SIZE, 'lastname', 'desc', Cursor(Cursor.AFTER, 1))
+
+
+def _statistics():
+    # a new instance each time to bypass the snapshot cache
+    return StatisticsInformation(
+        StatisticsRepository,
+        ShareRepository,
+        MembershipNumberAllocator(
+            MemberRepository, NumberSequenceRepository)).get_snapshot()
+
+
+def _autocomplete_codes():
+    return C3sMember.get_matching_codes(u'A')
+
+
+def _autocomplete_people():
+    return C3sMember.get_matching_people(u'Mü')
+
+
+def _monthly_dues_stats():
+    return StatisticsRepository.get_dues_statistics()
+
+
+HOT_PATHS = [
+    ('share_count', _share_count),
+    ('share_counts', _share_counts),
+    ('membership_listing', _membership_listing),
+    ('membership_listing_last_page', _membership_listing_last_page),
+    ('membership_listing_keyset_page', _membership_listing_keyset_page),
+    ('membership_listing_keyset_last_page',
+     _membership_listing_keyset_last_page),
+    ('member_list_data', _member_list_data),
+    ('dashboard_first_page', _dashboard_first_page),
+    ('dashboard_last_page', _dashboard_last_page),
+    ('dashboard_keyset_page', _dashboard_keyset_page),
+    ('statistics', _statistics),
+    ('autocomplete_codes', _autocomplete_codes),
+    ('autocomplete_people', _autocomplete_people),
+    ('monthly_dues_stats', _monthly_dues_stats),
+]
+"""
+The hot paths measured as tuples of name and function.
+"""
+
+
+def measure(counter, function, repeat):
+    """
+    Measures the number of queries and wall time of a function call.
+
+    Each repetition starts with an empty session so that no objects are
+    served from the identity map.
+
+    Returns:
+        A dictionary with the number of queries of a call and the minimum and
+        maximum wall time in seconds.
+    """
+    durations = []
+    queries = 0
+    for _ in range(repeat):
+        DBSession.remove()
+        counter.count = 0
+        start = time.time()
+        function()
+        durations.append(time.time() - start)
+        queries = counter.count
+    return {
+        'queries': queries,
+        'min_seconds': min(durations),
+        'max_seconds': max(durations),
+    }
+
+
+def benchmark(size, seed, repeat):
+    """
+    Runs the benchmark suite for a register of the specified size.
+
+    Returns:
+        A list of dictionaries containing the size, hot path name, number of
+        queries and the wall times.
+    """
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    start = time.time()
+    populate(engine, size, seed)
+    print('{0:>8} members generated in {1:.1f} s'.format(
+        size, time.time() - start))
+    DBSession.remove()
+    DBSession.configure(bind=engine)
+    counter = QueryCounter(engine)
+    results = []
+    for name, function in HOT_PATHS:
+        result = measure(counter, function, repeat)
+        result['size'] = size
+        result['name'] = name
+        results.append(result)
+        print('{0:>8} members  {1:<36} {2:>4} queries  {3:8.3f} s'.format(
+            size, name, result['queries'], result['min_seconds']))
+    DBSession.remove()
+    engine.dispose()
+    return results
+
+
+def main(argv=sys.argv):
+    """
+    Runs the benchmark suite for the sizes given as arguments and writes the
+    results to the output file.
+    """
+    output = DEFAULT_OUTPUT
+    seed = 0
+    repeat = DEFAULT_REPEAT
+    sizes = []
+    try:
+        for argument in argv[1:]:
+            if argument.startswith('--output='):
+                output = argument[len('--output='):]
+            elif argument.startswith('--seed='):
+                seed = int(argument[len('--seed='):])
+            elif argument.startswith('--repeat='):
+                repeat = int(argument[len('--repeat='):])
+            else:
+                sizes.append(int(argument))
+    except ValueError:
+        usage(argv)
+    if repeat < 1 or not output:
+        usage(argv)
+    sizes = sizes or DEFAULT_SIZES
+
+    results = []
+    for size in sizes:
+        results.extend(benchmark(size, seed, repeat))
+    with open(output, 'w') as output_file:
+        json.dump({
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'seed': seed,
+            'repeat': repeat,
+            'results': results,
+        }, output_file, indent=2, sort_keys=True)
+    print('results written to {0}'.format(output))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Calculates the membership dues of all members for a dues year.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_calculate_dues
+
+Usage:
+
+  env/bin/c3sMembership_calculate_dues <config_uri> [--year=<dues year>]
+      [--dry-run]
+
+The start quarter, amount and balance are calculated for all members liable
+to pay dues for the year given with --year which defaults to 2017. They are
+stored for the members not yet invoiced within one transaction. Already
+invoiced members keep their dues.
+
+With --dry-run nothing is stored and only the totals are printed, i.e. the
+sum of the dues, reductions, payments and outstanding receivables.
+"""
+
+import os
+import sys
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.dues_calculation import DuesCalculation
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.change_tracking import ChangeGeneration
+from c3smembership.data.repository.dues_calculation_repository import (
+    DuesCalculationRepository
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> [--year=<dues year>] [--dry-run]\n'
+          '(example: "%s development.ini --year=2017 --dry-run")'
+          % (cmd, cmd))
+    sys.exit(1)
+
+
+def print_preview(preview):
+    """
+    Prints the dues totals of a dues year.
+    """
+    print(u'dues {0}'.format(preview.year))
+    print(u'  members: {0} ({1} invoiced)'.format(
+        preview.members, preview.invoiced))
+    for start, count in sorted(preview.quarters.items()):
+        print(u'    {0}: {1}'.format(start, count))
+    print(u'  amount: {0} EUR'.format(preview.amount))
+    print(u'  reductions: {0} EUR'.format(preview.reductions))
+    print(u'  paid: {0} EUR'.format(preview.paid))
+    print(u'  receivables: {0} EUR'.format(preview.receivables))
+
+
+def main(argv=sys.argv):
+    """
+    Calculates the dues of the dues year.
+    """
+    arguments = argv[1:]
+    dry_run = '--dry-run' in arguments
+    if dry_run:
+        arguments.remove('--dry-run')
+    year = 2017
+    for argument in list(arguments):
+        if argument.startswith('--year='):
+            try:
+                year = int(argument[len('--year='):])
+            except ValueError:
+                usage(argv)
+            arguments.remove(argument)
+    if len(arguments) != 1 or \
+            year not in DuesCalculationRepository.DUES_YEARS:
+        usage(argv)
+    config_uri = arguments[0]
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+
+    dues_calculation = DuesCalculation(DuesCalculationRepository)
+    with transaction.manager:
+        if dry_run:
+            preview = dues_calculation.preview(year)
+        else:
+            preview = dues_calculation.apply(year)
+            # invalidate the caches of the running web application
+            ChangeGeneration(NumberSequenceRepository).increment()
+    print_preview(preview)
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+Generates a synthetic membership register for load tests and benchmarks.
+
+The register consists of membership applications and accepted members with
+their shares and the dues invoices of 2015, 2016 and 2017 including payments,
+reductions and reversal invoices. The data is generated from a seed so that
+the same seed and size always produce the same register.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_generate_register
+
+Usage:
+
+  env/bin/c3sMembership_generate_register <config_uri> [--size=<n>]
+      [--seed=<n>]
+
+The register is appended to the database configured in the config file. The
+size is the number of members and applicants and defaults to 30000. Sizes
+from 1000 to 500000 are reasonable. The seed defaults to 0.
+
+Never run this against a production database.
+"""
+
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+)
+from decimal import Decimal
+import os
+import random
+import string
+import sys
+import time
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import (
+    engine_from_config,
+    func,
+    select,
+)
+
+from c3smembership.data.model.base import Base
+from c3smembership.models import (
+    C3sMember,
+    Dues15Invoice,
+    Dues16Invoice,
+    Dues17Invoice,
+    NumberSequence,
+    Shares,
+    fold_search_text,
+    members_shares,
+    rebuild_dues_ledger,
+)
+
+DEFAULT_SIZE = 30000
+BATCH_SIZE = 5000
+
+FIRST_SUBMISSION = datetime(2013, 9, 1)
+LAST_SUBMISSION = datetime(2017, 12, 31)
+
+FIRSTNAMES = [
+    u'Anna', u'Ben', u'Clara', u'David', u'Emma', u'Felix', u'Greta',
+    u'Hannes', u'Ida', u'Jonas', u'Karla', u'Lukas', u'Marie', u'Niklas',
+    u'Olga', u'Paul', u'Quentin', u'Rosa', u'Stefan', u'Tanja', u'Ute',
+    u'Viktor', u'Wiebke', u'Xaver', u'Yvonne', u'Zoë', u'Jürgen', u'Björn',
+    u'Søren', u'Renée', u'Christoph', u'Kristof', u'Meik', u'Julian',
+]
+LASTNAMES = [
+    u'Müller', u'Schmidt', u'Schneider', u'Fischer', u'Weber', u'Meyer',
+    u'Wagner', u'Becker', u'Schulz', u'Hoffmann', u'Schäfer', u'Koch',
+    u'Bauer', u'Richter', u'Klein', u'Wolf', u'Schröder', u'Neumann',
+    u'Schwarz', u'Zimmermann', u'Braun', u'Krüger', u'Hofmann', u'Hartmann',
+    u'Lange', u'Schmitt', u'Werner', u'Krause', u'Meier', u'Lehmann',
+    u'Smith', u'Jones', u'García', u'Rossi', u'Dubois', u'Nowak', u'Öztürk',
+]
+CITIES = [
+    (u'Düsseldorf', u'40'), (u'Berlin', u'10'), (u'Hamburg', u'20'),
+    (u'München', u'80'), (u'Köln', u'50'), (u'Leipzig', u'04'),
+    (u'Frankfurt am Main', u'60'), (u'Stuttgart', u'70'),
+]
+COUNTRIES = [
+    (u'DE', 0.85), (u'AT', 0.05), (u'CH', 0.03), (u'NL', 0.02), (u'FR', 0.02),
+    (u'GB', 0.02), (u'US', 0.01),
+]
+COLLECTING_SOCIETIES = [u'GEMA', u'SACEM', u'PRS', u'BUMA']
+DUES_YEARS = [
+    (2015, Dues15Invoice),
+    (2016, Dues16Invoice),
+    (2017, Dues17Invoice),
+]
+QUARTER_AMOUNTS = [Decimal('50'), Decimal('37.50'), Decimal('25'),
+                   Decimal('12.50')]
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> [--size=<n>] [--seed=<n>]\n'
+          '(example: "%s development.ini --size=30000")' % (cmd, cmd))
+    sys.exit(1)
+
+
+class RegisterGenerator(object):
+    """
+    Generates the rows of a synthetic membership register.
+
+    The rows are generated in batches of dictionaries which can be inserted
+    using executemany. The IDs, membership numbers and invoice numbers
+    continue the ones already existing in the database.
+    """
+
+    def __init__(self, size, seed=0, first_ids=None):
+        """
+        Initialises the RegisterGenerator object.
+
+        Args:
+            size: The number of members and applicants to generate.
+            seed: Optional. The seed of the random number generator,
+                defaults to 0.
+            first_ids: Optional. A dictionary of the first IDs and numbers to
+                use with the keys member, shares, membership_number and the
+                invoice classes, all defaulting to 1.
+        """
+        self._size = size
+        first_ids = first_ids or {}
+        self._member_id = first_ids.get('member', 1)
+        # appending to an existing register with the same seed must not
+        # repeat its reference codes and tokens
+        self._random = random.Random(seed * 1000003 + self._member_id)
+        self._shares_id = first_ids.get('shares', 1)
+        self._membership_number = first_ids.get('membership_number', 1)
+        self._invoice_ids = {}
+        for _, invoice_class in DUES_YEARS:
+            self._invoice_ids[invoice_class] = first_ids.get(invoice_class, 1)
+        self._codes = set()
+
+    def _choose_weighted(self, choices):
+        value = self._random.random()
+        for choice, weight in choices:
+            value -= weight
+            if value < 0:
+                return choice
+        return choices[-1][0]
+
+    def _make_code(self, length=10):
+        while True:
+            code = u''.join(
+                self._random.choice(string.ascii_uppercase)
+                for _ in range(length))
+            if code not in self._codes:
+                self._codes.add(code)
+                return code
+
+    def _make_submission_date(self, index):
+        # submissions increase with the ID with some jitter so that
+        # membership numbers roughly follow the membership dates
+        span = (LAST_SUBMISSION - FIRST_SUBMISSION).total_seconds()
+        offset = span * index / self._size + self._random.uniform(
+            -86400 * 3, 86400 * 3)
+        offset = min(max(offset, 0), span)
+        return FIRST_SUBMISSION + timedelta(seconds=int(offset))
+
+    def batches(self, batch_size=BATCH_SIZE):
+        """
+        Generates the register in batches.
+
+        Yields:
+            Dictionaries with the keys members, shares, members_shares and
+            the invoice classes each containing a list of rows.
+        """
+        for batch_start in range(0, self._size, batch_size):
+            batch = {
+                'members': [],
+                'shares': [],
+                'members_shares': [],
+            }
+            for _, invoice_class in DUES_YEARS:
+                batch[invoice_class] = []
+            for index in range(
+                    batch_start, min(batch_start + batch_size, self._size)):
+                self._generate_member(index, batch)
+            yield batch
+
+    def _generate_member(self, index, batch):
+        rng = self._random
+        member_id = self._member_id
+        self._member_id += 1
+        firstname = rng.choice(FIRSTNAMES)
+        lastname = rng.choice(LASTNAMES)
+        is_legalentity = rng.random() < 0.05
+        if is_legalentity:
+            lastname = u'{0} {1}'.format(
+                lastname, rng.choice([u'GmbH', u'e.V.', u'UG', u'Ltd.']))
+        city, postcode_prefix = rng.choice(CITIES)
+        country = self._choose_weighted(COUNTRIES)
+        submission = self._make_submission_date(index)
+        membership_type = u'investing' if is_legalentity or \
+            rng.random() < 0.15 else u'normal'
+        member = {
+            'id': member_id,
+            'firstname': firstname,
+            'lastname': lastname,
+            'lastname_search': fold_search_text(lastname),
+            'email': u'{0}.{1}.{2}@example.com'.format(
+                fold_search_text(firstname),
+                fold_search_text(lastname).replace(u' ', u''),
+                member_id),
+            'password': u'',
+            'address1': u'Musterstraße {0}'.format(rng.randint(1, 200)),
+            'address2': u'',
+            'postcode': u'{0}{1:03d}'.format(
+                postcode_prefix, rng.randint(0, 999)),
+            'city': city,
+            'country': country,
+            'locale': u'de' if country in (u'DE', u'AT', u'CH') else u'en',
+            'date_of_birth': date(1940, 1, 1) + timedelta(
+                days=rng.randint(0, 365 * 60)),
+            'email_is_confirmed': True,
+            'email_confirm_code': self._make_code(),
+            'date_of_submission': submission,
+            'membership_type': membership_type,
+            'member_of_colsoc': rng.random() < 0.3,
+            'is_legalentity': is_legalentity,
+            'membership_accepted': False,
+            'membership_date': date(1970, 1, 1),
+        }
+        member['name_of_colsoc'] = rng.choice(COLLECTING_SOCIETIES) \
+            if member['member_of_colsoc'] else u''
+
+        # shares packages: most members hold few shares
+        package_count = 1 + int(rng.random() < 0.2) + int(rng.random() < 0.05)
+        packages = [
+            min(int(rng.expovariate(0.3)) + 1, 60)
+            for _ in range(package_count)]
+        member['num_shares'] = min(sum(packages), 60)
+
+        signature = rng.random() < 0.95
+        payment = rng.random() < 0.93
+        member['signature_received'] = signature
+        member['payment_received'] = payment
+        if signature:
+            member['signature_received_date'] = submission + timedelta(
+                days=rng.randint(1, 30))
+        if payment:
+            member['payment_received_date'] = submission + timedelta(
+                days=rng.randint(1, 30))
+
+        if signature and payment and \
+                submission < LAST_SUBMISSION - timedelta(days=30):
+            self._accept(member, packages, batch)
+        else:
+            # applicants hold their shares within the member data
+            member['num_shares'] = packages[0]
+        batch['members'].append(member)
+
+    def _accept(self, member, packages, batch):
+        rng = self._random
+        membership_date = (member['date_of_submission'] + timedelta(
+            days=rng.randint(14, 60))).date()
+        member['membership_accepted'] = True
+        member['membership_date'] = membership_date
+        member['membership_number'] = self._membership_number
+        self._membership_number += 1
+        if rng.random() < 0.03:
+            member['membership_loss_date'] = date(
+                rng.randint(membership_date.year, 2018), 12, 31)
+            member['membership_loss_type'] = rng.choice(
+                [u'resignation', u'death', u'transfer'])
+
+        acquisition_date = membership_date
+        for number in packages:
+            shares_id = self._shares_id
+            self._shares_id += 1
+            batch['shares'].append({
+                'id': shares_id,
+                'number': number,
+                'date_of_acquisition': acquisition_date,
+                'reference_code': self._make_code(),
+                'signature_received': True,
+                'payment_received': True,
+            })
+            batch['members_shares'].append({
+                'members_id': member['id'],
+                'shares_id': shares_id,
+            })
+            acquisition_date += timedelta(days=rng.randint(30, 400))
+
+        for year, invoice_class in DUES_YEARS:
+            loss_date = member.get('membership_loss_date')
+            if membership_date < date(year + 1, 1, 1) and \
+                    (loss_date is None or loss_date >= date(year, 1, 1)):
+                self._invoice(member, year, invoice_class, batch)
+
+    def _next_invoice_no(self, invoice_class):
+        invoice_no = self._invoice_ids[invoice_class]
+        self._invoice_ids[invoice_class] += 1
+        return invoice_no
+
+    def _invoice(self, member, year, invoice_class, batch):
+        # pylint: disable=too-many-locals
+        rng = self._random
+        prefix = 'dues{0}_'.format(str(year)[2:])
+        quarter = 0
+        if member['membership_date'] >= date(year, 1, 1):
+            quarter = (member['membership_date'].month - 1) // 3
+        invoice_date = datetime(year, 1, 1) + timedelta(
+            days=rng.randint(0, 364), seconds=rng.randint(0, 86399))
+        invoice_date = max(
+            invoice_date,
+            datetime.combine(member['membership_date'], datetime.min.time()))
+        invoice_no = self._next_invoice_no(invoice_class)
+        token = self._make_code()
+        member[prefix + 'invoice'] = True
+        member[prefix + 'invoice_date'] = invoice_date
+        member[prefix + 'invoice_no'] = invoice_no
+        member[prefix + 'token'] = token
+        member[prefix + 'start'] = u'q{0}_{1}'.format(quarter + 1, year)
+        if member['membership_type'] != u'normal':
+            return
+
+        amount = QUARTER_AMOUNTS[quarter]
+        member[prefix + 'amount'] = amount
+        invoice = self._make_invoice(
+            invoice_no, year, invoice_date, amount, member, token)
+        batch[invoice_class].append(invoice)
+
+        payable = amount
+        if rng.random() < 0.05:
+            # reduction: reversal of the invoice and a new invoice
+            payable = (amount / 2).quantize(Decimal('0.01'))
+            invoice['is_cancelled'] = True
+            reversal_no = self._next_invoice_no(invoice_class)
+            reversal = self._make_invoice(
+                reversal_no, year, invoice_date + timedelta(days=7), -amount,
+                member, token)
+            reversal['invoice_no_string'] += u'-S'
+            reversal['is_reversal'] = True
+            reversal['preceding_invoice_no'] = invoice_no
+            invoice['succeeding_invoice_no'] = reversal_no
+            new_no = self._next_invoice_no(invoice_class)
+            new_invoice = self._make_invoice(
+                new_no, year, invoice_date + timedelta(days=7), payable,
+                member, token)
+            new_invoice['preceding_invoice_no'] = reversal_no
+            reversal['succeeding_invoice_no'] = new_no
+            batch[invoice_class].extend([reversal, new_invoice])
+            member[prefix + 'reduced'] = True
+            member[prefix + 'amount_reduced'] = payable
+            member[prefix + 'invoice_no'] = new_no
+
+        paid = Decimal('0')
+        if rng.random() < 0.8:
+            paid = payable
+            member[prefix + 'paid'] = True
+            member[prefix + 'amount_paid'] = paid
+            member[prefix + 'paid_date'] = invoice_date + timedelta(
+                days=rng.randint(1, 60))
+        member[prefix + 'balance'] = payable - paid
+        member[prefix + 'balanced'] = payable == paid
+
+    @classmethod
+    def _make_invoice(cls, invoice_no, year, invoice_date, amount, member,
+                      token):
+        # pylint: disable=too-many-arguments
+        return {
+            'invoice_no': invoice_no,
+            'invoice_no_string': u'C3S-dues{0}-{1}'.format(
+                year, str(invoice_no).zfill(4)),
+            'invoice_date': invoice_date,
+            'invoice_amount': amount,
+            'is_cancelled': False,
+            'is_reversal': False,
+            'is_altered': False,
+            'member_id': member['id'],
+            'membership_no': member['membership_number'],
+            'email': member['email'],
+            'token': token,
+            'preceding_invoice_no': None,
+            'succeeding_invoice_no': None,
+        }
+
+
+def _get_first_ids(connection):
+    """
+    Gets the first free IDs and numbers of the database.
+    """
+    def _next(column):
+        return (connection.execute(
+            select([func.max(column)])).scalar() or 0) + 1
+
+    first_ids = {
+        'member': _next(C3sMember.__table__.c.id),
+        'shares': _next(Shares.__table__.c.id),
+        'membership_number': _next(C3sMember.__table__.c.membership_number),
+    }
+    for _, invoice_class in DUES_YEARS:
+        first_ids[invoice_class] = _next(
+            invoice_class.__table__.c.invoice_no)
+    return first_ids
+
+
+def populate(engine, size, seed=0, progress_callback=None):
+    """
+    Appends a synthetic register to the database.
+
+    Args:
+        engine: The SqlAlchemy engine of the database.
+        size: The number of members and applicants to generate.
+        seed: Optional. The seed of the random number generator, defaults to
+            0.
+        progress_callback: Optional. A function called with the number of
+            generated and the total number of members after each batch.
+
+    Returns:
+        A dictionary with the number of rows inserted per table.
+    """
+    counts = {}
+    with engine.begin() as connection:
+        generator = RegisterGenerator(
+            size, seed, _get_first_ids(connection))
+        generated = 0
+        for batch in generator.batches():
+            for key, table in [
+                    ('members', C3sMember.__table__),
+                    ('shares', Shares.__table__),
+                    ('members_shares', members_shares)] + [
+                        (invoice_class, invoice_class.__table__)
+                        for _, invoice_class in DUES_YEARS]:
+                rows = batch[key]
+                if rows:
+                    connection.execute(table.insert(), _complete(table, rows))
+                counts[table.name] = counts.get(table.name, 0) + len(rows)
+            generated += len(batch['members'])
+            if progress_callback is not None:
+                progress_callback(generated, size)
+        # The number sequences are created again starting after the highest
+        # generated numbers when numbers are allocated next.
+        connection.execute(NumberSequence.__table__.delete())
+        # The dues were inserted bypassing the session and are therefore
+        # recorded in the dues ledger afterwards. The payment entries of the
+        # existing members are kept.
+        rebuild_dues_ledger(connection)
+    return counts
+
+
+def _complete(table, rows):
+    """
+    Completes the rows with all keys used in any row of the batch.
+
+    executemany requires all rows to have the same keys. Missing values are
+    set to the column defaults.
+    """
+    keys = set()
+    for row in rows:
+        keys.update(row.keys())
+    defaults = {}
+    for key in keys:
+        default = table.c[key].default
+        if default is not None and default.is_scalar:
+            defaults[key] = default.arg
+        else:
+            defaults[key] = None
+    completed = []
+    for row in rows:
+        completed_row = dict(defaults)
+        completed_row.update(row)
+        completed.append(completed_row)
+    return completed
+
+
+def main(argv=sys.argv):
+    """
+    Generates the synthetic register into the configured database.
+    """
+    size = DEFAULT_SIZE
+    seed = 0
+    arguments = []
+    try:
+        for argument in argv[1:]:
+            if argument.startswith('--size='):
+                size = int(argument[len('--size='):])
+            elif argument.startswith('--seed='):
+                seed = int(argument[len('--seed='):])
+            else:
+                arguments.append(argument)
+    except ValueError:
+        usage(argv)
+    if len(arguments) != 1 or size < 1:
+        usage(argv)
+    config_uri = arguments[0]
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    Base.metadata.create_all(engine)
+
+    def _progress(generated, total):
+        print('{0} of {1} members generated'.format(generated, total))
+
+    start = time.time()
+    counts = populate(engine, size, seed, _progress)
+    for table_name in sorted(counts.keys()):
+        print('{0:>20}: {1} rows'.format(table_name, counts[table_name]))
+    print('generated in {0:.1f} s'.format(time.time() - start))
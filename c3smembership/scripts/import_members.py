@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Imports members from a CSV file.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_import_members
+
+Usage:
+
+  env/bin/c3sMembership_import_members <config_uri> <csv_file>
+      [--duplicates=skip|merge] [--batch-size=<n>]
+
+The first row of the CSV file names the columns by the attribute names of
+C3sMember, e.g. firstname, lastname, email, address1, postcode, city,
+country, date_of_birth and num_shares, see the MemberImport schema for all
+columns. Unknown columns are ignored. The delimiter is detected and the file
+must be UTF-8 encoded.
+
+Each row is validated with the rules of the application for membership form.
+Invalid rows are reported and not imported. Rows with a membership date are
+imported as accepted members with a membership number and a shares package.
+
+Rows with a reference code already in use are skipped. Rows with the email
+address of an existing member are skipped by default. With --duplicates=merge
+their shares are added to the existing member instead.
+
+The file is read and imported in batches of 1000 rows by default within one
+transaction so that either all valid rows or none are imported.
+"""
+
+import csv
+import os
+import sys
+import time
+
+import colander
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.member_import import (
+    MemberImporter,
+    MERGE,
+    SKIP,
+)
+from c3smembership.business.membership_number_allocator import (
+    MembershipNumberAllocator
+)
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.change_tracking import ChangeGeneration
+from c3smembership.data.repository.member_import_repository import (
+    MemberImportRepository
+)
+from c3smembership.data.repository.member_repository import MemberRepository
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+from c3smembership.presentation.schemas.membership_application import (
+    MemberImport
+)
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> <csv_file> [--duplicates=skip|merge] '
+          '[--batch-size=<n>]\n'
+          '(example: "%s development.ini import/import.csv")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def read_rows(csv_file, invalid):
+    """
+    Reads and validates the rows of a member import CSV file.
+
+    Args:
+        csv_file: The file object of the CSV file opened in binary mode.
+        invalid: A list to which tuples of line number and error message of
+            invalid rows are appended.
+
+    Yields:
+        Tuples of the line number and the dictionary of validated member
+        attributes for the valid rows.
+    """
+    sample = csv_file.read(4096)
+    csv_file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(csv_file, dialect)
+    schema = MemberImport()
+    names = set(node.name for node in schema.children)
+    header = [column.decode('utf-8').strip() for column in next(reader)]
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        cstruct = {}
+        for column, cell in zip(header, row):
+            if column in names:
+                cell = cell.decode('utf-8').strip()
+                cstruct[column] = cell if cell != u'' else colander.null
+        try:
+            yield (reader.line_num, schema.deserialize(cstruct))
+        except colander.Invalid as error:
+            invalid.append((reader.line_num, u'; '.join(
+                u'{0}: {1}'.format(name, message)
+                for name, message in sorted(error.asdict().items()))))
+
+
+def main(argv=sys.argv):
+    """
+    Imports the members of the CSV file into the configured database.
+    """
+    duplicates = SKIP
+    batch_size = MemberImporter.BATCH_SIZE
+    arguments = []
+    try:
+        for argument in argv[1:]:
+            if argument.startswith('--duplicates='):
+                duplicates = argument[len('--duplicates='):]
+            elif argument.startswith('--batch-size='):
+                batch_size = int(argument[len('--batch-size='):])
+            else:
+                arguments.append(argument)
+    except ValueError:
+        usage(argv)
+    if len(arguments) != 2 or duplicates not in (SKIP, MERGE) or \
+            batch_size < 1:
+        usage(argv)
+    config_uri, csv_path = arguments
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+
+    importer = MemberImporter(
+        MemberImportRepository,
+        MembershipNumberAllocator(MemberRepository, NumberSequenceRepository))
+    invalid = []
+
+    def _progress(processed):
+        print('{0} rows processed'.format(processed + len(invalid)))
+
+    start = time.time()
+    with open(csv_path, 'rb') as csv_file:
+        with transaction.manager:
+            report = importer.import_members(
+                read_rows(csv_file, invalid),
+                duplicates,
+                batch_size,
+                _progress)
+            # invalidate the caches of the running web application
+            ChangeGeneration(NumberSequenceRepository).increment()
+    duration = time.time() - start
+
+    total = report.inserted + report.merged + len(report.skipped) + \
+        len(invalid)
+    for line, message in sorted(invalid):
+        print(u'line {0}: invalid: {1}'.format(line, message).encode('utf-8'))
+    for line, reason in sorted(report.skipped):
+        print(u'line {0}: skipped: {1}'.format(line, reason))
+    print('{0} inserted, {1} merged, {2} skipped, {3} invalid'.format(
+        report.inserted, report.merged, len(report.skipped), len(invalid)))
+    print('{0} rows in {1:.1f} s ({2:.0f} rows/s)'.format(
+        total, duration, total / duration if duration > 0 else 0))
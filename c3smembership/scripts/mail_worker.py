@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Mail worker delivering the emails queued by batch mail runs.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_mail_worker
+
+Usage:
+
+  env/bin/c3sMembership_mail_worker <config_uri> [--once] [--workers=<n>]
+
+The worker polls the queue and delivers due emails until it is stopped. With
+--once it exits as soon as no email is due. With --workers the given number
+of worker processes is started.
+
+The worker is configured in the app section of the config file:
+
+- c3smembership.mail_queue.rate_limit: maximum number of emails per second
+  and worker process, defaults to no limit
+- c3smembership.mail_queue.max_attempts: maximum number of delivery attempts,
+  defaults to 5
+- c3smembership.mail_queue.retry_delay: seconds before the first retry,
+  doubled for each further retry, defaults to 60
+- c3smembership.mail_queue.poll_interval: seconds between polls of an empty
+  queue, defaults to 10
+
+If testing.mail_to_console is true the emails are printed to the console
+instead of being sent.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from pyramid_mailer.mailer import Mailer
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.mail_queue import MailWorker
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.mail_job_repository import (
+    MailJobRepository
+)
+
+
+class ConsoleMailer(object):
+    """
+    Mailer printing messages to the console.
+    """
+
+    @classmethod
+    def send_immediately(cls, message):
+        """
+        Prints the message to the console.
+        """
+        print(u'Sender: ' + unicode(message.sender))
+        print(u'Receipients: ' + unicode(message.recipients))
+        print(u'Subject: ' + unicode(message.subject))
+        print(message.body.encode('utf-8'))
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> [--once] [--workers=<n>]\n'
+          '(example: "%s development.ini --workers=2")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def create_worker(settings):
+    """
+    Creates the mail worker for the app settings.
+    """
+    if 'true' in settings.get('testing.mail_to_console', 'false'):
+        mailer = ConsoleMailer()
+    else:
+        mailer = Mailer.from_settings(settings)
+    rate_limit = settings.get('c3smembership.mail_queue.rate_limit')
+    return MailWorker(
+        MailJobRepository,
+        mailer,
+        transaction.manager,
+        max_attempts=int(
+            settings.get('c3smembership.mail_queue.max_attempts', 5)),
+        retry_delay=int(
+            settings.get('c3smembership.mail_queue.retry_delay', 60)),
+        rate_limit=float(rate_limit) if rate_limit else None)
+
+
+def work(settings, once):
+    """
+    Delivers queued emails until stopped or, if once is True, until no email
+    is due.
+    """
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+    worker = create_worker(settings)
+    poll_interval = int(
+        settings.get('c3smembership.mail_queue.poll_interval', 10))
+    while True:
+        processed = worker.work()
+        if once:
+            return
+        if processed == 0:
+            time.sleep(poll_interval)
+
+
+def main(argv=sys.argv):
+    """
+    Runs the mail worker.
+    """
+    arguments = argv[1:]
+    once = '--once' in arguments
+    if once:
+        arguments.remove('--once')
+    worker_count = 1
+    for argument in list(arguments):
+        if argument.startswith('--workers='):
+            try:
+                worker_count = int(argument[len('--workers='):])
+            except ValueError:
+                usage(argv)
+            arguments.remove(argument)
+    if len(arguments) != 1 or worker_count < 1:
+        usage(argv)
+    config_uri = arguments[0]
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+
+    if worker_count == 1:
+        work(settings, once)
+        return
+    processes = [
+        multiprocessing.Process(target=work, args=(settings, once))
+        for _ in range(worker_count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Rebuilds the monthly dues statistics from the dues ledger.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_rebuild_dues_statistics
+
+Usage:
+
+  env/bin/c3sMembership_rebuild_dues_statistics <config_uri> [--ledger]
+
+The monthly statistics are maintained whenever invoices or payments change.
+They only need to be rebuilt if the dues ledger was changed bypassing the
+application. With --ledger the invoice entries of the dues ledger and the
+balances are rebuilt from the per-year invoices and the dues columns of the
+members beforehand. The dated payment entries are kept and amounts paid
+differing from them are recorded as payments of the difference.
+"""
+
+import os
+import sys
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.change_tracking import ChangeGeneration
+from c3smembership.data.repository.dues_ledger_repository import (
+    DuesLedgerRepository
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> [--ledger]\n'
+          '(example: "%s development.ini")' % (cmd, cmd))
+    sys.exit(1)
+
+
+def main(argv=sys.argv):
+    """
+    Rebuilds the monthly dues statistics.
+    """
+    arguments = argv[1:]
+    ledger = '--ledger' in arguments
+    if ledger:
+        arguments.remove('--ledger')
+    if len(arguments) != 1:
+        usage(argv)
+    config_uri = arguments[0]
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+
+    with transaction.manager:
+        if ledger:
+            DuesLedgerRepository.rebuild()
+        else:
+            DuesLedgerRepository.rebuild_monthly_stats()
+        # invalidate the caches of the running web application
+        ChangeGeneration(NumberSequenceRepository).increment()
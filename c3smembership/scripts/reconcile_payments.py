@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Reconciles dues payments from a bank statement.
+
+In setup.py there is a section 'console_scripts' under 'entry_points'. Thus a
+console script is created when the app is set up:
+
+  env/bin/c3sMembership_reconcile_payments
+
+Usage:
+
+  env/bin/c3sMembership_reconcile_payments <config_uri> <statement>
+      [--format=csv|camt053] [--year=<dues year>] [--dry-run]
+
+The statement is either a CSV export or a CAMT.053 XML file. The format is
+detected by the file extension unless given with --format. Payments only
+identified by membership number are booked to the dues year given with
+--year which defaults to 2017.
+
+All matched payments are recorded in one transaction. With --dry-run nothing
+is recorded and only the report is printed. The report lists the bookings
+which could not be matched and the ambiguous ones which reference several
+members or dues years and must be booked manually. Bookings which were
+already applied by a previous reconciliation are listed as skipped and not
+booked again.
+"""
+
+import os
+import sys
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+)
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.payment_reconciliation import (
+    PaymentReconciliation,
+    read_camt053_bookings,
+    read_csv_bookings,
+)
+from c3smembership.data.model.base import DBSession
+from c3smembership.data.repository.change_tracking import ChangeGeneration
+from c3smembership.data.repository.dues_payment_repository import (
+    DuesPaymentRepository
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+
+
+READERS = {
+    'csv': read_csv_bookings,
+    'camt053': read_camt053_bookings,
+}
+"""
+The bank statement readers by format.
+"""
+
+
+def usage(argv):
+    """
+    Prints usage information if the script was called with bad arguments.
+    """
+    cmd = os.path.basename(argv[0])
+    print('usage: %s <config_uri> <statement> [--format=csv|camt053] '
+          '[--year=<dues year>] [--dry-run]\n'
+          '(example: "%s development.ini statement.csv --dry-run")'
+          % (cmd, cmd))
+    sys.exit(1)
+
+
+def _print_bookings(title, reconciled_bookings):
+    print(u'{0}: {1}'.format(title, len(reconciled_bookings)))
+    for reconciled in reconciled_bookings:
+        booking = reconciled.booking
+        print(u'  line {0}, {1}, {2}, {3}: {4} ({5})'.format(
+            booking.line,
+            booking.date,
+            booking.amount,
+            booking.name,
+            booking.reference,
+            reconciled.reason).encode('utf-8'))
+
+
+def print_report(report):
+    """
+    Prints the reconciliation report.
+    """
+    print(u'matched: {0}'.format(len(report.matched)))
+    for year, payments in sorted(report.payments.items()):
+        print(u'  {0}: {1} members, {2} EUR'.format(
+            year,
+            len(payments),
+            sum(amount for amount, _ in payments.values())))
+    _print_bookings(u'unmatched', report.unmatched)
+    _print_bookings(u'ambiguous', report.ambiguous)
+    _print_bookings(u'skipped', report.skipped)
+
+
+def main(argv=sys.argv):
+    """
+    Reconciles the payments of a bank statement.
+    """
+    arguments = argv[1:]
+    dry_run = '--dry-run' in arguments
+    if dry_run:
+        arguments.remove('--dry-run')
+    statement_format = None
+    year = 2017
+    for argument in list(arguments):
+        if argument.startswith('--format='):
+            statement_format = argument[len('--format='):]
+            arguments.remove(argument)
+        elif argument.startswith('--year='):
+            try:
+                year = int(argument[len('--year='):])
+            except ValueError:
+                usage(argv)
+            arguments.remove(argument)
+    if len(arguments) != 2 or year not in DuesPaymentRepository.DUES_YEARS:
+        usage(argv)
+    config_uri, statement = arguments
+    if statement_format is None:
+        statement_format = 'camt053' \
+            if statement.lower().endswith('.xml') else 'csv'
+    if statement_format not in READERS:
+        usage(argv)
+    setup_logging(config_uri)
+    settings = get_appsettings(config_uri)
+    engine = engine_from_config(settings, 'sqlalchemy.')
+    DBSession.configure(bind=engine)
+
+    reconciliation = PaymentReconciliation(DuesPaymentRepository)
+    with open(statement, 'rb') as statement_file:
+        with transaction.manager:
+            report = reconciliation.reconcile(
+                READERS[statement_format](statement_file),
+                year,
+                apply_payments=not dry_run)
+            if not dry_run:
+                # invalidate the caches of the running web application
+                ChangeGeneration(NumberSequenceRepository).increment()
+    print_report(report)
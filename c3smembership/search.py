@@ -45,7 +45,7 @@ def search_people(request):
     class AutocompleteForm(colander.MappingSchema):
         code_to_show = colander.SchemaNode(
             colander.String(),
-            title='Personen finden (Nachname: Groß-/Kleinschr. beachten!)',
+            title='Personen finden (Nachname)',
             widget=deform.widget.AutocompleteInputWidget(
                 min_length=1,
                 css_class="form-inline",
@@ -102,7 +102,7 @@ def search_codes(request):
     class AutocompleteRefCodeForm(colander.MappingSchema):
         code_to_show = colander.SchemaNode(
             colander.String(),
-            title='Code finden (quicksearch; Groß-/Kleinschreibung beachten!)',
+            title='Code finden (quicksearch)',
             widget=deform.widget.AutocompleteInputWidget(
                 min_length=1,
                 css_class="form-inline",
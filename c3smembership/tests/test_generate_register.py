@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the synthetic register generator.
+"""
+
+import unittest
+
+from sqlalchemy import create_engine
+
+from c3smembership.data.model.base import Base
+from c3smembership.scripts.generate_register import (
+    RegisterGenerator,
+    populate,
+)
+
+
+class TestGenerateRegister(unittest.TestCase):
+    """
+    Tests the synthetic register generator.
+    """
+
+    def test_deterministic(self):
+        """
+        Test that the same seed generates the same register.
+        """
+        register = [
+            list(RegisterGenerator(200, seed=3).batches(batch_size=50))
+            for _ in range(2)]
+        self.assertEqual(register[0], register[1])
+        other = list(RegisterGenerator(200, seed=4).batches(batch_size=50))
+        self.assertNotEqual(register[0], other)
+
+    def test_populate(self):
+        """
+        Test that the register is consistent and appended to existing data.
+        """
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+
+        counts = populate(engine, 300, seed=1)
+        self.assertEqual(counts['members'], 300)
+        self.assertEqual(counts['shares'], counts['members_shares'])
+        self.assertEqual(
+            engine.execute('SELECT COUNT(*) FROM shares').scalar(),
+            counts['shares'])
+        accepted, max_number = engine.execute(
+            'SELECT SUM(membership_accepted), MAX(membership_number) '
+            'FROM members').fetchone()
+        self.assertTrue(0 < accepted < 300)
+        self.assertEqual(accepted, max_number)
+        # invoices only for normal members and their amounts add up
+        self.assertEqual(engine.execute(
+            'SELECT COUNT(*) FROM dues17invoices i JOIN members m '
+            'ON m.id = i.member_id WHERE m.membership_type != "normal"'
+        ).scalar(), 0)
+        self.assertEqual(engine.execute(
+            'SELECT COUNT(*) FROM dues17invoices i JOIN members m '
+            'ON m.id = i.member_id AND m.dues17_invoice_no = i.invoice_no'
+        ).scalar(), engine.execute(
+            'SELECT COUNT(*) FROM members WHERE dues17_invoice = 1 '
+            'AND membership_type = "normal"').scalar())
+
+        populate(engine, 100, seed=1)
+        self.assertEqual(
+            engine.execute('SELECT COUNT(*) FROM members').scalar(), 400)
+        self.assertEqual(engine.execute(
+            'SELECT COUNT(DISTINCT invoice_no) FROM dues16invoices').scalar(),
+            engine.execute('SELECT COUNT(*) FROM dues16invoices').scalar())
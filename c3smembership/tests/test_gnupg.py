@@ -58,3 +58,40 @@ class TestGnuPG(unittest.TestCase):
         # print ("the result: " + str(result))
         self.assertTrue('-----BEGIN PGP MESSAGE-----' in str(result))
         self.assertTrue('-----END PGP MESSAGE-----' in str(result))
+
+    def test_encrypt_stream_with_gnupg(self):
+        """
+        test if chunks are encrypted into a single message
+        """
+        from c3smembership.gnupg_encrypt import encrypt_stream_with_gnupg
+        chunks = (u'line {0} with umläuts\n'.format(i) for i in range(10000))
+        result = ''.join(encrypt_stream_with_gnupg(chunks))
+        self.assertTrue(result.startswith('-----BEGIN PGP MESSAGE-----'))
+        self.assertEqual(result.count('-----BEGIN PGP MESSAGE-----'), 1)
+        self.assertTrue(result.strip().endswith('-----END PGP MESSAGE-----'))
+
+    def test_encrypt_stream_with_gnupg_close(self):
+        """
+        test if closing the stream early terminates gpg
+        """
+        from c3smembership.gnupg_encrypt import encrypt_stream_with_gnupg
+        chunks = ('x' * 1024 for i in range(100000))
+        stream = encrypt_stream_with_gnupg(chunks)
+        self.assertTrue(next(stream).startswith('-----BEGIN PGP MESSAGE'))
+        stream.close()
+
+    def test_keyring(self):
+        """
+        test if the keyring is created only once per process and only
+        accessible by its user
+        """
+        import os
+        import stat
+        from c3smembership.gnupg_encrypt import GnuPGKeyring
+        keyring = GnuPGKeyring()
+        gpg = keyring.get_gpg()
+        self.assertTrue(gpg is keyring.get_gpg())
+        self.assertEqual(
+            stat.S_IMODE(os.stat(gpg.gnupghome).st_mode), 0700)
+        self.assertTrue(
+            '71F6BA91CDD28110' in str(gpg.list_keys()))
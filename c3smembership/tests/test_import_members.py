@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the member import.
+"""
+
+from datetime import date
+from StringIO import StringIO
+import unittest
+
+from sqlalchemy import engine_from_config
+import transaction
+
+from c3smembership.business.member_import import (
+    MemberImporter,
+    MERGE,
+)
+from c3smembership.business.membership_number_allocator import (
+    MembershipNumberAllocator
+)
+from c3smembership.data.model.base import (
+    Base,
+    DBSession,
+)
+from c3smembership.data.repository.member_import_repository import (
+    MemberImportRepository
+)
+from c3smembership.data.repository.member_repository import MemberRepository
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
+from c3smembership.models import (
+    C3sMember,
+    Shares,
+)
+from c3smembership.scripts.import_members import read_rows
+
+
+HEADER = 'firstname;lastname;email;address1;postcode;city;country;' \
+    'date_of_birth;num_shares;email_confirm_code;membership_date;password\n'
+
+
+def _row(number, email=None, num_shares=1, code='', membership_date='',
+         date_of_birth='1970-01-01'):
+    # pylint: disable=too-many-arguments
+    return ';'.join([
+        'Firstname{0}'.format(number),
+        'L\xc3\xa4stname{0}'.format(number),
+        email or 'member{0}@example.com'.format(number),
+        'Street {0}'.format(number),
+        '12345',
+        'Town',
+        'DE',
+        date_of_birth,
+        str(num_shares),
+        code,
+        membership_date,
+        '',
+    ]) + '\n'
+
+
+class TestImportMembers(unittest.TestCase):
+    """
+    Tests reading, validating and importing members.
+    """
+
+    def setUp(self):
+        my_settings = {'sqlalchemy.url': 'sqlite:///:memory:', }
+        engine = engine_from_config(my_settings)
+        DBSession.configure(bind=engine)
+        Base.metadata.create_all(engine)
+        self.importer = MemberImporter(
+            MemberImportRepository,
+            MembershipNumberAllocator(
+                MemberRepository, NumberSequenceRepository))
+
+    def tearDown(self):
+        # pylint: disable=no-member
+        DBSession.close()
+        # pylint: disable=no-member
+        DBSession.remove()
+
+    def _import(self, csv_content, duplicates='skip', batch_size=None):
+        invalid = []
+        progress = []
+        with transaction.manager:
+            report = self.importer.import_members(
+                read_rows(StringIO(csv_content), invalid),
+                duplicates,
+                batch_size,
+                progress.append)
+        return report, invalid, progress
+
+    def test_read_rows(self):
+        """
+        Test that rows are validated with the application form rules.
+        """
+        invalid = []
+        rows = list(read_rows(StringIO(
+            HEADER +
+            _row(1) +
+            '\n' +
+            _row(2, num_shares=61) +
+            _row(3, email='no email') +
+            _row(4, date_of_birth='1900-01-01') +
+            _row(5, code='CODE5', membership_date='2014-03-29')), invalid))
+
+        self.assertEqual([line for line, _ in rows], [2, 7])
+        self.assertEqual(rows[0][1]['lastname'], u'L\xe4stname1')
+        self.assertEqual(rows[0][1]['date_of_birth'], date(1970, 1, 1))
+        self.assertEqual(rows[0][1]['address2'], u'')
+        self.assertEqual(rows[0][1]['email_confirm_code'], None)
+        self.assertEqual(rows[1][1]['membership_date'], date(2014, 3, 29))
+        self.assertEqual(
+            [(line, message.split(':')[0]) for line, message in invalid],
+            [(4, 'num_shares'), (5, 'email'), (6, 'date_of_birth')])
+
+    def test_import(self):
+        """
+        Test that applications and accepted members are imported in batches
+        and duplicates are skipped.
+        """
+        with transaction.manager:
+            # pylint: disable=no-member
+            DBSession.add(C3sMember(
+                firstname=u'Existing',
+                lastname=u'Member',
+                email=u'existing@example.com',
+                password=u'',
+                address1=u'Street',
+                address2=u'',
+                postcode=u'12345',
+                city=u'Town',
+                country=u'DE',
+                locale=u'de',
+                date_of_birth=date(1970, 1, 1),
+                email_is_confirmed=True,
+                email_confirm_code=u'EXISTING',
+                num_shares=1,
+                date_of_submission=date(2014, 1, 1),
+                membership_type=u'normal',
+                member_of_colsoc=False,
+                name_of_colsoc=u''))
+
+        report, invalid, progress = self._import(
+            HEADER +
+            _row(1) +
+            _row(2, code='CODE2', membership_date='2014-03-29',
+                 num_shares=3) +
+            _row(3, email='Existing@example.com') +
+            _row(4, code='EXISTING') +
+            _row(5, email='member1@example.com') +
+            _row(6, code='CODE2') +
+            _row(7, membership_date='2014-04-01'),
+            batch_size=2)
+
+        self.assertEqual(invalid, [])
+        self.assertEqual(progress, [2, 4, 6, 7])
+        self.assertEqual(report.inserted, 3)
+        self.assertEqual(report.merged, 0)
+        self.assertEqual(sorted(report.skipped), [
+            (4, u'email address already in use'),
+            (5, u'reference code already in use'),
+            (6, u'email address already in use'),
+            (7, u'reference code already in use'),
+        ])
+
+        # pylint: disable=no-member
+        applicant = C3sMember.get_by_email(u'member1@example.com')[0]
+        self.assertFalse(applicant.membership_accepted)
+        self.assertEqual(len(applicant.email_confirm_code), 10)
+        self.assertEqual(applicant.lastname_search, u'lastname1')
+        self.assertEqual(applicant.shares, [])
+
+        member = C3sMember.get_by_code(u'CODE2')
+        self.assertTrue(member.membership_accepted)
+        self.assertEqual(member.membership_number, 1)
+        self.assertEqual(member.num_shares, 3)
+        self.assertEqual(len(member.shares), 1)
+        self.assertEqual(member.shares[0].number, 3)
+        self.assertEqual(member.shares[0].reference_code, u'CODE2')
+        self.assertEqual(
+            member.shares[0].date_of_acquisition, date(2014, 3, 29))
+
+        member = C3sMember.get_by_email(u'member7@example.com')[0]
+        self.assertEqual(member.membership_number, 2)
+
+    def test_import_merge(self):
+        """
+        Test that the shares of duplicates are merged.
+        """
+        self._import(
+            HEADER +
+            _row(1, code='CODE1', membership_date='2014-03-29') +
+            _row(2, code='CODE2'))
+        report, _, _ = self._import(
+            HEADER +
+            _row(1, code='CODE1B', membership_date='2014-05-01',
+                 num_shares=2) +
+            _row(2, num_shares=4) +
+            _row(3, code='CODE3', membership_date='2014-05-01') +
+            _row(3, code='CODE3B', num_shares=5),
+            duplicates=MERGE)
+
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(report.merged, 3)
+        self.assertEqual(report.skipped, [])
+
+        member = C3sMember.get_by_code(u'CODE1')
+        self.assertEqual(member.num_shares, 3)
+        self.assertEqual(
+            sorted((shares.number, shares.date_of_acquisition)
+                   for shares in member.shares),
+            [(1, date(2014, 3, 29)), (2, date(2014, 5, 1))])
+
+        applicant = C3sMember.get_by_code(u'CODE2')
+        self.assertEqual(applicant.num_shares, 5)
+        self.assertEqual(applicant.shares, [])
+
+        member = C3sMember.get_by_code(u'CODE3')
+        self.assertEqual(member.num_shares, 6)
+        self.assertEqual(
+            sorted(shares.number for shares in member.shares), [1, 5])
+        # pylint: disable=no-member
+        self.assertEqual(DBSession.query(Shares).count(), 4)
+        self.assertEqual(DBSession.query(C3sMember).count(), 3)
@@ -11,10 +11,17 @@ from pyramid import testing
 from pyramid_mailer import get_mailer
 import transaction
 
+from c3smembership.business.mail_queue import (
+    MailQueue,
+    MailWorker,
+)
 from c3smembership.data.model.base import (
     DBSession,
     Base,
 )
+from c3smembership.data.repository.mail_job_repository import (
+    MailJobRepository
+)
 from c3smembership.models import C3sMember
 
 
@@ -145,6 +152,7 @@ class TestInvitation(unittest.TestCase):
         self.config.registry.settings['c3smembership.url'] = 'http://foo.com'
         self.config.registry.settings['ticketing.url'] = 'http://bar.com'
         self.config.registry.settings['testing.mail_to_console'] = 'false'
+        self.config.registry.mail_queue = MailQueue(MailJobRepository)
         self.session = init_testing_db()
 
     def tearDown(self):
@@ -240,7 +248,7 @@ class TestInvitation(unittest.TestCase):
         _messages = req.session.peek_flash('message_to_staff')
         print(_messages)
         self.assertTrue(
-            'sent out 1 mails (to members with ids [1])' in _messages)
+            'queued 1 mails (to members with ids [1])' in _messages)
 
         # without matchdict
         req.matchdict = {'number': ''}  # this triggers remaining 3
@@ -249,7 +257,7 @@ class TestInvitation(unittest.TestCase):
         _messages = req.session.peek_flash('message_to_staff')
 
         self.assertTrue(
-            'sent out 3 mails (to members with ids [2, 3, 4])' in _messages)
+            'queued 3 mails (to members with ids [2, 3, 4])' in _messages)
         # send more request with POST['number']
         req = testing.DummyRequest(
             POST={
@@ -270,7 +278,14 @@ class TestInvitation(unittest.TestCase):
             'no invitees left. all done!' in _messages)
 
         mailer = get_mailer(req)
+        self.assertEqual(len(mailer.outbox), 0)
+
+        # the mail worker delivers the queued emails
+        transaction.commit()
+        worker = MailWorker(MailJobRepository, mailer, transaction.manager)
+        self.assertEqual(worker.work(), 4)
         self.assertEqual(len(mailer.outbox), 4)
+        members = C3sMember.get_all()
 
         # assumptions about those members and emails sent
         self.assertTrue('[C3S] Einladung' in mailer.outbox[0].subject)  # de
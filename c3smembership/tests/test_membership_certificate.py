@@ -5,11 +5,17 @@ from datetime import (
     datetime,
     timedelta,
 )
+import glob
+import mock
+import os
 from pyramid import testing
+import shutil
 from sqlalchemy import engine_from_config
+import tempfile
 import transaction
 import unittest
 
+from c3smembership.business.document_cache import DocumentCache
 from c3smembership.data.model.base import (
     Base,
     DBSession,
@@ -111,10 +117,14 @@ class TestMembershipCertificateViews(unittest.TestCase):
         self.config.registry.settings['testing.mail_to_console'] = 'no'
         # set this to true to see mail bodies, but:
         # tests will fail: no mail in outbox
+        self.cache_path = tempfile.mkdtemp()
+        self.config.registry.document_cache = DocumentCache(
+            self.cache_path)
 
     def tearDown(self):
         DBSession.remove()
         testing.tearDown()
+        shutil.rmtree(self.cache_path)
 
     def test_send_certificate_email_german(self):
         """
@@ -495,3 +505,66 @@ class TestMembershipCertificateViews(unittest.TestCase):
 
         self.assertTrue(_min_PDF_size < len(result.body) < _max_PDF_size)
         self.assertTrue(result.content_type == 'application/pdf')
+
+    def test_gen_cert_cache(self):
+        """
+        test that certificates are only rendered if the data changes
+        """
+        from c3smembership.membership_certificate import gen_cert
+
+        def pdflatex(arguments, **kwargs):
+            with open(arguments[-1].replace('.tex', '.pdf'), 'w') as pdf:
+                pdf.write('certificate {}'.format(member.num_shares))
+            return 0
+
+        template_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_path)
+        template = os.path.join(template_path, 'urkunde_header_de.tex')
+        with open(template, 'w') as template_file:
+            template_file.write('header')
+
+        member = C3sMember.get_by_id(1)
+        member.certificate_token = u'hotzenplotz123'
+        request = testing.DummyRequest()
+        with mock.patch('subprocess.call') as call_mock, mock.patch(
+                'c3smembership.membership_certificate.'
+                'get_certificate_templates') as templates_mock:
+            templates_mock.return_value = [template] * 5
+            call_mock.side_effect = pdflatex
+            result = gen_cert(request, member)
+            self.assertEqual(result.body, 'certificate 23')
+            self.assertEqual(result.content_type, 'application/pdf')
+            self.assertEqual(call_mock.call_count, 1)
+
+            # cached
+            result = gen_cert(request, member)
+            self.assertEqual(result.body, 'certificate 23')
+            self.assertEqual(call_mock.call_count, 1)
+
+            # member data changed
+            member.num_shares = 1
+            result = gen_cert(request, member)
+            self.assertEqual(result.body, 'certificate 1')
+            self.assertEqual(call_mock.call_count, 2)
+
+            # certificate token changed
+            member.certificate_token = u'hotzenplotz456'
+            gen_cert(request, member)
+            self.assertEqual(call_mock.call_count, 3)
+            self.assertEqual(len(glob.glob(
+                os.path.join(self.cache_path, '*.pdf'))), 1)
+
+            # template changed
+            with open(template, 'w') as template_file:
+                template_file.write('changed header')
+            gen_cert(request, member)
+            self.assertEqual(call_mock.call_count, 4)
+
+            # failing pdflatex run is not cached
+            member.num_shares = 2
+            call_mock.side_effect = None
+            call_mock.return_value = 1
+            with self.assertRaises(IOError):
+                gen_cert(request, member)
+            self.assertEqual(len(glob.glob(
+                os.path.join(self.cache_path, '*.pdf'))), 1)
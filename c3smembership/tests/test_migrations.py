@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Tests that database migrations result in the schema of the models.
+"""
+
+import imp
+import os
+import unittest
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine
+
+from c3smembership.data.model.base import Base
+# import the models to register them with the metadata
+import c3smembership.models  # noqa pylint: disable=unused-import
+
+
+VERSIONS_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'alembic', 'versions')
+"""
+The path of the alembic migration scripts.
+"""
+
+
+def _load_migration(filename):
+    return imp.load_source(
+        'migration_' + filename.split('_')[0],
+        os.path.join(VERSIONS_PATH, filename))
+
+
+def _get_indexes(connection):
+    return dict(connection.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND sql IS NOT NULL").fetchall())
+
+
+class TestMoneyAsCentsMigration(unittest.TestCase):
+    """
+    Tests the migration storing the dues amounts as integer cents.
+    """
+
+    def test_indexes(self):
+        """
+        Test that downgrading and upgrading again keeps the indexes of the
+        models including the conditions of partial indexes.
+        """
+        migration = _load_migration('a4c8e1f6b2d7_money_as_cents.py')
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        connection = engine.connect()
+        indexes = _get_indexes(connection)
+        self.assertTrue(
+            indexes['ix_members_membership_number'].endswith(
+                'WHERE membership_number IS NOT NULL'))
+
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.downgrade()
+        self.assertEqual(_get_indexes(connection), indexes)
+
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+        self.assertEqual(_get_indexes(connection), indexes)
+        connection.close()
@@ -8,8 +8,19 @@ from datetime import(
 from decimal import Decimal as D
 from decimal import InvalidOperation
 from pyramid import testing
-from sqlalchemy import create_engine
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import (
+    Column,
+    create_engine,
+    func,
+    Integer,
+    MetaData,
+    select,
+    Table,
+)
+from sqlalchemy.exc import (
+    IntegrityError,
+    StatementError,
+)
 import transaction
 import unittest
 
@@ -24,8 +35,10 @@ from c3smembership.models import (
     Dues16Invoice,
     Dues17Invoice,
     Group,
+    Money,
     Shares,
 )
+from c3smembership.presentation.pagination.pagination import Cursor
 
 DEBUG = False
 
@@ -201,6 +214,64 @@ class C3sMembershipModelTests(C3sMembershipModelTestBase):
         self.assertEqual(instance.firstname, u'SomeFirstnäme')
         self.assertEqual(instance_from_DB.email, u'some@shri.de')
 
+    def test_get_matching_codes(self):
+        """
+        test: get codes matching a prefix case insensitively and limited
+        """
+        instance = self._makeOne()  # ABCDEFGHIK
+        self.session.add(instance)
+        another = self._makeAnotherOne()  # 0987654321
+        self.session.add(another)
+        self.session.flush()
+        member_class = self._getTargetClass()
+        self.assertEqual(
+            member_class.get_matching_codes(u'ABCDEFG'),
+            [u'ABCDEFGFOO', u'ABCDEFGHIK'])
+        self.assertEqual(
+            member_class.get_matching_codes(u'abcdefgh'), [u'ABCDEFGHIK'])
+        self.assertEqual(
+            member_class.get_matching_codes(u'098'), [u'0987654321'])
+        self.assertEqual(member_class.get_matching_codes(u'XYZ'), [])
+        self.assertEqual(len(member_class.get_matching_codes(u'')), 3)
+        self.assertEqual(
+            member_class.get_matching_codes(u'ABC', limit=1), [u'ABCDEFGFOO'])
+
+    def test_get_matching_people(self):
+        """
+        test: get people by last name prefix case and accent insensitively
+        """
+        instance = self._makeOne(
+            lastname=u'Göbel', firstname=u'Alice')
+        self.session.add(instance)
+        another = self._makeAnotherOne(
+            lastname=u'Gobelin', firstname=u'Bob')
+        self.session.add(another)
+        self.session.flush()
+        member_class = self._getTargetClass()
+        self.assertEqual(instance.lastname_search, u'gobel')
+
+        result = member_class.get_matching_people(u'göb')
+        self.assertEqual(result, {
+            u'ABCDEFGHIK Göbel, Alice': u'ABCDEFGHIK Göbel, Alice',
+            u'0987654321 Gobelin, Bob': u'0987654321 Gobelin, Bob',
+        })
+        self.assertEqual(
+            member_class.get_matching_people(u'GOBELI').keys(),
+            [u'0987654321 Gobelin, Bob'])
+        self.assertEqual(
+            member_class.get_matching_people(u'somelast').keys(),
+            [u'ABCDEFGFOO SomeLastnäme, SomeFirstnäme'])
+        self.assertEqual(member_class.get_matching_people(u'x'), {})
+        self.assertEqual(
+            member_class.get_matching_people(u'g', limit=1).keys(),
+            [u'ABCDEFGHIK Göbel, Alice'])
+
+        instance.lastname = u'Müller'
+        self.session.flush()
+        self.assertEqual(
+            member_class.get_matching_people(u'mull').keys(),
+            [u'ABCDEFGHIK Müller, Alice'])
+
     def test_get_by_bcgvtoken(self):
         """
         test: get one entry by bcgv17 token
@@ -785,10 +856,140 @@ class TestMemberListing(C3sMembershipModelTestBase):
         self.assertRaises(self.class_under_test.member_listing,
                           order_by='lastname', order=None)
 
+
+class TestKeysetPagination(C3sMembershipModelTestBase):
+    """
+    Test that keyset pagination returns the same pages as offset pagination.
+    """
+
+    def setUp(self):
+        super(TestKeysetPagination, self).setUp()
+        lastnames = [u'B', u'A', u'C', u'A', u'B', u'A', u'D', u'C', u'A']
+        membership_numbers = [3, None, 1, 7, None, 2, 5, None, 4]
+        for number, lastname in enumerate(lastnames):
+            member = self._makeOne(
+                lastname=lastname,
+                email_confirm_code=u'CODE{0}'.format(number))
+            member.membership_number = membership_numbers[number]
+            member.membership_accepted = number % 3 != 0
+            self.session.add(member)
+        self.session.flush()
+
+    def _assert_keyset_pages(self, get_page, content_size, page_size):
+        offset_pages = [
+            [member.id for member in get_page(offset, page_size, None)]
+            for offset in range(0, content_size, page_size)]
+
+        # forward using the last key of the previous page
+        cursor = None
+        for page_number, offset_page in enumerate(offset_pages):
+            page = get_page(page_number * page_size, page_size, cursor)
+            self.assertEqual([member.id for member in page], offset_page)
+            cursor = Cursor(Cursor.AFTER, page[-1].id)
+
+        # backward from the end using the first key of the next page
+        cursor = Cursor(Cursor.BEFORE)
+        for page_number in reversed(range(len(offset_pages))):
+            page = get_page(
+                page_number * page_size,
+                len(offset_pages[page_number]),
+                cursor)
+            self.assertEqual(
+                [member.id for member in page], offset_pages[page_number])
+            cursor = Cursor(Cursor.BEFORE, page[0].id)
+
+    def test_get_members(self):
+        for sort_property in ['id', 'lastname', 'membership_number']:
+            for sort_direction in ['asc', 'desc']:
+                self._assert_keyset_pages(
+                    lambda offset, page_size, cursor:
+                    C3sMember.get_members(
+                        sort_property, page_size, offset, sort_direction,
+                        cursor),
+                    6,
+                    2)
+
+    def test_nonmember_listing(self):
+        for sort_property in ['id', 'lastname', 'membership_number']:
+            for sort_direction in ['asc', 'desc']:
+                self._assert_keyset_pages(
+                    lambda offset, page_size, cursor:
+                    C3sMember.nonmember_listing(
+                        offset, page_size, sort_property, sort_direction,
+                        cursor),
+                    3,
+                    2)
+
+    def test_missing_cursor_row(self):
+        """
+        Test that the offset is used if the cursor row does not exist.
+        """
+        self.assertEqual(
+            [member.id for member in C3sMember.get_members(
+                'id', 2, 2, 'asc', Cursor(Cursor.AFTER, 100))],
+            [member.id for member in C3sMember.get_members('id', 2, 2)])
+
 # class MembershipNumberModelTestBase(C3sMembershipModelTestBase):
 # XXX TODO
 
 
+class MoneyTests(unittest.TestCase):
+    """
+    test the money type storing amounts as integer cents
+    """
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.table = Table(
+            'amounts', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('amount', Money(12, 2)))
+        self.table.create(self.engine)
+
+    def test_round_trip(self):
+        """
+        Test that amounts are stored as cents and loaded as Decimal
+        """
+        self.engine.execute(self.table.insert(), [
+            {'amount': D('37.50')},
+            {'amount': D('-0.01')},
+            {'amount': 12},
+            {'amount': D('NaN')},
+            {'amount': None},
+        ])
+        self.assertEqual(
+            [row[0] for row in self.engine.execute(
+                'select amount from amounts order by id')],
+            [3750, -1, 1200, None, None])
+        amounts = [
+            row.amount for row in self.engine.execute(
+                self.table.select().order_by(self.table.c.id))]
+        self.assertEqual(amounts[:3], [D('37.50'), D('-0.01'), D('12.00')])
+        self.assertTrue(amounts[3].is_nan())
+        self.assertTrue(amounts[4].is_nan())
+
+    def test_sub_cent_amount(self):
+        """
+        Test that amounts with more than two decimal places are rejected
+        """
+        with self.assertRaises(StatementError):
+            self.engine.execute(
+                self.table.insert(), {'amount': D('0.005')})
+
+    def test_sum(self):
+        """
+        Test that the database sums the amounts exactly
+        """
+        self.engine.execute(self.table.insert(), [
+            {'amount': D('0.10')},
+            {'amount': D('0.20')},
+            {'amount': D('NaN')},
+        ])
+        total = self.engine.execute(
+            select([func.sum(self.table.c.amount)])).scalar()
+        self.assertEqual(total, D('0.30'))
+        self.assertEqual(str(total), '0.30')
+
+
 class GroupTests(unittest.TestCase):
     """
     test the groups
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Tests that the hot repository and model queries are served by indexes.
+
+The query plans are captured with SQLite's EXPLAIN QUERY PLAN for every
+SELECT statement executed by a query. A query fails the test if its plan
+contains a full table scan, i.e. a "SCAN <table>" step not using an index.
+"""
+
+from datetime import date
+import re
+import unittest
+
+from sqlalchemy import (
+    create_engine,
+    event,
+)
+
+from c3smembership.data.model.base import (
+    Base,
+    DBSession,
+)
+from c3smembership.data.repository.member_repository import MemberRepository
+from c3smembership.data.repository.share_repository import ShareRepository
+from c3smembership.models import (
+    C3sMember,
+    Dues17Invoice,
+)
+from c3smembership.presentation.pagination.pagination import Cursor
+from c3smembership.scripts.generate_register import populate
+
+
+FULL_TABLE_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+"""
+Matches the query plan steps scanning a whole table without index.
+"""
+
+
+class QueryPlanRecorder(object):
+    """
+    Records the query plans of the SELECT statements executed on an engine.
+
+    The plans are recorded as tuples of the statement and the list of query
+    plan step details.
+    """
+
+    def __init__(self, engine):
+        self.plans = []
+        event.listen(engine, 'before_cursor_execute', self._explain)
+
+    def _explain(self, connection, cursor, statement, parameters, context,
+                 executemany):
+        # pylint: disable=too-many-arguments,unused-argument
+        if not statement.lstrip().upper().startswith('SELECT'):
+            return
+        explain_cursor = connection.connection.cursor()
+        explain_cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        self.plans.append(
+            (statement, [row[-1] for row in explain_cursor.fetchall()]))
+        explain_cursor.close()
+
+    def record(self, function):
+        """
+        Calls the function and returns the plans of its SELECT statements.
+        """
+        del self.plans[:]
+        function()
+        return list(self.plans)
+
+    @classmethod
+    def get_full_table_scans(cls, plans):
+        """
+        Gets the names of the tables scanned without index.
+        """
+        tables = []
+        for _, details in plans:
+            for detail in details:
+                match = FULL_TABLE_SCAN.match(detail)
+                if match is not None:
+                    tables.append(match.group('table'))
+        return tables
+
+
+HOT_QUERIES = [
+    ('member by membership number',
+     lambda: MemberRepository.get_member(5)),
+    ('member by dues 2015 token',
+     lambda: C3sMember.get_by_dues15_token(u'TOKEN')),
+    ('member by dues 2016 token',
+     lambda: C3sMember.get_by_dues16_token(u'TOKEN')),
+    ('member by dues 2017 token',
+     lambda: C3sMember.get_by_dues17_token(u'TOKEN')),
+    ('member by invitation token',
+     lambda: C3sMember.get_by_bcgvtoken(u'TOKEN')),
+    ('member by confirmation code',
+     lambda: C3sMember.get_by_code(u'CODE')),
+    ('accepted members',
+     MemberRepository.get_accepted_members),
+    ('accepted members count',
+     MemberRepository.get_accepted_members_count),
+    ('number of members', C3sMember.get_num_members_accepted),
+    ('number of lost memberships', C3sMember.get_num_membership_lost),
+    ('number of applications', C3sMember.nonmember_listing_count),
+    ('membership listing page',
+     lambda: C3sMember.get_members('lastname', 30, 0)),
+    ('membership listing keyset page',
+     lambda: C3sMember.get_members(
+         'lastname', 30, cursor=Cursor(Cursor.AFTER, 1))),
+    ('dashboard page',
+     lambda: C3sMember.nonmember_listing(0, 30, 'id', 'asc')),
+    ('dashboard keyset page',
+     lambda: C3sMember.nonmember_listing(
+         0, 30, 'lastname', 'desc', Cursor(Cursor.AFTER, 1))),
+    ('invitees', lambda: C3sMember.get_invitees(10)),
+    ('dues 2017 invoicees', lambda: C3sMember.get_dues17_invoicees(10)),
+    ('postal codes', C3sMember.get_postal_codes_de),
+    ('reference code autocompletion',
+     lambda: C3sMember.get_matching_codes(u'A')),
+    ('name autocompletion',
+     lambda: C3sMember.get_matching_people(u'M')),
+    ('share count', ShareRepository.get_share_count),
+    ('share counts',
+     lambda: ShareRepository.get_share_counts(
+         [date(2015, 12, 31), date(2016, 12, 31)])),
+    ('member share count',
+     lambda: ShareRepository.get_member_share_count(5)),
+    ('member shares', lambda: ShareRepository.get_member_shares(5)),
+    ('approved shares',
+     lambda: ShareRepository.get_approved(
+         date(2016, 1, 1), date(2016, 12, 31))),
+    ('approved shares count',
+     lambda: ShareRepository.get_approved_count(
+         date(2016, 1, 1), date(2016, 12, 31))),
+    ('invoices of member',
+     lambda: Dues17Invoice.get_by_membership_no(5)),
+]
+"""
+The hot queries as tuples of description and function executing them.
+"""
+
+
+class TestQueryPlans(unittest.TestCase):
+    """
+    Tests the query plans of the hot repository and model queries.
+    """
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        populate(self.engine, 200)
+        DBSession.remove()
+        DBSession.configure(bind=self.engine)
+        self.recorder = QueryPlanRecorder(self.engine)
+
+    def tearDown(self):
+        DBSession.remove()
+        self.engine.dispose()
+
+    def test_hot_queries(self):
+        """
+        Test that the hot queries do not scan whole tables.
+        """
+        for description, function in HOT_QUERIES:
+            plans = self.recorder.record(function)
+            self.assertTrue(
+                len(plans) > 0,
+                '{0}: no query executed'.format(description))
+            self.assertEqual(
+                QueryPlanRecorder.get_full_table_scans(plans),
+                [],
+                '{0} scans whole tables:\n{1}'.format(
+                    description,
+                    '\n'.join(
+                        '\n'.join(details) for _, details in plans)))
+
+    def test_full_table_scan_detected(self):
+        """
+        Test that the recorder detects full table scans.
+        """
+        plans = self.recorder.record(
+            lambda: C3sMember.get_by_email(u'nobody@example.com'))
+        self.assertEqual(
+            QueryPlanRecorder.get_full_table_scans(plans), ['members'])
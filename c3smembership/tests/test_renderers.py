@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyramid import testing
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    Unicode,
+    create_engine,
+    select,
+)
+from sqlalchemy.pool import QueuePool
+
+from c3smembership.data.model.base import DBSession
+from c3smembership.renderers import (
+    CSVRenderer,
+    iterate_csv_chunks,
+)
+
+
+class TestCSVRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def render(self, runmode, rows=None, query=None):
+        self.config.registry.settings['c3smembership.runmode'] = runmode
+        request = testing.DummyRequest()
+        renderer = CSVRenderer(None)
+        if query is None:
+            value = {'header': [u'id', u'name'], 'rows': rows}
+        else:
+            value = {'query': query}
+        result = renderer(value, {'request': request})
+        self.assertIsNone(result)
+        self.assertEqual(request.response.content_type, 'text/csv')
+        return request.response
+
+    def test_iterate_csv_chunks(self):
+        rows = ([i, u'nämé {0}'.format(i)] for i in range(1000))
+        chunks = list(iterate_csv_chunks([u'id', u'name'], rows, 1024))
+        self.assertTrue(len(chunks) > 10)
+        for chunk in chunks[:-1]:
+            self.assertTrue(1024 <= len(chunk) < 1100)
+        csv = ''.join(chunks)
+        self.assertTrue(
+            csv.startswith('"id";"name"\r\n"0";"n\xc3\xa4m\xc3\xa9 0"'))
+        self.assertTrue(csv.endswith('"999";"n\xc3\xa4m\xc3\xa9 999"\r\n'))
+
+    def test_dev(self):
+        rows_read = []
+
+        def rows():
+            for i in range(3):
+                rows_read.append(i)
+                yield [i, u'name {0}'.format(i)]
+
+        response = self.render('dev', rows())
+        # the rows are only read when the response is sent
+        self.assertEqual(rows_read, [])
+        self.assertEqual(
+            response.body,
+            '"id";"name"\r\n'
+            '"0";"name 0"\r\n'
+            '"1";"name 1"\r\n'
+            '"2";"name 2"\r\n')
+        self.assertEqual(rows_read, [0, 1, 2])
+
+    def test_query(self):
+        database_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, database_path)
+        engine = create_engine(
+            'sqlite:///{0}'.format(os.path.join(database_path, 'export.db')),
+            poolclass=QueuePool)
+        table = Table(
+            'export', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('name', Unicode(255)))
+        table.create(engine)
+        engine.execute(table.insert(), [
+            {'id': i, 'name': u'name {0}'.format(i)} for i in range(3)])
+        DBSession.configure(bind=engine)
+        self.addCleanup(DBSession.remove)
+
+        response = self.render('dev', query=select([table]))
+        # the query is executed on a dedicated connection when the response
+        # is sent and the connection is released afterwards
+        self.assertEqual(engine.pool.checkedout(), 0)
+        self.assertEqual(
+            response.body,
+            '"id";"name"\r\n'
+            '"0";"name 0"\r\n'
+            '"1";"name 1"\r\n'
+            '"2";"name 2"\r\n')
+        self.assertEqual(engine.pool.checkedout(), 0)
+
+    def test_prod(self):
+        response = self.render(
+            'prod', ([i, u'name {0}'.format(i)] for i in range(10000)))
+        self.assertTrue(
+            response.body.startswith('-----BEGIN PGP MESSAGE-----'))
+        self.assertTrue(
+            response.body.strip().endswith('-----END PGP MESSAGE-----'))
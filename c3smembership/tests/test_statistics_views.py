@@ -121,19 +121,38 @@ class TestViews(unittest.TestCase):
         """
         test the statistics view
         """
+        from c3smembership.business.membership_number_allocator import (
+            MembershipNumberAllocator
+        )
+        from c3smembership.business.statistics_information import (
+            StatisticsInformation
+        )
+        from c3smembership.data.repository.member_repository import (
+            MemberRepository
+        )
+        from c3smembership.data.repository.number_sequence_repository import (
+            NumberSequenceRepository
+        )
+        from c3smembership.data.repository.statistics_repository import (
+            StatisticsRepository
+        )
         from c3smembership.statistics_view import stats_view
         self.config.add_route('join', '/')
         request = testing.DummyRequest()
 
-        class ShareInformationDummy(object):
+        class ShareRepositoryDummy(object):
 
             def __init__(self, share_count):
                 self.share_count = share_count
 
-            def get_share_count(self):
+            def get_share_count(self, effective_date=None):
                 return self.share_count
 
-        request.registry.share_information = ShareInformationDummy(123)
+        request.registry.statistics_information = StatisticsInformation(
+            StatisticsRepository,
+            ShareRepositoryDummy(123),
+            MembershipNumberAllocator(
+                MemberRepository, NumberSequenceRepository))
         result = stats_view(request)
         # print result
         self.assertTrue(result['num_shares_members'] == 123)
@@ -56,6 +56,11 @@ from c3smembership.presentation.i18n import (
     _,
     ZPT_RENDERER,
 )
+from c3smembership.presentation.schemas.membership_application import (
+    NUM_SHARES_RANGE,
+    PASSWORD_LENGTH,
+    validate_date_of_birth,
+)
 import customization
 
 DEBUG = False
@@ -122,7 +127,7 @@ def join_c3s(request):
         )
         password = colander.SchemaNode(
             colander.String(),
-            validator=colander.Length(min=5, max=100),
+            validator=PASSWORD_LENGTH,
             widget=deform.widget.CheckedPasswordWidget(size=20),
             title=_(u'Password (to protect access to your data)'),
             description=_(u'We need a password to protect your data. After '
@@ -162,19 +167,7 @@ def join_c3s(request):
             # css_class="hasDatePicker",
             widget=deform.widget.DatePartsWidget(),
             default=date(2013, 1, 1),
-            validator=Range(
-                min=date(1913, 1, 1),
-                # max 18th birthday, no minors through web formular
-                max=date(
-                    date.today().year-18,
-                    date.today().month,
-                    date.today().day),
-                min_err=_(u'Sorry, we do not believe that you are that old'),
-                max_err=_(
-                    u'Unfortunately, the membership application of an '
-                    u'underaged person is currently not possible via our web '
-                    u'form. Please send an email to office@c3s.cc.')
-            ),
+            validator=validate_date_of_birth,
             oid="date_of_birth",
         )
         locale = colander.SchemaNode(colander.String(),
@@ -262,12 +255,7 @@ def join_c3s(request):
             default="1",
             widget=TextInputSliderWidget(
                 size=3, css_class='num_shares_input'),
-            validator=colander.Range(
-                min=1,
-                max=60,
-                min_err=_(u'You need at least one share of 50 €.'),
-                max_err=_(u'You may choose 60 shares at most (3000 €).'),
-            ),
+            validator=NUM_SHARES_RANGE,
             oid="num_shares")
 
     class TermsInfo(colander.Schema):
@@ -26,16 +26,19 @@ import subprocess
 import tempfile
 from pyramid.httpexceptions import HTTPFound
 from pyramid_mailer.message import Message
-from pyramid.response import Response
 from pyramid.view import view_config
 
+from c3smembership.business.dues_calculation import calculate_partial_dues
 from c3smembership.data.model.base import DBSession
 from c3smembership.models import (
     C3sMember,
     Dues15Invoice,
 )
 
-from c3smembership.mail_utils import send_message
+from c3smembership.mail_utils import (
+    queue_message,
+    send_message,
+)
 from .membership_dues_texts import (
     make_dues_invoice_email,
     make_dues_invoice_investing_email,
@@ -43,6 +46,9 @@ from .membership_dues_texts import (
     make_dues_reduction_email,
     make_dues_exemption_email,
 )
+from c3smembership.presentation.document_response import (
+    make_document_response
+)
 from c3smembership.presentation.views.membership_listing import (
     get_memberhip_listing_redirect
 )
@@ -55,6 +61,28 @@ if LOGGING:  # pragma: no cover
     import logging
     LOG = logging.getLogger(__name__)
 
+PDFLATEX_DIR = os.path.abspath(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '../../certificate/'))
+"""
+The directory of the LaTeX templates and the PDF background of the invoices.
+"""
+
+DUES15_TEMPLATES = [
+    os.path.join(PDFLATEX_DIR, template)
+    for template in [
+        'Urkunde_Hintergrund_blank.pdf',
+        'dues15_invoice_de_v0.2.tex',
+        'dues15_invoice_en_v0.2.tex',
+        'dues15_storno_de_v0.1.tex',
+        'dues15_storno_en_v0.1.tex',
+    ]]
+"""
+The templates of the dues 2015 invoices and reversal invoices determining
+the version of the cached invoice PDFs.
+"""
+
 
 def make_random_string():
     """
@@ -77,23 +105,7 @@ def calculate_partial_dues15(member):
 
     depending on members entry date
     """
-    if member.membership_date < date(2015, 4, 1):
-        # first quarter of 2015 or earlier
-        start = u'q1_2015'
-        amount = D('50')
-    elif member.membership_date < date(2015, 7, 1):
-        # second quarter of 2015
-        start = u'q2_2015'
-        amount = D('37.50')
-    elif member.membership_date < date(2015, 10, 1):
-        # third quarter of 2015
-        start = u'q3_2015'
-        amount = D('25')
-    elif member.membership_date >= date(2015, 10, 1):
-        # third quarter of 2015
-        start = u'q4_2015'
-        amount = D('12.50')
-    return (start, amount)
+    return calculate_partial_dues(2015, member.membership_date)
 
 
 def string_start_quarter(member):
@@ -196,19 +208,6 @@ def send_dues15_invoice_email(request, m_id=None):
             # create a new one, if the new one already exists in the database
             randomstring = make_random_string()  # pragma: no cover
 
-        # prepare invoice number
-        try:
-            # either we already have an invoice number for that client...
-            invoice_no = member.dues15_invoice_no
-            assert invoice_no is not None
-        except AssertionError:
-            # ... or we create a new one and save it
-            # get max invoice no from db
-            max_invoice_no = Dues15Invoice.get_max_invoice_no()
-            # use the next free number, save it to db
-            new_invoice_no = int(max_invoice_no) + 1
-            DBSession.flush()  # save dataset to DB
-
         # calculate dues amount (maybe partial, depending on quarter)
         dues_start, dues_amount = calculate_partial_dues15(member)
 
@@ -216,12 +215,14 @@ def send_dues15_invoice_email(request, m_id=None):
         # and persist invoice info for bookkeeping
         # store some info in DB/member table
         member.dues15_invoice = True
-        member.dues15_invoice_no = new_invoice_no  # irrelevant for investing
         member.dues15_invoice_date = datetime.now()
         member.dues15_token = randomstring
         member.dues15_start = dues_start
 
         if 'normal' in member.membership_type:  # only for normal members
+            # only invoices get an invoice number so that there are no gaps
+            member.dues15_invoice_no = \
+                request.registry.invoice_number_allocator.allocate(2015)
             member.set_dues15_amount(dues_amount)
             # store some more info about invoice in invoice table
             invoice = Dues15Invoice(
@@ -283,8 +284,15 @@ def send_dues15_invoice_email(request, m_id=None):
             }
         )
 
-    # print to console or send mail
-    if 'true' in request.registry.settings['testing.mail_to_console']:
+    # queue mail for the mail worker in batch mode, otherwise print to
+    # console or send mail
+    if batch:
+        queue_message(
+            request,
+            u'dues15_invoice',
+            u'dues15_invoice/{0}'.format(member.id),
+            message)
+    elif 'true' in request.registry.settings['testing.mail_to_console']:
         print(message.body.encode('utf-8'))  # pragma: no cover
     else:
         send_message(request, message)
@@ -310,7 +318,8 @@ def send_dues15_invoice_batch(request):
     """
     Send dues invoice to n members at the same time (batch processing).
 
-    The number (n) is configurable, defaults to 5.
+    The number (n) is configurable, defaults to 5. The emails are queued and
+    delivered in the background by the mail worker.
     """
     try:  # how many to process?
         number = int(request.matchdict['number'])
@@ -339,7 +348,7 @@ def send_dues15_invoice_batch(request):
         ids_sent.append(member.id)
 
     request.session.flash(
-        "sent out {} mails (to members with ids {})".format(
+        "queued {} mails (to members with ids {})".format(
             emails_sent, ids_sent),
         'message_to_staff')
 
@@ -407,29 +416,36 @@ def make_dues15_invoice_no_pdf(request):
         )
         return HTTPFound(request.route_url('error_page'))
 
-    # return a pdf file
-    pdf_file = make_invoice_pdf_pdflatex(member, invoice)
-    response = Response(content_type='application/pdf')
-    pdf_file.seek(0)  # rewind to beginning
-    response.app_iter = open(pdf_file.name, "r")
-    return response
+    # return a pdf file rendered only once per invoice data and templates
+    return make_dues15_invoice_response(
+        request,
+        invoice,
+        lambda: make_invoice_latex(member, invoice),
+        lambda: make_invoice_pdf_pdflatex(member, invoice))
 
 
-def make_invoice_pdf_pdflatex(member, invoice=None):
+def make_dues15_invoice_response(request, invoice, make_latex, render):
     """
-    This function uses pdflatex to create a PDF
-    as receipt for the members membership dues.
+    Makes the response serving an invoice or reversal invoice PDF.
 
-    default output is the current invoice.
-    if i_no is suplied, the relevant invoice number is produced
+    The invoice is keyed by its LaTeX source which contains the current
+    balance of the member. It is stored under its invoice number so that a
+    new version of the invoice, e.g. after a payment, replaces the cached one.
     """
+    return make_document_response(
+        request,
+        DUES15_TEMPLATES,
+        make_latex(),
+        render,
+        u'dues15_invoice_{0}'.format(invoice.invoice_no))
 
+
+def make_invoice_latex(member, invoice=None):
+    """
+    Creates the LaTeX source of an invoice as argument for pdflatex.
+    """
     # directory of pdf and tex files
-    pdflatex_dir = os.path.abspath(
-        os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            '../../certificate/'
-        ))
+    pdflatex_dir = PDFLATEX_DIR
 
     # pdf backgrounds
     pdf_backgrounds = {
@@ -451,12 +467,6 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
     bg_pdf = pdf_backgrounds[background]
     tpl_tex = latex_templates[template_name]
 
-    # pick temporary file for pdf
-    receipt_pdf = tempfile.NamedTemporaryFile(prefix='invoice_', suffix='.pdf')
-
-    (path, filename) = os.path.split(receipt_pdf.name)
-    filename = os.path.splitext(filename)[0]
-
     # on invoice, print start quarter or "reduced". prepare string:
     if (
             not invoice.is_reversal and
@@ -500,8 +510,28 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
     tex_cmd += '\\input{%s}' % tpl_tex
     tex_cmd = u'"'+tex_cmd+'"'
 
+    return tex_cmd
+
+
+def make_invoice_pdf_pdflatex(member, invoice=None):
+    """
+    This function uses pdflatex to create a PDF
+    as receipt for the members membership dues.
+
+    default output is the current invoice.
+    if i_no is suplied, the relevant invoice number is produced
+    """
+
+    tex_cmd = make_invoice_latex(member, invoice)
+
+    # pick temporary file for pdf
+    receipt_pdf = tempfile.NamedTemporaryFile(prefix='invoice_', suffix='.pdf')
+
+    (path, filename) = os.path.split(receipt_pdf.name)
+    filename = os.path.splitext(filename)[0]
+
     # XXX: try to find out, why utf-8 doesn't work on debian
-    subprocess.call(
+    return_code = subprocess.call(
         [
             'pdflatex',
             '-jobname', filename,
@@ -512,13 +542,17 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
         ],
         stdout=open(os.devnull, 'w'),  # hide output
         stderr=subprocess.STDOUT,
-        cwd=pdflatex_dir
+        cwd=PDFLATEX_DIR
     )
 
     # cleanup
     aux = os.path.join(path, filename + '.aux')
     if os.path.isfile(aux):
         os.unlink(aux)
+    if return_code != 0:
+        receipt_pdf.close()
+        raise IOError(
+            'pdflatex failed with exit code {0}'.format(return_code))
 
     return receipt_pdf
 
@@ -577,6 +611,8 @@ def dues15_reduction(request):
     try:
         reduced_amount = D(request.POST['amount'])
         assert not reduced_amount.is_signed()
+        # amounts are stored as cents
+        assert reduced_amount == reduced_amount.quantize(D('0.01'))
         if DEBUG:
             print("DEBUG: reduction to {}".format(reduced_amount))
     except (KeyError, AssertionError):  # pragma: no cover
@@ -641,8 +677,10 @@ def dues15_reduction(request):
         return HTTPFound(
             request.route_url('detail', memberid=member.id) + '#dues15')
 
-    # prepare: get highest invoice no from db
-    max_invoice_no = Dues15Invoice.get_max_invoice_no()
+    # prepare: allocate the numbers of the reversal invoice and, unless the
+    # dues are reduced to zero, the new invoice
+    invoice_numbers = request.registry.invoice_number_allocator.allocate_block(
+        2015, 1 if reduced_amount.is_zero() else 2)
 
     # things to be done:
     # * change dues amount for that member
@@ -659,7 +697,7 @@ def dues15_reduction(request):
     reversal_invoice_amount = -D(old_invoice.invoice_amount)
 
     # prepare reversal invoice number
-    new_invoice_no = max_invoice_no + 1
+    new_invoice_no = invoice_numbers[0]
     # create reversal invoice
     reversal_invoice = Dues15Invoice(
         invoice_no=new_invoice_no,
@@ -817,25 +855,20 @@ def make_dues15_reversal_invoice_pdf(request):
         )
         return HTTPFound(request.route_url('error_page'))
 
-    # return a pdf file
-    pdf_file = make_reversal_pdf_pdflatex(member, invoice)
-    response = Response(content_type='application/pdf')
-    pdf_file.seek(0)  # rewind to beginning
-    response.app_iter = open(pdf_file.name, "r")
-    return response
+    # return a pdf file rendered only once per invoice data and templates
+    return make_dues15_invoice_response(
+        request,
+        invoice,
+        lambda: make_reversal_latex(member, invoice),
+        lambda: make_reversal_pdf_pdflatex(member, invoice))
 
 
-def make_reversal_pdf_pdflatex(member, invoice=None):
+def make_reversal_latex(member, invoice=None):
     """
-    This function uses pdflatex to create a PDF
-    as reversal invoice: cancel and balance out a former invoice.
+    Creates the LaTeX source of a reversal invoice as argument for
+    pdflatex.
     """
-
-    pdflatex_dir = os.path.abspath(
-        os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            '../../certificate/'
-        ))
+    pdflatex_dir = PDFLATEX_DIR
     # pdf backgrounds
     pdf_backgrounds = {
         'blank': pdflatex_dir + '/' + 'Urkunde_Hintergrund_blank.pdf',
@@ -855,12 +888,6 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
     bg_pdf = pdf_backgrounds[background]
     tpl_tex = latex_templates[template_name]
 
-    # pick temporary file for pdf
-    receipt_pdf = tempfile.NamedTemporaryFile(prefix='storno_', suffix='.pdf')
-
-    (path, filename) = os.path.split(receipt_pdf.name)
-    filename = os.path.splitext(filename)[0]
-
     invoice_no = str(invoice.invoice_no).zfill(4) + '-S'
     invoice_date = invoice.invoice_date.strftime('%d. %m. %Y')
     # set variables for tex command
@@ -888,8 +915,25 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
     tex_cmd += '\\input{%s}' % tpl_tex
     tex_cmd = u'"'+tex_cmd+'"'
 
+    return tex_cmd
+
+
+def make_reversal_pdf_pdflatex(member, invoice=None):
+    """
+    This function uses pdflatex to create a PDF
+    as reversal invoice: cancel and balance out a former invoice.
+    """
+
+    tex_cmd = make_reversal_latex(member, invoice)
+
+    # pick temporary file for pdf
+    receipt_pdf = tempfile.NamedTemporaryFile(prefix='storno_', suffix='.pdf')
+
+    (path, filename) = os.path.split(receipt_pdf.name)
+    filename = os.path.splitext(filename)[0]
+
     # XXX: try to find out, why utf-8 doesn't work on debian
-    subprocess.call(
+    return_code = subprocess.call(
         [
             'pdflatex',
             '-jobname', filename,
@@ -900,13 +944,17 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
         ],
         stdout=open(os.devnull, 'w'),  # hide output
         stderr=subprocess.STDOUT,
-        cwd=pdflatex_dir
+        cwd=PDFLATEX_DIR
     )
 
     # cleanup
     aux = os.path.join(path, filename + '.aux')
     if os.path.isfile(aux):
         os.unlink(aux)
+    if return_code != 0:
+        receipt_pdf.close()
+        raise IOError(
+            'pdflatex failed with exit code {0}'.format(return_code))
 
     return receipt_pdf
 
@@ -936,6 +984,8 @@ def dues15_notice(request):
     try:
         paid_amount = D(request.POST['amount'])
         assert not paid_amount.is_signed()
+        # amounts are stored as cents
+        assert paid_amount == paid_amount.quantize(D('0.01'))
         if DEBUG:
             print("DEBUG: payment of {}".format(paid_amount))
     except (KeyError, AssertionError):  # pragma: no cover
@@ -26,16 +26,19 @@ import subprocess
 import tempfile
 from pyramid.httpexceptions import HTTPFound
 from pyramid_mailer.message import Message
-from pyramid.response import Response
 from pyramid.view import view_config
 
+from c3smembership.business.dues_calculation import calculate_partial_dues
 from c3smembership.data.model.base import DBSession
 from c3smembership.models import (
     C3sMember,
     Dues16Invoice,
 )
 
-from c3smembership.mail_utils import send_message
+from c3smembership.mail_utils import (
+    queue_message,
+    send_message,
+)
 from .membership_dues_texts import (
     make_dues16_invoice_email,
     make_dues_invoice_investing_email,
@@ -43,6 +46,9 @@ from .membership_dues_texts import (
     make_dues16_reduction_email,
     make_dues_exemption_email,
 )
+from c3smembership.presentation.document_response import (
+    make_document_response
+)
 from c3smembership.presentation.views.membership_listing import (
     get_memberhip_listing_redirect
 )
@@ -55,6 +61,28 @@ if LOGGING:  # pragma: no cover
     import logging
     LOG = logging.getLogger(__name__)
 
+PDFLATEX_DIR = os.path.abspath(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '../../certificate/'))
+"""
+The directory of the LaTeX templates and the PDF background of the invoices.
+"""
+
+DUES16_TEMPLATES = [
+    os.path.join(PDFLATEX_DIR, template)
+    for template in [
+        'Urkunde_Hintergrund_blank.pdf',
+        'dues16_invoice_de.tex',
+        'dues16_invoice_en.tex',
+        'dues16_storno_de.tex',
+        'dues16_storno_en.tex',
+    ]]
+"""
+The templates of the dues 2016 invoices and reversal invoices determining
+the version of the cached invoice PDFs.
+"""
+
 
 def make_random_string():
     """
@@ -77,26 +105,7 @@ def calculate_partial_dues16(member):
 
     depending on members entry date
     """
-    if member.membership_date >= date(2017, 1, 1):
-        raise ValueError('Member is not applicable for dues 2016.')
-
-    if member.membership_date < date(2016, 4, 1):
-        # first quarter of 2016 or earlier
-        start = u'q1_2016'
-        amount = D('50')
-    elif member.membership_date < date(2016, 7, 1):
-        # second quarter of 2016
-        start = u'q2_2016'
-        amount = D('37.50')
-    elif member.membership_date < date(2016, 10, 1):
-        # third quarter of 2016
-        start = u'q3_2016'
-        amount = D('25')
-    elif member.membership_date >= date(2016, 10, 1):
-        # third quarter of 2016
-        start = u'q4_2016'
-        amount = D('12.50')
-    return (start, amount)
+    return calculate_partial_dues(2016, member.membership_date)
 
 
 def string_start_quarter_dues16(member):
@@ -199,19 +208,6 @@ def send_dues16_invoice_email(request, m_id=None):
             # create a new one, if the new one already exists in the database
             randomstring = make_random_string()  # pragma: no cover
 
-        # prepare invoice number
-        try:
-            # either we already have an invoice number for that client...
-            invoice_no = member.dues16_invoice_no
-            assert invoice_no is not None
-        except AssertionError:
-            # ... or we create a new one and save it
-            # get max invoice no from db
-            max_invoice_no = Dues16Invoice.get_max_invoice_no()
-            # use the next free number, save it to db
-            new_invoice_no = int(max_invoice_no) + 1
-            DBSession.flush()  # save dataset to DB
-
         # calculate dues amount (maybe partial, depending on quarter)
         dues_start, dues_amount = calculate_partial_dues16(member)
 
@@ -219,12 +215,14 @@ def send_dues16_invoice_email(request, m_id=None):
         # and persist invoice info for bookkeeping
         # store some info in DB/member table
         member.dues16_invoice = True
-        member.dues16_invoice_no = new_invoice_no  # irrelevant for investing
         member.dues16_invoice_date = datetime.now()
         member.dues16_token = randomstring
         member.dues16_start = dues_start
 
         if 'normal' in member.membership_type:  # only for normal members
+            # only invoices get an invoice number so that there are no gaps
+            member.dues16_invoice_no = \
+                request.registry.invoice_number_allocator.allocate(2016)
             member.set_dues16_amount(dues_amount)
             # store some more info about invoice in invoice table
             invoice = Dues16Invoice(
@@ -286,8 +284,15 @@ def send_dues16_invoice_email(request, m_id=None):
             }
         )
 
-    # print to console or send mail
-    if 'true' in request.registry.settings['testing.mail_to_console']:
+    # queue mail for the mail worker in batch mode, otherwise print to
+    # console or send mail
+    if batch:
+        queue_message(
+            request,
+            u'dues16_invoice',
+            u'dues16_invoice/{0}'.format(member.id),
+            message)
+    elif 'true' in request.registry.settings['testing.mail_to_console']:
         print(message.body.encode('utf-8'))  # pragma: no cover
     else:
         send_message(request, message)
@@ -313,7 +318,8 @@ def send_dues16_invoice_batch(request):
     """
     Send dues invoice to n members at the same time (batch processing).
 
-    The number (n) is configurable, defaults to 5.
+    The number (n) is configurable, defaults to 5. The emails are queued and
+    delivered in the background by the mail worker.
     """
     try:  # how many to process?
         number = int(request.matchdict['number'])
@@ -342,7 +348,7 @@ def send_dues16_invoice_batch(request):
         ids_sent.append(member.id)
 
     request.session.flash(
-        "sent out {} mails (to members with ids {})".format(
+        "queued {} mails (to members with ids {})".format(
             emails_sent, ids_sent),
         'message_to_staff')
 
@@ -410,12 +416,12 @@ def make_dues16_invoice_no_pdf(request):
         )
         return HTTPFound(request.route_url('error_page'))
 
-    # return a pdf file
-    pdf_file = make_invoice_pdf_pdflatex(member, invoice)
-    response = Response(content_type='application/pdf')
-    pdf_file.seek(0)  # rewind to beginning
-    response.app_iter = open(pdf_file.name, "r")
-    return response
+    # return a pdf file rendered only once per invoice data and templates
+    return make_dues16_invoice_response(
+        request,
+        invoice,
+        lambda: make_invoice_latex(member, invoice),
+        lambda: make_invoice_pdf_pdflatex(member, invoice))
 
 
 def get_dues16_invoice_archive_path():
@@ -453,25 +459,37 @@ def get_dues16_archive_invoice(invoice):
         return None
 
 
-def make_invoice_pdf_pdflatex(member, invoice=None):
+def make_dues16_invoice_response(request, invoice, make_latex, render):
     """
-    This function uses pdflatex to create a PDF
-    as receipt for the members membership dues.
+    Makes the response serving an invoice or reversal invoice PDF.
 
-    default output is the current invoice.
-    if i_no is suplied, the relevant invoice number is produced
+    Archived invoices do not change anymore and are keyed by their archive
+    file. Otherwise the invoice is keyed by its LaTeX source which contains
+    the current balance of the member. It is stored under its invoice number
+    so that a new version of the invoice, e.g. after a payment or once it is
+    archived, replaces the cached one.
     """
+    archive_filename = get_dues16_archive_invoice_filename(invoice)
+    if os.path.isfile(archive_filename):
+        templates = [archive_filename]
+        data = archive_filename
+    else:
+        templates = DUES16_TEMPLATES
+        data = make_latex()
+    return make_document_response(
+        request,
+        templates,
+        data,
+        render,
+        u'dues16_invoice_{0}'.format(invoice.invoice_no))
 
-    dues16_archive_invoice = get_dues16_archive_invoice(invoice)
-    if dues16_archive_invoice is not None:
-        return dues16_archive_invoice
 
+def make_invoice_latex(member, invoice=None):
+    """
+    Creates the LaTeX source of an invoice as argument for pdflatex.
+    """
     # directory of pdf and tex files
-    pdflatex_dir = os.path.abspath(
-        os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            '../../certificate/'
-        ))
+    pdflatex_dir = PDFLATEX_DIR
 
     # pdf backgrounds
     pdf_backgrounds = {
@@ -493,12 +511,6 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
     bg_pdf = pdf_backgrounds[background]
     tpl_tex = latex_templates[template_name]
 
-    # pick temporary file for pdf
-    receipt_pdf = tempfile.NamedTemporaryFile(prefix='invoice_', suffix='.pdf')
-
-    (path, filename) = os.path.split(receipt_pdf.name)
-    filename = os.path.splitext(filename)[0]
-
     # on invoice, print start quarter or "reduced". prepare string:
     if (
             not invoice.is_reversal and
@@ -546,8 +558,32 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
     # make latex show ß correctly in pdf:
     tex_cmd = tex_cmd.replace(u'ß', u'\\ss{}')
 
+    return tex_cmd
+
+
+def make_invoice_pdf_pdflatex(member, invoice=None):
+    """
+    This function uses pdflatex to create a PDF
+    as receipt for the members membership dues.
+
+    default output is the current invoice.
+    if i_no is suplied, the relevant invoice number is produced
+    """
+
+    dues16_archive_invoice = get_dues16_archive_invoice(invoice)
+    if dues16_archive_invoice is not None:
+        return dues16_archive_invoice
+
+    tex_cmd = make_invoice_latex(member, invoice)
+
+    # pick temporary file for pdf
+    receipt_pdf = tempfile.NamedTemporaryFile(prefix='invoice_', suffix='.pdf')
+
+    (path, filename) = os.path.split(receipt_pdf.name)
+    filename = os.path.splitext(filename)[0]
+
     # XXX: try to find out, why utf-8 doesn't work on debian
-    subprocess.call(
+    return_code = subprocess.call(
         [
             'pdflatex',
             '-jobname', filename,
@@ -558,13 +594,17 @@ def make_invoice_pdf_pdflatex(member, invoice=None):
         ],
         stdout=open(os.devnull, 'w'),  # hide output
         stderr=subprocess.STDOUT,
-        cwd=pdflatex_dir
+        cwd=PDFLATEX_DIR
     )
 
     # cleanup
     aux = os.path.join(path, filename + '.aux')
     if os.path.isfile(aux):
         os.unlink(aux)
+    if return_code != 0:
+        receipt_pdf.close()
+        raise IOError(
+            'pdflatex failed with exit code {0}'.format(return_code))
 
     archive_dues16_invoice(receipt_pdf, invoice)
 
@@ -625,6 +665,8 @@ def dues16_reduction(request):
     try:
         reduced_amount = D(request.POST['amount'])
         assert not reduced_amount.is_signed()
+        # amounts are stored as cents
+        assert reduced_amount == reduced_amount.quantize(D('0.01'))
         if DEBUG:
             print("DEBUG: reduction to {}".format(reduced_amount))
     except (KeyError, AssertionError):  # pragma: no cover
@@ -689,8 +731,10 @@ def dues16_reduction(request):
         return HTTPFound(
             request.route_url('detail', memberid=member.id) + '#dues16')
 
-    # prepare: get highest invoice no from db
-    max_invoice_no = Dues16Invoice.get_max_invoice_no()
+    # prepare: allocate the numbers of the reversal invoice and, unless the
+    # dues are reduced to zero, the new invoice
+    invoice_numbers = request.registry.invoice_number_allocator.allocate_block(
+        2016, 1 if reduced_amount.is_zero() else 2)
 
     # things to be done:
     # * change dues amount for that member
@@ -707,7 +751,7 @@ def dues16_reduction(request):
     reversal_invoice_amount = -D(old_invoice.invoice_amount)
 
     # prepare reversal invoice number
-    new_invoice_no = max_invoice_no + 1
+    new_invoice_no = invoice_numbers[0]
     # create reversal invoice
     reversal_invoice = Dues16Invoice(
         invoice_no=new_invoice_no,
@@ -866,29 +910,20 @@ def make_dues16_reversal_invoice_pdf(request):
         )
         return HTTPFound(request.route_url('error_page'))
 
-    # return a pdf file
-    pdf_file = make_reversal_pdf_pdflatex(member, invoice)
-    response = Response(content_type='application/pdf')
-    pdf_file.seek(0)  # rewind to beginning
-    response.app_iter = open(pdf_file.name, "r")
-    return response
+    # return a pdf file rendered only once per invoice data and templates
+    return make_dues16_invoice_response(
+        request,
+        invoice,
+        lambda: make_reversal_latex(member, invoice),
+        lambda: make_reversal_pdf_pdflatex(member, invoice))
 
 
-def make_reversal_pdf_pdflatex(member, invoice=None):
+def make_reversal_latex(member, invoice=None):
     """
-    This function uses pdflatex to create a PDF
-    as reversal invoice: cancel and balance out a former invoice.
+    Creates the LaTeX source of a reversal invoice as argument for
+    pdflatex.
     """
-
-    dues16_archive_invoice = get_dues16_archive_invoice(invoice)
-    if dues16_archive_invoice is not None:
-        return dues16_archive_invoice
-
-    pdflatex_dir = os.path.abspath(
-        os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            '../../certificate/'
-        ))
+    pdflatex_dir = PDFLATEX_DIR
     # pdf backgrounds
     pdf_backgrounds = {
         'blank': pdflatex_dir + '/' + 'Urkunde_Hintergrund_blank.pdf',
@@ -908,12 +943,6 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
     bg_pdf = pdf_backgrounds[background]
     tpl_tex = latex_templates[template_name]
 
-    # pick temporary file for pdf
-    receipt_pdf = tempfile.NamedTemporaryFile(prefix='storno_', suffix='.pdf')
-
-    (path, filename) = os.path.split(receipt_pdf.name)
-    filename = os.path.splitext(filename)[0]
-
     invoice_no = str(invoice.invoice_no).zfill(4) + '-S'
     invoice_date = invoice.invoice_date.strftime('%d. %m. %Y')
     # set variables for tex command
@@ -941,8 +970,29 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
     tex_cmd += '\\input{%s}' % tpl_tex
     tex_cmd = u'"'+tex_cmd+'"'
 
+    return tex_cmd
+
+
+def make_reversal_pdf_pdflatex(member, invoice=None):
+    """
+    This function uses pdflatex to create a PDF
+    as reversal invoice: cancel and balance out a former invoice.
+    """
+
+    dues16_archive_invoice = get_dues16_archive_invoice(invoice)
+    if dues16_archive_invoice is not None:
+        return dues16_archive_invoice
+
+    tex_cmd = make_reversal_latex(member, invoice)
+
+    # pick temporary file for pdf
+    receipt_pdf = tempfile.NamedTemporaryFile(prefix='storno_', suffix='.pdf')
+
+    (path, filename) = os.path.split(receipt_pdf.name)
+    filename = os.path.splitext(filename)[0]
+
     # XXX: try to find out, why utf-8 doesn't work on debian
-    subprocess.call(
+    return_code = subprocess.call(
         [
             'pdflatex',
             '-jobname', filename,
@@ -953,13 +1003,17 @@ def make_reversal_pdf_pdflatex(member, invoice=None):
         ],
         stdout=open(os.devnull, 'w'),  # hide output
         stderr=subprocess.STDOUT,
-        cwd=pdflatex_dir
+        cwd=PDFLATEX_DIR
     )
 
     # cleanup
     aux = os.path.join(path, filename + '.aux')
     if os.path.isfile(aux):
         os.unlink(aux)
+    if return_code != 0:
+        receipt_pdf.close()
+        raise IOError(
+            'pdflatex failed with exit code {0}'.format(return_code))
 
     archive_dues16_invoice(receipt_pdf, invoice)
 
@@ -991,6 +1045,8 @@ def dues16_notice(request):
     try:
         paid_amount = D(request.POST['amount'])
         assert not paid_amount.is_signed()
+        # amounts are stored as cents
+        assert paid_amount == paid_amount.quantize(D('0.01'))
         if DEBUG:
             print("DEBUG: payment of {}".format(paid_amount))
     except (KeyError, AssertionError):  # pragma: no cover
@@ -21,14 +21,30 @@ from datetime import (
 from decimal import Decimal as D
 # from pyramid.config import Configurator
 from pyramid import testing
+import shutil
 from sqlalchemy import engine_from_config
+import tempfile
 import transaction
 import unittest
 
+from c3smembership.business.document_cache import DocumentCache
+from c3smembership.business.invoice_number_allocator import (
+    InvoiceNumberAllocator
+)
+from c3smembership.business.mail_queue import MailQueue
 from c3smembership.data.model.base import (
     DBSession,
     Base,
 )
+from c3smembership.data.repository.dues_invoice_repository import (
+    DuesInvoiceRepository
+)
+from c3smembership.data.repository.mail_job_repository import (
+    MailJobRepository
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
 from c3smembership.models import (
     C3sMember,
     Dues16Invoice,
@@ -187,6 +203,14 @@ class TestDues16Views(unittest.TestCase):
             'c3smembership.url'] = 'https://yes.c3s.cc'
         self.config.registry.settings['c3smembership.mailaddr'] = 'c@c3s.cc'
         self.config.registry.settings['testing.mail_to_console'] = 'false'
+        self.config.registry.mail_queue = MailQueue(MailJobRepository)
+        self.config.registry.invoice_number_allocator = \
+            InvoiceNumberAllocator(
+                DuesInvoiceRepository, NumberSequenceRepository)
+
+        self.document_cache_path = tempfile.mkdtemp()
+        self.config.registry.document_cache = DocumentCache(
+            self.document_cache_path)
 
         DBSession.remove()
         self.session = _initTestingDB()
@@ -194,6 +218,7 @@ class TestDues16Views(unittest.TestCase):
     def tearDown(self):
         DBSession.remove()
         testing.tearDown()
+        shutil.rmtree(self.document_cache_path)
 
     def test_random_string(self):
         from c3smembership.views.membership_dues_2016 import make_random_string
@@ -532,7 +557,7 @@ class TestDues16Views(unittest.TestCase):
         res = send_dues16_invoice_batch(req_post)
 
         assert(
-            'sent out 5 mails (to members with ids [1, 2, 3, 4, 5])' in
+            'queued 5 mails (to members with ids [1, 2, 3, 4, 5])' in
             req.session.pop_flash('message_to_staff'))
 
         # try to batch-send once more:
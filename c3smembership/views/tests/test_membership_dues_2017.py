@@ -19,16 +19,34 @@ from datetime import (
     date,
     datetime)
 from decimal import Decimal as D
+import mock
+import os
 # from pyramid.config import Configurator
 from pyramid import testing
+import shutil
 from sqlalchemy import engine_from_config
+import tempfile
 import transaction
 import unittest
 
+from c3smembership.business.document_cache import DocumentCache
+from c3smembership.business.invoice_number_allocator import (
+    InvoiceNumberAllocator
+)
+from c3smembership.business.mail_queue import MailQueue
 from c3smembership.data.model.base import (
     DBSession,
     Base,
 )
+from c3smembership.data.repository.dues_invoice_repository import (
+    DuesInvoiceRepository
+)
+from c3smembership.data.repository.mail_job_repository import (
+    MailJobRepository
+)
+from c3smembership.data.repository.number_sequence_repository import (
+    NumberSequenceRepository
+)
 from c3smembership.models import (
     C3sMember,
     Dues17Invoice,
@@ -187,6 +205,14 @@ class TestDues17Views(unittest.TestCase):
             'c3smembership.url'] = 'https://yes.c3s.cc'
         self.config.registry.settings['c3smembership.mailaddr'] = 'c@c3s.cc'
         self.config.registry.settings['testing.mail_to_console'] = 'false'
+        self.config.registry.mail_queue = MailQueue(MailJobRepository)
+        self.config.registry.invoice_number_allocator = \
+            InvoiceNumberAllocator(
+                DuesInvoiceRepository, NumberSequenceRepository)
+
+        self.document_cache_path = tempfile.mkdtemp()
+        self.config.registry.document_cache = DocumentCache(
+            self.document_cache_path)
 
         DBSession.remove()
         self.session = _initTestingDB()
@@ -194,6 +220,62 @@ class TestDues17Views(unittest.TestCase):
     def tearDown(self):
         DBSession.remove()
         testing.tearDown()
+        shutil.rmtree(self.document_cache_path)
+
+    def test_make_dues17_invoice_response(self):
+        """
+        Test that invoices are cached once per version and archived invoices
+        are keyed by their archive file
+        """
+        from c3smembership.views.membership_dues_2017 import (
+            make_dues17_invoice_response)
+        template_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_path)
+        template = os.path.join(template_path, 'dues17_invoice_de.tex')
+        archive_filename = os.path.join(template_path, 'C3S-dues17-0001.pdf')
+        for filename in [template, archive_filename]:
+            with open(filename, 'w') as written_file:
+                written_file.write('pdf')
+        os.remove(archive_filename)
+        invoice = mock.Mock()
+        invoice.invoice_no = 1
+        render_count = []
+
+        def render():
+            render_count.append(1)
+            pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf')
+            pdf_file.write('invoice')
+            pdf_file.flush()
+            return pdf_file
+
+        def get_response(latex):
+            return make_dues17_invoice_response(
+                testing.DummyRequest(), invoice, lambda: latex, render)
+
+        with mock.patch(
+                'c3smembership.views.membership_dues_2017.DUES17_TEMPLATES',
+                [template]), \
+                mock.patch(
+                    'c3smembership.views.membership_dues_2017.'
+                    'get_dues17_archive_invoice_filename') as archive_mock:
+            archive_mock.return_value = archive_filename
+            first = get_response(u'balance 50')
+            self.assertEqual(get_response(u'balance 50').etag, first.etag)
+            self.assertEqual(len(render_count), 1)
+
+            # a payment changes the balance and replaces the cached invoice
+            second = get_response(u'balance 0')
+            self.assertNotEqual(second.etag, first.etag)
+            self.assertEqual(len(render_count), 2)
+            self.assertEqual(len(os.listdir(self.document_cache_path)), 1)
+
+            # the archived invoice doesn't depend on the balance anymore
+            with open(archive_filename, 'w') as archive_file:
+                archive_file.write('archived invoice')
+            archived = get_response(u'balance 0')
+            self.assertEqual(get_response(u'balance 10').etag, archived.etag)
+            self.assertEqual(len(render_count), 3)
+            self.assertEqual(len(os.listdir(self.document_cache_path)), 1)
 
     def test_random_string(self):
         from c3smembership.views.membership_dues_2017 import make_random_string
@@ -531,7 +613,7 @@ class TestDues17Views(unittest.TestCase):
         res = send_dues17_invoice_batch(req_post)
 
         assert(
-            'sent out 5 mails (to members with ids [1, 2, 3, 4, 5])' in
+            'queued 5 mails (to members with ids [1, 2, 3, 4, 5])' in
             req.session.pop_flash('message_to_staff'))
 
         # try to batch-send once more:
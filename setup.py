@@ -79,6 +79,16 @@ setup(name='c3smembership',
       main = c3smembership:main
       [console_scripts]
       initialize_c3sMembership_db = c3smembership.scripts.initialize_db:main
+      benchmark_c3sMembership_share_count = c3smembership.scripts.benchmark_share_count:main
+      benchmark_c3sMembership_gnupg = c3smembership.scripts.benchmark_gnupg:main
+      benchmark_c3sMembership = c3smembership.scripts.benchmark_suite:main
+      c3sMembership_generate_register = c3smembership.scripts.generate_register:main
+      c3sMembership_mail_worker = c3smembership.scripts.mail_worker:main
+      c3sMembership_reconcile_payments = c3smembership.scripts.reconcile_payments:main
+      c3sMembership_import_members = c3smembership.scripts.import_members:main
+      c3sMembership_calculate_dues = c3smembership.scripts.calculate_dues:main
+      c3sMembership_rebuild_dues_statistics = c3smembership.scripts.rebuild_dues_statistics:main
+      c3sMembership_archive_invoices = c3smembership.scripts.archive_invoices:main
       """,
       # http://opkode.com/media/blog/
       #        using-extract_messages-in-your-python-egg-with-a-src-directory